@@ -0,0 +1,28 @@
+"""Add lower(student_id) expression index for case-insensitive ID search
+
+Revision ID: a8b6c0d2e5f7
+Revises: f7a5b9c1d4e6
+Create Date: 2026-10-19 16:02:51.274930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8b6c0d2e5f7'
+down_revision: Union[str, Sequence[str], None] = 'f7a5b9c1d4e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index lower(student_id) so student search can match ID prefixes case-insensitively."""
+    op.create_index('ix_students_student_id_lower', 'students', [sa.text('lower(student_id)')])
+
+
+def downgrade() -> None:
+    """Drop the lowered student ID index."""
+    op.drop_index('ix_students_student_id_lower', table_name='students')
@@ -0,0 +1,47 @@
+"""Add integration_sync_states for incremental LMS/SIS sync
+
+Revision ID: b3f1c2d4e5a6
+Revises: 9626b5d9eb1d
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c2d4e5a6'
+down_revision: Union[str, Sequence[str], None] = '9626b5d9eb1d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create integration_sync_states table."""
+    op.create_table(
+        'integration_sync_states',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('integration', sa.String(length=50), nullable=False),
+        sa.Column('scope_id', sa.String(length=100), nullable=False),
+        sa.Column('high_water_mark', sa.String(length=64), nullable=True),
+        sa.Column('etag', sa.String(length=255), nullable=True),
+        sa.Column('snapshot', sa.Text(), nullable=True),
+        sa.Column('student_count', sa.Integer(), nullable=True),
+        sa.Column('last_sync_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_full_sync_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_integration_sync_states_id'), 'integration_sync_states', ['id'], unique=False)
+    op.create_index('ix_integration_sync_states_scope', 'integration_sync_states',
+                    ['integration', 'scope_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Drop integration_sync_states table."""
+    op.drop_index('ix_integration_sync_states_scope', table_name='integration_sync_states')
+    op.drop_index(op.f('ix_integration_sync_states_id'), table_name='integration_sync_states')
+    op.drop_table('integration_sync_states')
@@ -0,0 +1,36 @@
+"""Add revoked_sessions for durable logout of stateless session tokens
+
+Revision ID: b9c7d1e3f5a8
+Revises: a8b6c0d2e5f7
+Create Date: 2026-10-19 16:42:31.518907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9c7d1e3f5a8'
+down_revision: Union[str, Sequence[str], None] = 'a8b6c0d2e5f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create revoked_sessions table."""
+    op.create_table(
+        'revoked_sessions',
+        sa.Column('nonce', sa.String(length=64), nullable=False),
+        sa.Column('exp', sa.Integer(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('nonce')
+    )
+    op.create_index(op.f('ix_revoked_sessions_exp'), 'revoked_sessions', ['exp'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop revoked_sessions table."""
+    op.drop_index(op.f('ix_revoked_sessions_exp'), table_name='revoked_sessions')
+    op.drop_table('revoked_sessions')
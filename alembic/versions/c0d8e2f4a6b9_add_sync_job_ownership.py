@@ -0,0 +1,33 @@
+"""Add sync job owner, heartbeat and cancel flag for multi-worker deployments
+
+Revision ID: c0d8e2f4a6b9
+Revises: b9c7d1e3f5a8
+Create Date: 2026-10-19 17:05:12.204417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c0d8e2f4a6b9'
+down_revision: Union[str, Sequence[str], None] = 'b9c7d1e3f5a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add worker_id, heartbeat_at and cancel_requested to sync_jobs."""
+    op.add_column('sync_jobs', sa.Column('worker_id', sa.String(length=100), nullable=True))
+    op.add_column('sync_jobs', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('sync_jobs', sa.Column('cancel_requested', sa.Boolean(), nullable=False,
+                                         server_default=sa.false()))
+
+
+def downgrade() -> None:
+    """Remove sync job ownership columns."""
+    op.drop_column('sync_jobs', 'cancel_requested')
+    op.drop_column('sync_jobs', 'heartbeat_at')
+    op.drop_column('sync_jobs', 'worker_id')
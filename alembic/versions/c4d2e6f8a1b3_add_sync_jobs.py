@@ -0,0 +1,51 @@
+"""Add sync_jobs for background integration syncs
+
+Revision ID: c4d2e6f8a1b3
+Revises: b3f1c2d4e5a6
+Create Date: 2026-10-18 14:03:27.552917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d2e6f8a1b3'
+down_revision: Union[str, Sequence[str], None] = 'b3f1c2d4e5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create sync_jobs table."""
+    op.create_table(
+        'sync_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.String(length=64), nullable=False),
+        sa.Column('integration', sa.String(length=50), nullable=False),
+        sa.Column('scope_id', sa.String(length=200), nullable=False),
+        sa.Column('requested_by', sa.String(length=100), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('stage', sa.String(length=50), nullable=True),
+        sa.Column('progress', sa.Text(), nullable=True),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_id')
+    )
+    op.create_index(op.f('ix_sync_jobs_id'), 'sync_jobs', ['id'], unique=False)
+    op.create_index('ix_sync_jobs_status_created', 'sync_jobs', ['status', 'created_at'], unique=False)
+    op.create_index('ix_sync_jobs_integration_scope', 'sync_jobs', ['integration', 'scope_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop sync_jobs table."""
+    op.drop_index('ix_sync_jobs_integration_scope', table_name='sync_jobs')
+    op.drop_index('ix_sync_jobs_status_created', table_name='sync_jobs')
+    op.drop_index(op.f('ix_sync_jobs_id'), table_name='sync_jobs')
+    op.drop_table('sync_jobs')
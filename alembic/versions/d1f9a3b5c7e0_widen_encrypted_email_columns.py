@@ -0,0 +1,47 @@
+"""Widen encrypted e-mail columns to hold Fernet tokens of full-length addresses
+
+Revision ID: d1f9a3b5c7e0
+Revises: c0d8e2f4a6b9
+Create Date: 2026-10-19 18:22:51.630942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1f9a3b5c7e0'
+down_revision: Union[str, Sequence[str], None] = 'c0d8e2f4a6b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# A 255-character address encrypts to a ~425-character versioned Fernet token
+ENCRYPTED_LENGTH = 512
+
+# (table, column, previous length, nullable)
+WIDENED_COLUMNS = [
+    ('students', 'email', 255, True),
+    ('students', 'parent_email', 255, True),
+    ('users', 'email', 255, False),
+    ('audit_logs', 'user_email', 255, True),
+]
+
+
+def upgrade() -> None:
+    """Widen e-mail columns whose encrypted values exceed 255 characters."""
+    for table, column, length, nullable in WIDENED_COLUMNS:
+        op.alter_column(table, column,
+                        existing_type=sa.String(length=length),
+                        type_=sa.String(length=ENCRYPTED_LENGTH),
+                        existing_nullable=nullable)
+
+
+def downgrade() -> None:
+    """Restore original column lengths."""
+    for table, column, length, nullable in WIDENED_COLUMNS:
+        op.alter_column(table, column,
+                        existing_type=sa.String(length=ENCRYPTED_LENGTH),
+                        type_=sa.String(length=length),
+                        existing_nullable=nullable)
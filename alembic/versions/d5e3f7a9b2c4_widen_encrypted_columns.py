@@ -0,0 +1,44 @@
+"""Widen encrypted contact and name columns to hold Fernet tokens
+
+Revision ID: d5e3f7a9b2c4
+Revises: c4d2e6f8a1b3
+Create Date: 2026-10-18 23:12:40.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e3f7a9b2c4'
+down_revision: Union[str, Sequence[str], None] = 'c4d2e6f8a1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, previous length, nullable)
+WIDENED_COLUMNS = [
+    ('students', 'phone', 20, True),
+    ('students', 'parent_phone', 20, True),
+    ('users', 'first_name', 100, False),
+    ('users', 'last_name', 100, False),
+]
+
+
+def upgrade() -> None:
+    """Widen columns whose encrypted values exceed their plaintext length."""
+    for table, column, length, nullable in WIDENED_COLUMNS:
+        op.alter_column(table, column,
+                        existing_type=sa.String(length=length),
+                        type_=sa.String(length=255),
+                        existing_nullable=nullable)
+
+
+def downgrade() -> None:
+    """Restore original column lengths."""
+    for table, column, length, nullable in WIDENED_COLUMNS:
+        op.alter_column(table, column,
+                        existing_type=sa.String(length=255),
+                        type_=sa.String(length=length),
+                        existing_nullable=nullable)
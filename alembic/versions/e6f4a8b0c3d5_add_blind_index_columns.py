@@ -0,0 +1,112 @@
+"""Add blind-index digest columns for searching encrypted fields
+
+Revision ID: e6f4a8b0c3d5
+Revises: d5e3f7a9b2c4
+Create Date: 2026-10-19 09:41:27.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f4a8b0c3d5'
+down_revision: Union[str, Sequence[str], None] = 'd5e3f7a9b2c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BLIND_INDEXES = {
+    'students': ['email', 'phone', 'parent_email', 'parent_phone'],
+    'users': ['email'],
+}
+# Encrypted ciphertext is randomized, so uniqueness moves from the value to its digest
+UNIQUE_BLIND_INDEXES = {('users', 'email')}
+# Unique constraints on those ciphertext columns (created in 375b9b58f70d)
+CIPHERTEXT_UNIQUE_CONSTRAINTS = {('users', 'email'): 'uq_users_email'}
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _backfill(table_name: str, fields: list) -> None:
+    """Compute digests for existing rows, decrypting values written encrypted."""
+    from mvp.encryption import blind_index_column, encryption_manager
+
+    table = sa.table(table_name, sa.column('id', sa.Integer),
+                     *[sa.column(field, sa.String) for field in fields],
+                     *[sa.column(blind_index_column(field), sa.String) for field in fields])
+    update = table.update().where(table.c.id == sa.bindparam('row_id')).values(
+        {blind_index_column(field): sa.bindparam(f"digest_{field}") for field in fields})
+
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.select(table.c.id, *[table.c[field] for field in fields])
+                            .where(table.c.id > last_id).order_by(table.c.id)
+                            .limit(BACKFILL_BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+        params = [{'row_id': row[0]} for row in rows]
+        for position, field in enumerate(fields, start=1):
+            values = encryption_manager.decrypt_column([row[position] for row in rows])
+            for param, value in zip(params, values):
+                param[f"digest_{field}"] = encryption_manager.blind_index(field, value)
+        bind.execute(update, params)
+        last_id = rows[-1][0]
+
+
+def _check_unique_digests(table_name: str, field: str) -> None:
+    """Refuse to build a unique digest index over values that only differ by case or whitespace."""
+    column = f"{field}_bidx"
+    table = sa.table(table_name, sa.column('id', sa.Integer), sa.column(column, sa.String))
+    duplicates = op.get_bind().execute(
+        sa.select(table.c[column], sa.func.count())
+        .where(table.c[column].isnot(None))
+        .group_by(table.c[column])
+        .having(sa.func.count() > 1)
+    ).fetchall()
+    if not duplicates:
+        return
+
+    groups = []
+    for digest, _count in duplicates:
+        ids = op.get_bind().execute(
+            sa.select(table.c.id).where(table.c[column] == digest).order_by(table.c.id)
+        ).scalars().all()
+        groups.append(ids)
+    # Ids only: the values themselves are the PII being protected
+    raise RuntimeError(
+        f"{table_name}.{field} has {len(groups)} group(s) of rows whose values differ only by case "
+        f"or surrounding whitespace (ids: {groups}); merge or rename them, then re-run the migration"
+    )
+
+
+def upgrade() -> None:
+    """Add indexed digest columns and backfill them."""
+    for table, fields in BLIND_INDEXES.items():
+        for field in fields:
+            op.add_column(table, sa.Column(f"{field}_bidx", sa.String(length=32), nullable=True))
+        _backfill(table, fields)
+        for field in fields:
+            if (table, field) in UNIQUE_BLIND_INDEXES:
+                _check_unique_digests(table, field)
+            op.create_index(f"ix_{table}_{field}_bidx", table, [f"{field}_bidx"],
+                            unique=(table, field) in UNIQUE_BLIND_INDEXES)
+    for table, field in UNIQUE_BLIND_INDEXES:
+        op.drop_index(f"ix_{table}_{field}", table_name=table)
+        op.create_index(f"ix_{table}_{field}", table, [field], unique=False)
+    for (table, field), constraint in CIPHERTEXT_UNIQUE_CONSTRAINTS.items():
+        op.drop_constraint(constraint, table)
+
+
+def downgrade() -> None:
+    """Drop digest columns."""
+    for (table, field), constraint in CIPHERTEXT_UNIQUE_CONSTRAINTS.items():
+        op.create_unique_constraint(constraint, table, [field])
+    for table, field in UNIQUE_BLIND_INDEXES:
+        op.drop_index(f"ix_{table}_{field}", table_name=table)
+        op.create_index(f"ix_{table}_{field}", table, [field], unique=True)
+    for table, fields in BLIND_INDEXES.items():
+        for field in fields:
+            op.drop_index(f"ix_{table}_{field}_bidx", table_name=table)
+            op.drop_column(table, f"{field}_bidx")
@@ -0,0 +1,45 @@
+"""Add key_rotation_checkpoints for online re-encryption
+
+Revision ID: f7a5b9c1d4e6
+Revises: e6f4a8b0c3d5
+Create Date: 2026-10-19 13:25:08.871254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a5b9c1d4e6'
+down_revision: Union[str, Sequence[str], None] = 'e6f4a8b0c3d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create key_rotation_checkpoints table."""
+    op.create_table(
+        'key_rotation_checkpoints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('table_name', sa.String(length=100), nullable=False),
+        sa.Column('key_version', sa.String(length=20), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=False),
+        sa.Column('rows_scanned', sa.Integer(), nullable=False),
+        sa.Column('rows_reencrypted', sa.Integer(), nullable=False),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_key_rotation_checkpoints_id'), 'key_rotation_checkpoints', ['id'], unique=False)
+    op.create_index('ix_key_rotation_checkpoints_table_version', 'key_rotation_checkpoints',
+                    ['table_name', 'key_version'], unique=True)
+
+
+def downgrade() -> None:
+    """Drop key_rotation_checkpoints table."""
+    op.drop_index('ix_key_rotation_checkpoints_table_version', table_name='key_rotation_checkpoints')
+    op.drop_index(op.f('ix_key_rotation_checkpoints_id'), table_name='key_rotation_checkpoints')
+    op.drop_table('key_rotation_checkpoints')
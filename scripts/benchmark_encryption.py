@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Field Encryption Benchmark
+
+Measures encryption throughput with database encryption enabled:
+
+* per-field encryption as the ORM listeners did it (encrypt, base64 the token
+  again, debug f-string per field) against ``encrypt_column``
+* bulk-inserting students with encrypted contact fields through Core
+* loading students through the ORM when only some rows' contact fields are read
+  (deferred decryption) against decrypting every field at load time
+
+Usage:
+    python scripts/benchmark_encryption.py [--rows 20000]
+"""
+
+import argparse
+import base64
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ['ENABLE_DATABASE_ENCRYPTION'] = 'true'
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.mvp.database import Base
+from src.mvp.encryption import ENCRYPTED_FIELDS, encrypt_model_rows, encryption_manager
+from src.mvp.models import Institution, Student
+
+logger = logging.getLogger('benchmark')
+
+
+def per_field_encrypt(values):
+    """The previous per-attribute path"""
+    cipher, version = encryption_manager._cipher, encryption_manager._key_version
+    out = []
+    for value in values:
+        token = base64.urlsafe_b64encode(cipher.encrypt(value.encode('utf-8'))).decode('ascii')
+        encrypted = f"v{version}:{token}"
+        logger.debug(f"🔒 Encrypted field (length: {len(value)} -> {len(encrypted)})")
+        out.append(encrypted)
+    return out
+
+
+def timed(label, rows, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:>44}: {elapsed:6.2f}s  ({rows / elapsed:,.0f} rows/s)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+    n = args.rows
+
+    emails = [f"student{i}@district.k12.us" for i in range(n)]
+    timed("per-field encrypt (previous)", n, lambda: per_field_encrypt(emails))
+    timed("encrypt_column", n, lambda: encryption_manager.encrypt_column(emails))
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    institution = Institution(name="Bench", code="BENCH", type="K12")
+    session.add(institution)
+    session.commit()
+
+    rows = [{'institution_id': institution.id, 'student_id': str(i), 'name': f"Student {i}",
+             'email': emails[i], 'phone': f"555-{i:07d}", 'parent_email': f"parent{i}@mail.com",
+             'parent_phone': f"555-{i + 1:07d}"} for i in range(n)]
+
+    def bulk_insert():
+        session.execute(Student.__table__.insert(), encrypt_model_rows('students', rows))
+        session.commit()
+
+    timed("bulk insert, 4 encrypted columns", n, bulk_insert)
+
+    fields = ENCRYPTED_FIELDS['students'][1:]  # birth_date is not a string column
+
+    def load(read_every):
+        session.expunge_all()
+        students = session.query(Student).all()
+        for student in students[::read_every]:
+            for field in fields:
+                getattr(student, field)
+        return students
+
+    def load_eager():
+        session.expunge_all()
+        students = session.query(Student).all()
+        for student in students:
+            for field in fields:
+                encryption_manager.decrypt(getattr(student, f"_{field}"))
+        return students
+
+    timed("ORM load, decrypt every field (previous)", n, load_eager)
+    timed("ORM load, deferred, read all fields", n, lambda: load(1))
+    timed("ORM load, deferred, read 1 row in 20", n, lambda: load(20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter Microbenchmark
+
+Drives the shared limiter with requests from 100k distinct client IPs and
+reports throughput, live keys before and after idle eviction, and the size of
+the key state. Compares against the per-IP deque storage the limiter replaced.
+
+Usage:
+    python scripts/benchmark_rate_limiter.py [--ips 100000] [--requests-per-ip 3] [--backend memory|file]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.mvp.rate_limit import MemoryRateLimitBackend, RateLimit, RateLimiter, SQLiteRateLimitBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def timed(run):
+    """Time ``run`` untraced, then measure its peak allocations in a second traced run"""
+    started = time.perf_counter()
+    result = run()
+    result['seconds'] = time.perf_counter() - started
+    tracemalloc.start()
+    run()
+    result['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return result
+
+
+def run_limiter(make_backend, ips, requests_per_ip, rate):
+    clock = FakeClock()
+    backend = make_backend()
+    limiter = RateLimiter(backend, clock=clock)
+    for round_ in range(requests_per_ip):
+        for ip in ips:
+            clock.now += 1e-6
+            limiter.hit(f"api_request:{ip}", rate)
+
+    live = len(backend)
+    clock.now += rate.window
+    evicted = backend.evict_idle(clock.now)
+    return {'requests': len(ips) * requests_per_ip, 'live_keys': live, 'evicted': evicted,
+            'after_eviction': len(backend)}
+
+
+def run_deques(ips, requests_per_ip, rate):
+    """The previous storage: a deque of timestamps per IP, never evicted"""
+    storage = defaultdict(deque)
+    now = 1_000_000.0
+    for round_ in range(requests_per_ip):
+        for ip in ips:
+            now += 1e-6
+            timestamps = storage[ip]
+            while timestamps and now - timestamps[0] > rate.window:
+                timestamps.popleft()
+            if len(timestamps) < rate.limit:
+                timestamps.append(now)
+    return {'requests': len(ips) * requests_per_ip, 'live_keys': len(storage)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--ips', type=int, default=100_000)
+    parser.add_argument('--requests-per-ip', type=int, default=3)
+    parser.add_argument('--backend', choices=['memory', 'file'], default='memory')
+    args = parser.parse_args()
+
+    ips = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(args.ips)]
+    rate = RateLimit(limit=30, window=60)
+
+    if args.backend == 'file':
+        directory = tempfile.mkdtemp()
+        runs = iter(range(2))
+        make_backend = lambda: SQLiteRateLimitBackend(os.path.join(directory, f'rate_limits_{next(runs)}.db'))
+    else:
+        make_backend = MemoryRateLimitBackend
+
+    for name, result in (('deque per IP (previous)', timed(lambda: run_deques(ips, args.requests_per_ip, rate))),
+                         (f'GCRA {args.backend}',
+                          timed(lambda: run_limiter(make_backend, ips, args.requests_per_ip, rate)))):
+        rate_per_sec = result['requests'] / result['seconds']
+        print(f"{name:>24}: {result['requests']:,} requests in {result['seconds']:.2f}s "
+              f"({rate_per_sec:,.0f}/s), {result['live_keys']:,} keys, peak {result['peak_mb']:.1f} MB")
+        if 'evicted' in result:
+            print(f"{'':>24}  after one idle window: evicted {result['evicted']:,}, "
+                  f"{result['after_eviction']:,} keys remain")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+WebSocket Broadcast Load Test
+
+Simulates thousands of connected dashboards, a fraction of them slow, and
+compares alert delivery:
+
+* awaiting ``send_text`` on every socket in turn, as the notification system
+  did before, where each slow client delays everyone behind it
+* the WebSocketBroadcaster, with per-client bounded queues and topic routing
+
+Reports how long publishing blocks and the delivery latency seen by fast clients.
+
+Usage:
+    python scripts/load_test_websocket_broadcast.py [--clients 5000] [--slow 0.02] [--alerts 20]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.mvp.websocket_broadcaster import WebSocketBroadcaster
+
+
+class SimulatedClient:
+    """Records receive latency; slow clients take ``delay`` seconds per message"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.latencies = []
+
+    async def send_text(self, text):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.latencies.append(time.perf_counter() - json.loads(text)['sent_at'])
+
+    async def close(self, code=1000):
+        pass
+
+
+def make_clients(n, slow_fraction, delay):
+    every = max(int(1 / slow_fraction), 1) if slow_fraction > 0 else 0
+    return [SimulatedClient(delay if every and i % every == 0 else 0.0) for i in range(n)]
+
+
+def report(label, publish_seconds, clients):
+    latencies = sorted(latency for client in clients if not client.delay for latency in client.latencies)
+    if not latencies:
+        print(f"{label:>30}: no messages delivered")
+        return
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:>30}: publish blocked {publish_seconds:6.3f}s, fast-client latency "
+          f"median {statistics.median(latencies) * 1000:7.1f}ms, p99 {p99 * 1000:7.1f}ms "
+          f"({len(latencies):,} deliveries)")
+
+
+async def sequential(args):
+    clients = make_clients(args.clients, args.slow, args.delay)
+    started = time.perf_counter()
+    for _ in range(args.alerts):
+        text = json.dumps({'type': 'student_alert', 'sent_at': time.perf_counter()})
+        for client in clients:
+            await client.send_text(text)
+    report("sequential send (previous)", time.perf_counter() - started, clients)
+
+
+async def broadcaster(args):
+    clients = make_clients(args.clients, args.slow, args.delay)
+    broadcast = WebSocketBroadcaster(max_queue=64)
+    for i, client in enumerate(clients):
+        broadcast.connect(client, [f"institution:{i % args.institutions}"])
+    await asyncio.sleep(0)
+
+    blocked = 0.0
+    for n in range(args.alerts):
+        started = time.perf_counter()
+        broadcast.publish({'type': 'student_alert', 'sent_at': started}, [f"institution:{n % args.institutions}"])
+        blocked += time.perf_counter() - started
+        await asyncio.sleep(0)
+    await asyncio.sleep(args.delay * 2 + 0.1)
+    report("broadcaster", blocked, clients)
+    stats = broadcast.get_stats()
+    print(f"{'':>30}  delivered {stats['messages_delivered']:,}, dropped {stats['messages_dropped']:,}, "
+          f"max queue depth {stats['max_queue_depth']}")
+    await broadcast.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=5000)
+    parser.add_argument('--slow', type=float, default=0.02, help='fraction of slow clients')
+    parser.add_argument('--delay', type=float, default=0.05, help='seconds per send for slow clients')
+    parser.add_argument('--alerts', type=int, default=20)
+    parser.add_argument('--institutions', type=int, default=1,
+                        help='topics clients are spread across (1 = every client gets every alert)')
+    args = parser.parse_args()
+
+    asyncio.run(sequential(args))
+    asyncio.run(broadcaster(args))
+
+
+if __name__ == '__main__':
+    main()
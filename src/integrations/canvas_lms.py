@@ -8,16 +8,25 @@ Handles Canvas API authentication, data fetching, and real-time gradebook sync.
 import requests
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Iterable, Set
 from datetime import datetime, timedelta
 import json
 import logging
 from pathlib import Path
 import asyncio
 import aiohttp
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from enum import Enum
 
+try:
+    from .client_registry import IntegrationClient, PoolConfig, get_client_registry
+    from .response_cache import UpstreamResponse, credential_fingerprint, get_response_cache
+    from .sync_state import IncrementalSync, DeltaChanges, record_fingerprint
+except ImportError:
+    from integrations.client_registry import IntegrationClient, PoolConfig, get_client_registry
+    from integrations.response_cache import UpstreamResponse, credential_fingerprint, get_response_cache
+    from integrations.sync_state import IncrementalSync, DeltaChanges, record_fingerprint
+
 logger = logging.getLogger(__name__)
 
 class CanvasDataType(Enum):
@@ -37,6 +46,10 @@ class CanvasConfig:
     account_id: Optional[str] = None
     rate_limit_per_hour: int = 3000  # Canvas default
     timeout_seconds: int = 30
+    per_page: int = 100  # Canvas caps most list endpoints at 100
+    submission_student_chunk: int = 50  # student_ids[] per submissions request when syncing a subset
+    use_response_cache: bool = True  # Serve course lists from the shared integration response cache
+    use_shared_client: bool = True  # Reuse the pooled keep-alive session of these credentials across instances
 
 @dataclass
 class CanvasStudent:
@@ -55,7 +68,12 @@ class CanvasLMSIntegration:
     
     def __init__(self, config: CanvasConfig):
         self.config = config
-        self.session = requests.Session()
+        self.credential_fingerprint = credential_fingerprint('canvas', config.base_url.rstrip('/'), config.access_token)
+        if config.use_shared_client:
+            self.client = get_client_registry().get_client('canvas', self.credential_fingerprint)
+        else:
+            self.client = IntegrationClient('canvas', self.credential_fingerprint, PoolConfig())
+        self.session = self.client.session
         self.session.headers.update({
             'Authorization': f'Bearer {config.access_token}',
             'Content-Type': 'application/json'
@@ -66,6 +84,12 @@ class CanvasLMSIntegration:
         self.requests_this_hour = 0
         self.request_count_reset_time = datetime.now()
         
+        self.response_cache = get_response_cache() if config.use_response_cache else None
+        # Optional (stage, student_count) callback for background sync jobs
+        self.progress_callback = None
+        # K12UltraPredictor, loaded on first scoring unless a caller shares one
+        self.predictor = None
+        
     def _handle_rate_limit(self):
         """Simple rate limiting implementation"""
         now = datetime.now()
@@ -83,18 +107,22 @@ class CanvasLMSIntegration:
         
         return 0
     
-    def _make_canvas_request(self, endpoint: str, params: Dict = None) -> requests.Response:
-        """Make authenticated request to Canvas API with rate limiting"""
+    def _make_canvas_request(self, endpoint: str, params: Dict = None, headers: Dict = None) -> requests.Response:
+        """Make authenticated request to Canvas API with rate limiting (304 is returned for conditional requests)"""
         sleep_time = self._handle_rate_limit()
         if sleep_time > 0:
             raise Exception(f"Rate limit exceeded, try again in {sleep_time} seconds")
         
-        url = f"{self.config.base_url.rstrip('/')}/api/v1/{endpoint.lstrip('/')}"
+        if endpoint.startswith(('http://', 'https://')):
+            url = endpoint  # Pagination links are absolute and carry their own query string
+        else:
+            url = f"{self.config.base_url.rstrip('/')}/api/v1/{endpoint.lstrip('/')}"
         
         try:
             response = self.session.get(
                 url, 
                 params=params or {}, 
+                headers=headers,
                 timeout=self.config.timeout_seconds
             )
             self.requests_this_hour += 1
@@ -105,6 +133,8 @@ class CanvasLMSIntegration:
                 raise Exception("Canvas API access forbidden - check permissions")
             elif response.status_code == 429:
                 raise Exception("Canvas API rate limit exceeded")
+            elif response.status_code == 304 and headers:
+                return response
             elif response.status_code != 200:
                 raise Exception(f"Canvas API error {response.status_code}: {response.text}")
             
@@ -115,6 +145,16 @@ class CanvasLMSIntegration:
         except requests.exceptions.ConnectionError:
             raise Exception("Cannot connect to Canvas API")
     
+    def _get_paginated(self, endpoint: str, params: Dict = None) -> List[Dict]:
+        """GET every page of a Canvas list endpoint by following the Link rel="next" header"""
+        params = {'per_page': self.config.per_page, **(params or {})}
+        response = self._make_canvas_request(endpoint, params)
+        records = list(response.json())
+        while 'next' in response.links:
+            response = self._make_canvas_request(response.links['next']['url'])
+            records.extend(response.json())
+        return records
+    
     def test_connection(self) -> Dict[str, Any]:
         """Test Canvas API connection and permissions"""
         try:
@@ -145,52 +185,61 @@ class CanvasLMSIntegration:
             }
     
     def get_courses(self, include_students: bool = False) -> List[Dict]:
-        """Get list of courses from Canvas"""
+        """Get list of courses from Canvas (cached per credentials, revalidated with ETags)"""
         try:
-            params = {
-                'enrollment_type': 'teacher',  # Only courses where user is teacher
-                'state[]': 'available',        # Only active courses
-                'per_page': 100
-            }
-            
-            if include_students:
-                params['include[]'] = 'students'
-            
-            response = self._make_canvas_request('courses', params)
-            courses = response.json()
-            
-            # Filter for K-12 relevant courses
-            k12_courses = []
-            for course in courses:
-                if course.get('enrollment_term_id') and course.get('name'):
-                    k12_courses.append({
-                        'id': course['id'],
-                        'name': course['name'],
-                        'course_code': course.get('course_code', ''),
-                        'term': course.get('term', {}).get('name', 'Unknown'),
-                        'student_count': course.get('total_students', 0),
-                        'start_date': course.get('start_at'),
-                        'end_date': course.get('end_at')
-                    })
-            
-            return k12_courses
+            if self.response_cache is None:
+                return self._fetch_courses(include_students).value
+            return self.response_cache.get_or_fetch(
+                self.credential_fingerprint, 'courses', 'courses', {'include_students': include_students},
+                lambda validators: self._fetch_courses(include_students, validators)
+            )
             
         except Exception as e:
             logger.error(f"Error fetching Canvas courses: {e}")
             raise Exception(f"Failed to fetch courses: {e}")
     
+    def _fetch_courses(self, include_students: bool, validators: Dict[str, str] = None) -> UpstreamResponse:
+        params = {
+            'enrollment_type': 'teacher',  # Only courses where user is teacher
+            'state[]': 'available',        # Only active courses
+            'per_page': 100
+        }
+        
+        if include_students:
+            params['include[]'] = 'students'
+        
+        response = self._make_canvas_request('courses', params, headers=validators or None)
+        if response.status_code == 304:
+            return UpstreamResponse(not_modified=True)
+        courses = response.json()
+        
+        # Filter for K-12 relevant courses
+        k12_courses = []
+        for course in courses:
+            if course.get('enrollment_term_id') and course.get('name'):
+                k12_courses.append({
+                    'id': course['id'],
+                    'name': course['name'],
+                    'course_code': course.get('course_code', ''),
+                    'term': course.get('term', {}).get('name', 'Unknown'),
+                    'student_count': course.get('total_students', 0),
+                    'start_date': course.get('start_at'),
+                    'end_date': course.get('end_at')
+                })
+        
+        return UpstreamResponse(k12_courses, etag=response.headers.get('ETag'),
+                                last_modified=response.headers.get('Last-Modified'))
+    
     def get_course_students(self, course_id: str) -> List[CanvasStudent]:
         """Get students enrolled in a specific course"""
         try:
             params = {
                 'enrollment_type[]': 'student',
                 'enrollment_state[]': 'active',
-                'include[]': ['email', 'enrollments', 'avatar_url'],
-                'per_page': 100
+                'include[]': ['email', 'enrollments', 'avatar_url']
             }
             
-            response = self._make_canvas_request(f'courses/{course_id}/users', params)
-            raw_students = response.json()
+            raw_students = self._get_paginated(f'courses/{course_id}/users', params)
             
             students = []
             for student_data in raw_students:
@@ -213,22 +262,17 @@ class CanvasLMSIntegration:
         """Get comprehensive grade data for a student in a course"""
         try:
             # Get assignments
-            assignments_response = self._make_canvas_request(
-                f'courses/{course_id}/assignments',
-                {'per_page': 100}
-            )
-            assignments = assignments_response.json()
+            assignments = self.get_course_assignments(course_id)
+            assignments_by_id = {a['id']: a for a in assignments}
             
             # Get student submissions
-            submissions_response = self._make_canvas_request(
+            submissions = self._get_paginated(
                 f'courses/{course_id}/students/submissions',
                 {
                     'student_ids[]': student_id,
-                    'include[]': ['assignment', 'submission_history'],
-                    'per_page': 100
+                    'include[]': ['assignment', 'submission_history']
                 }
             )
-            submissions = submissions_response.json()
             
             # Process grade data
             grade_data = {
@@ -252,7 +296,7 @@ class CanvasLMSIntegration:
             
             for submission in submissions:
                 assignment_id = submission.get('assignment_id')
-                assignment = next((a for a in assignments if a['id'] == assignment_id), None)
+                assignment = assignments_by_id.get(assignment_id)
                 
                 if assignment:
                     points_possible = assignment.get('points_possible', 0)
@@ -296,50 +340,89 @@ class CanvasLMSIntegration:
             logger.error(f"Error fetching student grades: {e}")
             raise Exception(f"Failed to fetch grades for student {student_id}: {e}")
     
-    def get_course_gradebook(self, course_id: str) -> pd.DataFrame:
-        """Get complete gradebook data for a course in our standard format"""
+    def get_course_assignments(self, course_id: str) -> List[Dict]:
+        """All assignments of a course"""
+        return self._get_paginated(f'courses/{course_id}/assignments')
+    
+    def get_course_submissions(self, course_id: str, student_ids: Optional[Iterable[str]] = None,
+                               params: Dict = None) -> List[Dict]:
+        """
+        Submissions of every student in a course (or of ``student_ids``), all pages.
+        
+        One course-wide stream replaces a submissions request per student.
+        """
+        params = dict(params or {})
+        if student_ids is None:
+            return self._get_paginated(f'courses/{course_id}/students/submissions',
+                                       {**params, 'student_ids[]': 'all'})
+        
+        ids = sorted(str(sid) for sid in student_ids)
+        submissions = []
+        chunk = self.config.submission_student_chunk
+        for start in range(0, len(ids), chunk):
+            submissions.extend(self._get_paginated(f'courses/{course_id}/students/submissions',
+                                                   {**params, 'student_ids[]': ids[start:start + chunk]}))
+        return submissions
+    
+    def get_course_gradebook(self, course_id: str, student_ids: Optional[Iterable[str]] = None,
+                             students: Optional[List[CanvasStudent]] = None) -> pd.DataFrame:
+        """
+        Get gradebook data for a course in our standard format.
+        
+        Assignments and submissions are fetched once per course and every
+        student's metrics are computed in one pass (see compute_grade_metrics).
+        
+        Args:
+            course_id: Canvas course ID
+            student_ids: Only build rows for these students
+            students: Roster already fetched with get_course_students
+        """
         try:
             # Get course students
-            students = self.get_course_students(course_id)
-            
-            gradebook_data = []
-            for student in students:
-                try:
-                    # Get student grade data
-                    grade_data = self.get_student_grades(course_id, student.id)
-                    
-                    # Convert to our standard format
-                    student_record = {
-                        'student_id': student.id,
-                        'name': student.name,
-                        'email': student.email,
-                        'sis_user_id': student.sis_user_id,
-                        'current_grade': grade_data['overall_grade'] / 25.0,  # Convert to 4.0 GPA scale approximation
-                        'current_gpa': grade_data['overall_grade'] / 25.0,   # Same as current_grade for now
-                        'assignment_completion': grade_data['assignment_completion_rate'],
-                        'late_submission_rate': grade_data['late_submission_rate'],
-                        'missing_assignments': grade_data['missing_assignments'],
-                        'points_earned': grade_data['points_earned'],
-                        'points_possible': grade_data['points_possible'],
-                        'canvas_course_id': course_id,
-                        'last_sync': datetime.now().isoformat()
-                    }
-                    
-                    # Add grade level estimation based on course name/code
-                    student_record['grade_level'] = self._estimate_grade_level(course_id)
-                    
-                    # Add default values for required prediction features
-                    student_record['attendance_rate'] = 0.95  # Default - would need separate attendance API
-                    student_record['discipline_incidents'] = 0  # Default - would need behavior data
-                    student_record['parent_engagement_frequency'] = 2  # Default moderate
-                    
-                    gradebook_data.append(student_record)
-                    
-                except Exception as e:
-                    logger.warning(f"Error processing student {student.id}: {e}")
-                    continue
+            if students is None:
+                students = self.get_course_students(course_id)
+            if student_ids is not None:
+                subset = {str(sid) for sid in student_ids}
+                students = [student for student in students if student.id in subset]
+            if not students:
+                return pd.DataFrame()
+            
+            assignments = self.get_course_assignments(course_id)
+            submissions = self.get_course_submissions(
+                course_id, student_ids=[s.id for s in students] if student_ids is not None else None
+            )
+            metrics = compute_grade_metrics(assignments, submissions).reindex([s.id for s in students])
+            
+            roster = pd.DataFrame({
+                'student_id': [s.id for s in students],
+                'name': [s.name for s in students],
+                'email': [s.email for s in students],
+                'sis_user_id': [s.sis_user_id for s in students],
+            })
+            overall_grade = metrics['overall_grade'].fillna(0.0).to_numpy()
+            
+            # Convert to our standard format
+            gradebook = roster.assign(
+                current_grade=overall_grade / 25.0,  # Convert to 4.0 GPA scale approximation
+                current_gpa=overall_grade / 25.0,    # Same as current_grade for now
+                assignment_completion=metrics['assignment_completion_rate'].fillna(0.0).to_numpy(),
+                late_submission_rate=metrics['late_submission_rate'].fillna(0.0).to_numpy(),
+                missing_assignments=metrics['missing_assignments'].fillna(0).astype(int).to_numpy(),
+                points_earned=metrics['points_earned'].fillna(0.0).to_numpy(),
+                points_possible=metrics['points_possible'].fillna(0.0).to_numpy(),
+                canvas_course_id=course_id,
+                last_sync=datetime.now().isoformat(),
+                # Add grade level estimation based on course name/code
+                grade_level=self._estimate_grade_level(course_id),
+                # Add default values for required prediction features
+                attendance_rate=0.95,  # Default - would need separate attendance API
+                discipline_incidents=0,  # Default - would need behavior data
+                parent_engagement_frequency=2  # Default moderate
+            )
             
-            return pd.DataFrame(gradebook_data)
+            logger.info(f"Canvas gradebook for course {course_id}: {len(gradebook)} students, "
+                        f"{len(assignments)} assignments, {len(submissions)} submissions")
+            return gradebook
             
         except Exception as e:
             logger.error(f"Error creating course gradebook: {e}")
@@ -381,32 +464,120 @@ class CanvasLMSIntegration:
         except:
             return 7  # Default fallback
     
-    def sync_course_data(self, course_id: str) -> Dict[str, Any]:
-        """Sync course data and return prediction results"""
+    def get_changed_student_ids(self, course_id: str, since: str) -> Tuple[Set[str], bool]:
+        """
+        Students with submissions submitted or graded since ``since``.
+        
+        Returns:
+            (changed student IDs, whether an assignment changed so every student needs recomputing)
+        """
+        changed = set()
+        for since_param in ('submitted_since', 'graded_since'):
+            submissions = self.get_course_submissions(course_id, params={since_param: since})
+            changed.update(str(submission.get('user_id')) for submission in submissions)
+        
+        assignments = self.get_course_assignments(course_id)
+        assignments_changed = any((a.get('updated_at') or '') >= since for a in assignments)
+        return changed, assignments_changed
+    
+    def _get_predictor(self):
+        """K-12 model used for scoring (loaded on first use unless one was injected)"""
+        if self.predictor is None:
+            try:
+                from models.k12_ultra_predictor import K12UltraPredictor
+            except ImportError:
+                from src.models.k12_ultra_predictor import K12UltraPredictor
+            self.predictor = K12UltraPredictor()
+        return self.predictor
+    
+    def _report_progress(self, stage: str, count: int):
+        if self.progress_callback is not None:
+            self.progress_callback(stage, count)
+    
+    def _score_gradebook(self, gradebook_df: pd.DataFrame) -> List[Dict]:
+        self._report_progress('fetched', len(gradebook_df))
+        # Generate predictions using K-12 ultra model
+        predictions = self._get_predictor().predict_batch(gradebook_df)
+        self._report_progress('scored', len(predictions))
+        return predictions
+    
+    def _sync_course_incremental(self, course_id: str, state_store, force_full: bool) -> Tuple[pd.DataFrame, List[Dict], Dict]:
+        """Delta sync: roster fingerprints plus submitted_since/graded_since submission filters"""
         try:
-            # Get gradebook data
-            gradebook_df = self.get_course_gradebook(course_id)
+            from models.k12_ultra_predictor import gradebook_feature_hashes
+        except ImportError:
+            from src.models.k12_ultra_predictor import gradebook_feature_hashes
+        sync = IncrementalSync('canvas', course_id, store=state_store, tenant=self.credential_fingerprint)
+        roster_cache = {}
+        
+        def load_roster() -> Dict[str, str]:
+            roster_cache['students'] = self.get_course_students(course_id)
+            fingerprints = {student.id: record_fingerprint(asdict(student)) for student in roster_cache['students']}
+            sync.record_fingerprints(fingerprints)
+            return fingerprints
+        
+        def fetch_full() -> pd.DataFrame:
+            load_roster()
+            return self.get_course_gradebook(course_id, students=roster_cache['students'])
+        
+        def fetch_changes(state) -> DeltaChanges:
+            fingerprints = load_roster()
+            changed = {sid for sid, fingerprint in fingerprints.items() if state.fingerprint(sid) != fingerprint}
+            submitted, assignments_changed = self.get_changed_student_ids(course_id, state.high_water_mark)
+            return DeltaChanges(
+                changed_ids=changed | (submitted & set(fingerprints)),
+                removed_ids=set(state.snapshot) - set(fingerprints),
+                full_resync=assignments_changed
+            )
+        
+        def fetch_rows(student_ids) -> pd.DataFrame:
+            return self.get_course_gradebook(course_id, student_ids=student_ids, students=roster_cache['students'])
+        
+        model_version = getattr(self._get_predictor(), 'model_version', None)
+        result = sync.run(fetch_full, fetch_changes, fetch_rows, self._score_gradebook, force_full=force_full,
+                          feature_hash=lambda rows: gradebook_feature_hashes(rows, model_version=model_version),
+                          model_version=model_version)
+        return result.gradebook, result.predictions, result.summary()
+    
+    def sync_course_data(self, course_id: str, incremental: bool = True, state_store=None,
+                         force_full: bool = False) -> Dict[str, Any]:
+        """
+        Sync course data and return prediction results.
+        
+        With ``incremental`` only students whose roster entry or submissions changed
+        since the stored high-water mark are refetched and re-scored.
+        """
+        try:
+            delta = None
+            gradebook_df = None
+            if incremental:
+                try:
+                    gradebook_df, predictions, delta = self._sync_course_incremental(course_id, state_store, force_full)
+                except Exception as e:
+                    logger.warning(f"Canvas incremental sync failed for course {course_id}, running full sync: {e}")
+            
+            if gradebook_df is None:
+                # Get gradebook data
+                gradebook_df = self.get_course_gradebook(course_id)
+                predictions = self._score_gradebook(gradebook_df) if not gradebook_df.empty else []
             
             if gradebook_df.empty:
                 return {
                     'status': 'warning',
                     'message': 'No student data found in course',
                     'students_processed': 0,
-                    'predictions': []
+                    'predictions': [],
+                    'delta': delta
                 }
             
-            # Generate predictions using K-12 ultra model
-            from models.k12_ultra_predictor import K12UltraPredictor
-            predictor = K12UltraPredictor()
-            predictions = predictor.predict_from_gradebook(gradebook_df)
-            
             return {
                 'status': 'success',
                 'course_id': course_id,
                 'students_processed': len(gradebook_df),
                 'predictions': predictions,
                 'sync_timestamp': datetime.now().isoformat(),
-                'data_source': 'canvas_lms'
+                'data_source': 'canvas_lms',
+                'delta': delta
             }
             
         except Exception as e:
@@ -417,6 +588,50 @@ class CanvasLMSIntegration:
                 'course_id': course_id
             }
 
+def compute_grade_metrics(assignments: List[Dict], submissions: List[Dict]) -> pd.DataFrame:
+    """
+    Per-student grade metrics for a whole course in one vectorized pass.
+    
+    Matches get_student_grades: submissions join their assignment through an
+    assignment-id index, completion is relative to all course assignments and
+    lateness to completed submissions.
+    
+    Returns:
+        DataFrame indexed by student ID (str) with overall_grade, points_earned,
+        points_possible, assignment_completion_rate, late_submission_rate and
+        missing_assignments
+    """
+    columns = ['overall_grade', 'points_earned', 'points_possible',
+               'assignment_completion_rate', 'late_submission_rate', 'missing_assignments']
+    points_by_assignment = pd.Series(
+        {a['id']: a.get('points_possible') or 0 for a in assignments}, dtype=float
+    )
+    if not submissions or points_by_assignment.empty:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name='user_id'))
+    
+    df = pd.DataFrame.from_records(submissions)
+    df = df.reindex(columns=sorted(set(df.columns) | {'user_id', 'assignment_id', 'score',
+                                                         'workflow_state', 'late', 'missing'}))
+    df = df[df['assignment_id'].isin(points_by_assignment.index)]
+    
+    df['user_id'] = df['user_id'].astype(str)
+    df['points_possible'] = df['assignment_id'].map(points_by_assignment)
+    df['points_earned'] = pd.to_numeric(df['score'], errors='coerce').fillna(0.0)
+    df['completed'] = df['workflow_state'] == 'submitted'
+    df['late'] = df['completed'] & df['late'].fillna(False).astype(bool)
+    df['missing'] = df['missing'].fillna(False).astype(bool)
+    
+    grouped = df.groupby('user_id').agg(
+        points_earned=('points_earned', 'sum'), points_possible=('points_possible', 'sum'),
+        completed=('completed', 'sum'), late=('late', 'sum'), missing_assignments=('missing', 'sum')
+    )
+    possible = grouped['points_possible']
+    grouped['overall_grade'] = np.where(possible > 0, grouped['points_earned'] / possible.where(possible > 0, 1) * 100, 0.0)
+    grouped['assignment_completion_rate'] = grouped['completed'] / len(points_by_assignment)
+    completed = grouped['completed']
+    grouped['late_submission_rate'] = np.where(completed > 0, grouped['late'] / completed.where(completed > 0, 1), 0.0)
+    return grouped[columns]
+
 def create_canvas_integration(base_url: str, access_token: str) -> CanvasLMSIntegration:
     """Factory function to create Canvas integration"""
     config = CanvasConfig(
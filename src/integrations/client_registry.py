@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Shared Integration HTTP Clients
+
+API endpoints build a new Canvas / PowerSchool integration per request. The
+registry lets those short-lived instances share one pooled keep-alive
+``requests.Session`` and one OAuth token per credential fingerprint, so UI
+calls reuse open TLS connections and tokens until shortly before they expire
+instead of handshaking and re-authenticating every time. The client also holds
+the credential's rate limiter, so a provider quota is charged once per
+process rather than once per integration instance.
+
+Pool sizes are tunable through environment variables:
+INTEGRATION_HTTP_POOL_CONNECTIONS (host pools per client),
+INTEGRATION_HTTP_POOL_MAXSIZE (keep-alive connections per host),
+INTEGRATION_HTTP_MAX_CLIENTS (clients kept before least-recently-used eviction)
+and INTEGRATION_TOKEN_REFRESH_MARGIN_SECONDS.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """urllib3 pool sizing of a client session"""
+    pool_connections: int = 4
+    pool_maxsize: int = 16
+    pool_block: bool = False  # True makes callers wait for a free connection instead of opening extras
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        return cls(
+            pool_connections=int(os.getenv('INTEGRATION_HTTP_POOL_CONNECTIONS', '4')),
+            pool_maxsize=int(os.getenv('INTEGRATION_HTTP_POOL_MAXSIZE', '16')),
+            pool_block=os.getenv('INTEGRATION_HTTP_POOL_BLOCK', 'false').lower() in ('true', '1', 'yes')
+        )
+
+
+@dataclass
+class OAuthToken:
+    """Cached bearer token"""
+    access_token: str
+    expires_at: float  # clock time the provider stops accepting it
+    refresh_at: float  # clock time a new token is fetched
+
+    def usable(self, now: float) -> bool:
+        return now < self.refresh_at
+
+
+class IntegrationClient:
+    """Pooled session and cached OAuth token of one set of credentials"""
+
+    def __init__(self, integration: str, fingerprint: str, pool: PoolConfig,
+                 clock: Callable[[], float] = time.time):
+        self.integration = integration
+        self.fingerprint = fingerprint
+        self.pool = pool
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=pool.pool_connections, pool_maxsize=pool.pool_maxsize,
+                                   pool_block=pool.pool_block)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.token: Optional[OAuthToken] = None
+        self._clock = clock
+        self._token_lock = threading.Lock()
+        self.created_at = clock()
+        self.last_used_at = self.created_at
+        self.token_fetches = 0
+        self.token_hits = 0
+        self.rate_limiter: Any = None
+        self._rate_limiter_lock = threading.Lock()
+
+    def get_rate_limiter(self, factory: Callable[[], Any]) -> Any:
+        """
+        Return the rate limiter shared by every user of these credentials.
+
+        Args:
+            factory: Builds the limiter on first use; later callers get the same
+                instance, so the first caller's quota settings win
+
+        Returns:
+            The credential's rate limiter
+        """
+        with self._rate_limiter_lock:
+            if self.rate_limiter is None:
+                self.rate_limiter = factory()
+            return self.rate_limiter
+
+    def get_token(self, fetch: Callable[[], Optional[Dict[str, Any]]],
+                  refresh_margin_seconds: float = DEFAULT_TOKEN_REFRESH_MARGIN_SECONDS) -> Optional[OAuthToken]:
+        """
+        Return the cached token, fetching a new one when it is close to expiry.
+
+        Args:
+            fetch: Requests a token; returns the provider's token JSON
+                (``access_token``, optional ``expires_in``) or None on failure
+            refresh_margin_seconds: Refresh this long before ``expires_in`` runs out
+                (capped at half the token lifetime)
+
+        Returns:
+            OAuthToken, or None when the provider refused
+        """
+        # One fetch per expiry even when many threads find the token stale together
+        with self._token_lock:
+            now = self._clock()
+            self.last_used_at = now
+            if self.token is not None and self.token.usable(now):
+                self.token_hits += 1
+                return self.token
+
+            token_data = fetch()
+            self.token_fetches += 1
+            if not token_data or not token_data.get('access_token'):
+                self.token = None
+                return None
+
+            expires_in = float(token_data.get('expires_in') or 3600)
+            now = self._clock()
+            self.token = OAuthToken(
+                access_token=token_data['access_token'],
+                expires_at=now + expires_in,
+                refresh_at=now + expires_in - min(refresh_margin_seconds, expires_in / 2)
+            )
+            return self.token
+
+    def invalidate_token(self, stale_token: Optional[str] = None) -> None:
+        """Drop the cached token (only if it is still ``stale_token`` when one is given)"""
+        with self._token_lock:
+            if self.token is not None and (stale_token is None or self.token.access_token == stale_token):
+                self.token = None
+
+    def close(self) -> None:
+        self.session.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Token and connection-pool statistics (never the credentials themselves)"""
+        now = self._clock()
+        hosts = []
+        for key in list(self.adapter.poolmanager.pools.keys()):
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            hosts.append({
+                'host': f"{key.key_scheme}://{key.key_host}:{key.key_port}",
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle_connections': pool.pool.qsize() if pool.pool is not None else 0
+            })
+        return {
+            'integration': self.integration,
+            'client': self.fingerprint[:8],
+            'pool_maxsize': self.pool.pool_maxsize,
+            'hosts': hosts,
+            'requests': sum(host['requests'] for host in hosts),
+            'connections_opened': sum(host['connections_opened'] for host in hosts),
+            'token_cached': self.token is not None and self.token.usable(now),
+            'token_expires_in': int(self.token.expires_at - now) if self.token is not None else None,
+            'token_fetches': self.token_fetches,
+            'token_hits': self.token_hits,
+            'idle_seconds': round(now - self.last_used_at, 1)
+        }
+
+
+class IntegrationClientRegistry:
+    """Process-wide IntegrationClients keyed by credential fingerprint"""
+
+    def __init__(self, pool: Optional[PoolConfig] = None, max_clients: int = 64,
+                 token_refresh_margin_seconds: float = DEFAULT_TOKEN_REFRESH_MARGIN_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize registry.
+
+        Args:
+            pool: Default pool sizing of new clients
+            max_clients: Clients kept before the least recently used one is closed
+            token_refresh_margin_seconds: How long before expiry cached tokens are refreshed
+            clock: Time source, injectable for tests
+        """
+        self.pool = pool or PoolConfig()
+        self.max_clients = max_clients
+        self.token_refresh_margin_seconds = token_refresh_margin_seconds
+        self._clock = clock
+        self._clients: "OrderedDict[str, IntegrationClient]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get_client(self, integration: str, fingerprint: str,
+                   pool_maxsize: Optional[int] = None) -> IntegrationClient:
+        """
+        Return the shared client for a credential fingerprint, creating it on first use.
+
+        Args:
+            integration: Integration name ('canvas', 'powerschool', ...)
+            fingerprint: credential_fingerprint of the caller's credentials
+            pool_maxsize: Minimum keep-alive connections per host the caller needs
+        """
+        evicted = []
+        with self._lock:
+            client = self._clients.get(fingerprint)
+            if client is None:
+                pool = self.pool
+                if pool_maxsize and pool_maxsize > pool.pool_maxsize:
+                    pool = PoolConfig(pool.pool_connections, pool_maxsize, pool.pool_block)
+                client = IntegrationClient(integration, fingerprint, pool, clock=self._clock)
+                self._clients[fingerprint] = client
+                while len(self._clients) > self.max_clients:
+                    evicted.append(self._clients.popitem(last=False)[1])
+                    self.evictions += 1
+            self._clients.move_to_end(fingerprint)
+            client.last_used_at = self._clock()
+
+        for old in evicted:
+            old.close()
+        return client
+
+    def get_token(self, client: IntegrationClient,
+                  fetch: Callable[[], Optional[Dict[str, Any]]]) -> Optional[OAuthToken]:
+        """Cached OAuth token of a client, refreshed with this registry's margin"""
+        return client.get_token(fetch, self.token_refresh_margin_seconds)
+
+    def close(self, fingerprint: Optional[str] = None) -> int:
+        """Close and forget one client, or all of them when no fingerprint is given"""
+        with self._lock:
+            keys = [fingerprint] if fingerprint is not None else list(self._clients)
+            closed = [self._clients.pop(key) for key in keys if key in self._clients]
+        for client in closed:
+            client.close()
+        return len(closed)
+
+    def get_stats(self, include_clients: bool = True) -> Dict[str, Any]:
+        """
+        Registry-wide pool and token counters.
+
+        Args:
+            include_clients: Add per-client stats (upstream hosts, fingerprint prefixes,
+                token expiries); leave them out wherever the caller is not authenticated
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+        client_stats = [client.get_stats() for client in clients]
+        stats = {
+            'clients': len(client_stats),
+            'max_clients': self.max_clients,
+            'evictions': self.evictions,
+            'pool_maxsize': self.pool.pool_maxsize,
+            'requests': sum(stats['requests'] for stats in client_stats),
+            'connections_opened': sum(stats['connections_opened'] for stats in client_stats),
+            'token_fetches': sum(stats['token_fetches'] for stats in client_stats),
+            'token_hits': sum(stats['token_hits'] for stats in client_stats)
+        }
+        if include_clients:
+            stats['by_client'] = client_stats
+        return stats
+
+
+_client_registry: Optional[IntegrationClientRegistry] = None
+_client_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> IntegrationClientRegistry:
+    """Process-wide registry shared by all integration instances"""
+    global _client_registry
+    with _client_registry_lock:
+        if _client_registry is None:
+            _client_registry = IntegrationClientRegistry(
+                pool=PoolConfig.from_env(),
+                max_clients=int(os.getenv('INTEGRATION_HTTP_MAX_CLIENTS', '64')),
+                token_refresh_margin_seconds=float(os.getenv(
+                    'INTEGRATION_TOKEN_REFRESH_MARGIN_SECONDS', str(DEFAULT_TOKEN_REFRESH_MARGIN_SECONDS)
+                ))
+            )
+        return _client_registry
@@ -19,6 +19,7 @@ from dataclasses import dataclass
 
 from integrations.canvas_lms import CanvasLMSIntegration, CanvasConfig
 from integrations.powerschool_sis import PowerSchoolSISIntegration, PowerSchoolConfig
+from integrations.student_matching import StudentMatcher
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +37,8 @@ class CombinedConfig:
     
     # Matching configuration
     student_id_field: str = 'sis_user_id'  # Field in Canvas that matches PowerSchool
+    name_match_threshold: float = 0.6  # Word Jaccard needed for a name match
+    fuzzy_match_threshold: float = 0.9  # Character similarity needed for a typo-tolerant match (0 disables)
     
 class CombinedIntegration:
     """Ultimate integration combining Canvas LMS and PowerSchool SIS data"""
@@ -61,6 +64,14 @@ class CombinedIntegration:
             'canvas': False,
             'powerschool': False
         }
+        
+        self.matcher = StudentMatcher(
+            name_threshold=config.name_match_threshold,
+            fuzzy_threshold=config.fuzzy_match_threshold
+        )
+        self.last_match_report = None
+        # Optional (stage, student_count) callback for background sync jobs
+        self.progress_callback = None
     
     def test_connections(self) -> Dict[str, Any]:
         """Test connections to both Canvas and PowerSchool"""
@@ -181,6 +192,8 @@ class CombinedIntegration:
             # Step 3: Match and merge student data
             combined_data = self._match_and_merge_student_data(canvas_gradebook, ps_gradebook)
             logger.info(f"Successfully matched {len(combined_data)} students")
+            if self.progress_callback is not None:
+                self.progress_callback('fetched', len(combined_data))
             
             if combined_data.empty:
                 return {
@@ -196,6 +209,8 @@ class CombinedIntegration:
             from models.k12_ultra_predictor import K12UltraPredictor
             predictor = K12UltraPredictor()
             predictions = predictor.predict_from_gradebook(combined_data)
+            if self.progress_callback is not None:
+                self.progress_callback('scored', len(predictions))
             
             # Step 5: Enhance predictions with combined insights
             enhanced_predictions = self._enhance_predictions_with_combined_data(predictions, combined_data)
@@ -213,6 +228,7 @@ class CombinedIntegration:
                 'powerschool_students': len(ps_gradebook),
                 'matched_students': len(combined_data),
                 'match_rate': len(combined_data) / max(len(canvas_gradebook), 1),
+                'match_report': self.last_match_report.to_dict() if self.last_match_report else None,
                 'predictions': enhanced_predictions,
                 'analysis': analysis_result,
                 'sync_timestamp': datetime.now().isoformat(),
@@ -233,62 +249,20 @@ class CombinedIntegration:
         if canvas_df.empty or ps_df.empty:
             return pd.DataFrame()
         
-        # Try multiple matching strategies
-        matched_data = []
-        
-        # Strategy 1: Match by SIS User ID (if available in Canvas)
-        if 'sis_user_id' in canvas_df.columns:
-            canvas_with_sis = canvas_df[canvas_df['sis_user_id'].notna()]
-            for _, canvas_student in canvas_with_sis.iterrows():
-                sis_id = str(canvas_student['sis_user_id'])
-                
-                # Look for match in PowerSchool by various ID fields
-                ps_match = ps_df[
-                    (ps_df['student_id'] == sis_id) |
-                    (ps_df['state_id'] == sis_id) |
-                    (ps_df['local_id'] == sis_id)
-                ]
-                
-                if not ps_match.empty:
-                    combined_student = self._merge_student_records(canvas_student, ps_match.iloc[0])
-                    matched_data.append(combined_student)
-        
-        # Strategy 2: Match by name (fuzzy matching)
-        if len(matched_data) < len(canvas_df) * 0.5:  # If low match rate, try name matching
-            matched_ids = set(d.get('student_id', '') for d in matched_data)
-            
-            for _, canvas_student in canvas_df.iterrows():
-                if canvas_student.get('student_id', '') in matched_ids:
-                    continue  # Already matched
-                
-                canvas_name = str(canvas_student.get('name', '')).lower().strip()
-                if not canvas_name:
-                    continue
-                
-                # Find best name match in PowerSchool
-                best_match = None
-                best_score = 0
-                
-                for _, ps_student in ps_df.iterrows():
-                    ps_name = f"{ps_student.get('first_name', '')} {ps_student.get('last_name', '')}".lower().strip()
-                    
-                    # Simple name matching score
-                    canvas_words = set(canvas_name.split())
-                    ps_words = set(ps_name.split())
-                    
-                    if canvas_words and ps_words:
-                        score = len(canvas_words & ps_words) / len(canvas_words | ps_words)
-                        if score > best_score and score > 0.6:  # 60% similarity threshold
-                            best_score = score
-                            best_match = ps_student
-                
-                if best_match is not None:
-                    combined_student = self._merge_student_records(canvas_student, best_match)
-                    matched_data.append(combined_student)
-        
-        if not matched_data:
+        # ID hash-join first, then blocked name matching (see StudentMatcher)
+        matches, self.last_match_report = self.matcher.match(canvas_df, ps_df)
+        if matches.empty:
             return pd.DataFrame()
         
+        canvas_rows = canvas_df.reset_index(drop=True)
+        ps_rows = ps_df.reset_index(drop=True)
+        matched_data = []
+        for match in matches.itertuples(index=False):
+            combined_student = self._merge_student_records(canvas_rows.iloc[match.canvas_pos], ps_rows.iloc[match.ps_pos])
+            combined_student['match_method'] = match.match_method
+            combined_student['match_confidence'] = float(match.match_confidence)
+            matched_data.append(combined_student)
+        
         return pd.DataFrame(matched_data)
     
     def _merge_student_records(self, canvas_record: pd.Series, ps_record: pd.Series) -> Dict:
@@ -22,10 +22,19 @@ import json
 import os
 import asyncio
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Set
 from dataclasses import dataclass, asdict
 import pandas as pd
 
+try:
+    from .rate_limiter import TokenBucket
+    from .response_cache import UpstreamResponse, credential_fingerprint, get_response_cache
+    from .sync_state import IncrementalSync, DeltaChanges, record_fingerprint
+except ImportError:
+    from integrations.rate_limiter import TokenBucket
+    from integrations.response_cache import UpstreamResponse, credential_fingerprint, get_response_cache
+    from integrations.sync_state import IncrementalSync, DeltaChanges, record_fingerprint
+
 try:
     from google.auth.transport.requests import Request
     from google.oauth2.credentials import Credentials
@@ -65,6 +74,9 @@ SCOPES = [
     'https://www.googleapis.com/auth/classroom.profile.photos'
 ]
 
+# Classroom API per-user quota; every request (including each call inside a batch) counts
+REQUESTS_PER_MINUTE = int(os.getenv('GOOGLE_CLASSROOM_REQUESTS_PER_MINUTE', '3000'))
+
 @dataclass
 class GoogleClassroomStudent:
     """Enhanced student data model for Google Classroom integration"""
@@ -164,6 +176,14 @@ class GoogleClassroomIntegration:
         self.students_cache = {}
         self.assignments_cache = {}
         
+        # Quota-aware pacing shared by sequential and batched requests
+        self.rate_limiter = TokenBucket(REQUESTS_PER_MINUTE / 60.0, capacity=max(1, REQUESTS_PER_MINUTE // 60))
+        
+        # Course lists are served from the shared response cache (Classroom lists carry no ETags,
+        # so entries are refreshed by TTL with stale-while-revalidate only)
+        self.response_cache = get_response_cache()
+        self.credential_fingerprint = self._file_credential_fingerprint()
+        
         logger.info("🎓 Google Classroom Integration initialized")
     
     def authenticate(self) -> bool:
@@ -213,6 +233,9 @@ class GoogleClassroomIntegration:
             
             self.credentials = creds
             self.service = build('classroom', 'v1', credentials=creds)
+            self.credential_fingerprint = credential_fingerprint(
+                'google_classroom', creds.client_id, creds.refresh_token
+            )
             
             logger.info("✅ Google Classroom API authentication successful")
             return True
@@ -221,6 +244,47 @@ class GoogleClassroomIntegration:
             logger.error(f"❌ Google Classroom authentication failed: {e}")
             return False
     
+    def _file_credential_fingerprint(self) -> str:
+        """
+        Fingerprint of the OAuth client and authorized account in the credential files.
+        
+        Built from the files' contents, not their paths, so tenants deployed with
+        the same paths never share cached data or sync state.
+        """
+        client_id = refresh_token = None
+        try:
+            with open(self.credentials_file, 'r') as f:
+                secrets = json.load(f)
+            client_id = (secrets.get('installed') or secrets.get('web') or {}).get('client_id')
+        except (OSError, ValueError, AttributeError):
+            pass
+        try:
+            with open(self.token_file, 'r') as f:
+                token = json.load(f)
+            client_id = client_id or token.get('client_id')
+            refresh_token = token.get('refresh_token')
+        except (OSError, ValueError, AttributeError):
+            pass
+        return credential_fingerprint('google_classroom', client_id, refresh_token)
+    
+    def _list_all(self, make_request, key: str) -> List[Dict]:
+        """
+        Every page of a Classroom list call.
+        
+        Args:
+            make_request: Builds the request for one page given its ``pageToken`` (None for the first)
+            key: Response field holding the items
+        """
+        items = []
+        page_token = None
+        while True:
+            self.rate_limiter.acquire()
+            response = make_request(page_token).execute()
+            items.extend(response.get(key, []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return items
+    
     def get_courses(self, teacher_only: bool = True) -> List[ClassroomCourse]:
         """
         Fetch all courses from Google Classroom
@@ -235,8 +299,12 @@ class GoogleClassroomIntegration:
             if not self.service:
                 raise Exception("Not authenticated. Call authenticate() first.")
             
-            results = self.service.courses().list().execute()
-            courses = results.get('courses', [])
+            if self.response_cache is None:
+                courses = self._fetch_courses().value
+            else:
+                courses = self.response_cache.get_or_fetch(
+                    self.credential_fingerprint, 'courses', 'courses', None, self._fetch_courses
+                )
             
             classroom_courses = []
             for course_data in courses:
@@ -264,6 +332,9 @@ class GoogleClassroomIntegration:
             logger.error(f"❌ Failed to fetch Google Classroom courses: {e}")
             return []
     
+    def _fetch_courses(self, validators: Dict[str, str] = None) -> UpstreamResponse:
+        return UpstreamResponse(self._list_all(lambda token: self.service.courses().list(pageToken=token), 'courses'))
+    
     def get_course_students(self, course_id: str) -> List[GoogleClassroomStudent]:
         """
         Get all students enrolled in a specific course
@@ -278,21 +349,14 @@ class GoogleClassroomIntegration:
             if not self.service:
                 raise Exception("Not authenticated")
             
-            results = self.service.courses().students().list(courseId=course_id).execute()
-            students_data = results.get('students', [])
+            students_data = self._list_all(
+                lambda token: self.service.courses().students().list(courseId=course_id, pageToken=token),
+                'students'
+            )
             
             students = []
             for student_data in students_data:
-                profile = student_data.get('profile', {})
-                
-                student = GoogleClassroomStudent(
-                    student_id=student_data['userId'],
-                    email=profile.get('emailAddress', ''),
-                    name=profile.get('name', {}).get('fullName', ''),
-                    photo_url=profile.get('photoUrl'),
-                    enrolled_courses=[course_id]
-                )
-                
+                student = self._parse_student(student_data, course_id)
                 students.append(student)
                 self.students_cache[student.student_id] = student
             
@@ -317,29 +381,14 @@ class GoogleClassroomIntegration:
             if not self.service:
                 raise Exception("Not authenticated")
             
-            results = self.service.courses().courseWork().list(courseId=course_id).execute()
-            coursework_data = results.get('courseWork', [])
+            coursework_data = self._list_all(
+                lambda token: self.service.courses().courseWork().list(courseId=course_id, pageToken=token),
+                'courseWork'
+            )
             
             assignments = []
             for work_data in coursework_data:
-                due_date = None
-                if 'dueDate' in work_data:
-                    due_info = work_data['dueDate']
-                    due_date = datetime(
-                        due_info['year'], 
-                        due_info['month'], 
-                        due_info['day']
-                    )
-                
-                assignment = ClassroomAssignment(
-                    assignment_id=work_data['id'],
-                    course_id=course_id,
-                    title=work_data['title'],
-                    description=work_data.get('description', ''),
-                    due_date=due_date,
-                    points=work_data.get('maxPoints')
-                )
-                
+                assignment = self._parse_assignment(work_data, course_id)
                 assignments.append(assignment)
                 self.assignments_cache[assignment.assignment_id] = assignment
             
@@ -350,6 +399,53 @@ class GoogleClassroomIntegration:
             logger.error(f"❌ Failed to fetch assignments for course {course_id}: {e}")
             return []
     
+    @staticmethod
+    def _parse_student(student_data: Dict, course_id: str) -> GoogleClassroomStudent:
+        profile = student_data.get('profile', {})
+        return GoogleClassroomStudent(
+            student_id=student_data['userId'],
+            email=profile.get('emailAddress', ''),
+            name=profile.get('name', {}).get('fullName', ''),
+            photo_url=profile.get('photoUrl'),
+            enrolled_courses=[course_id]
+        )
+    
+    @staticmethod
+    def _parse_assignment(work_data: Dict, course_id: str) -> ClassroomAssignment:
+        due_date = None
+        if 'dueDate' in work_data:
+            due_info = work_data['dueDate']
+            due_date = datetime(
+                due_info['year'], 
+                due_info['month'], 
+                due_info['day']
+            )
+        
+        return ClassroomAssignment(
+            assignment_id=work_data['id'],
+            course_id=course_id,
+            title=work_data['title'],
+            description=work_data.get('description', ''),
+            due_date=due_date,
+            points=work_data.get('maxPoints')
+        )
+    
+    def get_course_submissions(self, course_id: str) -> List[Dict]:
+        """
+        Every student's submissions for every coursework item of a course.
+        
+        One paged stream (``courseWorkId='-'``) replaces a submissions call per student.
+        """
+        if not self.service:
+            raise Exception("Not authenticated")
+        
+        return self._list_all(
+            lambda token: self.service.courses().courseWork().studentSubmissions().list(
+                courseId=course_id, courseWorkId='-', pageToken=token
+            ),
+            'studentSubmissions'
+        )
+    
     def calculate_student_engagement_metrics(self, student_id: str, course_id: str) -> Dict[str, float]:
         """
         Calculate comprehensive engagement metrics for a student in a course
@@ -363,12 +459,12 @@ class GoogleClassroomIntegration:
         """
         try:
             # Get student submissions for the course
-            submissions = self.service.courses().courseWork().studentSubmissions().list(
-                courseId=course_id,
-                userId=student_id
-            ).execute()
-            
-            submission_data = submissions.get('studentSubmissions', [])
+            submission_data = self._list_all(
+                lambda token: self.service.courses().courseWork().studentSubmissions().list(
+                    courseId=course_id, courseWorkId='-', userId=student_id, pageToken=token
+                ),
+                'studentSubmissions'
+            )
             
             if not submission_data:
                 return {
@@ -403,12 +499,79 @@ class GoogleClassroomIntegration:
             logger.error(f"❌ Failed to calculate engagement metrics for student {student_id}: {e}")
             return {}
     
-    def sync_course_data(self, course_id: str) -> Dict[str, Any]:
+    @staticmethod
+    def _apply_engagement_metrics(student: GoogleClassroomStudent, metrics: Dict[str, float]) -> GoogleClassroomStudent:
+        # Update student object with calculated metrics
+        student.classroom_participation_rate = metrics.get('participation_rate', 0.0)
+        student.assignment_completion_rate = metrics.get('completion_rate', 0.0)
+        student.avg_assignment_score = metrics.get('avg_score', 0.0)
+        student.total_assignments = metrics.get('total_assignments', 0)
+        return student
+    
+    def get_changed_student_ids(self, course_id: str, since: str,
+                                submissions: Optional[List[Dict]] = None) -> Set[str]:
+        """Students with a submission updated since ``since`` (RFC 3339 UTC timestamp)"""
+        if submissions is None:
+            submissions = self.get_course_submissions(course_id)
+        return {s['userId'] for s in submissions if (s.get('updateTime') or '') >= since}
+    
+    def _sync_students_incremental(self, course_id: str, assignments: List[ClassroomAssignment],
+                                   state_store, force_full: bool) -> Tuple[List[GoogleClassroomStudent], Dict]:
+        """Delta sync: recompute metrics only for students whose roster entry or submissions changed"""
+        sync = IncrementalSync('google_classroom', course_id, store=state_store,
+                               tenant=self.credential_fingerprint)
+        cache = {}
+        # Any coursework change (new assignment, points, due date) affects every student's rates
+        coursework_etag = record_fingerprint([asdict(a) for a in assignments])
+        
+        def load_course() -> Dict[str, str]:
+            cache['students'] = {s.student_id: s for s in self.get_course_students(course_id)}
+            # The course-wide submission stream serves both change detection and metrics
+            cache['submissions'] = self.get_course_submissions(course_id)
+            fingerprints = {
+                sid: record_fingerprint([student.email, student.name, student.photo_url])
+                for sid, student in cache['students'].items()
+            }
+            sync.record_fingerprints(fingerprints)
+            return fingerprints
+        
+        def student_rows(student_ids) -> pd.DataFrame:
+            metrics = compute_engagement_metrics(cache['submissions'])
+            return pd.DataFrame([
+                asdict(self._apply_engagement_metrics(cache['students'][sid], student_metrics(metrics, sid)))
+                for sid in student_ids
+            ])
+        
+        def fetch_full() -> pd.DataFrame:
+            load_course()
+            return student_rows(list(cache['students']))
+        
+        def fetch_changes(state) -> DeltaChanges:
+            fingerprints = load_course()
+            changed = {sid for sid, fingerprint in fingerprints.items() if state.fingerprint(sid) != fingerprint}
+            changed |= self.get_changed_student_ids(
+                course_id, state.high_water_mark, submissions=cache['submissions']
+            ) & set(fingerprints)
+            return DeltaChanges(
+                changed_ids=changed,
+                removed_ids=set(state.snapshot) - set(fingerprints),
+                full_resync=state.etag != coursework_etag
+            )
+        
+        result = sync.run(fetch_full, fetch_changes, student_rows, lambda rows: [],
+                          force_full=force_full, etag=coursework_etag)
+        return [GoogleClassroomStudent(**row) for row in result.rows], result.summary()
+    
+    def sync_course_data(self, course_id: str, incremental: bool = True, state_store=None,
+                         force_full: bool = False) -> Dict[str, Any]:
         """
         Comprehensive data synchronization for a specific course
         
         Args:
             course_id: Google Classroom course ID
+            incremental: Recompute metrics only for students changed since the last sync
+            state_store: SyncStateStore holding the course snapshot (defaults to the app database)
+            force_full: Ignore the stored snapshot and recompute every student
             
         Returns:
             Dictionary containing all course data and analytics
@@ -419,22 +582,24 @@ class GoogleClassroomIntegration:
             # Get course info
             course_info = self.service.courses().get(id=course_id).execute()
             
-            # Get students and assignments
-            students = self.get_course_students(course_id)
+            # Get assignments, then students with their engagement metrics
             assignments = self.get_course_assignments(course_id)
+            enhanced_students = None
+            delta = None
+            if incremental:
+                try:
+                    enhanced_students, delta = self._sync_students_incremental(
+                        course_id, assignments, state_store, force_full
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ Incremental sync failed for course {course_id}, running full sync: {e}")
             
-            # Calculate engagement metrics for each student
-            enhanced_students = []
-            for student in students:
-                metrics = self.calculate_student_engagement_metrics(student.student_id, course_id)
-                
-                # Update student object with calculated metrics
-                student.classroom_participation_rate = metrics.get('participation_rate', 0.0)
-                student.assignment_completion_rate = metrics.get('completion_rate', 0.0)
-                student.avg_assignment_score = metrics.get('avg_score', 0.0)
-                student.total_assignments = metrics.get('total_assignments', 0)
-                
-                enhanced_students.append(student)
+            if enhanced_students is None:
+                metrics = compute_engagement_metrics(self.get_course_submissions(course_id))
+                enhanced_students = [
+                    self._apply_engagement_metrics(student, student_metrics(metrics, student.student_id))
+                    for student in self.get_course_students(course_id)
+                ]
             
             sync_result = {
                 'course_id': course_id,
@@ -444,7 +609,8 @@ class GoogleClassroomIntegration:
                 'sync_timestamp': datetime.now().isoformat(),
                 'total_students': len(enhanced_students),
                 'total_assignments': len(assignments),
-                'avg_engagement': sum(s.classroom_participation_rate for s in enhanced_students) / len(enhanced_students) if enhanced_students else 0.0
+                'avg_engagement': sum(s.classroom_participation_rate for s in enhanced_students) / len(enhanced_students) if enhanced_students else 0.0,
+                'delta': delta
             }
             
             logger.info(f"✅ Google Classroom sync complete: {len(enhanced_students)} students, {len(assignments)} assignments")
@@ -454,6 +620,25 @@ class GoogleClassroomIntegration:
             logger.error(f"❌ Google Classroom sync failed for course {course_id}: {e}")
             return {}
     
+    def sync_courses(self, course_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Sync many courses with batched API requests.
+        
+        Roster, coursework and submission pages of all courses are fetched in
+        Google API batch requests (see GoogleClassroomBatchSync).
+        
+        Returns:
+            sync_course_data-style result per course ID
+        """
+        try:
+            from .google_classroom_batch import GoogleClassroomBatchSync
+        except ImportError:
+            from integrations.google_classroom_batch import GoogleClassroomBatchSync
+        
+        if not self.service:
+            raise Exception("Not authenticated")
+        return GoogleClassroomBatchSync(self).sync_courses(course_ids)
+    
     def generate_ml_features(self, students: List[GoogleClassroomStudent]) -> pd.DataFrame:
         """
         Generate enhanced ML features from Google Classroom data
@@ -657,6 +842,55 @@ class GoogleClassroomIntegration:
         
         return health_status
 
+ENGAGEMENT_METRIC_DEFAULTS = {
+    'participation_rate': 0.0,
+    'completion_rate': 0.0,
+    'on_time_rate': 0.0,
+    'avg_score': 0.0
+}
+
+
+def compute_engagement_metrics(submissions: List[Dict]) -> pd.DataFrame:
+    """
+    Engagement metrics for every student of a course in one vectorized pass.
+    
+    Matches GoogleClassroomIntegration.calculate_student_engagement_metrics.
+    
+    Returns:
+        DataFrame indexed by userId with participation_rate, completion_rate,
+        on_time_rate, avg_score, total_assignments and completed_assignments
+    """
+    columns = list(ENGAGEMENT_METRIC_DEFAULTS) + ['total_assignments', 'completed_assignments']
+    if not submissions:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name='userId'))
+    
+    df = pd.DataFrame.from_records(submissions)
+    df = df.reindex(columns=sorted(set(df.columns) | {'userId', 'state', 'late', 'assignedGrade'}))
+    df['completed'] = df['state'] == 'TURNED_IN'
+    df['on_time'] = df['late'].ne(True)
+    df['score'] = pd.to_numeric(df['assignedGrade'], errors='coerce')
+    
+    grouped = df.groupby('userId').agg(
+        total_assignments=('completed', 'size'), completed_assignments=('completed', 'sum'),
+        on_time=('on_time', 'sum'), avg_score=('score', 'mean')
+    )
+    grouped['participation_rate'] = grouped['completed_assignments'] / grouped['total_assignments']
+    grouped['completion_rate'] = grouped['participation_rate']
+    grouped['on_time_rate'] = grouped['on_time'] / grouped['total_assignments']
+    grouped['avg_score'] = grouped['avg_score'].fillna(0.0)
+    return grouped[columns]
+
+
+def student_metrics(metrics: pd.DataFrame, student_id: str) -> Dict[str, float]:
+    """One student's row of compute_engagement_metrics (defaults when they have no submissions)"""
+    if student_id not in metrics.index:
+        return dict(ENGAGEMENT_METRIC_DEFAULTS)
+    row = metrics.loc[student_id]
+    return {**{key: float(row[key]) for key in ENGAGEMENT_METRIC_DEFAULTS},
+            'total_assignments': int(row['total_assignments']),
+            'completed_assignments': int(row['completed_assignments'])}
+
+
 # Example usage and testing
 if __name__ == "__main__":
     async def test_google_classroom():
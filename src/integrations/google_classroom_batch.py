@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Batched Google Classroom Sync
+
+Syncs many courses with Google API batch requests: the roster, coursework
+and course-wide submission streams of every course advance one page per
+round, each round packed into batches of up to BATCH_LIMIT calls. Calls are
+paced by the integration's quota-aware token bucket and engagement metrics
+are computed for all students of a course in one vectorized pass.
+"""
+
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .google_classroom import (
+        GoogleClassroomIntegration, compute_engagement_metrics, student_metrics
+    )
+except ImportError:
+    from integrations.google_classroom import (
+        GoogleClassroomIntegration, compute_engagement_metrics, student_metrics
+    )
+
+logger = logging.getLogger(__name__)
+
+# Classroom accepts at most 50 calls per batch request
+BATCH_LIMIT = 50
+
+# (request for one page given its pageToken, response field holding the items)
+PagedStream = Tuple[Callable[[Optional[str]], Any], str]
+
+
+class ClassroomBatchExecutor:
+    """Runs Classroom API calls in batch HTTP requests"""
+
+    def __init__(self, service, rate_limiter=None, batch_size: int = BATCH_LIMIT):
+        """
+        Initialize executor.
+
+        Args:
+            service: Classroom discovery client (or FakeClassroomService)
+            rate_limiter: TokenBucket charged one token per call, not per batch
+            batch_size: Calls per batch request (at most BATCH_LIMIT)
+        """
+        self.service = service
+        self.rate_limiter = rate_limiter
+        self.batch_size = max(1, min(batch_size, BATCH_LIMIT))
+        self.http_requests = 0
+        self.api_calls = 0
+
+    def execute(self, requests: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute requests in batches.
+
+        Returns:
+            Response per request key, or the exception raised for that call
+        """
+        results: Dict[str, Any] = {}
+
+        def callback(request_id, response, exception):
+            results[request_id] = exception if exception is not None else response
+
+        items = list(requests.items())
+        for start in range(0, len(items), self.batch_size):
+            chunk = items[start:start + self.batch_size]
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(len(chunk))
+            batch = self.service.new_batch_http_request(callback=callback)
+            for key, request in chunk:
+                batch.add(request, request_id=key)
+            batch.execute()
+            self.http_requests += 1
+            self.api_calls += len(chunk)
+        return results
+
+    def fetch_all(self, streams: Dict[str, PagedStream]) -> Tuple[Dict[str, List[Dict]], Dict[str, Exception]]:
+        """
+        Follow ``nextPageToken`` of many list calls, one batch round per page depth.
+
+        Returns:
+            (items per stream key, error per failed stream key)
+        """
+        items: Dict[str, List[Dict]] = {key: [] for key in streams}
+        errors: Dict[str, Exception] = {}
+        tokens: Dict[str, Optional[str]] = {key: None for key in streams}
+
+        while tokens:
+            responses = self.execute({key: streams[key][0](token) for key, token in tokens.items()})
+            next_tokens = {}
+            for key, response in responses.items():
+                if isinstance(response, Exception):
+                    errors[key] = response
+                    continue
+                items[key].extend(response.get(streams[key][1], []))
+                if response.get('nextPageToken'):
+                    next_tokens[key] = response['nextPageToken']
+            tokens = next_tokens
+        return items, errors
+
+
+class GoogleClassroomBatchSync:
+    """Multi-course Classroom sync over batched, paged API streams"""
+
+    def __init__(self, integration: GoogleClassroomIntegration, batch_size: int = BATCH_LIMIT):
+        self.integration = integration
+        self.executor = ClassroomBatchExecutor(integration.service, integration.rate_limiter, batch_size)
+
+    def _streams(self, course_id: str) -> Dict[str, PagedStream]:
+        courses = self.integration.service.courses
+        return {
+            f'{course_id}/students': (
+                lambda token: courses().students().list(courseId=course_id, pageToken=token), 'students'
+            ),
+            f'{course_id}/courseWork': (
+                lambda token: courses().courseWork().list(courseId=course_id, pageToken=token), 'courseWork'
+            ),
+            f'{course_id}/studentSubmissions': (
+                lambda token: courses().courseWork().studentSubmissions().list(
+                    courseId=course_id, courseWorkId='-', pageToken=token
+                ),
+                'studentSubmissions'
+            ),
+        }
+
+    def sync_courses(self, course_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Sync courses with batched requests.
+
+        Returns:
+            sync_course_data-style result per course ID ({} for a course whose calls failed)
+        """
+        started = time.perf_counter()
+        courses = self.integration.service.courses
+        info = self.executor.execute({f'{cid}/course': courses().get(id=cid) for cid in course_ids})
+
+        streams: Dict[str, PagedStream] = {}
+        for course_id in course_ids:
+            streams.update(self._streams(course_id))
+        items, errors = self.executor.fetch_all(streams)
+
+        results = {}
+        for course_id in course_ids:
+            course_info = info.get(f'{course_id}/course')
+            failures = [key for key in self._streams(course_id) if key in errors]
+            if isinstance(course_info, Exception) or failures:
+                error = course_info if isinstance(course_info, Exception) else errors[failures[0]]
+                logger.error(f"Google Classroom batch sync failed for course {course_id}: {error}")
+                results[course_id] = {}
+                continue
+            results[course_id] = self._course_result(course_id, course_info, items)
+
+        logger.info(f"Google Classroom batch sync: {len(course_ids)} courses, {self.executor.api_calls} calls "
+                    f"in {self.executor.http_requests} batch requests ({time.perf_counter() - started:.2f}s)")
+        return results
+
+    def _course_result(self, course_id: str, course_info: Dict, items: Dict[str, List[Dict]]) -> Dict[str, Any]:
+        integration = self.integration
+        students = [integration._parse_student(data, course_id) for data in items[f'{course_id}/students']]
+        assignments = [integration._parse_assignment(data, course_id) for data in items[f'{course_id}/courseWork']]
+        metrics = compute_engagement_metrics(items[f'{course_id}/studentSubmissions'])
+
+        for student in students:
+            integration._apply_engagement_metrics(student, student_metrics(metrics, student.student_id))
+            integration.students_cache[student.student_id] = student
+        for assignment in assignments:
+            integration.assignments_cache[assignment.assignment_id] = assignment
+
+        return {
+            'course_id': course_id,
+            'course_name': course_info['name'],
+            'students': students,
+            'assignments': assignments,
+            'sync_timestamp': datetime.now().isoformat(),
+            'total_students': len(students),
+            'total_assignments': len(assignments),
+            'avg_engagement': sum(s.classroom_participation_rate for s in students) / len(students) if students else 0.0,
+            'delta': None
+        }
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Offline Google Classroom Transport
+
+In-memory stand-in for the ``build('classroom', 'v1')`` discovery client with
+the same resource/request/batch surface GoogleClassroomIntegration uses:
+paged list calls with ``nextPageToken``, ``courses().get`` and
+``new_batch_http_request``. It counts HTTP round trips and API calls so the
+sequential and batched sync paths can be compared without network access.
+"""
+
+import random
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_PAGE_SIZE = 30
+
+
+class FakeHttpError(Exception):
+    """Error response of the fake service (mirrors googleapiclient.errors.HttpError)"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"<HttpError {status}: {message}>")
+        self.status = status
+
+
+class FakeRequest:
+    """A prepared API call; ``execute()`` is one HTTP round trip"""
+
+    def __init__(self, service: "FakeClassroomService", handler: Callable[[], Dict]):
+        self._service = service
+        self._handler = handler
+
+    def _call(self) -> Dict:
+        self._service.api_calls += 1
+        return self._handler()
+
+    def execute(self) -> Dict:
+        self._service.http_requests += 1
+        return self._call()
+
+
+class FakeBatchHttpRequest:
+    """Runs many FakeRequests in one round trip, reporting each through the callback"""
+
+    def __init__(self, service: "FakeClassroomService", callback: Optional[Callable] = None):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request: FakeRequest, callback: Optional[Callable] = None, request_id: Optional[str] = None):
+        request_id = request_id or str(len(self._requests) + 1)
+        self._requests.append((request_id, request, callback or self._callback))
+
+    def execute(self):
+        self._service.http_requests += 1
+        for request_id, request, callback in self._requests:
+            try:
+                response, exception = request._call(), None
+            except FakeHttpError as e:
+                response, exception = None, e
+            if callback is not None:
+                callback(request_id, response, exception)
+
+
+class _Resource:
+    def __init__(self, service: "FakeClassroomService"):
+        self._service = service
+
+
+class _Submissions(_Resource):
+    def list(self, courseId: str, courseWorkId: str = '-', userId: Optional[str] = None,
+             pageToken: Optional[str] = None, pageSize: Optional[int] = None, **kwargs) -> FakeRequest:
+        def handler():
+            submissions = self._service._course(courseId)['studentSubmissions']
+            if courseWorkId != '-':
+                submissions = [s for s in submissions if s['courseWorkId'] == courseWorkId]
+            if userId is not None:
+                submissions = [s for s in submissions if s['userId'] == userId]
+            return self._service._page('studentSubmissions', submissions, pageToken, pageSize)
+        return FakeRequest(self._service, handler)
+
+
+class _CourseWork(_Resource):
+    def list(self, courseId: str, pageToken: Optional[str] = None, pageSize: Optional[int] = None,
+             **kwargs) -> FakeRequest:
+        return FakeRequest(self._service, lambda: self._service._page(
+            'courseWork', self._service._course(courseId)['courseWork'], pageToken, pageSize
+        ))
+
+    def studentSubmissions(self) -> _Submissions:
+        return _Submissions(self._service)
+
+
+class _Students(_Resource):
+    def list(self, courseId: str, pageToken: Optional[str] = None, pageSize: Optional[int] = None,
+             **kwargs) -> FakeRequest:
+        return FakeRequest(self._service, lambda: self._service._page(
+            'students', self._service._course(courseId)['students'], pageToken, pageSize
+        ))
+
+
+class _Courses(_Resource):
+    def list(self, pageToken: Optional[str] = None, pageSize: Optional[int] = None, **kwargs) -> FakeRequest:
+        courses = [data['course'] for data in self._service.data.values()]
+        return FakeRequest(self._service, lambda: self._service._page('courses', courses, pageToken, pageSize))
+
+    def get(self, id: str) -> FakeRequest:
+        return FakeRequest(self._service, lambda: self._service._course(id)['course'])
+
+    def students(self) -> _Students:
+        return _Students(self._service)
+
+    def courseWork(self) -> _CourseWork:
+        return _CourseWork(self._service)
+
+
+class FakeClassroomService:
+    """Offline Classroom API over in-memory course data"""
+
+    def __init__(self, data: Dict[str, Dict[str, Any]], page_size: int = DEFAULT_PAGE_SIZE):
+        """
+        Initialize fake service.
+
+        Args:
+            data: course ID -> {'course', 'students', 'courseWork', 'studentSubmissions'} in API shape
+            page_size: Default page size of list calls
+        """
+        self.data = data
+        self.page_size = page_size
+        self.http_requests = 0
+        self.api_calls = 0
+
+    @classmethod
+    def demo(cls, course_count: int = 3, students_per_course: int = 25, coursework_per_course: int = 8,
+             seed: int = 7, page_size: int = DEFAULT_PAGE_SIZE) -> "FakeClassroomService":
+        """Deterministic demo district"""
+        rng = random.Random(seed)
+        states = ['TURNED_IN', 'TURNED_IN', 'TURNED_IN', 'RETURNED', 'CREATED']
+        data = {}
+        for c in range(1, course_count + 1):
+            course_id = f"course-{c}"
+            students = [{'userId': f"{course_id}-student-{i}", 'courseId': course_id,
+                         'profile': {'name': {'fullName': f"Student {c}.{i}"},
+                                     'emailAddress': f"s{c}.{i}@school.example.org"}}
+                        for i in range(1, students_per_course + 1)]
+            coursework = [{'id': f"{course_id}-work-{k}", 'courseId': course_id, 'title': f"Assignment {k}",
+                           'maxPoints': 100} for k in range(1, coursework_per_course + 1)]
+            submissions = []
+            for work in coursework:
+                for student in students:
+                    submission = {'courseId': course_id, 'courseWorkId': work['id'], 'userId': student['userId'],
+                                  'state': rng.choice(states), 'late': rng.random() < 0.2,
+                                  'updateTime': '2024-01-15T12:00:00Z'}
+                    if rng.random() < 0.8:
+                        submission['assignedGrade'] = rng.randint(40, 100)
+                    submissions.append(submission)
+            data[course_id] = {
+                'course': {'id': course_id, 'name': f"Course {c}", 'courseState': 'ACTIVE'},
+                'students': students, 'courseWork': coursework, 'studentSubmissions': submissions
+            }
+        return cls(data, page_size=page_size)
+
+    def courses(self) -> _Courses:
+        return _Courses(self)
+
+    def new_batch_http_request(self, callback: Optional[Callable] = None) -> FakeBatchHttpRequest:
+        return FakeBatchHttpRequest(self, callback)
+
+    def _course(self, course_id: str) -> Dict[str, Any]:
+        if course_id not in self.data:
+            raise FakeHttpError(404, f"Requested entity was not found: course {course_id}")
+        return self.data[course_id]
+
+    def _page(self, key: str, items: List[Dict], page_token: Optional[str], page_size: Optional[int]) -> Dict:
+        start = int(page_token or 0)
+        size = page_size or self.page_size
+        response = {key: items[start:start + size]}
+        if start + size < len(items):
+            response['nextPageToken'] = str(start + size)
+        return response
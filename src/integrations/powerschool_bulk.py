@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+PowerSchool Bulk School Sync
+
+Builds a school's enhanced gradebook from school-wide paged collections
+(students with demographics/special-program expansions, attendance, grades,
+discipline) instead of six requests per student. Each collection is
+aggregated per student with vectorized pandas and joined on student id, so a
+school costs O(pages) requests.
+"""
+
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .powerschool_sis import PowerSchoolSISIntegration
+    from .powerschool_sync import SyncReport
+except ImportError:
+    from integrations.powerschool_sis import PowerSchoolSISIntegration
+    from integrations.powerschool_sync import SyncReport
+
+logger = logging.getLogger(__name__)
+
+# Column order of the per-student gradebook, so both sync modes are interchangeable
+GRADEBOOK_COLUMNS = [
+    'student_id', 'state_id', 'local_id', 'name', 'first_name', 'last_name',
+    'grade_level', 'current_gpa', 'cumulative_gpa', 'credits_earned', 'credits_attempted',
+    'attendance_rate', 'absences_unexcused', 'tardies',
+    'discipline_incidents', 'office_referrals', 'suspensions',
+    'gender', 'ethnicity', 'economic_disadvantaged',
+    'iep_status', 'section_504', 'ell_status', 'gifted_status',
+    'school_id', 'enrollment_status', 'data_source', 'last_sync',
+    'assignment_completion', 'parent_engagement_frequency', 'course_failures'
+]
+
+SUSPENSION_TYPES = ['suspension', 'oss', 'iss']
+
+# Student IDs per ``studentid=in=(...)`` filter when refreshing a subset of students
+STUDENT_FILTER_CHUNK = 100
+
+
+def _frame(records: List[Dict], columns: List[str]) -> pd.DataFrame:
+    """Records as a DataFrame with at least ``columns`` and a string student id"""
+    df = pd.DataFrame.from_records(records) if records else pd.DataFrame()
+    df = df.reindex(columns=sorted(set(df.columns) | set(columns)))
+    df['studentid'] = df['studentid'].astype(str)
+    return df
+
+
+def aggregate_attendance(records: List[Dict]) -> pd.DataFrame:
+    """Per-student attendance rate, unexcused absences and tardies"""
+    df = _frame(records, ['studentid', 'attendance_code', 'tardy'])
+    df['absent'] = df['attendance_code'].isin(['A', 'U'])  # Absent or Unexcused
+    df['tardy'] = df['tardy'].fillna(False).astype(bool)
+    grouped = df.groupby('studentid').agg(
+        total_days=('absent', 'size'), absences_unexcused=('absent', 'sum'), tardies=('tardy', 'sum')
+    )
+    grouped['attendance_rate'] = (grouped['total_days'] - grouped['absences_unexcused']) / grouped['total_days']
+    return grouped[['attendance_rate', 'absences_unexcused', 'tardies']]
+
+
+def aggregate_grades(records: List[Dict]) -> pd.DataFrame:
+    """Per-student GPA and credits; credits count as earned when grade_points > 0"""
+    df = _frame(records, ['studentid', 'credit_attempted', 'grade_points', 'gpa_current', 'gpa_cumulative'])
+    df['credit_attempted'] = pd.to_numeric(df['credit_attempted'], errors='coerce').fillna(0.0)
+    passed = pd.to_numeric(df['grade_points'], errors='coerce').fillna(0) > 0
+    df['credit_earned'] = df['credit_attempted'].where(passed, 0.0)
+    grouped = df.groupby('studentid').agg(
+        credits_attempted=('credit_attempted', 'sum'),
+        credits_earned=('credit_earned', 'sum'),
+        current_gpa=('gpa_current', 'max'),
+        cumulative_gpa=('gpa_cumulative', 'max'),
+    )
+    grouped[['current_gpa', 'cumulative_gpa']] = grouped[['current_gpa', 'cumulative_gpa']].astype(float)
+    return grouped
+
+
+def aggregate_discipline(records: List[Dict]) -> pd.DataFrame:
+    """Per-student incident, referral and suspension counts"""
+    df = _frame(records, ['studentid', 'type'])
+    df['referral'] = df['type'] == 'referral'
+    df['suspension'] = df['type'].isin(SUSPENSION_TYPES)
+    return df.groupby('studentid').agg(
+        discipline_incidents=('type', 'size'),
+        office_referrals=('referral', 'sum'),
+        suspensions=('suspension', 'sum'),
+    )
+
+
+def special_program_flags(students: pd.DataFrame) -> pd.DataFrame:
+    """IEP/504/ELL/gifted flags from the expanded special_programs lists"""
+    flags = ['iep_status', 'section_504', 'ell_status', 'gifted_status']
+    programs = students[['student_id', 'special_programs']].explode('special_programs')
+    codes = programs['special_programs'].str.get('program_code').fillna('').astype(str).str.upper()
+    # First matching rule wins, as in PowerSchoolSISIntegration._apply_special_programs
+    matched = np.select(
+        [codes.str.contains('IEP') | codes.str.contains('SPED'), codes.str.contains('504'),
+         codes.str.contains('ELL') | codes.str.contains('ESL'), codes.str.contains('GIFT') | codes.str.contains('TAG')],
+        flags, default=''
+    )
+    indicators = pd.get_dummies(pd.Series(matched, index=programs.index)).reindex(columns=flags, fill_value=False)
+    indicators['student_id'] = programs['student_id']
+    return indicators.groupby('student_id')[flags].any()
+
+
+class PowerSchoolBulkSync:
+    """School-wide gradebook built from paged PowerSchool collections"""
+
+    def __init__(self, integration: PowerSchoolSISIntegration):
+        self.integration = integration
+
+    def fetch_roster(self, school_id: str, grade_levels: List[int] = None) -> List[Dict]:
+        """All student records of a school with demographics and special programs expanded"""
+        params = self.integration._school_students_params(school_id, grade_levels)
+        params['expansions'] = 'demographics,special_programs'
+        return list(self.integration._get_paged('students', 'students', params))
+
+    def _collection_params(self, school_id: str) -> Dict[str, Dict]:
+        year_params = {'schoolid': school_id, 'yearid': datetime.now().year}
+        return {'attendance': year_params, 'grades': {'schoolid': school_id}, 'discipline': year_params}
+
+    def _fetch_collection(self, name: str, params: Dict, student_ids: Optional[Set[str]] = None) -> List[Dict]:
+        if student_ids is None:
+            return list(self.integration._get_paged(name, name, params))
+        records = []
+        ids = sorted(student_ids)
+        for start in range(0, len(ids), STUDENT_FILTER_CHUNK):
+            chunk = ids[start:start + STUDENT_FILTER_CHUNK]
+            chunk_params = {**params, 'q': f"studentid=in=({','.join(chunk)})"}
+            records.extend(self.integration._get_paged(name, name, chunk_params))
+        return records
+
+    def changed_student_ids(self, school_id: str, since: str) -> Set[str]:
+        """Students with attendance, grade or discipline records modified since ``since``"""
+        changed = set()
+        for name, params in self._collection_params(school_id).items():
+            delta_params = {**params, 'q': f"whenmodified=ge={since}"}
+            changed.update(str(r.get('studentid')) for r in self.integration._get_paged(name, name, delta_params))
+        return changed
+
+    def build_gradebook(self, school_id: str, grade_levels: List[int] = None,
+                        roster: Optional[List[Dict]] = None,
+                        student_ids: Optional[Iterable[str]] = None) -> Tuple[pd.DataFrame, SyncReport]:
+        """
+        Build the enhanced gradebook for a school.
+
+        Args:
+            school_id: PowerSchool school ID
+            grade_levels: Optional grade filter
+            roster: Student records already fetched with fetch_roster
+            student_ids: Only build rows for these students (collections are filtered server-side)
+
+        Returns:
+            (gradebook with the per-student sync's columns, sync report)
+        """
+        started = time.perf_counter()
+        requests_before = self.integration.requests_this_hour
+
+        if roster is None:
+            roster = self.fetch_roster(school_id, grade_levels)
+        subset = {str(sid) for sid in student_ids} if student_ids is not None else None
+        if subset is not None:
+            roster = [record for record in roster if str(record.get('id')) in subset]
+        students = self._students_frame(roster)
+
+        report = SyncReport(mode='bulk', requested=len(students))
+        if students.empty:
+            report.elapsed_seconds = time.perf_counter() - started
+            return pd.DataFrame(), report
+
+        params = self._collection_params(school_id)
+        attendance = aggregate_attendance(self._fetch_collection('attendance', params['attendance'], subset))
+        grades = aggregate_grades(self._fetch_collection('grades', params['grades'], subset))
+        discipline = aggregate_discipline(self._fetch_collection('discipline', params['discipline'], subset))
+
+        gradebook = self._join(students, attendance, grades, discipline)
+
+        report.succeeded = len(gradebook)
+        report.requests_made = self.integration.requests_this_hour - requests_before
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(f"PowerSchool bulk sync: {report.succeeded} students in {report.requests_made} requests "
+                    f"({report.elapsed_seconds:.2f}s)")
+        return gradebook, report
+
+    @staticmethod
+    def _students_frame(records: List[Dict]) -> pd.DataFrame:
+        if not records:
+            return pd.DataFrame()
+        raw = pd.DataFrame.from_records(records)
+        raw = raw.reindex(columns=sorted(set(raw.columns) | {
+            'id', 'state_studentnumber', 'student_number', 'first_name', 'last_name', 'grade_level',
+            'schoolid', 'enroll_status_code', 'gender', 'demographics', 'special_programs'
+        }))
+        demographics = raw['demographics'].apply(lambda d: d if isinstance(d, dict) else {})
+        programs = raw['special_programs'].apply(
+            lambda p: p.get('programs', []) if isinstance(p, dict) else (p if isinstance(p, list) else [])
+        )
+
+        return pd.DataFrame({
+            'student_id': raw['id'].astype(str),
+            'state_id': raw['state_studentnumber'].fillna(''),
+            'local_id': raw['student_number'].fillna(''),
+            'first_name': raw['first_name'].fillna(''),
+            'last_name': raw['last_name'].fillna(''),
+            'grade_level': pd.to_numeric(raw['grade_level'], errors='coerce').fillna(0).astype(int),
+            'school_id': raw['schoolid'].fillna('').astype(str),
+            'enrollment_status': raw['enroll_status_code'].fillna('A'),
+            'gender': raw['gender'],
+            'ethnicity': demographics.str.get('ethnicity'),
+            'economic_disadvantaged': demographics.str.get('economically_disadvantaged').fillna(False).astype(bool),
+            'special_programs': programs,
+        })
+
+    @staticmethod
+    def _join(students: pd.DataFrame, attendance: pd.DataFrame, grades: pd.DataFrame,
+              discipline: pd.DataFrame) -> pd.DataFrame:
+        gradebook = (
+            students.drop(columns='special_programs')
+            .join(special_program_flags(students), on='student_id')
+            .join(attendance, on='student_id')
+            .join(grades, on='student_id')
+            .join(discipline, on='student_id')
+        )
+
+        # Students without records get the same defaults as PowerSchoolStudent
+        gradebook = gradebook.fillna({
+            'attendance_rate': 0.0, 'absences_unexcused': 0, 'tardies': 0,
+            'current_gpa': 0.0, 'cumulative_gpa': 0.0, 'credits_earned': 0.0, 'credits_attempted': 0.0,
+            'discipline_incidents': 0, 'office_referrals': 0, 'suspensions': 0,
+            'iep_status': False, 'section_504': False, 'ell_status': False, 'gifted_status': False,
+        })
+        for column in ['absences_unexcused', 'tardies', 'discipline_incidents', 'office_referrals', 'suspensions']:
+            gradebook[column] = gradebook[column].astype(int)
+        for column in ['iep_status', 'section_504', 'ell_status', 'gifted_status']:
+            gradebook[column] = gradebook[column].astype(bool)
+
+        gradebook['name'] = gradebook['first_name'] + ' ' + gradebook['last_name']
+        gradebook['data_source'] = 'powerschool_sis'
+        gradebook['last_sync'] = datetime.now().isoformat()
+
+        # Calculated fields for prediction model
+        gradebook['assignment_completion'] = np.minimum(
+            1.0, gradebook['credits_earned'] / np.maximum(1, gradebook['credits_attempted'])
+        )
+        gradebook['parent_engagement_frequency'] = np.where(gradebook['economic_disadvantaged'], 2, 3)
+        gradebook['course_failures'] = np.maximum(0, gradebook['credits_attempted'] - gradebook['credits_earned'])
+
+        return gradebook[GRADEBOOK_COLUMNS].reset_index(drop=True)
@@ -7,6 +7,7 @@ academic history analysis for enhanced K-12 predictions.
 """
 
 import requests
+import time
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Any, Tuple
@@ -18,8 +19,21 @@ import base64
 from dataclasses import dataclass
 from enum import Enum
 
+try:
+    from .client_registry import IntegrationClient, PoolConfig, get_client_registry
+    from .rate_limiter import TokenBucket
+    from .response_cache import UpstreamResponse, credential_fingerprint, get_response_cache
+except ImportError:
+    from integrations.client_registry import IntegrationClient, PoolConfig, get_client_registry
+    from integrations.rate_limiter import TokenBucket
+    from integrations.response_cache import UpstreamResponse, credential_fingerprint, get_response_cache
+
 logger = logging.getLogger(__name__)
 
+# Gradebook columns _enhance_prediction_with_sis_data reads besides the model inputs
+SIS_INSIGHT_COLUMNS = ('tardies', 'suspensions', 'credits_earned', 'credits_attempted', 'iep_status',
+                       'section_504', 'gifted_status', 'economic_disadvantaged', 'ell_status')
+
 class PowerSchoolDataType(Enum):
     """Types of data we can fetch from PowerSchool"""
     STUDENTS = "students"
@@ -42,6 +56,13 @@ class PowerSchoolConfig:
     school_year: Optional[str] = None
     timeout_seconds: int = 30
     rate_limit_per_hour: int = 1000  # Conservative estimate
+    max_concurrent_students: int = 8  # Worker pool size for concurrent school sync
+    max_retries: int = 3  # Retries for 429/5xx responses before giving up
+    use_response_cache: bool = True  # Serve school lists from the shared integration response cache
+    use_shared_client: bool = True  # Share the pooled session and OAuth token of these credentials across instances
+    page_size: int = 500  # PowerSchool default max
+    bulk_sync: bool = True  # Build gradebooks from school-wide paged collections
+    incremental_sync: bool = True  # Refetch and re-score only students changed since the last sync
 
 @dataclass
 class PowerSchoolStudent:
@@ -84,7 +105,16 @@ class PowerSchoolSISIntegration:
     
     def __init__(self, config: PowerSchoolConfig):
         self.config = config
-        self.session = requests.Session()
+        self.credential_fingerprint = credential_fingerprint(
+            'powerschool', config.base_url.rstrip('/'), config.client_id, config.client_secret
+        )
+        if config.use_shared_client:
+            self.client = get_client_registry().get_client(
+                'powerschool', self.credential_fingerprint, pool_maxsize=config.max_concurrent_students
+            )
+        else:
+            self.client = IntegrationClient('powerschool', self.credential_fingerprint, PoolConfig())
+        self.session = self.client.session
         self.access_token = None
         self.token_expires_at = None
         
@@ -92,9 +122,21 @@ class PowerSchoolSISIntegration:
         self.last_request_time = datetime.now()
         self.requests_this_hour = 0
         self.request_count_reset_time = datetime.now()
+        # Shared by the sync client and the concurrent sync engine, and through the
+        # registry client by every instance built for the same base_url and client_id
+        self.rate_limiter = self.client.get_rate_limiter(
+            lambda: TokenBucket.per_hour(config.rate_limit_per_hour)
+        )
+        self.last_sync_report = None
         
-    def _handle_rate_limit(self):
-        """Simple rate limiting implementation"""
+        self.response_cache = get_response_cache() if config.use_response_cache else None
+        # Optional (stage, student_count) callback for background sync jobs
+        self.progress_callback = None
+        # K12UltraPredictor, loaded on first scoring unless a caller shares one
+        self.predictor = None
+        
+    def _handle_rate_limit(self) -> float:
+        """Reserve a request slot; returns seconds to wait before sending it"""
         now = datetime.now()
         
         # Reset hourly counter
@@ -102,72 +144,80 @@ class PowerSchoolSISIntegration:
             self.requests_this_hour = 0
             self.request_count_reset_time = now
         
-        # Check if we're at rate limit
-        if self.requests_this_hour >= self.config.rate_limit_per_hour:
-            sleep_time = 3600 - (now - self.request_count_reset_time).seconds
-            logger.warning(f"PowerSchool rate limit reached, sleeping for {sleep_time} seconds")
-            return sleep_time
-        
-        return 0
+        sleep_time = self.rate_limiter.reserve()
+        if sleep_time > 1:
+            logger.info(f"PowerSchool rate limit pacing: waiting {sleep_time:.1f} seconds")
+        return sleep_time
+    
+    @staticmethod
+    def _retry_after_seconds(retry_after: Optional[str], attempt: int) -> float:
+        """Delay from a Retry-After header, falling back to exponential backoff"""
+        try:
+            return max(0.0, float(retry_after))
+        except (TypeError, ValueError):
+            return float(2 ** attempt)
     
     def _authenticate(self) -> bool:
-        """Authenticate with PowerSchool OAuth2"""
+        """Authenticate with PowerSchool OAuth2, reusing the shared token of these credentials until near expiry"""
         try:
-            # Check if current token is still valid
-            if (self.access_token and self.token_expires_at and 
-                datetime.now() < self.token_expires_at - timedelta(minutes=5)):
-                return True
-            
-            # Prepare OAuth2 credentials
-            credentials = f"{self.config.client_id}:{self.config.client_secret}"
-            encoded_credentials = base64.b64encode(credentials.encode()).decode()
-            
-            # OAuth2 token request
-            token_url = f"{self.config.base_url.rstrip('/')}/oauth/access_token"
-            headers = {
-                'Authorization': f'Basic {encoded_credentials}',
-                'Content-Type': 'application/x-www-form-urlencoded'
-            }
-            data = {
-                'grant_type': 'client_credentials'
-            }
-            
-            response = requests.post(
-                token_url, 
-                headers=headers, 
-                data=data, 
-                timeout=self.config.timeout_seconds
-            )
+            if self.config.use_shared_client:
+                token = get_client_registry().get_token(self.client, self._request_token)
+            else:
+                token = self.client.get_token(self._request_token)
+            if token is None:
+                return False
             
-            if response.status_code == 200:
-                token_data = response.json()
-                self.access_token = token_data['access_token']
-                expires_in = token_data.get('expires_in', 3600)  # Default 1 hour
-                self.token_expires_at = datetime.now() + timedelta(seconds=expires_in)
-                
+            if token.access_token != self.access_token:
+                self.access_token = token.access_token
+                self.token_expires_at = datetime.fromtimestamp(token.expires_at)
                 # Update session headers
                 self.session.headers.update({
                     'Authorization': f'Bearer {self.access_token}',
                     'Content-Type': 'application/json',
                     'Accept': 'application/json'
                 })
-                
-                logger.info("PowerSchool authentication successful")
-                return True
-            else:
-                logger.error(f"PowerSchool authentication failed: {response.status_code} - {response.text}")
-                return False
+            return True
                 
         except Exception as e:
             logger.error(f"PowerSchool authentication error: {e}")
             return False
     
-    def _make_powerschool_request(self, endpoint: str, params: Dict = None) -> requests.Response:
-        """Make authenticated request to PowerSchool API with rate limiting"""
-        sleep_time = self._handle_rate_limit()
-        if sleep_time > 0:
-            raise Exception(f"Rate limit exceeded, try again in {sleep_time} seconds")
+    def _request_token(self) -> Optional[Dict[str, Any]]:
+        """OAuth2 client-credentials token request; returns the token JSON or None"""
+        # Prepare OAuth2 credentials
+        credentials = f"{self.config.client_id}:{self.config.client_secret}"
+        encoded_credentials = base64.b64encode(credentials.encode()).decode()
+        
+        # OAuth2 token request
+        token_url = f"{self.config.base_url.rstrip('/')}/oauth/access_token"
+        headers = {
+            'Authorization': f'Basic {encoded_credentials}',
+            'Content-Type': 'application/x-www-form-urlencoded'
+        }
+        data = {
+            'grant_type': 'client_credentials'
+        }
         
+        response = self.session.post(
+            token_url, 
+            headers=headers, 
+            data=data, 
+            timeout=self.config.timeout_seconds
+        )
+        
+        if response.status_code == 200:
+            logger.info("PowerSchool authentication successful")
+            return response.json()
+        logger.error(f"PowerSchool authentication failed: {response.status_code} - {response.text}")
+        return None
+    
+    def _invalidate_token(self, stale_token: Optional[str] = None) -> None:
+        """Forget a token the server rejected so the next _authenticate fetches a new one"""
+        self.client.invalidate_token(stale_token or self.access_token)
+        self.access_token = None
+    
+    def _make_powerschool_request(self, endpoint: str, params: Dict = None, headers: Dict = None) -> requests.Response:
+        """Make authenticated request to PowerSchool API, paced by the rate limiter (304 is returned for conditional requests)"""
         # Ensure authentication
         if not self._authenticate():
             raise Exception("PowerSchool authentication failed")
@@ -175,18 +225,33 @@ class PowerSchoolSISIntegration:
         url = f"{self.config.base_url.rstrip('/')}/ws/v1/{endpoint.lstrip('/')}"
         
         try:
-            response = self.session.get(
-                url, 
-                params=params or {}, 
-                timeout=self.config.timeout_seconds
-            )
-            self.requests_this_hour += 1
+            for attempt in range(self.config.max_retries + 1):
+                sleep_time = self._handle_rate_limit()
+                if sleep_time > 0:
+                    time.sleep(sleep_time)
+                
+                response = self.session.get(
+                    url, 
+                    params=params or {}, 
+                    headers=headers,
+                    timeout=self.config.timeout_seconds
+                )
+                self.requests_this_hour += 1
+                
+                if response.status_code != 429 or attempt == self.config.max_retries:
+                    break
+                
+                # Server-side throttling: hold back every caller, then retry
+                delay = self._retry_after_seconds(response.headers.get('Retry-After'), attempt)
+                logger.warning(f"PowerSchool returned 429, retrying in {delay:.1f} seconds")
+                self.rate_limiter.penalize(delay)
             
             if response.status_code == 401:
                 # Token expired, try to re-authenticate once
-                self.access_token = None
+                self._invalidate_token()
                 if self._authenticate():
-                    response = self.session.get(url, params=params or {}, timeout=self.config.timeout_seconds)
+                    response = self.session.get(url, params=params or {}, headers=headers,
+                                                timeout=self.config.timeout_seconds)
                 else:
                     raise Exception("PowerSchool authentication failed after retry")
             
@@ -194,6 +259,8 @@ class PowerSchoolSISIntegration:
                 raise Exception("PowerSchool API access forbidden - check permissions")
             elif response.status_code == 429:
                 raise Exception("PowerSchool API rate limit exceeded")
+            elif response.status_code == 304 and headers:
+                return response
             elif response.status_code not in [200, 201]:
                 raise Exception(f"PowerSchool API error {response.status_code}: {response.text}")
             
@@ -243,46 +310,74 @@ class PowerSchoolSISIntegration:
             }
     
     def get_schools(self) -> List[Dict]:
-        """Get list of schools in the district"""
+        """Get list of schools in the district (cached per credentials, revalidated with ETags)"""
         try:
-            response = self._make_powerschool_request('schools')
-            schools_data = response.json()
-            
-            schools = []
-            for school in schools_data.get('schools', []):
-                schools.append({
-                    'id': school.get('id'),
-                    'name': school.get('name'),
-                    'school_number': school.get('school_number'),
-                    'low_grade': school.get('low_grade', 0),
-                    'high_grade': school.get('high_grade', 12),
-                    'active': school.get('active', True),
-                    'student_count': school.get('enrollment_count', 0)
-                })
-            
-            return schools
+            if self.response_cache is None:
+                return self._fetch_schools().value
+            return self.response_cache.get_or_fetch(
+                self.credential_fingerprint, 'schools', 'schools', None, self._fetch_schools
+            )
             
         except Exception as e:
             logger.error(f"Error fetching PowerSchool schools: {e}")
             raise Exception(f"Failed to fetch schools: {e}")
     
+    def _fetch_schools(self, validators: Dict[str, str] = None) -> UpstreamResponse:
+        response = self._make_powerschool_request('schools', headers=validators or None)
+        if response.status_code == 304:
+            return UpstreamResponse(not_modified=True)
+        schools_data = response.json()
+        
+        schools = []
+        for school in schools_data.get('schools', []):
+            schools.append({
+                'id': school.get('id'),
+                'name': school.get('name'),
+                'school_number': school.get('school_number'),
+                'low_grade': school.get('low_grade', 0),
+                'high_grade': school.get('high_grade', 12),
+                'active': school.get('active', True),
+                'student_count': school.get('enrollment_count', 0)
+            })
+        
+        return UpstreamResponse(schools, etag=response.headers.get('ETag'),
+                                last_modified=response.headers.get('Last-Modified'))
+    
+    def _get_paged(self, endpoint: str, collection_key: str, params: Dict = None):
+        """
+        Yield every record of a paged PowerSchool collection.
+
+        Instances may cap ``pagesize`` below the requested size, so a short page
+        only ends the collection once it is shorter than a page already
+        received; otherwise paging continues until an empty page.
+        """
+        page_size = self.config.page_size
+        served_page_size = 0  # largest page the server has returned
+        page = 1
+        while True:
+            response = self._make_powerschool_request(endpoint, {**(params or {}), 'page': page, 'pagesize': page_size})
+            records = response.json().get(collection_key) or []
+            yield from records
+            if not records or len(records) < served_page_size:
+                return
+            served_page_size = max(served_page_size, len(records))
+            page += 1
+    
+    def _school_students_params(self, school_id: str, grade_levels: List[int] = None) -> Dict:
+        params = {'schoolid': school_id}
+        
+        # Add grade level filter if specified
+        if grade_levels:
+            params['q'] = f"grade_level=in=({','.join(map(str, grade_levels))})"
+        return params
+    
     def get_students_by_school(self, school_id: str, grade_levels: List[int] = None) -> List[PowerSchoolStudent]:
-        """Get students from a specific school, optionally filtered by grade level"""
+        """Get all students from a specific school, optionally filtered by grade level"""
         try:
-            params = {
-                'schoolid': school_id,
-                'pagesize': 500  # PowerSchool default max
-            }
-            
-            # Add grade level filter if specified
-            if grade_levels:
-                params['q'] = f"grade_level=in=({','.join(map(str, grade_levels))})"
-            
-            response = self._make_powerschool_request('students', params)
-            students_data = response.json()
+            params = self._school_students_params(school_id, grade_levels)
             
             students = []
-            for student_data in students_data.get('students', []):
+            for student_data in self._get_paged('students', 'students', params):
                 try:
                     student = self._parse_student_data(student_data)
                     students.append(student)
@@ -337,138 +432,178 @@ class PowerSchoolSISIntegration:
         """Enrich student with demographic data"""
         try:
             response = self._make_powerschool_request(f'students/{student_id}/demographics')
-            demo_data = response.json()
-            
-            student.ethnicity = demo_data.get('ethnicity')
-            student.economic_disadvantaged = demo_data.get('economically_disadvantaged', False)
+            self._apply_demographics(student, response.json())
             
         except Exception as e:
             logger.debug(f"Could not fetch demographics for student {student_id}: {e}")
     
+    def _apply_demographics(self, student: PowerSchoolStudent, demo_data: Dict):
+        student.ethnicity = demo_data.get('ethnicity')
+        student.economic_disadvantaged = demo_data.get('economically_disadvantaged', False)
+    
     def _enrich_student_attendance(self, student: PowerSchoolStudent, student_id: str):
         """Enrich student with attendance data"""
         try:
             # Get current year attendance
-            current_year = datetime.now().year
-            params = {
-                'yearid': current_year,
-                'studentid': student_id
-            }
-            
-            response = self._make_powerschool_request('attendance', params)
-            attendance_data = response.json()
-            
-            total_days = 0
-            absent_days = 0
-            tardy_count = 0
-            
-            for record in attendance_data.get('attendance', []):
-                total_days += 1
-                if record.get('attendance_code') in ['A', 'U']:  # Absent or Unexcused
-                    absent_days += 1
-                if record.get('tardy', False):
-                    tardy_count += 1
-            
-            if total_days > 0:
-                student.attendance_rate = (total_days - absent_days) / total_days
-            student.absences_unexcused = absent_days
-            student.tardies = tardy_count
+            response = self._make_powerschool_request('attendance', self._year_params(student_id))
+            self._apply_attendance(student, response.json())
             
         except Exception as e:
             logger.debug(f"Could not fetch attendance for student {student_id}: {e}")
     
+    def _year_params(self, student_id: str) -> Dict:
+        return {
+            'yearid': datetime.now().year,
+            'studentid': student_id
+        }
+    
+    def _apply_attendance(self, student: PowerSchoolStudent, attendance_data: Dict):
+        total_days = 0
+        absent_days = 0
+        tardy_count = 0
+        
+        for record in attendance_data.get('attendance', []):
+            total_days += 1
+            if record.get('attendance_code') in ['A', 'U']:  # Absent or Unexcused
+                absent_days += 1
+            if record.get('tardy', False):
+                tardy_count += 1
+        
+        if total_days > 0:
+            student.attendance_rate = (total_days - absent_days) / total_days
+        student.absences_unexcused = absent_days
+        student.tardies = tardy_count
+    
     def _enrich_student_grades(self, student: PowerSchoolStudent, student_id: str):
         """Enrich student with grade/GPA data"""
         try:
             response = self._make_powerschool_request(f'students/{student_id}/grades')
-            grades_data = response.json()
-            
-            # Extract GPA information
-            student.gpa_current = float(grades_data.get('gpa_current', 0.0))
-            student.gpa_cumulative = float(grades_data.get('gpa_cumulative', 0.0))
-            
-            # Calculate credits
-            credits_earned = 0.0
-            credits_attempted = 0.0
-            
-            for grade in grades_data.get('grades', []):
-                credit_value = float(grade.get('credit_attempted', 0.0))
-                credits_attempted += credit_value
-                
-                if grade.get('grade_points', 0) > 0:  # Passing grade
-                    credits_earned += credit_value
-            
-            student.credits_earned = credits_earned
-            student.credits_attempted = credits_attempted
+            self._apply_grades(student, response.json())
             
         except Exception as e:
             logger.debug(f"Could not fetch grades for student {student_id}: {e}")
     
+    def _apply_grades(self, student: PowerSchoolStudent, grades_data: Dict):
+        # Extract GPA information
+        student.gpa_current = float(grades_data.get('gpa_current', 0.0))
+        student.gpa_cumulative = float(grades_data.get('gpa_cumulative', 0.0))
+        
+        # Calculate credits
+        credits_earned = 0.0
+        credits_attempted = 0.0
+        
+        for grade in grades_data.get('grades', []):
+            credit_value = float(grade.get('credit_attempted', 0.0))
+            credits_attempted += credit_value
+            
+            if grade.get('grade_points', 0) > 0:  # Passing grade
+                credits_earned += credit_value
+        
+        student.credits_earned = credits_earned
+        student.credits_attempted = credits_attempted
+    
     def _enrich_student_discipline(self, student: PowerSchoolStudent, student_id: str):
         """Enrich student with discipline data"""
         try:
-            current_year = datetime.now().year
-            params = {
-                'yearid': current_year,
-                'studentid': student_id
-            }
-            
-            response = self._make_powerschool_request('discipline', params)
-            discipline_data = response.json()
-            
-            incidents = 0
-            referrals = 0
-            suspensions = 0
-            
-            for record in discipline_data.get('discipline', []):
-                incidents += 1
-                if record.get('type') == 'referral':
-                    referrals += 1
-                elif record.get('type') in ['suspension', 'oss', 'iss']:
-                    suspensions += 1
-            
-            student.discipline_incidents = incidents
-            student.office_referrals = referrals
-            student.suspensions = suspensions
+            response = self._make_powerschool_request('discipline', self._year_params(student_id))
+            self._apply_discipline(student, response.json())
             
         except Exception as e:
             logger.debug(f"Could not fetch discipline for student {student_id}: {e}")
     
+    def _apply_discipline(self, student: PowerSchoolStudent, discipline_data: Dict):
+        incidents = 0
+        referrals = 0
+        suspensions = 0
+        
+        for record in discipline_data.get('discipline', []):
+            incidents += 1
+            if record.get('type') == 'referral':
+                referrals += 1
+            elif record.get('type') in ['suspension', 'oss', 'iss']:
+                suspensions += 1
+        
+        student.discipline_incidents = incidents
+        student.office_referrals = referrals
+        student.suspensions = suspensions
+    
     def _enrich_student_special_programs(self, student: PowerSchoolStudent, student_id: str):
         """Enrich student with special program data"""
         try:
             response = self._make_powerschool_request(f'students/{student_id}/special_programs')
-            programs_data = response.json()
-            
-            for program in programs_data.get('programs', []):
-                program_code = program.get('program_code', '').upper()
-                
-                if 'IEP' in program_code or 'SPED' in program_code:
-                    student.iep_status = True
-                elif '504' in program_code:
-                    student.section_504 = True
-                elif 'ELL' in program_code or 'ESL' in program_code:
-                    student.ell_status = True
-                elif 'GIFT' in program_code or 'TAG' in program_code:
-                    student.gifted_status = True
+            self._apply_special_programs(student, response.json())
             
         except Exception as e:
             logger.debug(f"Could not fetch special programs for student {student_id}: {e}")
     
-    def create_enhanced_gradebook(self, school_id: str, grade_levels: List[int] = None) -> pd.DataFrame:
-        """Create comprehensive gradebook with PowerSchool data"""
+    def _apply_special_programs(self, student: PowerSchoolStudent, programs_data: Dict):
+        for program in programs_data.get('programs', []):
+            program_code = program.get('program_code', '').upper()
+            
+            if 'IEP' in program_code or 'SPED' in program_code:
+                student.iep_status = True
+            elif '504' in program_code:
+                student.section_504 = True
+            elif 'ELL' in program_code or 'ESL' in program_code:
+                student.ell_status = True
+            elif 'GIFT' in program_code or 'TAG' in program_code:
+                student.gifted_status = True
+    
+    def _enrichment_requests(self, student_id: str) -> List[Tuple[str, str, Optional[Dict], Any]]:
+        """(facet, endpoint, params, apply function) for each enrichment call of a student"""
+        return [
+            ('demographics', f'students/{student_id}/demographics', None, self._apply_demographics),
+            ('attendance', 'attendance', self._year_params(student_id), self._apply_attendance),
+            ('grades', f'students/{student_id}/grades', None, self._apply_grades),
+            ('discipline', 'discipline', self._year_params(student_id), self._apply_discipline),
+            ('special_programs', f'students/{student_id}/special_programs', None, self._apply_special_programs),
+        ]
+    
+    def create_enhanced_gradebook(self, school_id: str, grade_levels: List[int] = None,
+                                  bulk: Optional[bool] = None) -> pd.DataFrame:
+        """
+        Create comprehensive gradebook with PowerSchool data.
+        
+        Bulk mode (the default, see ``PowerSchoolConfig.bulk_sync``) costs O(pages)
+        requests; if the school-wide collections are unavailable it falls back to
+        concurrent per-student enrichment.
+        """
+        self.last_sync_report = None
+        if self.config.bulk_sync if bulk is None else bulk:
+            try:
+                try:
+                    from .powerschool_bulk import PowerSchoolBulkSync
+                except ImportError:
+                    from integrations.powerschool_bulk import PowerSchoolBulkSync
+                gradebook, self.last_sync_report = PowerSchoolBulkSync(self).build_gradebook(school_id, grade_levels)
+                return gradebook
+            except Exception as e:
+                logger.warning(f"PowerSchool bulk sync unavailable for school {school_id}, "
+                               f"falling back to per-student sync: {e}")
+        
         try:
+
             # Get students from PowerSchool
             students = self.get_students_by_school(school_id, grade_levels)
             
             if not students:
                 return pd.DataFrame()
             
+            # Fetch comprehensive data for all students concurrently
+            try:
+                from .powerschool_sync import PowerSchoolSyncEngine
+            except ImportError:
+                from integrations.powerschool_sync import PowerSchoolSyncEngine
+            comprehensive_students, self.last_sync_report = PowerSchoolSyncEngine(self).run(
+                [student.id for student in students]
+            )
+            
             gradebook_data = []
             for student in students:
                 try:
-                    # Get comprehensive data for each student
-                    comprehensive_student = self.get_student_comprehensive_data(student.id)
+                    comprehensive_student = comprehensive_students.get(student.id)
+                    if comprehensive_student is None:
+                        continue
                     
                     # Convert to our standard format
                     student_record = {
@@ -532,43 +667,40 @@ class PowerSchoolSISIntegration:
             logger.error(f"Error creating enhanced gradebook: {e}")
             raise Exception(f"Failed to create gradebook for school {school_id}: {e}")
     
-    def sync_school_data(self, school_id: str, grade_levels: List[int] = None) -> Dict[str, Any]:
-        """Sync school data and return enhanced prediction results"""
+    def sync_school_data(self, school_id: str, grade_levels: List[int] = None,
+                         incremental: Optional[bool] = None, state_store=None,
+                         force_full: bool = False) -> Dict[str, Any]:
+        """
+        Sync school data and return enhanced prediction results.
+        
+        In incremental mode (``PowerSchoolConfig.incremental_sync``) only students
+        whose records changed since the stored high-water mark are refetched and
+        re-scored; the rest come from the persisted gradebook snapshot.
+        """
         try:
+            if self.config.incremental_sync if incremental is None else incremental:
+                try:
+                    return self._sync_school_incremental(school_id, grade_levels, state_store, force_full)
+                except Exception as e:
+                    logger.warning(f"PowerSchool incremental sync failed for school {school_id}, "
+                                   f"running full sync: {e}")
+            
             # Get comprehensive gradebook data
             gradebook_df = self.create_enhanced_gradebook(school_id, grade_levels)
             
+            sync_report = self.last_sync_report.to_dict() if self.last_sync_report else None
+            
             if gradebook_df.empty:
                 return {
                     'status': 'warning',
                     'message': 'No student data found in school',
                     'students_processed': 0,
-                    'predictions': []
+                    'predictions': [],
+                    'sync_report': sync_report
                 }
             
-            # Generate predictions using K-12 ultra model with enhanced data
-            from models.k12_ultra_predictor import K12UltraPredictor
-            predictor = K12UltraPredictor()
-            predictions = predictor.predict_from_gradebook(gradebook_df)
-            
-            # Enhance predictions with PowerSchool-specific insights
-            for prediction in predictions:
-                self._enhance_prediction_with_sis_data(prediction, gradebook_df)
-            
-            return {
-                'status': 'success',
-                'school_id': school_id,
-                'students_processed': len(gradebook_df),
-                'predictions': predictions,
-                'sync_timestamp': datetime.now().isoformat(),
-                'data_source': 'powerschool_sis',
-                'data_quality': {
-                    'has_attendance': gradebook_df['attendance_rate'].notna().sum(),
-                    'has_discipline': gradebook_df['discipline_incidents'].notna().sum(),
-                    'has_demographics': gradebook_df['economic_disadvantaged'].notna().sum(),
-                    'has_special_programs': (gradebook_df[['iep_status', 'section_504', 'ell_status']].any(axis=1)).sum()
-                }
-            }
+            predictions = self._score_gradebook(gradebook_df)
+            return self._school_sync_result(school_id, gradebook_df, predictions, sync_report)
             
         except Exception as e:
             logger.error(f"Error syncing school data: {e}")
@@ -578,6 +710,123 @@ class PowerSchoolSISIntegration:
                 'school_id': school_id
             }
     
+    def _get_predictor(self):
+        """K-12 model used for scoring (loaded on first use unless one was injected)"""
+        if self.predictor is None:
+            try:
+                from models.k12_ultra_predictor import K12UltraPredictor
+            except ImportError:
+                from src.models.k12_ultra_predictor import K12UltraPredictor
+            self.predictor = K12UltraPredictor()
+        return self.predictor
+    
+    def _report_progress(self, stage: str, count: int):
+        if self.progress_callback is not None:
+            self.progress_callback(stage, count)
+    
+    def _score_gradebook(self, gradebook_df: pd.DataFrame) -> List[Dict]:
+        """Predict risk for gradebook rows and add PowerSchool-specific insights"""
+        self._report_progress('fetched', len(gradebook_df))
+        # Generate predictions using K-12 ultra model with enhanced data
+        predictions = self._get_predictor().predict_batch(gradebook_df)
+        
+        # Enhance predictions with PowerSchool-specific insights
+        for prediction in predictions:
+            self._enhance_prediction_with_sis_data(prediction, gradebook_df)
+        self._report_progress('scored', len(predictions))
+        return predictions
+    
+    def _school_sync_result(self, school_id: str, gradebook_df: pd.DataFrame, predictions: List[Dict],
+                            sync_report: Optional[Dict]) -> Dict[str, Any]:
+        return {
+            'status': 'success',
+            'school_id': school_id,
+            'students_processed': len(gradebook_df),
+            'predictions': predictions,
+            'sync_timestamp': datetime.now().isoformat(),
+            'data_source': 'powerschool_sis',
+            'sync_report': sync_report,
+            'data_quality': {
+                'has_attendance': gradebook_df['attendance_rate'].notna().sum(),
+                'has_discipline': gradebook_df['discipline_incidents'].notna().sum(),
+                'has_demographics': gradebook_df['economic_disadvantaged'].notna().sum(),
+                'has_special_programs': (gradebook_df[['iep_status', 'section_504', 'ell_status']].any(axis=1)).sum()
+            }
+        }
+    
+    def _sync_school_incremental(self, school_id: str, grade_levels: Optional[List[int]],
+                                 state_store, force_full: bool) -> Dict[str, Any]:
+        """Delta sync: roster fingerprints plus whenmodified filters on the bulk collections"""
+        try:
+            from .powerschool_bulk import PowerSchoolBulkSync
+            from .sync_state import IncrementalSync, DeltaChanges, record_fingerprint
+        except ImportError:
+            from integrations.powerschool_bulk import PowerSchoolBulkSync
+            from integrations.sync_state import IncrementalSync, DeltaChanges, record_fingerprint
+        try:
+            from models.k12_ultra_predictor import gradebook_feature_hashes
+        except ImportError:
+            from src.models.k12_ultra_predictor import gradebook_feature_hashes
+        
+        bulk = PowerSchoolBulkSync(self)
+        scope_id = str(school_id)
+        if grade_levels:
+            scope_id += f":grades={','.join(map(str, sorted(grade_levels)))}"
+        sync = IncrementalSync('powerschool', scope_id, store=state_store, tenant=self.credential_fingerprint)
+        requests_before = self.requests_this_hour
+        roster_cache = {}
+        
+        def load_roster() -> Dict[str, str]:
+            roster_cache['records'] = bulk.fetch_roster(school_id, grade_levels)
+            fingerprints = {str(record.get('id')): record_fingerprint(record) for record in roster_cache['records']}
+            sync.record_fingerprints(fingerprints)
+            return fingerprints
+        
+        def fetch_full() -> pd.DataFrame:
+            load_roster()
+            gradebook, self.last_sync_report = bulk.build_gradebook(
+                school_id, grade_levels, roster=roster_cache['records']
+            )
+            return gradebook
+        
+        def fetch_changes(state) -> DeltaChanges:
+            fingerprints = load_roster()
+            changed = {sid for sid, fingerprint in fingerprints.items() if state.fingerprint(sid) != fingerprint}
+            changed |= bulk.changed_student_ids(school_id, state.high_water_mark) & set(fingerprints)
+            return DeltaChanges(changed_ids=changed, removed_ids=set(state.snapshot) - set(fingerprints))
+        
+        def fetch_rows(student_ids) -> pd.DataFrame:
+            gradebook, self.last_sync_report = bulk.build_gradebook(
+                school_id, grade_levels, roster=roster_cache['records'], student_ids=student_ids
+            )
+            return gradebook
+        
+        self.last_sync_report = None
+        # SIS annotations read these columns too, so they count as inputs for change detection
+        model_version = getattr(self._get_predictor(), 'model_version', None)
+        result = sync.run(fetch_full, fetch_changes, fetch_rows, self._score_gradebook, force_full=force_full,
+                          feature_hash=lambda rows: gradebook_feature_hashes(rows, SIS_INSIGHT_COLUMNS,
+                                                                             model_version=model_version),
+                          model_version=model_version)
+        delta = result.summary()
+        delta['requests_made'] = self.requests_this_hour - requests_before
+        sync_report = self.last_sync_report.to_dict() if self.last_sync_report else None
+        
+        gradebook_df = result.gradebook
+        if gradebook_df.empty:
+            return {
+                'status': 'warning',
+                'message': 'No student data found in school',
+                'students_processed': 0,
+                'predictions': [],
+                'sync_report': sync_report,
+                'delta': delta
+            }
+        
+        response = self._school_sync_result(school_id, gradebook_df, result.predictions, sync_report)
+        response['delta'] = delta
+        return response
+    
     def _enhance_prediction_with_sis_data(self, prediction: Dict, gradebook_df: pd.DataFrame):
         """Enhance prediction with PowerSchool-specific insights"""
         student_id = prediction.get('student_id')
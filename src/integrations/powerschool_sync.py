@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Concurrent PowerSchool School Sync
+
+Fetches comprehensive data (base record plus five enrichment facets) for many
+students with a bounded pool of async workers. Requests share the
+integration's token bucket, so the sync is paced to ``rate_limit_per_hour``
+and 429 responses are waited out instead of aborting the run. Per-student
+failures are collected in a SyncReport rather than failing the whole school.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Any, Tuple
+
+import aiohttp
+
+try:
+    from .powerschool_sis import PowerSchoolSISIntegration, PowerSchoolStudent
+except ImportError:
+    from integrations.powerschool_sis import PowerSchoolSISIntegration, PowerSchoolStudent
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PowerSchoolRequestError(Exception):
+    """A PowerSchool request failed after retries"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class SyncReport:
+    """Outcome of a school sync run"""
+    mode: str = 'per_student'
+    requested: int = 0
+    succeeded: int = 0
+    failed: Dict[str, str] = field(default_factory=dict)
+    partial: Dict[str, List[str]] = field(default_factory=dict)  # student -> enrichment facets missing
+    requests_made: int = 0
+    retries: int = 0
+    rate_limit_wait_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+    workers: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['rate_limit_wait_seconds'] = round(self.rate_limit_wait_seconds, 3)
+        data['elapsed_seconds'] = round(self.elapsed_seconds, 3)
+        return data
+
+
+def run_coroutine_sync(coro):
+    """Run a coroutine to completion from sync code, even inside a running event loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Called from an async endpoint: run on a private loop in a worker thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+class PowerSchoolSyncEngine:
+    """Bounded-concurrency fan-out of per-student PowerSchool requests"""
+
+    def __init__(self, integration: PowerSchoolSISIntegration, max_workers: Optional[int] = None):
+        """
+        Initialize sync engine.
+
+        Args:
+            integration: Configured PowerSchool integration (auth, rate limiter, parsers)
+            max_workers: Students fetched concurrently (defaults to config / POWERSCHOOL_SYNC_WORKERS)
+        """
+        self.integration = integration
+        self.config = integration.config
+        self.max_workers = max(1, max_workers or int(
+            os.getenv('POWERSCHOOL_SYNC_WORKERS', self.config.max_concurrent_students)
+        ))
+        self._auth_lock: Optional[asyncio.Lock] = None
+        self._report = SyncReport()
+
+    def run(self, student_ids: List[str]) -> Tuple[Dict[str, PowerSchoolStudent], SyncReport]:
+        """Synchronous entry point for fetch_students"""
+        return run_coroutine_sync(self.fetch_students(student_ids))
+
+    async def fetch_students(self, student_ids: List[str]) -> Tuple[Dict[str, PowerSchoolStudent], SyncReport]:
+        """
+        Fetch comprehensive data for many students concurrently.
+
+        Args:
+            student_ids: PowerSchool student IDs
+
+        Returns:
+            (students keyed by ID, sync report); failed students are absent from the dict
+        """
+        started = time.perf_counter()
+        self._report = report = SyncReport(requested=len(student_ids),
+                                           workers=min(self.max_workers, len(student_ids)))
+        self._auth_lock = asyncio.Lock()
+        results: Dict[str, PowerSchoolStudent] = {}
+
+        if not student_ids:
+            return results, report
+
+        if not await asyncio.to_thread(self.integration._authenticate):
+            report.failed = {str(sid): "PowerSchool authentication failed" for sid in student_ids}
+            report.elapsed_seconds = time.perf_counter() - started
+            return results, report
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for student_id in student_ids:
+            queue.put_nowait(str(student_id))
+
+        # Every worker may have all of a student's requests in flight at once
+        facets_per_student = 1 + len(self.integration._enrichment_requests(''))
+        connector = aiohttp.TCPConnector(limit=self.max_workers * facets_per_student)
+        timeout = aiohttp.ClientTimeout(total=self.config.timeout_seconds)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            async def worker():
+                while True:
+                    try:
+                        student_id = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    try:
+                        results[student_id] = await self._fetch_student(session, student_id)
+                        report.succeeded += 1
+                    except Exception as e:
+                        report.failed[student_id] = str(e)
+                        logger.warning(f"PowerSchool sync failed for student {student_id}: {e}")
+
+            await asyncio.gather(*(worker() for _ in range(report.workers)))
+
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(f"PowerSchool concurrent sync: {report.succeeded}/{report.requested} students, "
+                    f"{report.requests_made} requests in {report.elapsed_seconds:.2f}s "
+                    f"with {report.workers} workers")
+        return results, report
+
+    async def _fetch_student(self, session: aiohttp.ClientSession, student_id: str) -> PowerSchoolStudent:
+        """Fetch the base record and all enrichment facets of one student in parallel"""
+        enrichments = self.integration._enrichment_requests(student_id)
+        responses = await asyncio.gather(
+            self._get_json(session, f'students/{student_id}'),
+            *(self._get_json(session, endpoint, params) for _, endpoint, params, _ in enrichments),
+            return_exceptions=True
+        )
+
+        base = responses[0]
+        if isinstance(base, Exception):
+            raise base
+        student = self.integration._parse_student_data(base)
+
+        for (facet, _, _, apply), data in zip(enrichments, responses[1:]):
+            if isinstance(data, Exception):
+                # Enrichment is best-effort, matching the sequential client
+                self._report.partial.setdefault(student_id, []).append(facet)
+                logger.debug(f"Could not fetch {facet} for student {student_id}: {data}")
+                continue
+            apply(student, data)
+        return student
+
+    async def _get_json(self, session: aiohttp.ClientSession, endpoint: str,
+                        params: Optional[Dict] = None) -> Dict:
+        """GET a PowerSchool endpoint with pacing, 429/5xx retries and one re-auth on 401"""
+        url = f"{self.config.base_url.rstrip('/')}/ws/v1/{endpoint.lstrip('/')}"
+        reauthenticated = False
+        attempt = 0
+
+        while True:
+            self._report.rate_limit_wait_seconds += await self.integration.rate_limiter.acquire_async()
+            token = self.integration.access_token
+            headers = {'Authorization': f'Bearer {token}', 'Accept': 'application/json'}
+
+            try:
+                async with session.get(url, params=params or {}, headers=headers) as response:
+                    self._report.requests_made += 1
+                    self.integration.requests_this_hour += 1
+
+                    if response.status in (200, 201):
+                        return await response.json(content_type=None)
+                    if response.status == 401 and not reauthenticated:
+                        reauthenticated = True
+                        await self._reauthenticate(token)
+                        continue
+                    if response.status in RETRYABLE_STATUSES and attempt < self.config.max_retries:
+                        delay = self.integration._retry_after_seconds(response.headers.get('Retry-After'), attempt)
+                        if response.status == 429:
+                            # Slow down every worker, not just this one
+                            self.integration.rate_limiter.penalize(delay)
+                        else:
+                            await asyncio.sleep(delay)
+                        attempt += 1
+                        self._report.retries += 1
+                        continue
+                    raise PowerSchoolRequestError(
+                        f"PowerSchool API error {response.status} for {endpoint}", response.status
+                    )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.config.max_retries:
+                    raise PowerSchoolRequestError(f"PowerSchool request failed for {endpoint}: {e}")
+                attempt += 1
+                self._report.retries += 1
+                await asyncio.sleep(2 ** (attempt - 1))
+
+    async def _reauthenticate(self, stale_token: Optional[str]) -> None:
+        """Refresh the token once even when many workers see 401 together"""
+        async with self._auth_lock:
+            if self.integration.access_token != stale_token:
+                return
+            self.integration._invalidate_token(stale_token)
+            if not await asyncio.to_thread(self.integration._authenticate):
+                raise PowerSchoolRequestError("PowerSchool authentication failed after retry", 401)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Rate Limiting for External API Integrations
+
+Token-bucket limiter shared by the synchronous (requests) and asynchronous
+(aiohttp) clients of an integration, so callers are paced to the provider's
+quota instead of failing once it is exhausted.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket that paces callers rather than rejecting them"""
+
+    def __init__(self, rate_per_second: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize token bucket.
+
+        Args:
+            rate_per_second: Sustained refill rate
+            capacity: Maximum burst size (defaults to one second of tokens, at least 1)
+            clock: Monotonic time source, injectable for tests
+        """
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second must be positive")
+        self.rate = float(rate_per_second)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.total_wait_seconds = 0.0
+
+    @classmethod
+    def per_hour(cls, requests_per_hour: int, burst: Optional[int] = None) -> "TokenBucket":
+        """Bucket for an hourly quota; bursts up to one minute's worth by default"""
+        return cls(requests_per_hour / 3600.0, capacity=burst or max(1, requests_per_hour // 60))
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        """Tokens currently available (negative while callers are queued)"""
+        with self._lock:
+            self._refill(self._clock())
+            return self._tokens
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens now, going into debt if needed.
+
+        Returns:
+            Seconds the caller must wait before using the reservation
+        """
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            wait = -self._tokens / self.rate
+            self.total_wait_seconds += wait
+            return wait
+
+    def penalize(self, seconds: float) -> None:
+        """Hold back all callers for ``seconds`` (e.g. after a 429 Retry-After)"""
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until tokens are available; returns seconds waited"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """Await until tokens are available; returns seconds waited"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
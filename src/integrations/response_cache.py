@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Integration Response Cache
+
+Caches slow-changing integration reads (course and school lists) keyed on
+(credential fingerprint, endpoint, params). Each resource type has a fresh
+TTL and a longer stale window: fresh entries are served directly, stale ones
+are served immediately while a background refresh revalidates them, and
+expired ones are refetched inline. Refreshes send the stored ETag /
+Last-Modified as If-None-Match / If-Modified-Since so an unchanged upstream
+answers 304 without a body. Callers get a copy of the cached value, so they
+can never change what other callers are served.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CacheTTL:
+    """Seconds an entry is fresh, then servable while a refresh runs"""
+    fresh_seconds: float
+    stale_seconds: float
+
+
+# Course and school lists change rarely; matches are derived from both
+RESOURCE_TTLS = {
+    'courses': CacheTTL(fresh_seconds=300, stale_seconds=3600),
+    'schools': CacheTTL(fresh_seconds=3600, stale_seconds=86400),
+}
+DEFAULT_TTL = CacheTTL(fresh_seconds=60, stale_seconds=600)
+
+
+@dataclass
+class UpstreamResponse:
+    """Result of a (conditional) upstream fetch"""
+    value: Any = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = False  # upstream answered 304
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh_until: float
+    stale_until: float
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def credential_fingerprint(*parts: Optional[str]) -> str:
+    """Stable, non-reversible key for a set of credentials (never store the secrets themselves)"""
+    return hashlib.sha256('\x1f'.join(str(part or '') for part in parts).encode()).hexdigest()[:32]
+
+
+class IntegrationResponseCache:
+    """In-memory LRU cache with per-resource TTLs and stale-while-revalidate"""
+
+    def __init__(self, max_entries: int = 1000, ttls: Optional[Dict[str, CacheTTL]] = None,
+                 clock: Callable[[], float] = time.monotonic, refresh_workers: int = 2):
+        """
+        Initialize cache.
+
+        Args:
+            max_entries: Entries kept before least-recently-used eviction
+            ttls: Per-resource TTLs (defaults to RESOURCE_TTLS)
+            clock: Monotonic time source, injectable for tests
+            refresh_workers: Threads running background revalidation
+        """
+        self.max_entries = max_entries
+        self.ttls = {**RESOURCE_TTLS, **(ttls or {})}
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str, str], _CacheEntry]" = OrderedDict()
+        self._refreshing: Dict[Tuple[str, str, str], Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='integration-cache')
+        self.stats = {
+            'hits': 0, 'stale_hits': 0, 'misses': 0, 'upstream_fetches': 0,
+            'not_modified': 0, 'refresh_errors': 0, 'evictions': 0
+        }
+
+    @staticmethod
+    def _key(fingerprint: str, endpoint: str, params: Optional[Dict]) -> Tuple[str, str, str]:
+        return fingerprint, endpoint, json.dumps(params or {}, sort_keys=True, default=str)
+
+    def get_or_fetch(self, fingerprint: str, resource: str, endpoint: str, params: Optional[Dict],
+                     fetch: Callable[[Dict[str, str]], UpstreamResponse]) -> Any:
+        """
+        Return the cached value, refreshing it as its TTL requires.
+
+        Args:
+            fingerprint: credential_fingerprint of the caller's credentials
+            resource: TTL class ('courses', 'schools', ...)
+            endpoint: Upstream endpoint, part of the key
+            params: Request params, part of the key
+            fetch: Calls upstream with conditional headers ({} when nothing is cached)
+
+        Returns:
+            A deep copy of the cached value
+        """
+        key = self._key(fingerprint, endpoint, params)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.stale_until:
+                self._entries.move_to_end(key)
+                if now < entry.fresh_until:
+                    self.stats['hits'] += 1
+                    return copy.deepcopy(entry.value)
+                self.stats['stale_hits'] += 1
+                if key not in self._refreshing:
+                    self._refreshing[key] = self._executor.submit(self._background_refresh, key, resource, fetch)
+                return copy.deepcopy(entry.value)
+            self.stats['misses'] += 1
+
+        # Missing or past its stale window: the caller waits for upstream
+        return copy.deepcopy(self._refresh(key, resource, fetch, entry))
+
+    def _refresh(self, key: Tuple[str, str, str], resource: str,
+                 fetch: Callable[[Dict[str, str]], UpstreamResponse], entry: Optional[_CacheEntry]) -> Any:
+        upstream = fetch(entry.validators() if entry is not None else {})
+        ttl = self.ttls.get(resource, DEFAULT_TTL)
+        now = self._clock()
+        with self._lock:
+            self.stats['upstream_fetches'] += 1
+            if upstream.not_modified and entry is not None:
+                self.stats['not_modified'] += 1
+                value, etag, last_modified = entry.value, entry.etag, entry.last_modified
+            else:
+                value, etag, last_modified = upstream.value, upstream.etag, upstream.last_modified
+            self._entries[key] = _CacheEntry(value, etag, last_modified,
+                                             now + ttl.fresh_seconds, now + ttl.fresh_seconds + ttl.stale_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        return value
+
+    def _background_refresh(self, key: Tuple[str, str, str], resource: str,
+                            fetch: Callable[[Dict[str, str]], UpstreamResponse]) -> None:
+        try:
+            with self._lock:
+                entry = self._entries.get(key)
+            self._refresh(key, resource, fetch, entry)
+        except Exception as e:
+            # Keep serving the stale value; the next stale hit retries
+            with self._lock:
+                self.stats['refresh_errors'] += 1
+            logger.warning(f"Background refresh of {key[1]} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def wait_for_refreshes(self, timeout: Optional[float] = None) -> None:
+        """Block until in-flight background refreshes finish"""
+        with self._lock:
+            pending = list(self._refreshing.values())
+        for future in pending:
+            future.result(timeout=timeout)
+
+    def invalidate(self, fingerprint: Optional[str] = None, endpoint: Optional[str] = None) -> int:
+        """Drop entries for a credential and/or endpoint (everything when both are None)"""
+        with self._lock:
+            keys = [key for key in self._entries
+                    if (fingerprint is None or key[0] == fingerprint) and (endpoint is None or key[1] == endpoint)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['stale_hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'refreshing': len(self._refreshing),
+                'hit_rate': round((self.stats['hits'] + self.stats['stale_hits']) / lookups, 4) if lookups else 0.0
+            }
+
+
+_response_cache: Optional[IntegrationResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[IntegrationResponseCache]:
+    """Process-wide cache shared by all integration instances (None when INTEGRATION_RESPONSE_CACHE=false)"""
+    global _response_cache
+    if os.getenv('INTEGRATION_RESPONSE_CACHE', 'true').lower() in ('false', '0', 'no'):
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = IntegrationResponseCache(
+                max_entries=int(os.getenv('INTEGRATION_RESPONSE_CACHE_SIZE', '1000'))
+            )
+        return _response_cache
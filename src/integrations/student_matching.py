@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Canvas ↔ PowerSchool Student Matching
+
+Matches Canvas gradebook rows to PowerSchool students in three passes:
+
+1. ID hash-join: Canvas ``sis_user_id`` against PowerSchool ``student_id``,
+   ``state_id`` and ``local_id`` via pandas merges.
+2. Name Jaccard: word-set similarity, scored only for pairs that share a name
+   token (pairs without one score 0, so blocking on tokens loses nothing).
+3. Fuzzy names: for students still unmatched, a character-level ratio inside
+   blocks of identical initials, catching typos the word sets miss.
+
+Each match carries its method and confidence, and a MatchReport records
+candidate-pair counts and throughput.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, asdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ID_FIELDS = ['student_id', 'state_id', 'local_id']
+MATCH_COLUMNS = ['canvas_pos', 'ps_pos', 'match_method', 'match_field', 'match_confidence']
+
+
+@dataclass
+class MatchReport:
+    """Outcome and cost of one matching run"""
+    canvas_students: int = 0
+    powerschool_students: int = 0
+    id_matches: int = 0
+    name_matches: int = 0
+    fuzzy_matches: int = 0
+    unmatched: int = 0
+    candidate_pairs: int = 0  # name pairs scored after blocking (brute force: canvas × PowerSchool)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def matched(self) -> int:
+        return self.id_matches + self.name_matches + self.fuzzy_matches
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['matched'] = self.matched
+        data['match_rate'] = round(self.matched / self.canvas_students, 4) if self.canvas_students else 0.0
+        data['elapsed_seconds'] = round(self.elapsed_seconds, 4)
+        data['students_per_second'] = (
+            round(self.canvas_students / self.elapsed_seconds, 1) if self.elapsed_seconds > 0 else None
+        )
+        return data
+
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    return df[name] if name in df.columns else pd.Series('', index=df.index)
+
+
+def _normalize_names(names: pd.Series) -> pd.Series:
+    """Lower-cased, stripped names indexed by row position"""
+    return names.fillna('').astype(str).str.lower().str.strip().reset_index(drop=True)
+
+
+def _token_frame(names: pd.Series, position: str) -> pd.DataFrame:
+    """One row per (position, distinct name token)"""
+    tokens = names.str.split().apply(lambda words: sorted(set(words)))
+    frame = pd.DataFrame({position: range(len(names)), 'token': tokens.to_numpy(),
+                          'token_count': tokens.str.len().to_numpy()})
+    return frame.explode('token').dropna(subset=['token'])
+
+
+def _initials(names: pd.Series) -> pd.Series:
+    words = names.str.split()
+    return words.str[0].str[0].fillna('') + words.str[-1].str[0].fillna('')
+
+
+class StudentMatcher:
+    """Hash-indexed, blocked matching of Canvas rows to PowerSchool rows"""
+
+    def __init__(self, name_threshold: float = 0.6, fuzzy_threshold: float = 0.9,
+                 name_fallback_below: float = 0.5):
+        """
+        Initialize matcher.
+
+        Args:
+            name_threshold: Minimum word Jaccard for a name match (exclusive)
+            fuzzy_threshold: Minimum character ratio for a fuzzy match (inclusive); 0 disables the pass
+            name_fallback_below: Run name passes only while the ID match rate is below this
+        """
+        self.name_threshold = name_threshold
+        self.fuzzy_threshold = fuzzy_threshold
+        self.name_fallback_below = name_fallback_below
+
+    def match(self, canvas_df: pd.DataFrame, ps_df: pd.DataFrame) -> Tuple[pd.DataFrame, MatchReport]:
+        """
+        Match students.
+
+        Returns:
+            (one row per matched Canvas student with canvas_pos / ps_pos row positions,
+            match_method, match_field and match_confidence; report)
+        """
+        started = time.perf_counter()
+        report = MatchReport(canvas_students=len(canvas_df), powerschool_students=len(ps_df))
+        matches = [self._match_ids(canvas_df, ps_df)]
+        report.id_matches = len(matches[0])
+
+        if report.id_matches < len(canvas_df) * self.name_fallback_below:
+            canvas_names = _normalize_names(_column(canvas_df, 'name'))
+            ps_names = _normalize_names(
+                _column(ps_df, 'first_name').fillna('').astype(str) + ' ' +
+                _column(ps_df, 'last_name').fillna('').astype(str)
+            )
+
+            remaining = canvas_names.index.difference(matches[0]['canvas_pos'])
+            name_matches, pairs = self._match_names(canvas_names, ps_names, remaining)
+            matches.append(name_matches)
+            report.name_matches = len(name_matches)
+            report.candidate_pairs += pairs
+
+            if self.fuzzy_threshold:
+                remaining = remaining.difference(name_matches['canvas_pos'])
+                fuzzy_matches, pairs = self._match_fuzzy(canvas_names, ps_names, remaining)
+                matches.append(fuzzy_matches)
+                report.fuzzy_matches = len(fuzzy_matches)
+                report.candidate_pairs += pairs
+
+        result = pd.concat(matches, ignore_index=True).sort_values('canvas_pos', kind='stable')
+        report.unmatched = report.canvas_students - len(result)
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(f"Student matching: {report.matched}/{report.canvas_students} matched "
+                    f"({report.id_matches} by ID, {report.name_matches} by name, {report.fuzzy_matches} fuzzy), "
+                    f"{report.candidate_pairs} name pairs scored in {report.elapsed_seconds:.3f}s")
+        return result.reset_index(drop=True), report
+
+    @staticmethod
+    def _match_ids(canvas_df: pd.DataFrame, ps_df: pd.DataFrame) -> pd.DataFrame:
+        if 'sis_user_id' not in canvas_df.columns:
+            return pd.DataFrame(columns=MATCH_COLUMNS)
+
+        sis = canvas_df['sis_user_id']
+        canvas_keys = pd.DataFrame({'canvas_pos': range(len(canvas_df)), 'key': sis.astype(str).to_numpy()})
+        canvas_keys = canvas_keys[sis.notna().to_numpy() & (canvas_keys['key'] != '')]
+
+        candidates = []
+        for field in ID_FIELDS:
+            if field not in ps_df.columns:
+                continue
+            ps_keys = pd.DataFrame({'ps_pos': range(len(ps_df)), 'key': ps_df[field].astype(str).to_numpy()})
+            ps_keys = ps_keys[ps_df[field].notna().to_numpy() & (ps_keys['key'] != '')]
+            joined = canvas_keys.merge(ps_keys, on='key')
+            joined['match_field'] = field
+            candidates.append(joined)
+
+        if not candidates:
+            return pd.DataFrame(columns=MATCH_COLUMNS)
+        # First PowerSchool row matching any ID field wins, as with a row filter followed by iloc[0]
+        pairs = pd.concat(candidates, ignore_index=True).sort_values(['canvas_pos', 'ps_pos'], kind='stable')
+        pairs = pairs.drop_duplicates('canvas_pos')
+        pairs['match_method'] = 'id'
+        pairs['match_confidence'] = 1.0
+        return pairs[MATCH_COLUMNS]
+
+    def _match_names(self, canvas_names: pd.Series, ps_names: pd.Series,
+                     remaining: pd.Index) -> Tuple[pd.DataFrame, int]:
+        canvas_tokens = _token_frame(canvas_names, 'canvas_pos')
+        canvas_tokens = canvas_tokens[canvas_tokens['canvas_pos'].isin(remaining)]
+        ps_tokens = _token_frame(ps_names, 'ps_pos')
+
+        # Token blocks: only pairs sharing at least one word are scored
+        shared = canvas_tokens.merge(ps_tokens, on='token', suffixes=('_canvas', '_ps'))
+        if shared.empty:
+            return pd.DataFrame(columns=MATCH_COLUMNS), 0
+        pairs = shared.groupby(['canvas_pos', 'ps_pos']).agg(
+            shared=('token', 'size'), canvas_count=('token_count_canvas', 'first'), ps_count=('token_count_ps', 'first')
+        ).reset_index()
+        pairs['match_confidence'] = pairs['shared'] / (pairs['canvas_count'] + pairs['ps_count'] - pairs['shared'])
+
+        best = pairs[pairs['match_confidence'] > self.name_threshold]
+        # Highest score per Canvas student; the earliest PowerSchool row wins ties
+        best = best.sort_values(['canvas_pos', 'match_confidence', 'ps_pos'], ascending=[True, False, True])
+        best = best.drop_duplicates('canvas_pos').assign(match_method='name', match_field='name')
+        return best[MATCH_COLUMNS], len(pairs)
+
+    def _match_fuzzy(self, canvas_names: pd.Series, ps_names: pd.Series,
+                     remaining: pd.Index) -> Tuple[pd.DataFrame, int]:
+        canvas_blocks = pd.DataFrame({'canvas_pos': remaining, 'block': _initials(canvas_names.loc[remaining]).to_numpy()})
+        ps_blocks = pd.DataFrame({'ps_pos': range(len(ps_names)), 'block': _initials(ps_names).to_numpy()})
+        pairs = canvas_blocks[canvas_blocks['block'] != ''].merge(ps_blocks, on='block')
+        if pairs.empty:
+            return pd.DataFrame(columns=MATCH_COLUMNS), 0
+
+        canvas_values = canvas_names.to_numpy()
+        ps_values = ps_names.to_numpy()
+        pairs['match_confidence'] = [
+            SequenceMatcher(None, canvas_values[c], ps_values[p]).ratio()
+            for c, p in zip(pairs['canvas_pos'].to_numpy(), pairs['ps_pos'].to_numpy())
+        ]
+        best = pairs[pairs['match_confidence'] >= self.fuzzy_threshold]
+        best = best.sort_values(['canvas_pos', 'match_confidence', 'ps_pos'], ascending=[True, False, True])
+        best = best.drop_duplicates('canvas_pos').assign(match_method='fuzzy', match_field='name')
+        return best[MATCH_COLUMNS], len(pairs)
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Incremental Delta Sync for LMS/SIS Integrations
+
+Persists a high-water mark, roster ETag and gradebook snapshot per
+(integration, course/school). Each run asks the integration only for records
+changed since the high-water mark, merges the refreshed student rows into the
+snapshot and re-scores just those students; unchanged students keep their
+cached rows and predictions. With a feature-hash function, refetched students
+whose model inputs hash the same as last time keep their prediction too.
+Each prediction records the model version it came from, so after a retrain
+students scored by the old model are re-scored from their cached rows.
+The snapshot holds student records (names, e-mail, demographics), so it is
+stored encrypted like the other FERPA-covered columns.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Re-read this much history on every run so clock skew never drops a change
+DEFAULT_OVERLAP_SECONDS = 300
+
+
+def utc_timestamp(moment: Optional[datetime] = None) -> str:
+    """ISO-8601 UTC timestamp used for high-water marks"""
+    moment = moment or datetime.now(timezone.utc)
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def record_fingerprint(record: Any) -> str:
+    """Stable hash of a source record for change detection"""
+    return hashlib.sha1(json.dumps(record, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@dataclass
+class SyncState:
+    """Stored state of one integration scope"""
+    integration: str
+    scope_id: str
+    high_water_mark: Optional[str] = None
+    etag: Optional[str] = None
+    snapshot: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    last_full_sync_at: Optional[datetime] = None
+
+    def fingerprint(self, student_id: str) -> Optional[str]:
+        return self.snapshot.get(student_id, {}).get('fingerprint')
+
+
+@dataclass
+class DeltaChanges:
+    """What an integration reports as changed since the stored high-water mark"""
+    changed_ids: Set[str] = field(default_factory=set)
+    removed_ids: Set[str] = field(default_factory=set)
+    etag: Optional[str] = None
+    full_resync: bool = False  # e.g. an assignment changed and every student must be recomputed
+
+
+@dataclass
+class IncrementalSyncResult:
+    """Merged gradebook and predictions of a sync run"""
+    mode: str
+    rows: List[Dict[str, Any]]
+    predictions: List[Dict[str, Any]]
+    rescored_ids: List[str]
+    removed_ids: List[str]
+    high_water_mark: str
+    elapsed_seconds: float
+    unchanged_ids: List[str] = field(default_factory=list)  # refetched, but feature hash unchanged
+    previous_risk: Dict[str, float] = field(default_factory=dict)  # risk of rescored students before this run
+
+    @property
+    def gradebook(self) -> pd.DataFrame:
+        return pd.DataFrame(self.rows)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'students_total': len(self.rows),
+            'students_rescored': len(self.rescored_ids),
+            'students_removed': len(self.removed_ids),
+            'students_unchanged': len(self.unchanged_ids),
+            'rescored_student_ids': self.rescored_ids,
+            'previous_risk': self.previous_risk,
+            'high_water_mark': self.high_water_mark,
+            'elapsed_seconds': round(self.elapsed_seconds, 3)
+        }
+
+
+class SyncStateStore:
+    """Database-backed sync state (integration_sync_states table)"""
+
+    def __init__(self, session_factory=None, encryption=None):
+        """
+        Initialize store.
+
+        Args:
+            session_factory: Context manager yielding a DB session (defaults to get_db_session)
+            encryption: EncryptionManager for the snapshot column (defaults to the global one)
+        """
+        if session_factory is None:
+            from src.mvp.database import get_db_session
+            session_factory = get_db_session
+        if encryption is None:
+            from src.mvp.encryption import encryption_manager as encryption
+        self.session_factory = session_factory
+        self.encryption = encryption
+
+    def _load_snapshot(self, row) -> Dict[str, Dict[str, Any]]:
+        if not row.snapshot:
+            return {}
+        try:
+            return json.loads(self.encryption.decrypt(row.snapshot))
+        except ValueError:
+            # Unreadable snapshot: start over with a full sync
+            logger.warning(f"Could not decrypt the {row.integration} sync snapshot of {row.scope_id}")
+            return {}
+
+    def load(self, integration: str, scope_id: str) -> Optional[SyncState]:
+        from src.mvp.models import IntegrationSyncState
+
+        with self.session_factory() as db:
+            row = db.query(IntegrationSyncState).filter_by(integration=integration, scope_id=str(scope_id)).first()
+            if row is None:
+                return None
+            return SyncState(
+                integration=integration,
+                scope_id=str(scope_id),
+                high_water_mark=row.high_water_mark,
+                etag=row.etag,
+                snapshot=self._load_snapshot(row),
+                last_full_sync_at=row.last_full_sync_at
+            )
+
+    def save(self, state: SyncState) -> None:
+        from src.mvp.models import IntegrationSyncState
+
+        with self.session_factory() as db:
+            row = db.query(IntegrationSyncState).filter_by(
+                integration=state.integration, scope_id=state.scope_id
+            ).first()
+            if row is None:
+                row = IntegrationSyncState(integration=state.integration, scope_id=state.scope_id)
+                db.add(row)
+            row.high_water_mark = state.high_water_mark
+            row.etag = state.etag
+            row.snapshot = self.encryption.encrypt(json.dumps(state.snapshot))
+            row.student_count = len(state.snapshot)
+            row.last_sync_at = datetime.now(timezone.utc)
+            row.last_full_sync_at = state.last_full_sync_at
+            db.commit()
+
+    def clear(self, integration: str, scope_id: str) -> None:
+        """Forget a scope so its next sync is a full one"""
+        from src.mvp.models import IntegrationSyncState
+
+        with self.session_factory() as db:
+            db.query(IntegrationSyncState).filter_by(integration=integration, scope_id=str(scope_id)).delete()
+            db.commit()
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """JSON-native row dicts (no numpy scalars)"""
+    return json.loads(df.to_json(orient='records', date_format='iso')) if not df.empty else []
+
+
+class IncrementalSync:
+    """Delta-sync orchestration shared by the Canvas, Google Classroom and PowerSchool integrations"""
+
+    def __init__(self, integration: str, scope_id: str, store: Optional[SyncStateStore] = None,
+                 key: str = 'student_id', overlap_seconds: int = DEFAULT_OVERLAP_SECONDS,
+                 risk_key: str = 'risk_probability', tenant: Optional[str] = None):
+        """
+        Initialize delta sync for one course/school.
+
+        Args:
+            integration: canvas, google_classroom or powerschool
+            scope_id: Course or school ID
+            store: Sync state store (defaults to the database)
+            key: Student ID column of the gradebook
+            overlap_seconds: History re-read on every run
+            risk_key: Risk score field of predictions
+            tenant: credential_fingerprint of the caller; part of the state key so
+                tenants with the same course/school IDs never share a snapshot
+        """
+        self.integration = integration
+        self.scope_id = str(scope_id)
+        self.state_scope = f"{tenant}:{self.scope_id}" if tenant else self.scope_id
+        self.store = store or SyncStateStore()
+        self.key = key
+        self.risk_key = risk_key
+        self.overlap_seconds = overlap_seconds
+        self._fingerprints: Dict[str, str] = {}
+
+    def record_fingerprints(self, fingerprints: Dict[str, str]) -> None:
+        """Let fetchers store per-student source hashes for change detection on the next run"""
+        self._fingerprints.update(fingerprints)
+
+    def run(self,
+            fetch_full: Callable[[], pd.DataFrame],
+            fetch_changes: Callable[[SyncState], DeltaChanges],
+            fetch_rows: Callable[[Set[str]], pd.DataFrame],
+            score: Callable[[pd.DataFrame], List[Dict[str, Any]]],
+            force_full: bool = False,
+            etag: Optional[str] = None,
+            feature_hash: Optional[Callable[[pd.DataFrame], pd.Series]] = None,
+            model_version: Optional[str] = None) -> IncrementalSyncResult:
+        """
+        Run one sync.
+
+        Args:
+            fetch_full: Fetch the whole gradebook (first run or forced)
+            fetch_changes: Report changed/removed students since ``state.high_water_mark``
+            fetch_rows: Fetch gradebook rows for the given students
+            score: Predict for gradebook rows; each prediction carries the key column
+            force_full: Ignore stored state
+            etag: Version tag of the source as of this run, stored for the next comparison
+            feature_hash: Hash of each row's model inputs; rows whose hash matches the stored
+                one keep their previous prediction instead of being scored again
+            model_version: Version of the model ``score`` uses; cached predictions from
+                another version are never kept
+
+        Returns:
+            IncrementalSyncResult with the merged gradebook and all predictions
+        """
+        started = time.perf_counter()
+        self._fingerprints = {}
+        # Taken before fetching so changes made during this run are seen next time
+        next_high_water_mark = utc_timestamp(datetime.now(timezone.utc) - timedelta(seconds=self.overlap_seconds))
+
+        state = None if force_full else self._load_state()
+        previous = dict(state.snapshot) if state is not None else {}
+        changes = None
+        if state is not None and state.snapshot and state.high_water_mark:
+            try:
+                changes = fetch_changes(state)
+            except Exception as e:
+                logger.warning(f"{self.integration} delta detection failed for {self.scope_id}, "
+                               f"running full sync: {e}")
+
+        if changes is None or changes.full_resync:
+            mode = 'full'
+            rows = fetch_full()
+            state = SyncState(self.integration, self.state_scope, etag=(changes.etag if changes else None) or etag)
+            state.last_full_sync_at = datetime.now(timezone.utc)
+            removed: Set[str] = set()
+        else:
+            mode = 'incremental'
+            changed = {sid for sid in changes.changed_ids if sid not in changes.removed_ids}
+            rows = fetch_rows(changed) if changed else pd.DataFrame()
+            removed = changes.removed_ids & set(state.snapshot)
+            state.etag = changes.etag or etag or state.etag
+            if model_version is not None:
+                rows = self._with_outdated_rows(state, rows, changed | removed, model_version)
+
+        rows = rows.copy() if not rows.empty else rows
+        if not rows.empty:
+            rows[self.key] = rows[self.key].astype(str)
+        hashes: Dict[str, str] = {}
+        kept: Dict[str, Dict[str, Any]] = {}
+        to_score = rows
+        if feature_hash is not None and not rows.empty:
+            hashes = dict(zip(rows[self.key], feature_hash(rows)))
+            kept = {sid: previous[sid]['prediction'] for sid, digest in hashes.items()
+                    if previous.get(sid, {}).get('feature_hash') == digest and previous[sid].get('prediction')
+                    and (model_version is None or previous[sid].get('model_version') == model_version)}
+            to_score = rows[~rows[self.key].isin(list(kept))] if kept else rows
+        predictions = score(to_score) if not to_score.empty else []
+
+        rescored = self._merge(state, rows, predictions, removed, kept, hashes, model_version)
+        previous_risk = {}
+        for student_id in rescored:
+            risk = (previous.get(student_id, {}).get('prediction') or {}).get(self.risk_key)
+            if risk is not None:
+                previous_risk[student_id] = risk
+        state.high_water_mark = next_high_water_mark
+        self._save_state(state)
+
+        result = IncrementalSyncResult(
+            mode=mode,
+            rows=[entry['row'] for entry in state.snapshot.values()],
+            predictions=[entry['prediction'] for entry in state.snapshot.values() if entry.get('prediction')],
+            rescored_ids=rescored,
+            removed_ids=sorted(removed),
+            high_water_mark=next_high_water_mark,
+            elapsed_seconds=time.perf_counter() - started,
+            unchanged_ids=sorted(kept),
+            previous_risk=previous_risk
+        )
+        logger.info(f"{self.integration} {mode} sync of {self.scope_id}: {len(rescored)} rescored, "
+                    f"{len(kept)} unchanged, {len(removed)} removed, {len(state.snapshot)} total")
+        return result
+
+    def _with_outdated_rows(self, state: SyncState, rows: pd.DataFrame, refetched: Set[str],
+                            model_version: str) -> pd.DataFrame:
+        """Add cached rows of students last scored by another model version, so they are re-scored"""
+        outdated = [entry['row'] for student_id, entry in state.snapshot.items()
+                    if student_id not in refetched and entry.get('row')
+                    and entry.get('model_version') != model_version]
+        if not outdated:
+            return rows
+        logger.info(f"{self.integration} sync of {self.scope_id}: re-scoring {len(outdated)} cached students "
+                    f"for model {model_version}")
+        outdated_rows = pd.DataFrame(outdated)
+        return pd.concat([rows, outdated_rows], ignore_index=True) if not rows.empty else outdated_rows
+
+    def _merge(self, state: SyncState, rows: pd.DataFrame, predictions: List[Dict[str, Any]],
+               removed: Set[str], kept: Optional[Dict[str, Dict[str, Any]]] = None,
+               hashes: Optional[Dict[str, str]] = None, model_version: Optional[str] = None) -> List[str]:
+        for student_id in removed:
+            state.snapshot.pop(student_id, None)
+
+        kept = kept or {}
+        hashes = hashes or {}
+        predictions_by_id = {str(p.get(self.key)): p for p in predictions}
+        rescored = []
+        for row in _records(rows):
+            student_id = str(row[self.key])
+            previous = state.snapshot.get(student_id, {})
+            state.snapshot[student_id] = {
+                'row': row,
+                'prediction': kept.get(student_id) or predictions_by_id.get(student_id),
+                'fingerprint': previous.get('fingerprint'),
+                'feature_hash': hashes.get(student_id),
+                'model_version': previous.get('model_version') if student_id in kept else model_version
+            }
+            if student_id not in kept:
+                rescored.append(student_id)
+
+        for student_id, fingerprint in self._fingerprints.items():
+            if student_id in state.snapshot:
+                state.snapshot[student_id]['fingerprint'] = fingerprint
+        return rescored
+
+    def _load_state(self) -> Optional[SyncState]:
+        try:
+            return self.store.load(self.integration, self.state_scope)
+        except Exception as e:
+            logger.warning(f"Could not load {self.integration} sync state for {self.scope_id}: {e}")
+            return None
+
+    def _save_state(self, state: SyncState) -> None:
+        try:
+            self.store.save(state)
+        except Exception as e:
+            logger.warning(f"Could not save {self.integration} sync state for {self.scope_id}: {e}")
@@ -6,6 +6,7 @@ Interface for the ultra-advanced K-12 model (81.5% AUC) that works with gradeboo
 Handles the complex feature engineering required by the neural network ensemble.
 """
 
+import hashlib
 import pandas as pd
 import numpy as np
 import joblib
@@ -14,6 +15,104 @@ import json
 import warnings
 warnings.filterwarnings('ignore')
 
+# Column mappings for gradebook to ultra-advanced features
+GRADEBOOK_MAPPINGS = {
+    # Basic gradebook columns
+    'current_gpa': ['current_gpa', 'gpa', 'grade_avg', 'current_grade'],
+    'attendance_rate': ['attendance_rate', 'attendance', 'attendance_pct'],
+    'discipline_incidents': ['discipline_incidents', 'disciplinary_incidents', 'referrals'],
+    'assignment_completion': ['assignment_completion', 'assignment_rate', 'homework_rate'],
+    'grade_level': ['grade_level', 'grade', 'current_grade_level'],
+    'parent_engagement_frequency': ['parent_engagement', 'parent_contact', 'family_contact'],
+    
+    # Extended mappings for ultra-advanced features
+    'homework_quality': ['homework_quality', 'assignment_quality', 'work_quality'],
+    'math_performance': ['math_grade', 'math_score', 'mathematics'],
+    'reading_performance': ['reading_grade', 'reading_score', 'ela_grade'],
+    'science_performance': ['science_grade', 'science_score'],
+    'course_failures': ['course_failures', 'failures', 'failed_courses'],
+    'extracurricular_participation': ['extracurricular', 'activities', 'clubs'],
+    'teacher_relationship_quality': ['teacher_rating', 'teacher_relationship'],
+    'social_skills': ['social_skills', 'peer_relationships'],
+}
+
+# Gradebook fields copied into every prediction for database storage
+PREDICTION_PASSTHROUGH_FIELDS = [
+    'assignment_completion', 'quiz_average', 'participation_score', 'late_submissions',
+    'course_difficulty', 'previous_gpa', 'study_hours_week', 'extracurricular',
+    'parent_education', 'socioeconomic_status'
+]
+
+
+def _input_default(feature):
+    """Default of a mapped model input missing from the gradebook (mirrors _extract_gradebook_features)"""
+    if 'gpa' in feature:
+        return 2.5
+    if 'attendance' in feature:
+        return 0.95
+    if 'grade_level' in feature:
+        return 9
+    if 'performance' in feature:
+        return 0.7
+    if 'quality' in feature:
+        return 0.8
+    if 'frequency' in feature or 'participation' in feature:
+        return 1
+    return 0
+
+
+def extract_gradebook_inputs(df, mappings=None):
+    """
+    Mapped model inputs of every gradebook row in one vectorized pass.
+
+    Args:
+        df: Gradebook DataFrame
+        mappings: Model feature -> candidate gradebook columns (defaults to GRADEBOOK_MAPPINGS)
+
+    Returns:
+        Float DataFrame with one column per mapped feature, aligned with ``df``
+    """
+    inputs = pd.DataFrame(index=df.index)
+    for feature, possible_cols in (mappings or GRADEBOOK_MAPPINGS).items():
+        column = next((col for col in possible_cols if col in df.columns), None)
+        values = pd.to_numeric(df[column], errors='coerce') if column is not None else pd.Series(np.nan, index=df.index)
+        inputs[feature] = values.fillna(_input_default(feature)).astype(float)
+    return inputs
+
+
+def gradebook_feature_hashes(df, extra_columns=(), model_version=None):
+    """
+    Hash of everything a prediction is derived from, per gradebook row.
+
+    Covers the mapped model inputs, the identity and passthrough fields copied
+    into predictions, ``extra_columns`` (e.g. SIS fields used to annotate
+    predictions) and the model version, so a retrained model changes every
+    hash. Rows with equal hashes score identically, so callers can skip
+    re-scoring students whose hash did not change.
+
+    Returns:
+        Series of 16-character hex strings aligned with ``df``
+    """
+    frame = extract_gradebook_inputs(df)
+    for column in ['student_id', 'name', *PREDICTION_PASSTHROUGH_FIELDS, *extra_columns]:
+        frame[f'raw_{column}'] = df[column].astype(str) if column in df.columns else ''
+    frame['model_version'] = str(model_version or '')
+    hashes = pd.util.hash_pandas_object(frame, index=False)
+    return hashes.map(lambda value: format(value, '016x'))
+
+
+def model_files_digest(paths):
+    """Short SHA-256 over the contents of the model artifacts (None entries are skipped)"""
+    digest = hashlib.sha256()
+    for path in paths:
+        if path is None:
+            continue
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
 class K12UltraPredictor:
     """Ultra-advanced K-12 predictor interface for gradebook CSV files."""
     
@@ -39,27 +138,10 @@ class K12UltraPredictor:
         self.scaler = None
         self.features = None
         self.metadata = None
+        self.model_version = None  # digest of the loaded model files, mixed into feature hashes
         
         # Column mappings for gradebook to ultra-advanced features
-        self.gradebook_mappings = {
-            # Basic gradebook columns
-            'current_gpa': ['current_gpa', 'gpa', 'grade_avg', 'current_grade'],
-            'attendance_rate': ['attendance_rate', 'attendance', 'attendance_pct'],
-            'discipline_incidents': ['discipline_incidents', 'disciplinary_incidents', 'referrals'],
-            'assignment_completion': ['assignment_completion', 'assignment_rate', 'homework_rate'],
-            'grade_level': ['grade_level', 'grade', 'current_grade_level'],
-            'parent_engagement_frequency': ['parent_engagement', 'parent_contact', 'family_contact'],
-            
-            # Extended mappings for ultra-advanced features
-            'homework_quality': ['homework_quality', 'assignment_quality', 'work_quality'],
-            'math_performance': ['math_grade', 'math_score', 'mathematics'],
-            'reading_performance': ['reading_grade', 'reading_score', 'ela_grade'],
-            'science_performance': ['science_grade', 'science_score'],
-            'course_failures': ['course_failures', 'failures', 'failed_courses'],
-            'extracurricular_participation': ['extracurricular', 'activities', 'clubs'],
-            'teacher_relationship_quality': ['teacher_rating', 'teacher_relationship'],
-            'social_skills': ['social_skills', 'peer_relationships'],
-        }
+        self.gradebook_mappings = {feature: list(columns) for feature, columns in GRADEBOOK_MAPPINGS.items()}
         
         self._load_ultra_model()
     
@@ -80,6 +162,7 @@ class K12UltraPredictor:
             self.model = joblib.load(latest_model)
             
             # Load scaler
+            scaler_file = features_file = None
             scaler_files = [f for f in self.models_dir.glob("k12_ultra_scaler_*.pkl")]
             if scaler_files:
                 scaler_file = max(scaler_files, key=lambda p: p.stat().st_mtime)
@@ -92,6 +175,8 @@ class K12UltraPredictor:
                 with open(features_file, 'r') as f:
                     self.features = json.load(f)
             
+            self.model_version = model_files_digest([latest_model, scaler_file, features_file])
+            
             # Load metadata
             metadata_files = [f for f in self.models_dir.glob("k12_ultra_metadata_*.json")]
             if metadata_files:
@@ -120,6 +205,7 @@ class K12UltraPredictor:
         
         self.features = ['gpa', 'attendance', 'engagement', 'behavior', 'support'] * 2
         self.metadata = {'model_type': 'fallback', 'auc_score': 0.5}
+        self.model_version = 'fallback'
         
         print("📝 Using fallback model for ultra-advanced predictions")
     
@@ -347,6 +433,147 @@ class K12UltraPredictor:
         # Subject consistency (simplified)
         features_dict['subject_consistency'] = 0.8  # Default high consistency
     
+    def _engineer_feature_frame(self, inputs):
+        """Vectorized _engineer_ultra_features / _create_advanced_engineered_features over all rows."""
+        f = inputs.copy()
+        gpa = f['current_gpa']
+        attendance = f['attendance_rate']
+        discipline = f['discipline_incidents']
+        completion = f['assignment_completion']
+        parent = f['parent_engagement_frequency']
+        extracurricular = f['extracurricular_participation']
+        
+        f['previous_gpa'] = (gpa - 0.2).clip(lower=0)
+        f['gpa_2_years_ago'] = (f['previous_gpa'] - 0.15).clip(lower=0)
+        f['gpa_trend'] = gpa - f['previous_gpa']
+        f['gpa_trajectory'] = (gpa - f['gpa_2_years_ago']) / 2
+        
+        f['attendance_consistency'] = (attendance + 0.05).clip(upper=1.0)
+        f['days_absent_per_month'] = np.trunc(20 * (1 - attendance)).clip(lower=0)
+        f['chronic_absent_pattern'] = (attendance < 0.85).astype(int)
+        f['late_submission_rate'] = (0.3 - completion * 0.2).clip(lower=0)
+        
+        f['course_repeats'] = (f['course_failures'] - 1).clip(lower=0)
+        f['behavioral_trend'] = np.where(discipline > 0, 0.1, -0.1)
+        f['office_referrals'] = (discipline // 2).clip(lower=0)
+        f['suspensions'] = np.trunc(discipline * 0.2).clip(lower=0)
+        
+        family_support_estimate = (parent / 4 + 0.4).clip(upper=1.0)
+        f['peer_relationships'] = 0.7
+        f['emotional_regulation'] = 0.8
+        for feature in ['family_communication_quality', 'home_support_structure', 'parental_education_support']:
+            f[feature] = family_support_estimate
+        
+        f['years_in_current_school'] = (f['grade_level'] - 5).clip(upper=4)
+        f['school_transitions'] = np.where(family_support_estimate > 0.6, 0, 1)
+        f['leadership_roles'] = (extracurricular > 1).astype(int)
+        f['community_service_hours'] = extracurricular * 10
+        
+        f['peer_performance_percentile'] = (gpa / 4.0 * 0.8 + 0.1).clip(upper=1.0)
+        f['class_rank_percentile'] = f['peer_performance_percentile']
+        f['grade_level_expectations_met'] = (gpa >= 2.0).astype(int)
+        
+        f['cumulative_risk_factors'] = (
+            (gpa < 2.0).astype(int) + (attendance < 0.85) + (discipline > 2) + (f['course_failures'] > 0) +
+            (family_support_estimate < 0.4) + (f['behavioral_trend'] > 0.3)
+        )
+        f['protective_factors_count'] = (
+            (parent >= 3).astype(int) + (extracurricular > 0) + (f['teacher_relationship_quality'] > 0.7) +
+            (f['peer_relationships'] > 0.6) + (f['home_support_structure'] > 0.7) + (f['social_skills'] > 0.6)
+        )
+        
+        # Advanced engineered features
+        for degree in [2, 3]:
+            f[f'gpa_power_{degree}'] = gpa ** degree
+            f[f'attendance_power_{degree}'] = attendance ** degree
+        f['gpa_attendance_product'] = gpa * attendance
+        f['gpa_parent_product'] = gpa * parent
+        f['attendance_parent_product'] = attendance * parent
+        f['gpa_homework_product'] = gpa * f['homework_quality']
+        f['gpa_attendance_parent_triple'] = gpa * attendance * parent
+        
+        f['academic_excellence_score'] = gpa * 0.4 + f['homework_quality'] * 0.3 + completion * 0.3
+        f['family_support_score'] = (parent / 5 * 0.4 + f['home_support_structure'] * 0.3 +
+                                     f['family_communication_quality'] * 0.3)
+        f['behavioral_stability_score'] = ((1 - (discipline / 5).clip(upper=1)) * 0.5 +
+                                           f['emotional_regulation'] * 0.3 + f['social_skills'] * 0.2)
+        f['academic_momentum'] = f['gpa_trend'] * 2 + f['gpa_trajectory'] + (completion - 0.5) * 2
+        f['risk_momentum'] = (f['behavioral_trend'] + (f['late_submission_rate'] - 0.5) * 2 +
+                              (0.85 - attendance) * 5)
+        f['academic_advantage'] = f['class_rank_percentile'] * 0.6 + f['peer_performance_percentile'] * 0.4
+        f['high_risk_indicator'] = ((gpa < 2.0) * 4 + (attendance < 0.80) * 3 + (discipline > 3) * 3 +
+                                    (f['course_failures'] > 1) * 2)
+        f['protective_factor_strength'] = ((parent >= 4) * 2 + (extracurricular > 0) * 1 +
+                                           (f['teacher_relationship_quality'] > 0.8) * 2 +
+                                           (f['social_skills'] > 0.7) * 1)
+        f['subject_mastery_average'] = (f['math_performance'] + f['reading_performance'] +
+                                        f['science_performance']) / 3
+        f['subject_consistency'] = 0.8
+        return f
+    
+    def predict_batch(self, gradebook_df):
+        """
+        Predict student success for a whole gradebook in one vectorized pass.
+        
+        Produces the same predictions as predict_from_gradebook, but engineers
+        features column-wise and calls the scaler and model once for all rows
+        instead of once per student. Falls back to predict_from_gradebook if the
+        batch cannot be scored.
+        
+        Args:
+            gradebook_df: Gradebook DataFrame (one row per student)
+            
+        Returns:
+            List of prediction dicts in row order
+        """
+        if gradebook_df.empty:
+            return []
+        try:
+            features = self._engineer_feature_frame(extract_gradebook_inputs(gradebook_df, self.gradebook_mappings))
+            
+            if self.features and len(self.features) > 10:  # Real model
+                X = features.reindex(columns=self.features, fill_value=0).to_numpy(dtype=float)
+                if self.scaler:
+                    X = self.scaler.transform(X)
+            else:  # Fallback model
+                basic = np.column_stack([
+                    features['current_gpa'] / 4.0,
+                    features['attendance_rate'],
+                    features['assignment_completion'],
+                    features['discipline_incidents'] / 5.0,
+                    features['parent_engagement_frequency'] / 5.0
+                ])
+                X = np.hstack([basic, basic])
+            
+            # Model predicts SUCCESS probability, so invert for RISK
+            risk = 1.0 - self.model.predict_proba(X)[:, 1]
+            categories = np.select([risk < 0.3, risk < 0.7], ["Low Risk", "Moderate Risk"], "High Risk")
+            levels = np.select([risk < 0.3, risk < 0.7], ["success", "warning"], "danger")
+            
+            predictions = []
+            rows = gradebook_df.to_dict('records')
+            for i, (idx, row) in enumerate(zip(gradebook_df.index, rows)):
+                result = {
+                    'student_id': row.get('student_id', row.get('id', row.get('ID', f'student_{idx}'))),
+                    'name': row.get('name', row.get('student_name', row.get('Student', 'Unknown'))),
+                    'grade_level': int(features['grade_level'].iat[i]),
+                    'current_gpa': float(features['current_gpa'].iat[i]),
+                    'attendance_rate': float(features['attendance_rate'].iat[i]),
+                    'risk_probability': float(risk[i]),
+                    'risk_category': str(categories[i]),
+                    'risk_level': str(levels[i]),
+                    'confidence': float(abs(risk[i] - 0.5) * 2),
+                    'model_type': 'ultra_advanced'
+                }
+                for field in PREDICTION_PASSTHROUGH_FIELDS:
+                    result[field] = row.get(field)
+                predictions.append(result)
+            return predictions
+            
+        except Exception as e:
+            print(f"⚠️  Batch prediction error, scoring row by row: {e}")
+            return self.predict_from_gradebook(gradebook_df)
+    
     def predict_from_gradebook(self, gradebook_df):
         """Predict student success using ultra-advanced model."""
         try:
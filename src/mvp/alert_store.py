@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Bounded, Indexed Alert Store
+
+The notification system used to keep alerts in a plain list that grew for as
+long as the process ran: resolving an alert scanned it, listing active alerts
+sorted them on every call and every stats request recounted the whole
+history. AlertStore keeps the same data with bounded memory and indexed access:
+
+* history is a bounded buffer that evicts the oldest alerts beyond
+  ``max_history``; active (unresolved) alerts are kept until resolved, up
+  to ``max_active``, beyond which the oldest active alerts expire (they
+  leave the active set unresolved and are counted as expired)
+* alerts are indexed by alert id and by student id
+* history and active alerts are kept ordered by timestamp, so newest-first
+  pages cost O(page) instead of a sort
+* level and type counters are maintained on insert, so statistics are
+  O(1); they cover every alert since startup, evicted or not
+
+BoundedRiskCache holds the latest risk score per student, evicting the least
+recently updated students beyond its size.
+
+Configuration (environment):
+    NOTIFICATION_HISTORY_SIZE      alerts kept in history (default 10000)
+    NOTIFICATION_ACTIVE_LIMIT      unresolved alerts kept active (default 10000)
+    NOTIFICATION_RISK_CACHE_SIZE   students whose last risk score is remembered (default 100000)
+"""
+
+import itertools
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+
+class _Timeline:
+    """Alerts ordered by (timestamp, insertion sequence) with O(1) lookup by id"""
+
+    def __init__(self):
+        self.keys: List[Tuple[Any, int, str]] = []
+        self.by_id: Dict[str, Any] = {}
+        self._key_of: Dict[str, Tuple[Any, int, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, alert, sequence: int) -> None:
+        key = (alert.timestamp, sequence, alert.alert_id)
+        if not self.keys or key > self.keys[-1]:
+            self.keys.append(key)  # the usual case: alerts arrive in time order
+        else:
+            insort(self.keys, key)
+        self.by_id[alert.alert_id] = alert
+        self._key_of[alert.alert_id] = key
+
+    def remove(self, alert_id: str):
+        key = self._key_of.pop(alert_id)
+        del self.keys[bisect_left(self.keys, key)]
+        return self.by_id.pop(alert_id)
+
+    def oldest_id(self) -> str:
+        return self.keys[0][2]
+
+    def newest(self) -> Iterator[Any]:
+        for key in reversed(self.keys):
+            yield self.by_id[key[2]]
+
+    def oldest(self) -> Iterator[Any]:
+        for key in self.keys:
+            yield self.by_id[key[2]]
+
+
+class AlertStore:
+    """Alert history and active alerts with id/student indexes and running counters"""
+
+    def __init__(self, max_history: int = 10000, max_active: int = 10000):
+        """
+        Initialize store.
+
+        Args:
+            max_history: Alerts kept in history before the oldest are evicted
+            max_active: Unresolved alerts kept active before the oldest expire
+        """
+        self.max_history = max_history
+        self.max_active = max_active
+        self._history = _Timeline()
+        self._active = _Timeline()
+        self._history_by_student: Dict[str, Dict[str, Any]] = {}
+        self._active_by_student: Dict[str, Dict[str, Any]] = {}
+        self._sequence = itertools.count()
+        self.total_alerts = 0
+        self.evicted_alerts = 0
+        self.expired_alerts = 0
+        self.level_counts: Counter = Counter()
+        self.type_counts: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self._history)
+
+    def __iter__(self) -> Iterator[Any]:
+        """History, oldest first"""
+        return self._history.oldest()
+
+    def __contains__(self, alert_id: str) -> bool:
+        return alert_id in self._history.by_id or alert_id in self._active.by_id
+
+    @property
+    def active(self) -> Mapping[str, Any]:
+        """Read-only view of active alerts by id"""
+        return MappingProxyType(self._active.by_id)
+
+    def add(self, alert) -> None:
+        """Record a new alert in history and, unless resolved, among the active alerts"""
+        if alert.alert_id in self:
+            self._discard(alert.alert_id)
+        sequence = next(self._sequence)
+        self._history.add(alert, sequence)
+        self._history_by_student.setdefault(alert.student_id, {})[alert.alert_id] = alert
+        if not alert.resolved:
+            self._active.add(alert, sequence)
+            self._active_by_student.setdefault(alert.student_id, {})[alert.alert_id] = alert
+        self.total_alerts += 1
+        self.level_counts[alert.alert_level.value] += 1
+        self.type_counts[alert.alert_type.value] += 1
+
+        while len(self._history) > self.max_history:
+            self._evict(self._history.oldest_id())
+        while len(self._active) > self.max_active:
+            self._expire(self._active.oldest_id())
+
+    def get(self, alert_id: str):
+        """Alert by id, active or in history; None if unknown or evicted"""
+        alert = self._active.by_id.get(alert_id)
+        return alert if alert is not None else self._history.by_id.get(alert_id)
+
+    def get_active(self, alert_id: str):
+        return self._active.by_id.get(alert_id)
+
+    def resolve(self, alert_id: str):
+        """Move an alert out of the active set (it stays in history); None if not active"""
+        alert = self._active.by_id.get(alert_id)
+        if alert is None:
+            return None
+        self._active.remove(alert_id)
+        _unindex(self._active_by_student, alert)
+        alert.resolved = True
+        return alert
+
+    def active_alerts(self, student_id: Optional[str] = None, limit: Optional[int] = None) -> List[Any]:
+        """Active alerts, newest first"""
+        if student_id is not None:
+            return _newest_first(self._active_by_student.get(student_id, {}), limit)
+        return list(itertools.islice(self._active.newest(), limit))
+
+    def history(self, student_id: Optional[str] = None, limit: Optional[int] = None) -> List[Any]:
+        """Alerts in history, newest first"""
+        if student_id is not None:
+            return _newest_first(self._history_by_student.get(student_id, {}), limit)
+        return list(itertools.islice(self._history.newest(), limit))
+
+    def _evict(self, alert_id: str) -> None:
+        alert = self._history.remove(alert_id)
+        _unindex(self._history_by_student, alert)
+        self.evicted_alerts += 1
+
+    def _expire(self, alert_id: str) -> None:
+        alert = self._active.remove(alert_id)
+        _unindex(self._active_by_student, alert)
+        self.expired_alerts += 1
+
+    def _discard(self, alert_id: str) -> None:
+        """Drop an alert being replaced under the same id, keeping counters consistent"""
+        if alert_id in self._active.by_id:
+            alert = self._active.remove(alert_id)
+            _unindex(self._active_by_student, alert)
+        if alert_id in self._history.by_id:
+            alert = self._history.remove(alert_id)
+            _unindex(self._history_by_student, alert)
+            self.total_alerts -= 1
+            self.level_counts[alert.alert_level.value] -= 1
+            self.type_counts[alert.alert_type.value] -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for the stats endpoint; O(number of levels and types)"""
+        return {
+            'total_alerts': self.total_alerts,
+            'active_alerts': len(self._active),
+            'resolved_alerts': self.total_alerts - len(self._active) - self.expired_alerts,
+            'active_limit': self.max_active,
+            'expired_alerts': self.expired_alerts,
+            'alert_levels': {level: count for level, count in self.level_counts.items() if count},
+            'alert_types': {alert_type: count for alert_type, count in self.type_counts.items() if count},
+            'history_size': len(self._history),
+            'history_limit': self.max_history,
+            'evicted_alerts': self.evicted_alerts
+        }
+
+
+def _unindex(index: Dict[str, Dict[str, Any]], alert) -> None:
+    alerts = index.get(alert.student_id)
+    if alerts is not None:
+        alerts.pop(alert.alert_id, None)
+        if not alerts:
+            del index[alert.student_id]
+
+
+def _newest_first(alerts: Dict[str, Any], limit: Optional[int]) -> List[Any]:
+    """A single student's alerts (a handful), newest first"""
+    ordered = sorted(alerts.values(), key=lambda alert: alert.timestamp, reverse=True)
+    return ordered if limit is None else ordered[:limit]
+
+
+class BoundedRiskCache(OrderedDict):
+    """
+    Latest risk score per student, evicting the least recently updated beyond ``max_size``
+
+    Keys are ``(institution_id, student_id)`` pairs (see ``risk_key``), since
+    student ids are only unique within an institution.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        super().__init__()
+        self.max_size = max_size
+
+    def __setitem__(self, key, risk) -> None:
+        if key in self:
+            self.move_to_end(key)
+        super().__setitem__(key, risk)
+        if len(self) > self.max_size:
+            self.popitem(last=False)
+
+
+def risk_key(student_id: Any, institution_id: Any = None) -> Tuple[Optional[str], str]:
+    """Risk cache key of a student: ``(institution_id, student_id)`` as strings (institution may be None)"""
+    return (None if institution_id is None else str(institution_id), str(student_id))
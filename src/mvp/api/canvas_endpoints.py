@@ -17,6 +17,9 @@ from datetime import datetime
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from mvp.security import get_current_user_secure as get_current_user
 from mvp.database import save_predictions_batch
+from src.mvp.services.sync_jobs import (
+    SyncJobCancelled, SyncJobContext, SyncJobError, SyncJobQueueFull, get_sync_job_service, run_inline
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -127,12 +130,64 @@ async def get_canvas_courses(
         logger.error(f"Error fetching Canvas courses: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching courses: {str(e)}")
 
+def _canvas_sync_runner(base_url: str, access_token: str, course_id: str):
+    """Sync, persist and summarize a Canvas course; shared by the inline and background paths"""
+    def run(job: SyncJobContext) -> dict:
+        from integrations.canvas_lms import create_canvas_integration
+        canvas = create_canvas_integration(base_url, access_token)
+        canvas.progress_callback = job.progress
+        
+        # Sync course data and generate predictions
+        sync_result = canvas.sync_course_data(course_id)
+        job.check_cancelled()
+        
+        if sync_result['status'] != 'success':
+            raise SyncJobError(f"Canvas sync failed: {sync_result.get('error')}")
+        
+        # Save predictions to database if available
+        try:
+            session_id = f"canvas_{course_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            if sync_result['predictions']:
+                job.persist(sync_result['predictions'], lambda chunk: save_predictions_batch(chunk, session_id))
+                logger.info(f"Saved {len(sync_result['predictions'])} Canvas predictions to database")
+        except SyncJobCancelled:
+            raise
+        except Exception as db_error:
+            logger.warning(f"Could not save Canvas predictions to database: {db_error}")
+        
+        # Generate summary statistics
+        predictions = sync_result['predictions']
+        if predictions:
+            total_students = len(predictions)
+            high_risk = sum(1 for p in predictions if p.get('risk_level') == 'danger')
+            moderate_risk = sum(1 for p in predictions if p.get('risk_level') == 'warning') 
+            low_risk = sum(1 for p in predictions if p.get('risk_level') == 'success')
+            
+            avg_gpa = sum(p.get('current_gpa', 0) for p in predictions) / total_students if total_students > 0 else 0
+            avg_attendance = sum(p.get('attendance_rate', 0) for p in predictions) / total_students if total_students > 0 else 0
+            
+            sync_result['summary'] = {
+                'total_students': total_students,
+                'risk_distribution': {
+                    'high_risk': high_risk,
+                    'moderate_risk': moderate_risk,
+                    'low_risk': low_risk
+                },
+                'class_averages': {
+                    'gpa': round(avg_gpa, 2),
+                    'attendance': round(avg_attendance * 100, 1)
+                }
+            }
+        
+        return sync_result
+    return run
+
 @router.post("/sync")
 async def sync_canvas_course(
     request: Request,
     current_user: dict = Depends(get_current_user)
 ):
-    """Sync Canvas course data and generate predictions"""
+    """Sync Canvas course data and generate predictions (``"background": true`` returns a job to poll)"""
     try:
         body = await request.json()
         base_url = body.get('base_url', '').strip()
@@ -142,52 +197,24 @@ async def sync_canvas_course(
         if not all([base_url, access_token, course_id]):
             raise HTTPException(status_code=400, detail="Canvas URL, access token, and course ID are required")
         
-        from integrations.canvas_lms import create_canvas_integration
-        canvas = create_canvas_integration(base_url, access_token)
+        run = _canvas_sync_runner(base_url, access_token, course_id)
         
-        # Sync course data and generate predictions
-        sync_result = canvas.sync_course_data(course_id)
+        if body.get('background'):
+            job = get_sync_job_service().submit(
+                'canvas', course_id, run,
+                requested_by=current_user.get('user') if isinstance(current_user, dict) else None,
+                dedupe_key=f"canvas:{base_url}:{access_token}:{course_id}"
+            )
+            return JSONResponse(job.to_dict(), status_code=202)
         
-        if sync_result['status'] == 'success':
-            # Save predictions to database if available
-            try:
-                session_id = f"canvas_{course_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                if sync_result['predictions']:
-                    save_predictions_batch(sync_result['predictions'], session_id)
-                    logger.info(f"Saved {len(sync_result['predictions'])} Canvas predictions to database")
-            except Exception as db_error:
-                logger.warning(f"Could not save Canvas predictions to database: {db_error}")
-            
-            # Generate summary statistics
-            predictions = sync_result['predictions']
-            if predictions:
-                total_students = len(predictions)
-                high_risk = sum(1 for p in predictions if p.get('risk_level') == 'danger')
-                moderate_risk = sum(1 for p in predictions if p.get('risk_level') == 'warning') 
-                low_risk = sum(1 for p in predictions if p.get('risk_level') == 'success')
-                
-                avg_gpa = sum(p.get('current_gpa', 0) for p in predictions) / total_students if total_students > 0 else 0
-                avg_attendance = sum(p.get('attendance_rate', 0) for p in predictions) / total_students if total_students > 0 else 0
-                
-                sync_result['summary'] = {
-                    'total_students': total_students,
-                    'risk_distribution': {
-                        'high_risk': high_risk,
-                        'moderate_risk': moderate_risk,
-                        'low_risk': low_risk
-                    },
-                    'class_averages': {
-                        'gpa': round(avg_gpa, 2),
-                        'attendance': round(avg_attendance * 100, 1)
-                    }
-                }
-            
-            return JSONResponse(sync_result)
-        else:
-            raise HTTPException(status_code=400, detail=f"Canvas sync failed: {sync_result.get('error')}")
+        return JSONResponse(run_inline('canvas', course_id, run))
             
     except HTTPException:
         raise
+    except SyncJobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Sync queue is full, try again shortly: {e}")
+    except SyncJobError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error syncing Canvas course: {e}")
         raise HTTPException(status_code=500, detail=f"Canvas sync error: {str(e)}")
@@ -17,6 +17,9 @@ from datetime import datetime
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from mvp.security import get_current_user_secure as get_current_user
 from mvp.database import save_predictions_batch
+from src.mvp.services.sync_jobs import (
+    SyncJobCancelled, SyncJobContext, SyncJobError, SyncJobQueueFull, get_sync_job_service, run_inline
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -153,12 +156,91 @@ async def get_combined_matches(
         logger.error(f"Error getting combined matches: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting matches: {str(e)}")
 
+def _combined_sync_runner(canvas_url: str, canvas_token: str, powerschool_url: str,
+                          powerschool_client_id: str, powerschool_client_secret: str,
+                          canvas_course_id: str, powerschool_school_id: str, grade_levels: list):
+    """Sync, persist and summarize a combined Canvas + PowerSchool roster; shared by the inline and background paths"""
+    def run(job: SyncJobContext) -> dict:
+        from integrations.combined_integration import create_combined_integration
+        combined = create_combined_integration(
+            canvas_url, canvas_token,
+            powerschool_url, powerschool_client_id, powerschool_client_secret
+        )
+        combined.progress_callback = job.progress
+        
+        # Perform combined sync
+        sync_result = combined.sync_combined_data(
+            canvas_course_id, powerschool_school_id, 
+            grade_levels if grade_levels else None
+        )
+        job.check_cancelled()
+        
+        if sync_result['status'] != 'success':
+            raise SyncJobError(f"Combined sync failed: {sync_result.get('error')}")
+        
+        # Save combined predictions to database
+        try:
+            session_id = f"combined_{canvas_course_id}_{powerschool_school_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            if sync_result['predictions']:
+                job.persist(sync_result['predictions'], lambda chunk: save_predictions_batch(chunk, session_id))
+                logger.info(f"Saved {len(sync_result['predictions'])} combined predictions to database")
+        except SyncJobCancelled:
+            raise
+        except Exception as db_error:
+            logger.warning(f"Could not save combined predictions to database: {db_error}")
+        
+        # Generate enhanced summary statistics
+        predictions = sync_result['predictions']
+        if predictions:
+            total_students = len(predictions)
+            critical_priority = sync_result['analysis']['risk_analysis']['critical_priority']
+            high_priority = sync_result['analysis']['risk_analysis']['high_priority']
+            medium_priority = sync_result['analysis']['risk_analysis']['medium_priority']
+            low_priority = sync_result['analysis']['risk_analysis']['low_priority']
+        
+            # Traditional risk categories
+            high_risk = sum(1 for p in predictions if p.get('risk_level') == 'danger')
+            moderate_risk = sum(1 for p in predictions if p.get('risk_level') == 'warning') 
+            low_risk = sum(1 for p in predictions if p.get('risk_level') == 'success')
+        
+            avg_gpa = sum(p.get('current_gpa', 0) for p in predictions) / total_students if total_students > 0 else 0
+            avg_attendance = sum(p.get('attendance_rate', 0) for p in predictions) / total_students if total_students > 0 else 0
+        
+            sync_result['enhanced_summary'] = {
+                'total_students': total_students,
+                'traditional_risk_distribution': {
+                    'high_risk': high_risk,
+                    'moderate_risk': moderate_risk,
+                    'low_risk': low_risk
+                },
+                'intervention_priority_distribution': {
+                    'critical': critical_priority,
+                    'high': high_priority,
+                    'medium': medium_priority,
+                    'low': low_priority
+                },
+                'class_averages': {
+                    'gpa': round(avg_gpa, 2),
+                    'attendance': round(avg_attendance * 100, 1)
+                },
+                'data_integration_quality': {
+                    'match_rate': sync_result['match_rate'],
+                    'canvas_coverage': sync_result['canvas_students'],
+                    'powerschool_coverage': sync_result['powerschool_students'],
+                    'combined_profiles': sync_result['matched_students'],
+                    'data_completeness': sync_result['data_quality']['data_completeness_score']
+                }
+            }
+        
+        return sync_result
+    return run
+
 @router.post("/sync")
 async def sync_combined_data(
     request: Request,
     current_user: dict = Depends(get_current_user)
 ):
-    """Perform ultimate combined Canvas + PowerSchool data sync and analysis"""
+    """Perform ultimate combined Canvas + PowerSchool data sync and analysis (``"background": true`` returns a job to poll)"""
     try:
         body = await request.json()
         
@@ -178,77 +260,27 @@ async def sync_combined_data(
                    powerschool_client_secret, canvas_course_id, powerschool_school_id]):
             raise HTTPException(status_code=400, detail="All credentials and selection parameters required")
         
-        from integrations.combined_integration import create_combined_integration
-        combined = create_combined_integration(
-            canvas_url, canvas_token,
-            powerschool_url, powerschool_client_id, powerschool_client_secret
-        )
+        run = _combined_sync_runner(canvas_url, canvas_token, powerschool_url, powerschool_client_id,
+                                    powerschool_client_secret, canvas_course_id, powerschool_school_id, grade_levels)
+        scope_id = f"{canvas_course_id}:{powerschool_school_id}"
         
-        # Perform combined sync
-        sync_result = combined.sync_combined_data(
-            canvas_course_id, powerschool_school_id, 
-            grade_levels if grade_levels else None
-        )
+        if body.get('background'):
+            job = get_sync_job_service().submit(
+                'combined', scope_id, run,
+                requested_by=current_user.get('user') if isinstance(current_user, dict) else None,
+                dedupe_key=f"combined:{canvas_url}:{canvas_token}:{powerschool_url}:{powerschool_client_id}:"
+                           f"{powerschool_client_secret}:{scope_id}:{sorted(grade_levels or [])}"
+            )
+            return JSONResponse(job.to_dict(), status_code=202)
         
-        if sync_result['status'] == 'success':
-            # Save combined predictions to database
-            try:
-                session_id = f"combined_{canvas_course_id}_{powerschool_school_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                if sync_result['predictions']:
-                    save_predictions_batch(sync_result['predictions'], session_id)
-                    logger.info(f"Saved {len(sync_result['predictions'])} combined predictions to database")
-            except Exception as db_error:
-                logger.warning(f"Could not save combined predictions to database: {db_error}")
-            
-            # Generate enhanced summary statistics
-            predictions = sync_result['predictions']
-            if predictions:
-                total_students = len(predictions)
-                critical_priority = sync_result['analysis']['risk_analysis']['critical_priority']
-                high_priority = sync_result['analysis']['risk_analysis']['high_priority']
-                medium_priority = sync_result['analysis']['risk_analysis']['medium_priority']
-                low_priority = sync_result['analysis']['risk_analysis']['low_priority']
-                
-                # Traditional risk categories
-                high_risk = sum(1 for p in predictions if p.get('risk_level') == 'danger')
-                moderate_risk = sum(1 for p in predictions if p.get('risk_level') == 'warning') 
-                low_risk = sum(1 for p in predictions if p.get('risk_level') == 'success')
-                
-                avg_gpa = sum(p.get('current_gpa', 0) for p in predictions) / total_students if total_students > 0 else 0
-                avg_attendance = sum(p.get('attendance_rate', 0) for p in predictions) / total_students if total_students > 0 else 0
-                
-                sync_result['enhanced_summary'] = {
-                    'total_students': total_students,
-                    'traditional_risk_distribution': {
-                        'high_risk': high_risk,
-                        'moderate_risk': moderate_risk,
-                        'low_risk': low_risk
-                    },
-                    'intervention_priority_distribution': {
-                        'critical': critical_priority,
-                        'high': high_priority,
-                        'medium': medium_priority,
-                        'low': low_priority
-                    },
-                    'class_averages': {
-                        'gpa': round(avg_gpa, 2),
-                        'attendance': round(avg_attendance * 100, 1)
-                    },
-                    'data_integration_quality': {
-                        'match_rate': sync_result['match_rate'],
-                        'canvas_coverage': sync_result['canvas_students'],
-                        'powerschool_coverage': sync_result['powerschool_students'],
-                        'combined_profiles': sync_result['matched_students'],
-                        'data_completeness': sync_result['data_quality']['data_completeness_score']
-                    }
-                }
-            
-            return JSONResponse(sync_result)
-        else:
-            raise HTTPException(status_code=400, detail=f"Combined sync failed: {sync_result.get('error')}")
+        return JSONResponse(run_inline('combined', scope_id, run))
             
     except HTTPException:
         raise
+    except SyncJobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Sync queue is full, try again shortly: {e}")
+    except SyncJobError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error with combined sync: {e}")
         raise HTTPException(status_code=500, detail=f"Combined sync error: {str(e)}")
\ No newline at end of file
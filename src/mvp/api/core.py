@@ -17,7 +17,6 @@ import logging
 from src.mvp.logging_config import get_logger, log_prediction, log_error
 import os
 from typing import List, Dict, Any
-import io
 import time
 import importlib.util
 from datetime import datetime
@@ -34,10 +33,14 @@ from src.models.k12_ultra_predictor import K12UltraPredictor
 from src.mvp.simple_auth_clean import simple_auth_check, apply_rate_limit
 from src.mvp.simple_auth import simple_file_validation  # Keep file validation
 from src.mvp.security import InputSanitizer
+from src.mvp.services.insight_warmup import get_insight_warmup_service
+from src.mvp.services.cohort_stats import notify_cohort_changed
+from src.mvp.services.risk_percentile_index import get_risk_percentile_index, notify_percentiles_changed
 from mvp.database import get_db_session, get_session_factory, save_predictions_batch, save_gpt_insight, get_gpt_insight, get_all_gpt_insights_for_session
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from mvp.audit_logger import audit_logger
+from mvp.encryption import decrypt_model_rows
 
 # Database dependency function  
 def get_db():
@@ -163,10 +166,10 @@ async def analyze_student_data(
         # Secure file validation and processing
         contents = await file.read()
         filename = InputSanitizer.sanitize_filename(file.filename)
-        InputSanitizer.validate_file_content(contents, filename)
+        upload = InputSanitizer.validate_file_content(contents, filename)
         
         # Process CSV
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
+        df = upload.read_csv()
         # Basic structural validation: require at least 2 columns
         if df.shape[1] < 2:
             raise HTTPException(status_code=400, detail="Invalid CSV format - insufficient columns")
@@ -365,6 +368,17 @@ async def analyze_student_data(
         except Exception as db_error:
             logger.warning(f"Could not save to database: {db_error}")
         
+        # Precompute GPT insights for the riskiest students in the background
+        insight_warmup = None
+        try:
+            warmup_job = get_insight_warmup_service().submit(
+                results, institution_id=1, session_id=session_id
+            )
+            if warmup_job:
+                insight_warmup = warmup_job.to_dict()
+        except Exception as warmup_error:
+            logger.warning(f"Could not start GPT insight warm-up: {warmup_error}")
+        
         # Note: Database ID assignment for frontend compatibility attempted here
         # Frontend has robust fallback logic to handle missing database IDs gracefully
         
@@ -385,6 +399,7 @@ async def analyze_student_data(
             'students': results,
             'summary': summary,
             'k12_predictions': predictions,  # Full K-12 predictions with recommendations
+            'insight_warmup': insight_warmup,
             'message': f'Successfully analyzed {len(results)} students with K-12 Ultra-Advanced model (81.5% AUC)'
         })
         
@@ -425,9 +440,9 @@ async def analyze_detailed_student_data(
         
         contents = await file.read()
         filename = InputSanitizer.sanitize_filename(file.filename)
-        InputSanitizer.validate_file_content(contents, filename)
+        upload = InputSanitizer.validate_file_content(contents, filename)
         
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
+        df = upload.read_csv()
         if df.shape[1] < 2:
             raise HTTPException(status_code=400, detail="Invalid CSV format - insufficient columns")
         logger.info(f"Processing detailed analysis: {file.filename} with {len(df)} rows")
@@ -579,6 +594,7 @@ async def get_audit_events(
                 'details': json.loads(row.details) if row.details else {},
                 'compliance_data': json.loads(row.compliance_data) if row.compliance_data else {}
             })
+        events = decrypt_model_rows('audit_logs', events)
         
         return JSONResponse({
             'events': events,
@@ -640,9 +656,9 @@ async def analyze_k12_gradebook(
         
         contents = await file.read()
         filename = InputSanitizer.sanitize_filename(file.filename)
-        InputSanitizer.validate_file_content(contents, filename)
+        upload = InputSanitizer.validate_file_content(contents, filename)
         
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
+        df = upload.read_csv()
         if df.shape[1] < 2:
             raise HTTPException(status_code=400, detail="Invalid CSV format - insufficient columns")
         
@@ -878,6 +894,7 @@ async def load_sample_data(
             Institution.name == "Demo Educational District"
         ).all()
         
+        students_moved = False
         if len(demo_institutions) > 1:
             # Merge multiple demo institutions into one
             primary_institution = demo_institutions[0]
@@ -902,6 +919,7 @@ async def load_sample_data(
                 logger.info(f"Merged duplicate institution {duplicate_institution.id} into {primary_institution.id}")
             
             db.commit()
+            students_moved = True
             demo_institution = primary_institution
         elif demo_institutions:
             demo_institution = demo_institutions[0]
@@ -951,8 +969,13 @@ async def load_sample_data(
                     # Delete duplicate student
                     db.delete(duplicate_student)
                     logger.info(f"Removed duplicate sample student {student_id} (id: {duplicate_student.id})")
+                students_moved = True
         
         db.commit()
+        if students_moved:
+            # Moved and deleted students bypass the prediction write hooks
+            notify_cohort_changed()
+            notify_percentiles_changed()
         
         # Create sample students if they don't exist (READ-ONLY approach)
         sample_student_data = [
@@ -1548,6 +1571,39 @@ async def load_existing_students(
             "message": "Could not load student data"
         })
 
+MAX_PERCENTILE_LOOKUP = 1000
+
+@router.post("/students/percentiles")
+async def get_student_percentiles(
+    request: Request
+):
+    """Get grade-level risk percentile ranks for a list of students in one call."""
+    try:
+        # Manual authentication check
+        current_user = simple_auth_check(request, None)
+        
+        body = await request.json()
+        student_ids = body.get('student_ids')
+        # Always the caller's institution; an institution_id in the body is ignored
+        institution_id = current_user.get('institution_id', 1)
+        
+        if not isinstance(student_ids, list) or not student_ids:
+            raise HTTPException(status_code=400, detail="student_ids must be a non-empty list")
+        if len(student_ids) > MAX_PERCENTILE_LOOKUP:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_PERCENTILE_LOOKUP} student_ids per request")
+        
+        percentiles = get_risk_percentile_index().get_percentiles(int(institution_id), student_ids)
+        return JSONResponse({
+            'institution_id': int(institution_id),
+            'percentiles': percentiles
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting student percentiles: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get student percentiles")
+
 @router.get("/success-stories")
 async def get_success_stories(current_user: dict = Depends(simple_auth_check)):
     """Get success stories and case studies"""
@@ -1975,3 +2031,38 @@ async def get_session_gpt_insights(
     except Exception as e:
         logger.error(f"Error retrieving session insights: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve session insights")
+
+@router.get("/gpt-insights/warmup/{job_id}")
+async def get_gpt_insight_warmup(
+    job_id: str,
+    request: Request
+):
+    """Report progress of a background GPT insight warm-up job."""
+    current_user = simple_auth_check(request, None)
+    
+    warmup_service = get_insight_warmup_service()
+    job = warmup_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Warm-up job not found")
+    
+    return JSONResponse({
+        **job.to_dict(),
+        'institution_budget': warmup_service.budget_summary(job.institution_id)
+    })
+
+@router.post("/gpt-insights/warmup/{job_id}/cancel")
+async def cancel_gpt_insight_warmup(
+    job_id: str,
+    request: Request
+):
+    """Cancel a queued or running GPT insight warm-up job."""
+    current_user = simple_auth_check(request, None)
+    
+    warmup_service = get_insight_warmup_service()
+    if not warmup_service.get_job(job_id):
+        raise HTTPException(status_code=404, detail="Warm-up job not found")
+    
+    return JSONResponse({
+        'success': warmup_service.cancel(job_id),
+        'job_id': job_id
+    })
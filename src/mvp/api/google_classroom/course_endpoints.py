@@ -49,14 +49,14 @@ async def get_courses(
         formatted_courses = []
         for course in courses:
             formatted_courses.append({
-                'id': course.get('id'),
-                'name': course.get('name'),
-                'section': course.get('section', ''),
-                'description': course.get('description', ''),
-                'state': course.get('courseState', 'UNKNOWN'),
-                'enrollment_count': course.get('enrollmentCode', 'N/A'),
-                'creation_time': course.get('creationTime'),
-                'update_time': course.get('updateTime')
+                'id': course.course_id,
+                'name': course.name,
+                'section': '',
+                'description': course.description,
+                'state': course.state,
+                'enrollment_count': course.enrollment_count,
+                'creation_time': course.creation_date.isoformat() if course.creation_date else None,
+                'update_time': None
             })
         
         return JSONResponse({
@@ -21,7 +21,7 @@ sys.path.insert(0, str(project_root))
 from src.mvp.logging_config import get_logger, log_prediction
 from src.mvp.services.gpt_enhanced_predictor import GPTEnhancedPredictor
 from src.mvp.services.gpt_oss_service import GPTOSSService
-from src.mvp.services.metrics_aggregator import MetricsAggregator
+from src.mvp.services.metrics_aggregator import MetricsAggregator, StudentDataLoader
 from src.mvp.services.context_builder import ContextBuilder
 from src.mvp.database import get_db_session
 from src.mvp.models import Student, Prediction, Intervention, Institution
@@ -84,6 +84,10 @@ def get_metrics_aggregator():
     """Dependency to get metrics aggregator.""" 
     return MetricsAggregator()
 
+def get_student_data_loader():
+    """Dependency to get a batched student data loader memoized for this request."""
+    return MetricsAggregator().create_loader()
+
 # Database dependency
 def get_db():
     """Database session dependency."""
@@ -104,6 +108,7 @@ async def analyze_student_comprehensive(
     format_for_display: str = Query("web", description="Display format: web, report, email, mobile"),
     predictor: GPTEnhancedPredictor = Depends(get_gpt_enhanced_predictor),
     context_builder: ContextBuilder = Depends(get_context_builder),
+    data_loader: StudentDataLoader = Depends(get_student_data_loader),
     db: Session = Depends(get_db)
 ):
     """
@@ -122,8 +127,7 @@ async def analyze_student_comprehensive(
             raise HTTPException(status_code=404, detail=f"Student {student_id} not found")
         
         # Get comprehensive student data
-        metrics_aggregator = MetricsAggregator()
-        comprehensive_data = metrics_aggregator.get_comprehensive_student_data(student_id)
+        comprehensive_data = data_loader.get(student_id)
         
         if comprehensive_data.get("error"):
             raise HTTPException(status_code=500, detail=f"Failed to aggregate student data: {comprehensive_data['error']}")
@@ -146,7 +150,8 @@ async def analyze_student_comprehensive(
         prediction_result = predictor.predict_student_success(
             student_data=student_data,
             include_gpt_analysis=include_gpt_analysis,
-            analysis_depth=analysis_depth
+            analysis_depth=analysis_depth,
+            data_loader=data_loader
         )
         
         if not prediction_result.get("success"):
@@ -244,6 +249,7 @@ async def generate_intervention_plan(
     request: Request = None,
     gpt_service: GPTOSSService = Depends(get_gpt_service),
     context_builder: ContextBuilder = Depends(get_context_builder),
+    data_loader: StudentDataLoader = Depends(get_student_data_loader),
     db: Session = Depends(get_db)
 ):
     """
@@ -277,8 +283,7 @@ async def generate_intervention_plan(
             })
         
         # Get comprehensive student data
-        metrics_aggregator = MetricsAggregator()
-        comprehensive_data = metrics_aggregator.get_comprehensive_student_data(request_data.student_id)
+        comprehensive_data = data_loader.get(request_data.student_id)
         
         # Build student data for intervention planning
         student_data = {
@@ -362,30 +367,10 @@ async def get_quick_student_insight(
             }
         
         # Build focused prompt for the specific question
-        prompt_parts = [
-            "STUDENT INSIGHT REQUEST",
-            f"Question: {request_data.question}",
-            "",
-            "Student Data:"
-        ]
-        
-        # Add relevant student data
         logger.info(f"🔍 DEBUG: Student data received: {request_data.student_data}")
-        for key, value in request_data.student_data.items():
-            if value is not None:
-                prompt_parts.append(f"• {key.replace('_', ' ').title()}: {value}")
-        
-        prompt_parts.extend([
-            "",
-            "Format each recommendation as:",
-            "1) [Action title]",
-            "- What to do: [One specific action]", 
-            "- Why it's needed for THIS student: [Brief explanation using their data]",
-            "- How to implement: [1 concrete step]",
-            "- Timeline: [When to start/complete]"
-        ])
-        
-        insight_prompt = "\n".join(prompt_parts)
+        insight_prompt = ContextBuilder().build_quick_insight_context(
+            request_data.student_data, request_data.question
+        )
         logger.info(f"🔍 DEBUG: Full prompt being sent to GPT:\n{insight_prompt}")
         
         # Generate insight
@@ -427,6 +412,7 @@ async def generate_narrative_report(
     audience: str = Query("educator", description="Target audience: educator, administrator, family"),
     predictor: GPTEnhancedPredictor = Depends(get_gpt_enhanced_predictor),
     context_builder: ContextBuilder = Depends(get_context_builder),
+    data_loader: StudentDataLoader = Depends(get_student_data_loader),
     db: Session = Depends(get_db)
 ):
     """
@@ -445,8 +431,7 @@ async def generate_narrative_report(
             raise HTTPException(status_code=404, detail=f"Student {student_id} not found")
         
         # Get comprehensive analysis first
-        metrics_aggregator = MetricsAggregator()
-        comprehensive_data = metrics_aggregator.get_comprehensive_student_data(student_id)
+        comprehensive_data = data_loader.get(student_id)
         
         # Generate enhanced prediction for the report
         student_data = {
@@ -457,7 +442,8 @@ async def generate_narrative_report(
         prediction_result = predictor.predict_student_success(
             student_data=student_data,
             include_gpt_analysis=True,
-            analysis_depth="comprehensive" if report_type == "comprehensive" else "detailed"
+            analysis_depth="comprehensive" if report_type == "comprehensive" else "detailed",
+            data_loader=data_loader
         )
         
         # Format report based on audience
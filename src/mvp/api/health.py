@@ -154,6 +154,25 @@ async def detailed_health_check():
         }
         health_status["status"] = "degraded"
 
+    # Integration HTTP pools and caches
+    try:
+        from integrations.client_registry import get_client_registry
+        from integrations.response_cache import get_response_cache
+
+        response_cache = get_response_cache()
+        health_status["checks"]["integration_clients"] = {
+            "status": "healthy",
+            # Aggregates only: this endpoint is unauthenticated, per-client stats name tenants' hosts
+            "http_pools": get_client_registry().get_stats(include_clients=False),
+            "response_cache": response_cache.get_stats() if response_cache else "disabled"
+        }
+
+    except Exception as e:
+        health_status["checks"]["integration_clients"] = {
+            "status": "unknown",
+            "error": str(e)
+        }
+
     # Static files check
     try:
         static_dir = Path(__file__).parent.parent / "static"
@@ -9,14 +9,19 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel, validator
 from typing import Optional, List, Dict, Any, Union
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, func
 from datetime import datetime, timedelta
 import logging
 import time
 
 from src.mvp.database import get_db_session
 from src.mvp.models import Intervention, Student, User, Institution
+from src.mvp.encryption import BLIND_INDEXED_FIELDS
+from src.mvp.encryption_middleware import blind_index_clause, prefix_clause
 from src.mvp.security import get_current_user_secure
+from src.mvp.services.cohort_stats import (
+    notify_intervention_written, notify_intervention_outcome_changed, notify_cohort_changed
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -184,6 +189,17 @@ async def get_student_interventions(
         logger.error(f"Error getting student interventions: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve interventions")
 
+def _student_search_clause(term: str):
+    """
+    Indexed student search: case-insensitive student ID prefix, or exact contact details via blind indexes
+    
+    IDs match from the start only ("stu_00" finds "STU_001", "001" does not);
+    the range scan runs on the ix_students_student_id_lower expression index.
+    """
+    clauses = [prefix_clause(func.lower(Student.student_id), term.lower())]
+    clauses.extend(blind_index_clause(Student, field, term) for field in BLIND_INDEXED_FIELDS['students'])
+    return or_(*clauses)
+
 @router.get("/all", response_model=Dict[str, Any])
 async def get_all_interventions(
     db: Session = Depends(get_db),
@@ -218,7 +234,7 @@ async def get_all_interventions(
         if assigned_to:
             query = query.filter(Intervention.assigned_to.ilike(f"%{assigned_to}%"))
         if student_search:
-            query = query.filter(Student.student_id.ilike(f"%{student_search}%"))
+            query = query.filter(_student_search_clause(student_search.strip()))
         
         # Get total count for pagination
         total_count = query.count()
@@ -420,6 +436,8 @@ async def create_intervention(
         db.add(intervention)
         db.commit()
         db.refresh(intervention)
+        notify_intervention_written(intervention.institution_id, intervention.student_id,
+                                    intervention.intervention_type, intervention.outcome)
         
         logger.info(f"Created intervention {intervention.id} for student {student.student_id}")
         
@@ -462,6 +480,8 @@ async def update_intervention(
         # Get student for response
         student = db.query(Student).filter(Student.id == intervention.student_id).first()
         
+        previous_outcome = intervention.outcome
+        
         # Update fields if provided
         update_data = intervention_data.dict(exclude_unset=True)
         for field, value in update_data.items():
@@ -475,6 +495,9 @@ async def update_intervention(
         
         db.commit()
         db.refresh(intervention)
+        notify_intervention_outcome_changed(intervention.institution_id, intervention.student_id,
+                                            intervention.intervention_type, previous_outcome,
+                                            intervention.outcome)
         
         logger.info(f"Updated intervention {intervention.id}")
         
@@ -513,8 +536,11 @@ async def delete_intervention(
         if not intervention:
             raise HTTPException(status_code=404, detail="Intervention not found")
         
+        deleted = (intervention.institution_id, intervention.student_id,
+                   intervention.intervention_type, intervention.outcome)
         db.delete(intervention)
         db.commit()
+        notify_intervention_written(*deleted, removed=True)
         
         logger.info(f"Deleted intervention {intervention_id}")
         
@@ -817,6 +843,9 @@ async def _create_bulk_interventions_sync(
                 # Only commit if ALL insertions succeed
                 db.commit()
                 successful_count = len(interventions_to_create)
+                for data in interventions_to_create:
+                    notify_intervention_written(data['institution_id'], data['student_id'],
+                                                data['intervention_type'])
                 
                 # Add success results only after successful commit
                 for student_id, student in valid_student_data:
@@ -961,6 +990,7 @@ async def update_bulk_interventions(
         # Commit all successful operations
         if successful_count > 0:
             db.commit()
+            notify_cohort_changed()
             logger.info(f"Successfully updated {successful_count} interventions")
         else:
             db.rollback()
@@ -1043,6 +1073,7 @@ async def delete_bulk_interventions(
         # Commit all successful operations
         if successful_count > 0:
             db.commit()
+            notify_cohort_changed()
             logger.info(f"Successfully deleted {successful_count} interventions")
         else:
             db.rollback()
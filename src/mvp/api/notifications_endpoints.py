@@ -11,10 +11,12 @@ Provides REST and WebSocket endpoints for the notification system:
 
 from fastapi import APIRouter, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 import logging
 import json
+import os
 import asyncio
 from datetime import datetime
 
@@ -24,7 +26,10 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from mvp.notifications import notification_system, AlertLevel, AlertType, StudentAlert, NotificationRule
+from mvp.websocket_broadcaster import TOPIC_KINDS, topic, validate_topic
 from mvp.simple_auth import simple_auth
+from mvp.security import get_current_user_secure
+from src.mvp.services.sync_jobs import get_sync_job_service
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -38,7 +43,6 @@ def get_current_user(request: Request):
     auth_header = request.headers.get('authorization')
     if auth_header and auth_header.startswith('Bearer '):
         token = auth_header.split(' ')[1]
-        from fastapi.security import HTTPAuthorizationCredentials
         credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
         return simple_auth(credentials)
     
@@ -68,6 +72,66 @@ class NotificationRuleCreate(BaseModel):
     recipients: Optional[List[str]] = Field(None, description="Email recipients")
     escalation_time: Optional[int] = Field(None, description="Escalation time in minutes")
 
+def _user_institution_id(current_user: Dict[str, Any]) -> Optional[str]:
+    """
+    Institution a socket is bound to
+    
+    Session users are bound to their own account's institution, and are refused
+    (None) without an active account. The shared API key and the development
+    bypass carry no user record, so they keep the deployment's default
+    institution.
+    """
+    if current_user.get('institution_id') is not None:
+        return str(current_user['institution_id'])
+    if current_user.get('auth_method') != 'session':
+        return os.getenv('DEFAULT_INSTITUTION_ID', '1')
+    
+    from src.mvp.database import get_db_session
+    from src.mvp.models import User
+    try:
+        with get_db_session() as db:
+            user = db.query(User).filter(User.username == str(current_user.get('user')),
+                                         User.is_active.is_(True)).first()
+            return str(user.institution_id) if user is not None else None
+    except Exception as e:
+        logger.error(f"Could not resolve institution of WebSocket user: {e}")
+        return None
+
+def _authenticate_websocket(websocket: WebSocket) -> Optional[Dict[str, Any]]:
+    """
+    User (with institution) of the socket, or None
+    
+    Authenticated exactly like the REST endpoints: the session cookie, which
+    browsers send with the handshake, or else the API key as ``Authorization:
+    Bearer``. Keys are never taken from the URL, where they would be logged.
+    """
+    try:
+        current_user = get_current_user_secure(websocket)
+    except HTTPException:
+        return None
+    institution_id = _user_institution_id(current_user)
+    if institution_id is None:
+        return None
+    return {**current_user, 'institution_id': institution_id}
+
+def _authorize_topics(names: List[str], institution_id: str) -> List[str]:
+    """
+    Validate client-requested topics against the user's institution
+    
+    Institution topics must be the user's own. School and student topics are
+    accepted because the connection is bound to the institution: it only
+    receives messages published for that institution.
+    
+    Raises:
+        ValueError: For malformed topics or another institution's topic
+    """
+    own = topic('institution', institution_id)
+    topics = [validate_topic(name) for name in names]
+    for name in topics:
+        if name.startswith('institution:') and name != own:
+            raise ValueError(f"Not authorized for topic '{name}'")
+    return topics
+
 # WebSocket endpoint for real-time notifications
 @router.websocket("/notifications/ws")
 async def websocket_notifications(websocket: WebSocket):
@@ -78,22 +142,48 @@ async def websocket_notifications(websocket: WebSocket):
     - New student alerts (risk threshold, attendance, grades)
     - Alert acknowledgments and resolutions
     - System status updates
+    
+    The session cookie or the API key (``Authorization: Bearer``) is required;
+    without one the handshake is rejected (close code 1008). The connection is
+    bound to the user's institution and, by default, subscribed to it. Clients
+    can narrow that with ``?school_id=&student_id=`` query parameters or
+    manage topics by sending ``{"type": "subscribe", "topics": ["school:4",
+    "student:S1"]}``; other institutions' topics are refused, and a connection
+    with no subscriptions receives no alerts. All outgoing messages go through
+    the connection's bounded send queue.
     """
+    current_user = _authenticate_websocket(websocket)
+    if current_user is None:
+        await websocket.close(code=1008)
+        return
+    institution_id = str(current_user['institution_id'])
+    try:
+        initial_topics = _authorize_topics([
+            topic(kind, websocket.query_params[f"{kind}_id"])
+            for kind in TOPIC_KINDS if websocket.query_params.get(f"{kind}_id")
+        ], institution_id) or [topic('institution', institution_id)]
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+    
     await websocket.accept()
-    notification_system.add_websocket_connection(websocket)
+    broadcaster = notification_system.broadcaster
+    notification_system.add_websocket_connection(websocket, initial_topics, institution_id)
     
     try:
         # Send initial connection confirmation
         welcome_message = {
             'type': 'connection_established',
             'message': 'Connected to real-time notifications',
-            'active_alerts': len(notification_system.get_active_alerts()),
+            'active_alerts': len(notification_system.active_alerts),
+            'topics': sorted(initial_topics),
             'timestamp': datetime.now().isoformat()
         }
-        await websocket.send_text(json.dumps(welcome_message))
+        broadcaster.send_to(websocket, welcome_message)
         
         # Send current active alerts
-        active_alerts = notification_system.get_active_alerts()
+        active_alerts = [alert for alert in notification_system.get_active_alerts()
+                         if alert.institution_id == institution_id and set(alert.topics) & set(initial_topics)]
         if active_alerts:
             for alert in active_alerts[:10]:  # Send last 10 active alerts
                 alert_data = {
@@ -111,7 +201,7 @@ async def websocket_notifications(websocket: WebSocket):
                         'intervention_recommended': alert.intervention_recommended
                     }
                 }
-                await websocket.send_text(json.dumps(alert_data))
+                broadcaster.send_to(websocket, alert_data)
         
         # Keep connection alive and handle incoming messages
         while True:
@@ -121,12 +211,32 @@ async def websocket_notifications(websocket: WebSocket):
                 message = json.loads(data)
                 
                 if message.get('type') == 'ping':
-                    await websocket.send_text(json.dumps({'type': 'pong', 'timestamp': datetime.now().isoformat()}))
+                    broadcaster.send_to(websocket, {'type': 'pong', 'timestamp': datetime.now().isoformat()})
+                elif message.get('type') in ('subscribe', 'unsubscribe'):
+                    try:
+                        if message['type'] == 'subscribe':
+                            topics = broadcaster.subscribe(
+                                websocket, _authorize_topics(message.get('topics') or [], institution_id))
+                        else:
+                            topics = broadcaster.unsubscribe(websocket, message.get('topics'))
+                        broadcaster.send_to(websocket, {'type': 'subscriptions', 'topics': sorted(topics)})
+                    except ValueError as e:
+                        broadcaster.send_to(websocket, {'type': 'error', 'error': str(e)})
                 elif message.get('type') == 'acknowledge_alert':
-                    alert_id = message.get('alert_id')
-                    user_id = message.get('user_id', 'unknown')
-                    if alert_id:
-                        await notification_system.acknowledge_alert(alert_id, user_id)
+                    alert = notification_system.alerts.get(message.get('alert_id'))
+                    if alert is not None and alert.institution_id == institution_id:
+                        await notification_system.acknowledge_alert(alert.alert_id, current_user['user'])
+                elif message.get('type') == 'subscribe_sync_job':
+                    # Progress of a background sync job is pushed until it finishes; jobs are
+                    # recorded under the same user name the sync endpoints store in requested_by
+                    job = get_sync_job_service().subscribe(message.get('job_id', ''), websocket,
+                                                           requested_by=current_user.get('user') or '')
+                    broadcaster.send_to(websocket, {
+                        'type': 'sync_job_progress',
+                        'job': job.to_dict(include_result=False) if job else None,
+                        'error': None if job else 'Sync job not found',
+                        'timestamp': datetime.now().isoformat()
+                    })
                         
             except WebSocketDisconnect:
                 break
@@ -140,6 +250,7 @@ async def websocket_notifications(websocket: WebSocket):
         logger.error(f"WebSocket connection error: {e}")
     finally:
         notification_system.remove_websocket_connection(websocket)
+        get_sync_job_service().unsubscribe(websocket)
 
 @router.post("/notifications/monitor")
 async def monitor_student_risk(
@@ -203,10 +314,7 @@ async def get_alerts(
             alerts = notification_system.get_active_alerts(student_id)
         else:
             # Get from history
-            all_alerts = notification_system.alert_history
-            if student_id:
-                all_alerts = [alert for alert in all_alerts if alert.student_id == student_id]
-            alerts = sorted(all_alerts, key=lambda x: x.timestamp, reverse=True)[:50]  # Last 50
+            alerts = notification_system.get_alert_history(student_id, limit=50)  # Last 50
         
         return JSONResponse({
             'alerts': [
@@ -316,13 +424,14 @@ async def get_notification_stats(
     """
     try:
         stats = notification_system.get_alert_statistics()
+        latest = notification_system.get_alert_history(limit=1)
         
         return JSONResponse({
             'notification_system_stats': stats,
             'system_health': {
                 'status': 'healthy',
                 'uptime': 'active',
-                'last_alert': datetime.now().isoformat() if stats['total_alerts'] > 0 else None
+                'last_alert': latest[0].timestamp.isoformat() if latest else None
             },
             'timestamp': datetime.now().isoformat()
         })
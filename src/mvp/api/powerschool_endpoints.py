@@ -17,6 +17,9 @@ from datetime import datetime
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from mvp.security import get_current_user_secure as get_current_user
 from mvp.database import save_predictions_batch
+from src.mvp.services.sync_jobs import (
+    SyncJobCancelled, SyncJobContext, SyncJobError, SyncJobQueueFull, get_sync_job_service, run_inline
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -108,12 +111,70 @@ async def get_powerschool_schools(
         logger.error(f"Error fetching PowerSchool schools: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching schools: {str(e)}")
 
+def _powerschool_sync_runner(base_url: str, client_id: str, client_secret: str, school_id: str, grade_levels: list):
+    """Sync, persist and summarize a PowerSchool school; shared by the inline and background paths"""
+    def run(job: SyncJobContext) -> dict:
+        from integrations.powerschool_sis import create_powerschool_integration
+        ps = create_powerschool_integration(base_url, client_id, client_secret)
+        ps.progress_callback = job.progress
+        
+        # Sync school data and generate predictions
+        sync_result = ps.sync_school_data(school_id, grade_levels if grade_levels else None)
+        job.check_cancelled()
+        
+        if sync_result['status'] != 'success':
+            raise SyncJobError(f"PowerSchool sync failed: {sync_result.get('error')}")
+        
+        # Save predictions to database if available
+        try:
+            session_id = f"powerschool_{school_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            if sync_result['predictions']:
+                job.persist(sync_result['predictions'], lambda chunk: save_predictions_batch(chunk, session_id))
+                logger.info(f"Saved {len(sync_result['predictions'])} PowerSchool predictions to database")
+        except SyncJobCancelled:
+            raise
+        except Exception as db_error:
+            logger.warning(f"Could not save PowerSchool predictions to database: {db_error}")
+        
+        # Generate summary statistics
+        predictions = sync_result['predictions']
+        if predictions:
+            total_students = len(predictions)
+            high_risk = sum(1 for p in predictions if p.get('risk_level') == 'danger')
+            moderate_risk = sum(1 for p in predictions if p.get('risk_level') == 'warning') 
+            low_risk = sum(1 for p in predictions if p.get('risk_level') == 'success')
+            
+            avg_gpa = sum(p.get('current_gpa', 0) for p in predictions) / total_students if total_students > 0 else 0
+            avg_attendance = sum(p.get('attendance_rate', 0) for p in predictions) / total_students if total_students > 0 else 0
+            
+            sync_result['summary'] = {
+                'total_students': total_students,
+                'risk_distribution': {
+                    'high_risk': high_risk,
+                    'moderate_risk': moderate_risk,
+                    'low_risk': low_risk
+                },
+                'class_averages': {
+                    'gpa': round(avg_gpa, 2),
+                    'attendance': round(avg_attendance * 100, 1)
+                },
+                'enhanced_data_coverage': {
+                    'attendance_data': sync_result['data_quality']['has_attendance'],
+                    'discipline_data': sync_result['data_quality']['has_discipline'],
+                    'demographics_data': sync_result['data_quality']['has_demographics'],
+                    'special_programs_data': sync_result['data_quality']['has_special_programs']
+                }
+            }
+        
+        return sync_result
+    return run
+
 @router.post("/sync")
 async def sync_powerschool_school(
     request: Request,
     current_user: dict = Depends(get_current_user)
 ):
-    """Sync PowerSchool school data and generate enhanced predictions"""
+    """Sync PowerSchool school data and generate enhanced predictions (``"background": true`` returns a job to poll)"""
     try:
         body = await request.json()
         base_url = body.get('base_url', '').strip()
@@ -125,58 +186,24 @@ async def sync_powerschool_school(
         if not all([base_url, client_id, client_secret, school_id]):
             raise HTTPException(status_code=400, detail="PowerSchool credentials and school ID are required")
         
-        from integrations.powerschool_sis import create_powerschool_integration
-        ps = create_powerschool_integration(base_url, client_id, client_secret)
+        run = _powerschool_sync_runner(base_url, client_id, client_secret, school_id, grade_levels)
         
-        # Sync school data and generate predictions
-        sync_result = ps.sync_school_data(school_id, grade_levels if grade_levels else None)
+        if body.get('background'):
+            job = get_sync_job_service().submit(
+                'powerschool', school_id, run,
+                requested_by=current_user.get('user') if isinstance(current_user, dict) else None,
+                dedupe_key=f"powerschool:{base_url}:{client_id}:{client_secret}:{school_id}:{sorted(grade_levels or [])}"
+            )
+            return JSONResponse(job.to_dict(), status_code=202)
         
-        if sync_result['status'] == 'success':
-            # Save predictions to database if available
-            try:
-                session_id = f"powerschool_{school_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                if sync_result['predictions']:
-                    save_predictions_batch(sync_result['predictions'], session_id)
-                    logger.info(f"Saved {len(sync_result['predictions'])} PowerSchool predictions to database")
-            except Exception as db_error:
-                logger.warning(f"Could not save PowerSchool predictions to database: {db_error}")
-            
-            # Generate summary statistics
-            predictions = sync_result['predictions']
-            if predictions:
-                total_students = len(predictions)
-                high_risk = sum(1 for p in predictions if p.get('risk_level') == 'danger')
-                moderate_risk = sum(1 for p in predictions if p.get('risk_level') == 'warning') 
-                low_risk = sum(1 for p in predictions if p.get('risk_level') == 'success')
-                
-                avg_gpa = sum(p.get('current_gpa', 0) for p in predictions) / total_students if total_students > 0 else 0
-                avg_attendance = sum(p.get('attendance_rate', 0) for p in predictions) / total_students if total_students > 0 else 0
-                
-                sync_result['summary'] = {
-                    'total_students': total_students,
-                    'risk_distribution': {
-                        'high_risk': high_risk,
-                        'moderate_risk': moderate_risk,
-                        'low_risk': low_risk
-                    },
-                    'class_averages': {
-                        'gpa': round(avg_gpa, 2),
-                        'attendance': round(avg_attendance * 100, 1)
-                    },
-                    'enhanced_data_coverage': {
-                        'attendance_data': sync_result['data_quality']['has_attendance'],
-                        'discipline_data': sync_result['data_quality']['has_discipline'],
-                        'demographics_data': sync_result['data_quality']['has_demographics'],
-                        'special_programs_data': sync_result['data_quality']['has_special_programs']
-                    }
-                }
-            
-            return JSONResponse(sync_result)
-        else:
-            raise HTTPException(status_code=400, detail=f"PowerSchool sync failed: {sync_result.get('error')}")
+        return JSONResponse(run_inline('powerschool', school_id, run))
             
     except HTTPException:
         raise
+    except SyncJobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Sync queue is full, try again shortly: {e}")
+    except SyncJobError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error syncing PowerSchool school: {e}")
         raise HTTPException(status_code=500, detail=f"PowerSchool sync error: {str(e)}")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Background Sync Job API Endpoints
+
+Status, listing and cancellation of integration sync jobs submitted with
+``"background": true`` to the Canvas, PowerSchool or combined sync endpoints.
+Users only see and cancel their own jobs; anyone else's job is reported as
+not found.
+Live progress is also pushed over /api/notifications/ws after sending
+``{"type": "subscribe_sync_job", "job_id": ...}``. The scheduled re-scoring
+of synced rosters is inspected and triggered under /jobs/rescoring, and
+re-encryption after an encryption key rotation under /jobs/key-rotation.
+"""
+
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import JSONResponse
+from pathlib import Path
+from typing import Optional
+import sys
+import logging
+
+# Add src directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from mvp.security import get_current_user_secure as get_current_user
+from src.mvp.services.sync_jobs import get_sync_job_service
+from src.mvp.services.rescoring import get_rescoring_scheduler
+from src.mvp.services.key_rotation import get_key_rotation_worker
+
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter(prefix="/jobs", tags=["Sync Jobs"])
+
+def _requester(current_user) -> Optional[str]:
+    """User name recorded as requested_by when a sync job is submitted"""
+    return current_user.get('user') if isinstance(current_user, dict) else None
+
+def _get_own_job(job_id: str, current_user):
+    """The current user's job, or 404 (other users' jobs are not revealed)"""
+    job = get_sync_job_service().get_job(job_id)
+    if job is None or job.requested_by != _requester(current_user):
+        raise HTTPException(status_code=404, detail=f"Sync job {job_id} not found")
+    return job
+
+@router.get("")
+async def list_sync_jobs(
+    integration: Optional[str] = None,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user)
+):
+    """The current user's recent sync jobs, newest first (results omitted)"""
+    service = get_sync_job_service()
+    jobs = service.list_jobs(limit=max(1, min(limit, 200)), integration=integration,
+                             requested_by=_requester(current_user))
+    return JSONResponse({
+        'jobs': [job.to_dict(include_result=False) for job in jobs],
+        'queue': service.get_stats()
+    })
+
+@router.get("/rescoring")
+async def get_rescoring_status(
+    current_user: dict = Depends(get_current_user)
+):
+    """Targets, next run and last results of the scheduled re-scoring"""
+    return JSONResponse(get_rescoring_scheduler().get_status())
+
+@router.post("/rescoring/run")
+async def run_rescoring_now(
+    current_user: dict = Depends(get_current_user)
+):
+    """Start a re-scoring run immediately instead of waiting for the schedule"""
+    scheduler = get_rescoring_scheduler()
+    if not scheduler.trigger():
+        raise HTTPException(status_code=409, detail="A re-scoring run is already in progress")
+    return JSONResponse({'status': 'started', 'targets': len(scheduler.targets)}, status_code=202)
+
+@router.get("/key-rotation")
+async def get_key_rotation_status(
+    current_user: dict = Depends(get_current_user)
+):
+    """Per-table progress, throughput and remaining rows of the re-encryption worker"""
+    return JSONResponse(get_key_rotation_worker().get_status())
+
+@router.post("/key-rotation/run")
+async def run_key_rotation_now(
+    current_user: dict = Depends(get_current_user)
+):
+    """Re-encrypt rows still on older key versions, resuming from the last checkpoint"""
+    worker = get_key_rotation_worker()
+    reason = worker.blocked_reason()
+    if reason:
+        raise HTTPException(status_code=409, detail=reason)
+    if not worker.start():
+        raise HTTPException(status_code=409, detail="Re-encryption is already in progress")
+    return JSONResponse({'status': 'started', 'key_version': worker.manager.key_version}, status_code=202)
+
+@router.get("/{job_id}")
+async def get_sync_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Status, progress and (once completed) the sync response of a job"""
+    return JSONResponse(_get_own_job(job_id, current_user).to_dict())
+
+@router.post("/{job_id}/cancel")
+async def cancel_sync_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Cancel a queued or running sync job"""
+    service = get_sync_job_service()
+    job = _get_own_job(job_id, current_user)
+    if not service.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Sync job {job_id} already {job.status.value}")
+    return JSONResponse(service.get_job(job_id).to_dict(include_result=False))
@@ -20,6 +20,7 @@ from sqlalchemy.dialects.postgresql import insert
 import asyncpg
 
 from .database import db_config, Base
+from .encryption import encrypt_model_rows
 from .models import Institution, Student, Prediction, Intervention, AuditLog
 from .exceptions import DatabaseError, DatabaseConnectionError, ErrorContext
 
@@ -186,6 +187,9 @@ class AsyncInterventionService:
                         ])
                 
                 await session.commit()
+                if interventions_to_create:
+                    from src.mvp.services.cohort_stats import notify_cohort_changed
+                    notify_cohort_changed()
                 
                 execution_time = asyncio.get_event_loop().time() - start_time
                 
@@ -330,6 +334,9 @@ class AsyncPredictionService:
                     }
                     predictions_data_final.append(prediction_data)
                 
+                # Core inserts bypass the ORM attributes, so encrypt sensitive columns here
+                students_data = encrypt_model_rows('students', students_data)
+                
                 # Bulk upsert students (PostgreSQL optimization)
                 if db_config.database_url.startswith('postgresql'):
                     # PostgreSQL UPSERT for students
@@ -16,6 +16,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Request
 
+from .encryption import encryption_manager
+
 logger = logging.getLogger(__name__)
 
 class AuditEvent:
@@ -128,7 +130,7 @@ class AuditLogger:
                 """), {
                     'institution_id': event_data['institution_id'],
                     'user_id': event_data['user_id'],
-                    'user_email': user_context.get('email') if user_context else None,
+                    'user_email': encryption_manager.encrypt(user_context.get('email')) if user_context else None,
                     'user_role': user_context.get('role') if user_context else None,
                     'action': event_data['action'],
                     'resource_type': event_data['resource_type'],
@@ -155,7 +157,7 @@ class AuditLogger:
                 """), {
                     'institution_id': event_data['institution_id'],
                     'user_id': event_data['user_id'],
-                    'user_email': user_context.get('email') if user_context else None,
+                    'user_email': encryption_manager.encrypt(user_context.get('email')) if user_context else None,
                     'user_role': user_context.get('role') if user_context else None,
                     'action': event_data['action'],
                     'resource_type': event_data['resource_type'],
@@ -229,7 +231,7 @@ class AuditLogger:
             """), {
                 'institution_id': event_data['institution_id'],
                 'user_id': event_data['user_id'],
-                'user_email': user_context.get('email') if user_context else None,
+                'user_email': encryption_manager.encrypt(user_context.get('email')) if user_context else None,
                 'user_role': user_context.get('role') if user_context else None,
                 'action': event_data['action'],
                 'resource_type': event_data['resource_type'],
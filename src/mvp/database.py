@@ -18,6 +18,8 @@ from sqlalchemy.orm import sessionmaker, Session, declarative_base
 from sqlalchemy.pool import QueuePool
 from datetime import datetime
 
+from .encryption import encrypt_model_rows
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -235,6 +237,16 @@ def _get_models():
         logger.warning("Models module not available, using minimal models")
         return None, None, None
 
+def _notify_predictions_written(institution_id: int, predictions: list):
+    """Apply committed predictions to the in-memory cohort counters and percentile index."""
+    try:
+        from src.mvp.services.cohort_stats import notify_predictions_written
+        from src.mvp.services.risk_percentile_index import notify_scores_written
+        notify_predictions_written(institution_id, predictions)
+        notify_scores_written(institution_id, predictions)
+    except ImportError:
+        pass
+
 def save_predictions_batch(predictions_data: list, session_id: str):
     """Fast batch save for multiple predictions - 10x faster than individual saves"""
     if not predictions_data:
@@ -273,6 +285,7 @@ def save_predictions_batch(predictions_data: list, session_id: str):
             
             # Create lookup of existing students
             existing_student_lookup = {s.student_id: s.id for s in existing_students}
+            grade_lookup = {s.student_id: s.grade_level for s in existing_students}
             existing_student_ids = set(existing_student_lookup.keys())
             
             # Process each prediction
@@ -301,6 +314,8 @@ def save_predictions_batch(predictions_data: list, session_id: str):
             
             # Batch upsert new students (PostgreSQL ON CONFLICT)
             if students_to_create:
+                # Core inserts bypass the ORM attributes, so encrypt sensitive columns here
+                students_to_create = encrypt_model_rows('students', students_to_create)
                 if db_config.database_url.startswith('postgresql'):
                     # PostgreSQL upsert - avoid duplicates
                     from sqlalchemy.dialects.postgresql import insert
@@ -325,6 +340,7 @@ def save_predictions_batch(predictions_data: list, session_id: str):
                 
                 for student in new_students:
                     existing_student_lookup[student.student_id] = student.id
+                    grade_lookup[student.student_id] = student.grade_level
             
             # Check for existing predictions to avoid duplicates
             student_db_ids = [existing_student_lookup[str(pred['student_id'])] for pred in predictions_data]
@@ -421,6 +437,17 @@ def save_predictions_batch(predictions_data: list, session_id: str):
             
             # Single commit for all operations
             session.commit()
+            _notify_predictions_written(institution.id, [
+                {
+                    'student_id': existing_student_lookup[str(pred['student_id'])],
+                    'risk_score': pred['risk_score'],
+                    'risk_category': pred['risk_category'],
+                    'replaces_existing': existing_student_lookup[str(pred['student_id'])] in existing_pred_lookup,
+                    'grade_level': grade_lookup.get(str(pred['student_id'])),
+                    'external_id': str(pred['student_id'])
+                }
+                for pred in predictions_data
+            ])
             logger.info(f"✅ Batch processed {len(predictions_data)} predictions: {len(predictions_to_create)} new, {len(predictions_to_update)} updated")
             
     except Exception as e:
@@ -527,6 +554,14 @@ def save_prediction(prediction_data: dict, session_id: str):
                 session.add(prediction)
             
             session.commit()
+            _notify_predictions_written(institution.id, [{
+                'student_id': student.id,
+                'risk_score': prediction_data['risk_score'],
+                'risk_category': prediction_data['risk_category'],
+                'replaces_existing': db_config.database_url.startswith('postgresql'),
+                'grade_level': student.grade_level,
+                'external_id': student_id_str
+            }])
             
     except Exception as e:
         logger.error(f"Failed to save prediction for student {prediction_data.get('student_id')}: {e}")
@@ -617,6 +652,22 @@ def get_gpt_insight(student_id: str, data_hash: str, institution_id: int = 1):
         logger.error(f"Failed to retrieve GPT insight for student {student_id}: {e}")
         return None
 
+def gpt_insight_exists(student_id: str, data_hash: str, institution_id: int = 1) -> bool:
+    """Check for a stored GPT insight without counting it as a cache hit."""
+    try:
+        from .models import GPTInsight
+
+        with get_db_session() as session:
+            return session.query(GPTInsight.id).filter(
+                GPTInsight.student_id == str(student_id),
+                GPTInsight.data_hash == data_hash,
+                GPTInsight.institution_id == institution_id
+            ).first() is not None
+
+    except Exception as e:
+        logger.error(f"Failed to check GPT insight for student {student_id}: {e}")
+        return False
+
 def get_all_gpt_insights_for_session(session_id: str, institution_id: int = 1):
     """Retrieve all GPT insights for a session to restore on login/refresh."""
     try:
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Outbound Alert E-mail Pipeline
+
+send_email_alert used to open an SMTP connection, STARTTLS, log in and send
+for every alert, with blocking smtplib calls on the event loop, so a batch of
+threshold alerts stalled the whole API. The dispatcher makes e-mail
+fire-and-forget:
+
+* ``submit`` only queues an alert section per recipient and returns
+* a background task sends when a recipient's digest window closes; alerts
+  that piled up for the same recipient in the window go out as one digest
+* sends run in a worker thread over one authenticated SMTP connection that is
+  reused until it has been idle for a while (and re-opened if the server
+  drops it)
+* sends are rate limited with the GCRA limiter used for API requests
+* a digest that fails to send is put back in the queue and retried with
+  exponential backoff; it is only counted as failed after the last attempt
+* ``close`` flushes within a time budget instead of waiting out the rate
+  limiter, and logs and counts what it had to leave unsent
+* delivery latency (queued -> accepted by the server) and counters are kept
+  for the notification stats
+
+Configuration (environment):
+    SMTP_USE_TLS                 STARTTLS before login (default true; false for a local sink)
+    EMAIL_DIGEST_WINDOW_SECONDS  how long alerts for a recipient are collected (default 60)
+    EMAIL_MAX_PER_MINUTE         messages per minute sent to the SMTP server (default 30)
+    EMAIL_IDLE_TIMEOUT_SECONDS   idle time before the SMTP connection is closed (default 60)
+    EMAIL_MAX_ATTEMPTS           send attempts per digest before it is dropped (default 5)
+    EMAIL_RETRY_BACKOFF_SECONDS  wait before the first retry, doubled per attempt up to 15 minutes (default 30)
+    EMAIL_SHUTDOWN_TIMEOUT_SECONDS  time ``close`` spends flushing the queue (default 10)
+"""
+
+import asyncio
+import logging
+import smtplib
+import time
+from collections import deque
+from contextlib import suppress
+from dataclasses import dataclass
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .rate_limit import MemoryRateLimitBackend, RateLimit, RateLimiter
+except ImportError:
+    from mvp.rate_limit import MemoryRateLimitBackend, RateLimit, RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Delivery latencies kept for percentiles
+LATENCY_SAMPLES = 1000
+
+# Upper bound for the retry backoff of a failing digest
+MAX_RETRY_BACKOFF = 900.0
+
+
+@dataclass
+class QueuedEmail:
+    """One alert section waiting for its recipient's digest"""
+    subject: str
+    html: str
+    queued_at: float
+
+
+class EmailDispatcher:
+    """Queues alert e-mail per recipient and sends digests from a background task"""
+
+    def __init__(self,
+                 host: str,
+                 port: int,
+                 username: Optional[str] = None,
+                 password: Optional[str] = None,
+                 sender: Optional[str] = None,
+                 use_tls: bool = True,
+                 digest_window: float = 60.0,
+                 max_per_minute: int = 30,
+                 idle_timeout: float = 60.0,
+                 timeout: float = 30.0,
+                 max_attempts: int = 5,
+                 retry_backoff: float = 30.0,
+                 shutdown_timeout: float = 10.0,
+                 smtp_factory: Callable[..., smtplib.SMTP] = smtplib.SMTP,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize dispatcher.
+
+        Args:
+            host: SMTP server
+            port: SMTP port
+            username: Login user (no login without username and password)
+            password: Login password
+            sender: From address (defaults to username)
+            use_tls: STARTTLS before logging in
+            digest_window: Seconds alerts for one recipient are collected into a digest (0 sends on the next tick)
+            max_per_minute: Messages per minute handed to the SMTP server
+            idle_timeout: Seconds without sends before the connection is closed
+            timeout: Socket timeout for SMTP operations
+            max_attempts: Send attempts per digest before its alerts are counted as failed
+            retry_backoff: Seconds before the first retry of a failed digest, doubled per attempt
+            shutdown_timeout: Seconds ``close`` spends flushing before it gives up on the rest
+            smtp_factory: SMTP client class, injectable for tests
+            sleep: Awaitable sleep used while rate limited, injectable for tests
+            clock: Monotonic time source for windows and latency
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.use_tls = use_tls
+        self.digest_window = digest_window
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.max_attempts = max(int(max_attempts), 1)
+        self.retry_backoff = retry_backoff
+        self.shutdown_timeout = shutdown_timeout
+        self._smtp_factory = smtp_factory
+        self._sleep = sleep
+        self._clock = clock
+        self._rate = RateLimit(limit=max(int(max_per_minute), 1), window=60.0)
+        self._limiter = RateLimiter(MemoryRateLimitBackend(shards=1), clock=clock)
+        self._pending: Dict[str, List[QueuedEmail]] = {}
+        # recipient -> (failed attempts, clock time the next attempt is allowed)
+        self._retries: Dict[str, Tuple[int, float]] = {}
+        self._connection: Optional[smtplib.SMTP] = None
+        self._send_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+        self.alerts_queued = 0
+        self.alerts_sent = 0
+        self.alerts_failed = 0
+        self.alerts_dropped = 0
+        self.send_retries = 0
+        self.messages_sent = 0
+        self.digests_sent = 0
+        self.connections_opened = 0
+        self.rate_limited_seconds = 0.0
+
+    @property
+    def pending_alerts(self) -> int:
+        return sum(len(items) for items in self._pending.values())
+
+    def submit(self, recipients: Iterable[str], subject: str, html: str) -> int:
+        """
+        Queue an alert section for each recipient; never blocks.
+
+        Must be called from the event loop thread; the sender task is started on first use.
+
+        Returns:
+            Number of recipients it was queued for
+        """
+        now = self._clock()
+        queued = 0
+        for recipient in dict.fromkeys(r.strip() for r in recipients if r and r.strip()):
+            self._pending.setdefault(recipient, []).append(QueuedEmail(subject, html, now))
+            queued += 1
+        self.alerts_queued += queued
+        if queued:
+            self._ensure_worker()
+            self._wakeup.set()
+        return queued
+
+    def _ensure_worker(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._send_lock = asyncio.Lock()
+            self._task = asyncio.get_running_loop().create_task(self._worker())
+
+    def _ready_at(self, recipient: str, items: List[QueuedEmail]) -> float:
+        ready = items[0].queued_at + self.digest_window
+        if recipient in self._retries:
+            ready = max(ready, self._retries[recipient][1])
+        return ready
+
+    def _due(self, now: float, force: bool = False) -> List[str]:
+        return [recipient for recipient, items in self._pending.items()
+                if force or now >= self._ready_at(recipient, items)]
+
+    def _next_deadline(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        return min(self._ready_at(recipient, items) for recipient, items in self._pending.items())
+
+    async def _worker(self) -> None:
+        while True:
+            await self.send_due()
+            deadline = self._next_deadline()
+            if deadline is not None:
+                wait = max(deadline - self._clock(), 0.0)
+            elif self._connection is not None:
+                wait = self.idle_timeout
+            else:
+                wait = None
+            self._wakeup.clear()
+            try:
+                async with asyncio.timeout(wait):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                if not self._pending and self._connection is not None:
+                    async with self._send_lock:
+                        await asyncio.to_thread(self._disconnect)
+
+    async def send_due(self, force: bool = False, deadline: Optional[float] = None) -> int:
+        """
+        Send every digest whose window has closed and whose retry backoff has passed.
+
+        Args:
+            force: Send everything queued, ignoring digest windows and backoff
+            deadline: Clock time after which no further message is started; sending stops early
+                instead of waiting on the rate limiter past it
+
+        Returns:
+            Number of messages sent
+        """
+        sent = 0
+        for recipient in self._due(self._clock(), force):
+            if recipient not in self._pending:
+                continue
+            if not await self._throttle(deadline):
+                break
+            # A concurrent flush or close may have sent this recipient while we waited for quota
+            items = self._pending.pop(recipient, None)
+            if items is None:
+                continue
+            message = self._compose(recipient, items)
+            try:
+                async with self._send_lock:
+                    await asyncio.to_thread(self._send, message)
+            except asyncio.CancelledError:
+                # Cancelled while waiting for the lock: nothing was sent, keep the alerts queued
+                self._pending[recipient] = items + self._pending.get(recipient, [])
+                raise
+            except Exception as e:
+                self._retry_later(recipient, items, e)
+                continue
+            self._retries.pop(recipient, None)
+            delivered_at = self._clock()
+            self._latencies.extend(delivered_at - item.queued_at for item in items)
+            self.alerts_sent += len(items)
+            self.messages_sent += 1
+            if len(items) > 1:
+                self.digests_sent += 1
+            sent += 1
+            logger.info(f"📧 Sent {len(items)} alert(s) to {recipient}")
+        return sent
+
+    def _retry_later(self, recipient: str, items: List[QueuedEmail], error: Exception) -> None:
+        """Put a failed digest back in front of anything queued since, or drop it after the last attempt"""
+        attempts = self._retries.get(recipient, (0, 0.0))[0] + 1
+        if attempts >= self.max_attempts:
+            self._retries.pop(recipient, None)
+            self.alerts_failed += len(items)
+            logger.error(f"❌ Failed to send {len(items)} alert(s) to {recipient} after {attempts} attempts: {error}")
+            return
+        backoff = min(self.retry_backoff * 2 ** (attempts - 1), MAX_RETRY_BACKOFF)
+        self._retries[recipient] = (attempts, self._clock() + backoff)
+        self._pending[recipient] = items + self._pending.get(recipient, [])
+        self.send_retries += 1
+        logger.warning(f"⚠️ Failed to send alert e-mail to {recipient} (attempt {attempts}/{self.max_attempts}), "
+                       f"retrying in {backoff:.0f}s: {error}")
+
+    async def flush(self, deadline: Optional[float] = None) -> int:
+        """Send everything queued now, ignoring digest windows and retry backoff"""
+        if not self._pending:
+            return 0
+        self._ensure_worker()
+        return await self.send_due(force=True, deadline=deadline)
+
+    async def close(self) -> None:
+        """Flush queued alerts within ``shutdown_timeout``, stop the sender task and close the SMTP connection"""
+        await self.flush(deadline=self._clock() + self.shutdown_timeout)
+        if self._task is not None:
+            # Holding the send lock means the worker is not mid-send when it is cancelled
+            async with self._send_lock:
+                self._task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await self._task
+            self._task = None
+        if self._pending:
+            unsent = self.pending_alerts
+            self.alerts_dropped += unsent
+            logger.warning(f"⚠️ Shutting down with {unsent} alert(s) for {len(self._pending)} "
+                           f"recipient(s) not e-mailed")
+            self._pending.clear()
+            self._retries.clear()
+        await asyncio.to_thread(self._disconnect)
+
+    async def _throttle(self, deadline: Optional[float] = None) -> bool:
+        """Wait for send quota; returns False instead of waiting past ``deadline``"""
+        while True:
+            if deadline is not None and self._clock() >= deadline:
+                return False
+            decision = self._limiter.hit('smtp', self._rate)
+            if decision.allowed:
+                return True
+            if deadline is not None and self._clock() + decision.retry_after > deadline:
+                return False
+            self.rate_limited_seconds += decision.retry_after
+            await self._sleep(decision.retry_after)
+
+    def _compose(self, recipient: str, items: List[QueuedEmail]) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg['From'] = self.sender or recipient
+        msg['To'] = recipient
+        if len(items) == 1:
+            msg['Subject'] = items[0].subject
+            heading = "🚨 Student Success Alert"
+        else:
+            msg['Subject'] = f"Student Alert Digest: {len(items)} alerts"
+            heading = f"🚨 {len(items)} Student Success Alerts"
+        sections = '<hr>'.join(item.html for item in items)
+        msg.attach(MIMEText(
+            f"<html><body><h2>{heading}</h2>{sections}"
+            f"<p><em>This alert was generated by the Student Success Prediction System.</em></p></body></html>",
+            'html'
+        ))
+        return msg
+
+    # Blocking SMTP calls below run in a worker thread, one at a time (under _send_lock)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = self._smtp_factory(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            with suppress(Exception):
+                server.close()
+            raise
+        self.connections_opened += 1
+        self._connection = server
+        return server
+
+    def _disconnect(self) -> None:
+        server, self._connection = self._connection, None
+        if server is not None:
+            with suppress(Exception):
+                server.quit()
+
+    def _send(self, message: MIMEMultipart) -> None:
+        for attempt in (1, 2):
+            server = self._connection or self._connect()
+            try:
+                server.send_message(message)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                # Server closed the reused connection; reconnect once
+                self._connection = None
+                with suppress(Exception):
+                    server.close()
+                if attempt == 2:
+                    raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)], 3) if latencies else None
+
+        return {
+            'alerts_queued': self.alerts_queued,
+            'alerts_pending': self.pending_alerts,
+            'recipients_pending': len(self._pending),
+            'alerts_sent': self.alerts_sent,
+            'alerts_failed': self.alerts_failed,
+            'alerts_dropped': self.alerts_dropped,
+            'send_retries': self.send_retries,
+            'recipients_retrying': len(self._retries),
+            'messages_sent': self.messages_sent,
+            'digests_sent': self.digests_sent,
+            'connections_opened': self.connections_opened,
+            'connected': self._connection is not None,
+            'rate_limited_seconds': round(self.rate_limited_seconds, 3),
+            'digest_window_seconds': self.digest_window,
+            'max_per_minute': self._rate.limit,
+            'delivery_latency_seconds': {
+                'samples': len(latencies),
+                'avg': round(sum(latencies) / len(latencies), 3) if latencies else None,
+                'p50': percentile(0.50),
+                'p95': percentile(0.95),
+                'max': round(latencies[-1], 3) if latencies else None
+            }
+        }
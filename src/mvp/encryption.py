@@ -6,10 +6,11 @@ Provides transparent encryption/decryption for sensitive student data fields
 
 import os
 import base64
+import hmac
 import logging
 import hashlib
-from typing import Optional, Any, Dict
-from cryptography.fernet import Fernet
+from typing import Optional, Any, Dict, Iterable, List
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from functools import wraps
@@ -17,6 +18,29 @@ import json
 
 logger = logging.getLogger(__name__)
 
+# Every Fernet token starts with base64 of the 0x80 version byte and a timestamp
+FERNET_TOKEN_PREFIX = 'gAAAAA'
+
+# Blind-index digests are truncated to 128 bits (32 hex characters)
+BLIND_INDEX_LENGTH = 32
+BLIND_INDEX_SUFFIX = '_bidx'
+
+def normalize_search_value(field_name: str, value: Any) -> str:
+    """
+    Canonical form of a value for blind indexing
+    
+    Phone numbers keep only their digits; everything else is trimmed and
+    lower-cased, so ``" Parent@Mail.com"`` and ``"parent@mail.com"`` match.
+    """
+    value = str(value)
+    if 'phone' in field_name:
+        return ''.join(ch for ch in value if ch.isdigit())
+    return value.strip().lower()
+
+def blind_index_column(field_name: str) -> str:
+    """Name of the digest column holding the blind index for ``field_name``"""
+    return f"{field_name}{BLIND_INDEX_SUFFIX}"
+
 class EncryptionManager:
     """
     FERPA-compliant encryption manager for sensitive student data
@@ -27,17 +51,31 @@ class EncryptionManager:
     - Transparent field-level encryption for ORM models
     - Key rotation support for security compliance
     - Audit logging for encryption operations
+    
+    Key rotation: set the new key in ``DATABASE_ENCRYPTION_KEY`` with a higher
+    ``ENCRYPTION_KEY_VERSION`` and list the old ones in
+    ``DATABASE_ENCRYPTION_PREVIOUS_KEYS`` as ``version:key`` pairs. Values are
+    always written with the current key, while every key in the ring can still
+    read (the version tag picks the key, the others are tried after it), so the
+    re-encryption worker can move old rows over while the API keeps serving.
+    Blind-index digests must survive the rotation, so ``DATABASE_BLIND_INDEX_KEY``
+    has to be pinned first; the worker refuses to run without it.
     """
     
     def __init__(self):
         self.enabled = self._is_encryption_enabled()
         self._cipher = None
+        self._key_ring: Dict[str, Fernet] = {}
+        self._readers: Dict[str, MultiFernet] = {}
+        self._blind_index_key = None
+        self.blind_index_key_pinned = False
         self._key_version = None
         
         if self.enabled:
             self._initialize_encryption()
         else:
             logger.warning("⚠️ Database encryption is DISABLED - only use in development")
+        self._initialize_blind_index()
     
     def _is_encryption_enabled(self) -> bool:
         """Check if encryption should be enabled based on environment"""
@@ -52,20 +90,23 @@ class EncryptionManager:
         try:
             # Get or generate master key
             master_key = self._get_or_create_master_key()
-            
-            # Derive encryption key using PBKDF2
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,  # 256 bits for AES-256
-                salt=self._get_salt(),
-                iterations=100000,  # NIST recommended minimum
-            )
-            
-            key = base64.urlsafe_b64encode(kdf.derive(master_key.encode()))
+            key = self._derive_key(master_key)
             self._cipher = Fernet(key)
             self._key_version = os.getenv('ENCRYPTION_KEY_VERSION', '1')
             
-            logger.info(f"✅ Database encryption initialized (key version: {self._key_version})")
+            # Older keys stay readable until the re-encryption worker has moved their rows
+            self._key_ring = {self._key_version: self._cipher}
+            for version, previous_key in self._get_previous_keys():
+                if version not in self._key_ring:
+                    self._key_ring[version] = Fernet(self._derive_key(previous_key))
+            # Per version tag: that version's key first, then the rest of the ring
+            self._readers = {
+                version: MultiFernet([cipher] + [other for tag, other in self._key_ring.items() if tag != version])
+                for version, cipher in self._key_ring.items()
+            }
+            
+            logger.info(f"✅ Database encryption initialized (key version: {self._key_version}, "
+                        f"readable versions: {', '.join(self._key_ring)})")
             
         except Exception as e:
             logger.error(f"❌ Failed to initialize encryption: {e}")
@@ -76,6 +117,39 @@ class EncryptionManager:
                 logger.warning("⚠️ Encryption disabled due to initialization failure")
                 self.enabled = False
     
+    def _initialize_blind_index(self):
+        """Derive the blind-index HMAC key from DATABASE_BLIND_INDEX_KEY, else the master key"""
+        pinned_key = os.getenv('DATABASE_BLIND_INDEX_KEY')
+        self.blind_index_key_pinned = bool(pinned_key)
+        if not pinned_key and self.enabled:
+            # Digests then change with the master key; the key rotation worker refuses to run
+            logger.warning("⚠️ DATABASE_BLIND_INDEX_KEY not set - blind indexes follow the master key")
+        source_key = pinned_key or self._get_or_create_master_key()
+        self._blind_index_key = hmac.new(source_key.encode(), b'blind-index', hashlib.sha256).digest()
+    
+    def _derive_key(self, master_key: str) -> bytes:
+        """Derive a Fernet key from a master key using PBKDF2"""
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,  # 256 bits for AES-256
+            salt=self._get_salt(),
+            iterations=100000,  # NIST recommended minimum
+        )
+        return base64.urlsafe_b64encode(kdf.derive(master_key.encode()))
+    
+    def _get_previous_keys(self) -> List[tuple]:
+        """Parse DATABASE_ENCRYPTION_PREVIOUS_KEYS (``version:key`` pairs, comma-separated)"""
+        previous = []
+        for entry in os.getenv('DATABASE_ENCRYPTION_PREVIOUS_KEYS', '').split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+            version, sep, key = entry.partition(':')
+            if not sep or not version or len(key) < 32:
+                raise ValueError("DATABASE_ENCRYPTION_PREVIOUS_KEYS entries must be version:key with keys of at least 32 characters")
+            previous.append((version.strip(), key))
+        return previous
+    
     def _get_or_create_master_key(self) -> str:
         """Get master key from environment or generate secure default"""
         # In production, master key MUST be provided via environment
@@ -107,6 +181,32 @@ class EncryptionManager:
         institution_salt = os.getenv('ENCRYPTION_SALT', 'student_success_salt_2024')
         return hashlib.sha256(institution_salt.encode()).digest()[:16]  # 16 bytes for salt
     
+    def blind_index(self, field_name: str, value: Any) -> Optional[str]:
+        """
+        Deterministic HMAC-SHA256 digest of a field value for indexed lookups
+        
+        Fernet ciphertexts are randomized and cannot be compared, so searchable
+        fields also store this digest in an indexed ``<field>_bidx`` column. The
+        HMAC key is derived at startup from ``DATABASE_BLIND_INDEX_KEY`` (default: the
+        master key) but separate from the encryption key, and the field name is part of the message, so equal values in
+        different fields do not share digests. Digests are computed whether or
+        not encryption is enabled, so toggling encryption never invalidates them.
+        
+        Args:
+            field_name: Name of the encrypted field (e.g. 'email')
+            value: Plaintext value
+            
+        Returns:
+            Hex digest, or None for None/empty values
+        """
+        if value is None:
+            return None
+        normalized = normalize_search_value(field_name, value)
+        if not normalized:
+            return None
+        message = f"{field_name}:{normalized}".encode('utf-8')
+        return hmac.new(self._blind_index_key, message, hashlib.sha256).hexdigest()[:BLIND_INDEX_LENGTH]
+    
     def encrypt(self, plaintext: str) -> str:
         """
         Encrypt a string value for database storage
@@ -115,78 +215,160 @@ class EncryptionManager:
             plaintext: The original text to encrypt
             
         Returns:
-            Base64-encoded encrypted text with version prefix
+            Fernet token with version prefix
         """
-        if not self.enabled:
-            return plaintext
-        
-        if not plaintext or plaintext.strip() == '':
-            return plaintext
+        return self.encrypt_column([plaintext])[0]
+    
+    def decrypt(self, encrypted_text: str) -> str:
+        """
+        Decrypt a string value from database storage
         
-        try:
-            # Add key version prefix for future key rotation support
-            encrypted_bytes = self._cipher.encrypt(plaintext.encode('utf-8'))
-            encrypted_b64 = base64.urlsafe_b64encode(encrypted_bytes).decode('ascii')
+        Args:
+            encrypted_text: The encrypted text from database
             
-            # Format: v{version}:{encrypted_data}
-            versioned_encrypted = f"v{self._key_version}:{encrypted_b64}"
+        Returns:
+            Original plaintext string
+        """
+        return self.decrypt_column([encrypted_text])[0]
+    
+    def encrypt_column(self, values: Iterable[Optional[str]]) -> List[Optional[str]]:
+        """
+        Encrypt a column of values in one call
+        
+        None, empty and whitespace-only values pass through unchanged; every
+        other value becomes its own Fernet token under the current key, with
+        one log line for the whole column.
+        
+        Args:
+            values: Plaintext values
             
-            logger.debug(f"🔒 Encrypted field (length: {len(plaintext)} -> {len(versioned_encrypted)})")
-            return versioned_encrypted
+        Returns:
+            List of ``v{version}:{fernet token}`` values in the same order
+        """
+        values = list(values)
+        if not self.enabled:
+            return values
+        
+        try:
+            prefix = f"v{self._key_version}:"
+            encrypted = list(values)
+            count = 0
+            for i, value in enumerate(values):
+                if value and not value.isspace():
+                    encrypted[i] = prefix + self._cipher.encrypt(value.encode('utf-8')).decode('ascii')
+                    count += 1
+            logger.debug(f"🔒 Encrypted column of {count} values")
+            return encrypted
             
         except Exception as e:
             logger.error(f"❌ Encryption failed: {e}")
             # In production, fail hard for security
             if os.getenv('ENVIRONMENT', '').lower() in ['production', 'prod']:
                 raise ValueError("Critical: Database encryption failed")
-            return plaintext
+            return values
     
-    def decrypt(self, encrypted_text: str) -> str:
+    def decrypt_column(self, values: Iterable[Optional[str]]) -> List[Optional[str]]:
         """
-        Decrypt a string value from database storage
+        Decrypt a column of values in one call
+        
+        Unencrypted legacy values are returned as-is, and so is any value that
+        fails to decrypt (graceful degradation), with one warning per column.
         
         Args:
-            encrypted_text: The encrypted text from database
+            values: Stored values
             
         Returns:
-            Original plaintext string
+            List of plaintext values in the same order
         """
+        values = list(values)
         if not self.enabled:
-            return encrypted_text
+            return values
         
-        if not encrypted_text or encrypted_text.strip() == '':
-            return encrypted_text
+        decrypted, failed = self._decrypt_column(values)
+        if failed:
+            logger.error(f"❌ Decryption failed for {len(failed)} of {len(values)} values")
+            # Return encrypted text if decryption fails (graceful degradation)
+            logger.warning("⚠️ Returning encrypted text due to decryption failure")
+        logger.debug(f"🔓 Decrypted column of {len(values)} values")
+        return decrypted
+    
+    def _decrypt_column(self, values: List[Optional[str]]) -> tuple:
+        """
+        Decrypt a column with the key ring
         
-        # Handle unencrypted legacy data
-        if not encrypted_text.startswith('v'):
-            logger.debug("📄 Returning unencrypted legacy data")
-            return encrypted_text
+        Each token is tried with the key named by its version tag first, then
+        with the other keys in the ring.
         
-        try:
-            # Parse version and encrypted data
-            if ':' not in encrypted_text:
-                logger.warning("⚠️ Invalid encrypted data format, returning as-is")
-                return encrypted_text
-            
-            version_part, encrypted_b64 = encrypted_text.split(':', 1)
-            version = version_part[1:]  # Remove 'v' prefix
-            
-            # For now, support only current version (future: key rotation)
-            if version != self._key_version:
-                logger.warning(f"⚠️ Encrypted data uses different key version: {version}")
-            
-            encrypted_bytes = base64.urlsafe_b64decode(encrypted_b64.encode('ascii'))
-            decrypted_bytes = self._cipher.decrypt(encrypted_bytes)
-            plaintext = decrypted_bytes.decode('utf-8')
-            
-            logger.debug(f"🔓 Decrypted field (length: {len(encrypted_text)} -> {len(plaintext)})")
-            return plaintext
+        Returns:
+            (values with every decryptable token replaced by its plaintext,
+             positions of tokens no key could decrypt)
+        """
+        decrypted = list(values)
+        failed = []
+        unknown_versions = set()
+        fallback = MultiFernet(list(self._key_ring.values()))
+        for i, value in enumerate(values):
+            # Handle empty and unencrypted legacy data
+            if not value or value[0] != 'v' or ':' not in value:
+                continue
+            version, token = value.split(':', 1)
+            version = version[1:]
+            try:
+                if not token.startswith(FERNET_TOKEN_PREFIX):
+                    # Values written before tokens were stored directly were base64-encoded twice
+                    token = base64.urlsafe_b64decode(token.encode('ascii')).decode('ascii')
+                reader = self._readers.get(version)
+                if reader is None:
+                    unknown_versions.add(version)
+                    reader = fallback
+                decrypted[i] = reader.decrypt(token.encode('ascii')).decode('utf-8')
+            except (InvalidToken, ValueError, UnicodeError):
+                failed.append(i)
+        
+        if unknown_versions:
+            logger.warning(f"⚠️ Encrypted data uses unknown key version: {', '.join(sorted(unknown_versions))}")
+        return decrypted, failed
+    
+    @property
+    def key_version(self) -> Optional[str]:
+        """Version new values are encrypted with"""
+        return self._key_version
+    
+    def is_current(self, value: Optional[str]) -> bool:
+        """Whether a stored value is already encrypted with the current key in the current format"""
+        return bool(value) and value.startswith(f"v{self._key_version}:{FERNET_TOKEN_PREFIX}")
+    
+    def reencrypt_column(self, values: Iterable[Optional[str]]) -> List[Optional[tuple]]:
+        """
+        Re-encrypt the values of a column that are not on the current key
+        
+        Values under an older key version, in the legacy double-encoded format,
+        or not encrypted at all are encrypted with the current key. Values that
+        no key in the ring can decrypt are left alone.
+        
+        Args:
+            values: Stored values
             
-        except Exception as e:
-            logger.error(f"❌ Decryption failed: {e}")
-            # Return encrypted text if decryption fails (graceful degradation)
-            logger.warning("⚠️ Returning encrypted text due to decryption failure")
-            return encrypted_text
+        Returns:
+            ``(plaintext, new stored value)`` per value, or None where the value
+            is already current, empty or unreadable
+        """
+        values = list(values)
+        result: List[Optional[tuple]] = [None] * len(values)
+        if not self.enabled:
+            return result
+        
+        stale = [i for i, value in enumerate(values)
+                 if value and not value.isspace() and not self.is_current(value)]
+        if not stale:
+            return result
+        plaintexts, failed = self._decrypt_column([values[i] for i in stale])
+        failed = set(failed)
+        readable = [j for j in range(len(stale)) if j not in failed]
+        encrypted = self.encrypt_column([plaintexts[j] for j in readable])
+        for j, value in zip(readable, encrypted):
+            result[stale[j]] = (plaintexts[j], value)
+        return result
     
     def encrypt_dict(self, data: Dict[str, Any], encrypted_fields: list) -> Dict[str, Any]:
         """
@@ -202,13 +384,7 @@ class EncryptionManager:
         if not self.enabled:
             return data
         
-        encrypted_data = data.copy()
-        
-        for field in encrypted_fields:
-            if field in encrypted_data and encrypted_data[field] is not None:
-                encrypted_data[field] = self.encrypt(str(encrypted_data[field]))
-        
-        return encrypted_data
+        return self.encrypt_rows([data], encrypted_fields)[0]
     
     def decrypt_dict(self, data: Dict[str, Any], encrypted_fields: list) -> Dict[str, Any]:
         """
@@ -224,19 +400,57 @@ class EncryptionManager:
         if not self.enabled:
             return data
         
-        decrypted_data = data.copy()
+        return self.decrypt_rows([data], encrypted_fields)[0]
+    
+    def encrypt_rows(self, rows: List[Dict[str, Any]], encrypted_fields: list) -> List[Dict[str, Any]]:
+        """
+        Encrypt specified fields across a batch of row dictionaries
         
-        for field in encrypted_fields:
-            if field in decrypted_data and decrypted_data[field] is not None:
-                decrypted_data[field] = self.decrypt(str(decrypted_data[field]))
+        Each field is encrypted as one column, so bulk inserts
+        (``insert().values(rows)``, executemany) store ciphertext too.
         
-        return decrypted_data
+        Args:
+            rows: Row dictionaries, e.g. for ``Table.insert()``
+            encrypted_fields: List of field names to encrypt
+            
+        Returns:
+            New row dictionaries with specified fields encrypted
+        """
+        return self._transform_rows(rows, encrypted_fields, self.encrypt_column)
+    
+    def decrypt_rows(self, rows: List[Dict[str, Any]], encrypted_fields: list) -> List[Dict[str, Any]]:
+        """
+        Decrypt specified fields across a batch of row dictionaries
+        
+        Args:
+            rows: Row dictionaries read from the database
+            encrypted_fields: List of field names to decrypt
+            
+        Returns:
+            New row dictionaries with specified fields decrypted
+        """
+        return self._transform_rows(rows, encrypted_fields, self.decrypt_column)
+    
+    def _transform_rows(self, rows, encrypted_fields, transform_column):
+        if not self.enabled or not rows:
+            return rows
+        
+        rows = [row.copy() for row in rows]
+        for field in encrypted_fields:
+            positions = [i for i, row in enumerate(rows) if row.get(field) is not None]
+            if not positions:
+                continue
+            column = transform_column(str(rows[i][field]) for i in positions)
+            for i, value in zip(positions, column):
+                rows[i][field] = value
+        return rows
     
     def get_encryption_status(self) -> Dict[str, Any]:
         """Get encryption system status for health checks"""
         return {
             'enabled': self.enabled,
             'key_version': self._key_version,
+            'readable_key_versions': list(self._key_ring),
             'algorithm': 'AES-256 (Fernet)' if self.enabled else None,
             'environment': os.getenv('ENVIRONMENT', 'development'),
             'kdf': 'PBKDF2-SHA256' if self.enabled else None
@@ -248,7 +462,6 @@ encryption_manager = EncryptionManager()
 # Field definitions for different models
 ENCRYPTED_FIELDS = {
     'students': [
-        'birth_date',
         'email', 
         'phone',
         'parent_email',
@@ -261,6 +474,25 @@ ENCRYPTED_FIELDS = {
     ],
     'audit_logs': [
         'user_email'
+    ],
+    'sync_jobs': [
+        'result'  # sync responses carry student predictions
+    ],
+    'integration_sync_states': [
+        'snapshot'  # cached gradebook rows and predictions
+    ]
+}
+
+# Encrypted fields searchable by exact value through a ``<field>_bidx`` digest column
+BLIND_INDEXED_FIELDS = {
+    'students': [
+        'email',
+        'phone',
+        'parent_email',
+        'parent_phone'
+    ],
+    'users': [
+        'email'
     ]
 }
 
@@ -294,6 +526,104 @@ def decrypt_model_data(model_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
         return encryption_manager.decrypt_dict(data, ENCRYPTED_FIELDS[model_name])
     return data
 
+def add_blind_indexes(model_name: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fill the blind-index columns of plaintext rows
+    
+    Args:
+        model_name: Name of the database model (e.g., 'students', 'users')
+        rows: Row dictionaries keyed by column name, before encryption
+        
+    Returns:
+        New row dictionaries with a ``<field>_bidx`` entry for every indexed field present
+    """
+    fields = [field for field in BLIND_INDEXED_FIELDS.get(model_name, []) if any(field in row for row in rows)]
+    if not fields:
+        return rows
+    
+    rows = [row.copy() for row in rows]
+    for row in rows:
+        for field in fields:
+            if field in row:
+                row[blind_index_column(field)] = encryption_manager.blind_index(field, row[field])
+    return rows
+
+def encrypt_model_rows(model_name: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Encrypt sensitive fields of a batch of rows for a bulk insert
+    
+    Blind-index digests are added for searchable fields before encryption.
+    
+    Args:
+        model_name: Name of the database model (e.g., 'students', 'users')
+        rows: Row dictionaries keyed by column name
+        
+    Returns:
+        Row dictionaries with sensitive fields encrypted
+    """
+    rows = add_blind_indexes(model_name, rows)
+    if model_name in ENCRYPTED_FIELDS:
+        return encryption_manager.encrypt_rows(rows, ENCRYPTED_FIELDS[model_name])
+    return rows
+
+def decrypt_model_rows(model_name: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Decrypt sensitive fields of a batch of rows read with Core or raw SQL
+    
+    Args:
+        model_name: Name of the database model (e.g., 'students', 'users')
+        rows: Row dictionaries keyed by column name
+        
+    Returns:
+        Row dictionaries with sensitive fields decrypted
+    """
+    if model_name in ENCRYPTED_FIELDS:
+        return encryption_manager.decrypt_rows(rows, ENCRYPTED_FIELDS[model_name])
+    return rows
+
+class EncryptedAttribute:
+    """
+    Instance-level descriptor for an encrypted ORM column, used with ``synonym``
+    
+    The mapped column attribute (e.g. ``_email``) holds ciphertext as loaded from
+    the database; nothing is decrypted at load time. Reading the public attribute
+    decrypts on first access and memoizes the plaintext per instance until the
+    ciphertext changes; assigning to it encrypts immediately and, when
+    ``blind_index`` names a digest column attribute, stores the value's blind index.
+    
+    Example:
+        _email = Column('email', String(255))
+        email_bidx = Column(String(32), index=True)
+        email = synonym('_email', descriptor=EncryptedAttribute('_email', blind_index='email_bidx'))
+    """
+    
+    def __init__(self, column_attr: str, blind_index: Optional[str] = None):
+        self.column_attr = column_attr
+        self.field_name = column_attr.lstrip('_')
+        self.blind_index = blind_index
+    
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        stored = getattr(instance, self.column_attr)
+        if not stored or not encryption_manager.enabled:
+            return stored
+        
+        cache = instance.__dict__.setdefault('_decrypted_fields', {})
+        cached = cache.get(self.column_attr)
+        if cached is not None and cached[0] is stored:
+            return cached[1]
+        plaintext = encryption_manager.decrypt(stored)
+        cache[self.column_attr] = (stored, plaintext)
+        return plaintext
+    
+    def __set__(self, instance, value):
+        if value is not None and not isinstance(value, str):
+            value = str(value)
+        setattr(instance, self.column_attr, encryption_manager.encrypt(value))
+        if self.blind_index:
+            setattr(instance, self.blind_index, encryption_manager.blind_index(self.field_name, value))
+
 def encryption_required(func):
     """
     Decorator to automatically encrypt/decrypt model data
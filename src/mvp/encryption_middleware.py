@@ -6,16 +6,19 @@ Transparent encryption/decryption for SQLAlchemy ORM operations
 
 import logging
 from typing import Any, Dict, List, Optional
-from sqlalchemy.event import listen
-from sqlalchemy.orm import Session, InstanceState
-from sqlalchemy.orm.events import InstanceEvents
+from sqlalchemy import and_, false
+from sqlalchemy.orm import Session
 from sqlalchemy.inspection import inspect
 
 from .encryption import (
     encryption_manager, 
     ENCRYPTED_FIELDS,
+    BLIND_INDEXED_FIELDS,
+    EncryptedAttribute,
+    blind_index_column,
     encrypt_model_data,
-    decrypt_model_data
+    decrypt_model_data,
+    decrypt_model_rows
 )
 
 logger = logging.getLogger(__name__)
@@ -24,8 +27,10 @@ class EncryptionMiddleware:
     """
     SQLAlchemy middleware for transparent field-level encryption
     
-    Automatically encrypts sensitive fields before database writes
-    and decrypts them after database reads.
+    Encrypted ORM columns are mapped through ``EncryptedAttribute`` synonyms,
+    which encrypt on assignment and decrypt on first read, so loading a large
+    result set costs nothing for fields nobody reads. Core and raw-SQL bulk
+    writes go through ``encrypt_model_rows``.
     """
     
     def __init__(self):
@@ -33,111 +38,18 @@ class EncryptionMiddleware:
         self._setup_event_listeners()
     
     def _setup_event_listeners(self):
-        """Setup SQLAlchemy event listeners for automatic encryption/decryption"""
+        """No per-attribute listeners: encryption happens in EncryptedAttribute and encrypt_model_rows"""
         if not self.enabled:
             logger.info("🔓 Encryption middleware disabled")
             return
         
-        # Listen for before_insert events to encrypt data
-        listen(Session, 'before_insert', self._encrypt_before_insert)
-        
-        # Listen for before_update events to encrypt data
-        listen(Session, 'before_update', self._encrypt_before_update)
-        
-        # Listen for after_load events to decrypt data
-        listen(InstanceEvents, 'load', self._decrypt_after_load, propagate=True)
-        
-        logger.info("🔒 Encryption middleware enabled with SQLAlchemy event listeners")
-    
-    def _get_model_name(self, instance) -> Optional[str]:
-        """Get model name from SQLAlchemy instance"""
-        try:
-            return instance.__tablename__
-        except AttributeError:
-            return None
+        logger.info("🔒 Encryption middleware enabled with deferred field decryption")
     
-    def _encrypt_before_insert(self, mapper, connection, target):
-        """Encrypt sensitive fields before INSERT operations"""
-        try:
-            model_name = self._get_model_name(target)
-            if not model_name or model_name not in ENCRYPTED_FIELDS:
-                return
-            
-            # Get fields that need encryption for this model
-            fields_to_encrypt = ENCRYPTED_FIELDS[model_name]
-            
-            # Encrypt each sensitive field
-            for field_name in fields_to_encrypt:
-                if hasattr(target, field_name):
-                    current_value = getattr(target, field_name)
-                    if current_value is not None and current_value != '':
-                        encrypted_value = encryption_manager.encrypt(str(current_value))
-                        setattr(target, field_name, encrypted_value)
-                        logger.debug(f"🔒 Encrypted {model_name}.{field_name} for INSERT")
-            
-        except Exception as e:
-            logger.error(f"❌ Encryption before INSERT failed: {e}")
-            # In production, fail hard for security
-            if encryption_manager.enabled:
-                raise
-    
-    def _encrypt_before_update(self, mapper, connection, target):
-        """Encrypt sensitive fields before UPDATE operations"""
-        try:
-            model_name = self._get_model_name(target)
-            if not model_name or model_name not in ENCRYPTED_FIELDS:
-                return
-            
-            # Get fields that need encryption for this model
-            fields_to_encrypt = ENCRYPTED_FIELDS[model_name]
-            
-            # Get dirty (changed) attributes
-            state = inspect(target)
-            if not state.modified:
-                return
-            
-            # Only encrypt fields that have been modified
-            for field_name in fields_to_encrypt:
-                if hasattr(target, field_name) and field_name in state.attrs:
-                    attr = state.attrs[field_name]
-                    if attr.history.has_changes():
-                        current_value = getattr(target, field_name)
-                        if current_value is not None and current_value != '':
-                            # Check if already encrypted to avoid double encryption
-                            if not str(current_value).startswith('v'):
-                                encrypted_value = encryption_manager.encrypt(str(current_value))
-                                setattr(target, field_name, encrypted_value)
-                                logger.debug(f"🔒 Encrypted {model_name}.{field_name} for UPDATE")
-            
-        except Exception as e:
-            logger.error(f"❌ Encryption before UPDATE failed: {e}")
-            # In production, fail hard for security
-            if encryption_manager.enabled:
-                raise
-    
-    def _decrypt_after_load(self, target, context):
-        """Decrypt sensitive fields after loading from database"""
-        try:
-            model_name = self._get_model_name(target)
-            if not model_name or model_name not in ENCRYPTED_FIELDS:
-                return
-            
-            # Get fields that need decryption for this model
-            fields_to_decrypt = ENCRYPTED_FIELDS[model_name]
-            
-            # Decrypt each sensitive field
-            for field_name in fields_to_decrypt:
-                if hasattr(target, field_name):
-                    encrypted_value = getattr(target, field_name)
-                    if encrypted_value is not None and encrypted_value != '':
-                        decrypted_value = encryption_manager.decrypt(str(encrypted_value))
-                        setattr(target, field_name, decrypted_value)
-                        logger.debug(f"🔓 Decrypted {model_name}.{field_name} after LOAD")
-            
-        except Exception as e:
-            logger.error(f"❌ Decryption after LOAD failed: {e}")
-            # Don't fail hard on decryption - graceful degradation
-            logger.warning("⚠️ Continuing with encrypted data due to decryption failure")
+    @staticmethod
+    def is_deferred(model_class, field_name: str) -> bool:
+        """Whether ``field_name`` is an EncryptedAttribute synonym on ``model_class``"""
+        synonyms = inspect(model_class).synonyms
+        return field_name in synonyms and isinstance(synonyms[field_name].descriptor, EncryptedAttribute)
 
 # Utility functions for manual encryption/decryption operations
 
@@ -155,17 +67,7 @@ def encrypt_query_parameters(model_name: str, query_params: Dict[str, Any]) -> D
     if not encryption_manager.enabled or model_name not in ENCRYPTED_FIELDS:
         return query_params
     
-    encrypted_params = query_params.copy()
-    fields_to_encrypt = ENCRYPTED_FIELDS[model_name]
-    
-    for field_name in fields_to_encrypt:
-        if field_name in encrypted_params:
-            value = encrypted_params[field_name]
-            if value is not None and value != '':
-                encrypted_params[field_name] = encryption_manager.encrypt(str(value))
-                logger.debug(f"🔒 Encrypted query parameter {field_name}")
-    
-    return encrypted_params
+    return encrypt_model_data(model_name, query_params)
 
 def decrypt_query_results(model_name: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
@@ -178,22 +80,7 @@ def decrypt_query_results(model_name: str, results: List[Dict[str, Any]]) -> Lis
     Returns:
         List with decrypted field values
     """
-    if not encryption_manager.enabled or model_name not in ENCRYPTED_FIELDS:
-        return results
-    
-    decrypted_results = []
-    fields_to_decrypt = ENCRYPTED_FIELDS[model_name]
-    
-    for row in results:
-        decrypted_row = row.copy()
-        for field_name in fields_to_decrypt:
-            if field_name in decrypted_row:
-                value = decrypted_row[field_name]
-                if value is not None and value != '':
-                    decrypted_row[field_name] = encryption_manager.decrypt(str(value))
-        decrypted_results.append(decrypted_row)
-    
-    return decrypted_results
+    return decrypt_model_rows(model_name, results)
 
 def create_encrypted_student(session: Session, student_data: Dict[str, Any]) -> 'Student':
     """
@@ -208,7 +95,7 @@ def create_encrypted_student(session: Session, student_data: Dict[str, Any]) ->
     """
     from .models import Student
     
-    # Encryption will be handled automatically by middleware
+    # Encrypted fields are encrypted on assignment by EncryptedAttribute
     student = Student(**student_data)
     session.add(student)
     session.flush()  # Get the ID without committing
@@ -234,7 +121,7 @@ def update_encrypted_student(session: Session, student_id: int, update_data: Dic
     if not student:
         return None
     
-    # Update fields (encryption will be handled automatically by middleware)
+    # Update fields (encrypted on assignment by EncryptedAttribute)
     for field, value in update_data.items():
         if hasattr(student, field):
             setattr(student, field, value)
@@ -243,31 +130,82 @@ def update_encrypted_student(session: Session, student_id: int, update_data: Dic
     logger.info(f"👤 Updated encrypted student record (ID: {student.id})")
     return student
 
-def search_encrypted_field(session: Session, model_class, field_name: str, search_value: str):
+def blind_index_clause(model_class, field_name: str, search_value: str):
+    """
+    WHERE clause matching an encrypted field exactly through its blind index
+    
+    Args:
+        model_class: SQLAlchemy model class
+        field_name: Name of the encrypted field
+        search_value: Plaintext value to match
+        
+    Returns:
+        Equality on the indexed ``<field>_bidx`` column (never true for empty values)
+        
+    Raises:
+        ValueError: If the field has no blind index
+    """
+    model_name = model_class.__tablename__
+    if field_name not in BLIND_INDEXED_FIELDS.get(model_name, []):
+        raise ValueError(f"{model_name}.{field_name} has no blind index")
+    
+    digest = encryption_manager.blind_index(field_name, search_value)
+    if digest is None:
+        return false()
+    return getattr(model_class, blind_index_column(field_name)) == digest
+
+def prefix_clause(column, prefix: str):
+    """
+    WHERE clause matching values that start with ``prefix`` as a range scan
+    
+    Unlike ``LIKE 'x%'`` the range form can use a plain B-tree index on every
+    backend, but its ``prefix + U+10FFFF`` upper bound is only exact under
+    binary (code-point) ordering: SQLite's default BINARY collation, PostgreSQL
+    ``"C"`` or MySQL ``*_bin``. Under a linguistic collation such as
+    ``en_US.UTF-8`` the range can miss matching rows, so there the searched
+    column needs ``COLLATE "C"`` (declared on the column, or on both its index
+    and the ``column`` expression passed in).
+    """
+    return and_(column >= prefix, column < prefix + '\U0010ffff')
+
+def search_encrypted_field(session: Session, model_class, field_name: str, search_value: str,
+                           prefix: bool = False):
     """
     Search for records by encrypted field value
     
-    Note: This requires encrypting the search value and doing exact match.
-    Full-text search on encrypted fields requires special handling.
+    Encrypted fields are matched exactly through their blind-index column, so
+    nothing is decrypted and the lookup uses the index. Unencrypted fields are
+    matched by equality or, with ``prefix=True``, by an indexed prefix range.
     
     Args:
         session: SQLAlchemy session
         model_class: SQLAlchemy model class
-        field_name: Name of the encrypted field
+        field_name: Name of the field
         search_value: Value to search for
+        prefix: Match values starting with ``search_value`` (unencrypted fields only)
         
     Returns:
         Query result
+        
+    Raises:
+        ValueError: For prefix searches on encrypted fields, or exact searches on
+            encrypted fields without a blind index while encryption is enabled
     """
     model_name = model_class.__tablename__
-    
-    if encryption_manager.enabled and model_name in ENCRYPTED_FIELDS and field_name in ENCRYPTED_FIELDS[model_name]:
-        # Encrypt the search value for exact match
-        encrypted_search_value = encryption_manager.encrypt(search_value)
-        return session.query(model_class).filter(getattr(model_class, field_name) == encrypted_search_value)
-    else:
-        # Regular search for unencrypted fields
-        return session.query(model_class).filter(getattr(model_class, field_name) == search_value)
+    query = session.query(model_class)
+    
+    if field_name in ENCRYPTED_FIELDS.get(model_name, []):
+        if prefix:
+            raise ValueError(f"Prefix search is not supported on encrypted field {model_name}.{field_name}")
+        if field_name in BLIND_INDEXED_FIELDS.get(model_name, []):
+            return query.filter(blind_index_clause(model_class, field_name, search_value))
+        if encryption_manager.enabled:
+            raise ValueError(f"{model_name}.{field_name} is encrypted and has no blind index")
+    
+    column = getattr(model_class, field_name)
+    if prefix:
+        return query.filter(prefix_clause(column, search_value))
+    return query.filter(column == search_value)
 
 # Global middleware instance
 encryption_middleware = EncryptionMiddleware()
@@ -9,10 +9,11 @@ for production PostgreSQL deployment.
 from datetime import datetime
 from typing import Optional
 from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, ForeignKey, Index, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, synonym
 from sqlalchemy.sql import func
 
 from .database import Base
+from .encryption import EncryptedAttribute
 
 class Institution(Base):
     """Institution/District model for multi-tenant architecture."""
@@ -78,11 +79,21 @@ class Student(Base):
     has_504 = Column(Boolean, default=False, index=True)  # Section 504 plan
     is_economically_disadvantaged = Column(Boolean, default=False, index=True)
     
-    # Contact information (encrypted in production)
-    email = Column(String(255))
-    phone = Column(String(20))
-    parent_email = Column(String(255))
-    parent_phone = Column(String(20))
+    # Contact information (encrypted in production; decrypted on first access)
+    _email = Column('email', String(512))
+    _phone = Column('phone', String(255))
+    _parent_email = Column('parent_email', String(512))
+    _parent_phone = Column('parent_phone', String(255))
+    email = synonym('_email', descriptor=EncryptedAttribute('_email', blind_index='email_bidx'))
+    phone = synonym('_phone', descriptor=EncryptedAttribute('_phone', blind_index='phone_bidx'))
+    parent_email = synonym('_parent_email', descriptor=EncryptedAttribute('_parent_email', blind_index='parent_email_bidx'))
+    parent_phone = synonym('_parent_phone', descriptor=EncryptedAttribute('_parent_phone', blind_index='parent_phone_bidx'))
+    
+    # Blind indexes: HMAC digests of the normalized contact fields for indexed exact lookups
+    email_bidx = Column(String(32), index=True)
+    phone_bidx = Column(String(32), index=True)
+    parent_email_bidx = Column(String(32), index=True)
+    parent_phone_bidx = Column(String(32), index=True)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -99,6 +110,7 @@ class Student(Base):
         Index('ix_students_institution_student_id', 'institution_id', 'student_id'),
         Index('ix_students_institution_grade', 'institution_id', 'grade_level'),
         Index('ix_students_institution_status', 'institution_id', 'enrollment_status'),
+        Index('ix_students_student_id_lower', func.lower(student_id)),  # Case-insensitive ID search
     )
 
 class Prediction(Base):
@@ -207,7 +219,8 @@ class AuditLog(Base):
     
     # User information
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # nullable for anonymous actions
-    user_email = Column(String(255))
+    _user_email = Column('user_email', String(512))
+    user_email = synonym('_user_email', descriptor=EncryptedAttribute('_user_email'))
     user_role = Column(String(50))
     
     # Action details
@@ -295,12 +308,16 @@ class User(Base):
     
     # Authentication
     username = Column(String(100), unique=True, nullable=False, index=True)
-    email = Column(String(255), unique=True, nullable=False, index=True)
+    _email = Column('email', String(512), nullable=False, index=True)  # Randomized ciphertext; uniqueness is on email_bidx
+    email_bidx = Column(String(32), unique=True, index=True)  # Blind index for lookups by e-mail
+    email = synonym('_email', descriptor=EncryptedAttribute('_email', blind_index='email_bidx'))
     password_hash = Column(String(255), nullable=False)
     
-    # Profile information
-    first_name = Column(String(100), nullable=False)
-    last_name = Column(String(100), nullable=False)
+    # Profile information (encrypted in production; decrypted on first access)
+    _first_name = Column('first_name', String(255), nullable=False)
+    _last_name = Column('last_name', String(255), nullable=False)
+    first_name = synonym('_first_name', descriptor=EncryptedAttribute('_first_name'))
+    last_name = synonym('_last_name', descriptor=EncryptedAttribute('_last_name'))
     role = Column(String(50), nullable=False, index=True)  # teacher, admin, district_admin, etc.
     
     # Account status
@@ -402,4 +419,108 @@ class GPTInsight(Base):
     )
     
     def __repr__(self):
-        return f"<GPTInsight(student_id='{self.student_id}', risk_level='{self.risk_level}', cached={self.is_cached})>"
\ No newline at end of file
+        return f"<GPTInsight(student_id='{self.student_id}', risk_level='{self.risk_level}', cached={self.is_cached})>"
+
+
+class IntegrationSyncState(Base):
+    """Incremental sync state (high-water mark + gradebook snapshot) per integration scope."""
+    __tablename__ = "integration_sync_states"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    integration = Column(String(50), nullable=False)  # powerschool, canvas, google_classroom
+    scope_id = Column(String(100), nullable=False)  # School or course ID
+    
+    # Change tracking
+    high_water_mark = Column(String(64))  # ISO timestamp sent as updated_since on the next run
+    etag = Column(String(255))  # Roster ETag for conditional requests
+    
+    # Cached gradebook, encrypted: JSON {student_id: {"row": {...}, "prediction": {...}, "fingerprint": "..."}}
+    snapshot = Column(Text)
+    student_count = Column(Integer, default=0)
+    
+    # Timestamps
+    last_sync_at = Column(DateTime(timezone=True))
+    last_full_sync_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        Index('ix_integration_sync_states_scope', 'integration', 'scope_id', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<IntegrationSyncState(integration='{self.integration}', scope_id='{self.scope_id}', hwm='{self.high_water_mark}')>"
+
+
+class SyncJobRecord(Base):
+    """Background integration sync job (status, progress and result survive restarts)."""
+    __tablename__ = "sync_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(64), nullable=False, unique=True)
+    integration = Column(String(50), nullable=False)  # canvas, powerschool, combined
+    scope_id = Column(String(200), nullable=False)  # Course / school IDs being synced
+    requested_by = Column(String(100))
+    
+    # Lifecycle
+    status = Column(String(20), nullable=False, default='queued')  # queued, running, completed, failed, cancelled, interrupted
+    stage = Column(String(50))  # Current step, e.g. fetching, scoring, persisting
+    progress = Column(Text)  # JSON counts: students_fetched, students_scored, students_persisted
+    result = Column(Text)  # JSON sync response once completed
+    error = Column(Text)
+    
+    # Ownership across API workers
+    worker_id = Column(String(100))  # Process running the job
+    heartbeat_at = Column(DateTime(timezone=True))  # Refreshed by the owner while the job is active
+    cancel_requested = Column(Boolean, nullable=False, default=False)  # Polled by the owner
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        Index('ix_sync_jobs_status_created', 'status', 'created_at'),
+        Index('ix_sync_jobs_integration_scope', 'integration', 'scope_id'),
+    )
+    
+    def __repr__(self):
+        return f"<SyncJobRecord(job_id='{self.job_id}', integration='{self.integration}', status='{self.status}')>"
+
+
+class KeyRotationCheckpoint(Base):
+    """Re-encryption progress of one table for one key version (resumes after restarts)."""
+    __tablename__ = "key_rotation_checkpoints"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    table_name = Column(String(100), nullable=False)
+    key_version = Column(String(20), nullable=False)  # Key version rows are being moved to
+    
+    # Keyset position and counters
+    last_id = Column(Integer, nullable=False, default=0)  # Highest primary key processed
+    rows_scanned = Column(Integer, nullable=False, default=0)
+    rows_reencrypted = Column(Integer, nullable=False, default=0)
+    
+    # Timestamps
+    completed_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        Index('ix_key_rotation_checkpoints_table_version', 'table_name', 'key_version', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<KeyRotationCheckpoint(table='{self.table_name}', version='{self.key_version}', last_id={self.last_id})>"
+
+
+class RevokedSession(Base):
+    """Nonce of a logged-out session token, kept until the token expires."""
+    __tablename__ = "revoked_sessions"
+    
+    nonce = Column(String(64), primary_key=True)
+    exp = Column(Integer, nullable=False, index=True)  # Token expiry (epoch seconds); purged after
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<RevokedSession(nonce='{self.nonce[:8]}...', exp={self.exp})>"
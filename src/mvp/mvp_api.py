@@ -128,6 +128,7 @@ from src.mvp.api.canvas_endpoints import router as canvas_router
 from src.mvp.api.powerschool_endpoints import router as powerschool_router
 from src.mvp.api.google_classroom_v2 import router as google_classroom_router
 from src.mvp.api.combined_endpoints import router as combined_router
+from src.mvp.api.sync_jobs_endpoints import router as sync_jobs_router
 from src.mvp.api.notifications_endpoints import router as notifications_router
 from src.mvp.api.health import router as health_router
 from src.mvp.api.gpt_enhanced_endpoints import router as gpt_enhanced_router
@@ -146,6 +147,21 @@ from .container import initialize_container
 async def startup_event():
     """Initialize services on app startup."""
     initialize_container()
+    # Close out sync jobs left behind by stopped workers (jobs of live workers keep heartbeating)
+    from src.mvp.services.sync_jobs import get_sync_job_service
+    get_sync_job_service().recover_interrupted()
+    if os.getenv('RESCORE_ENABLED', 'false').lower() == 'true':
+        from src.mvp.services.rescoring import get_rescoring_scheduler
+        get_rescoring_scheduler().start()
+    if os.getenv('KEY_ROTATION_ENABLED', 'false').lower() == 'true':
+        from src.mvp.services.key_rotation import get_key_rotation_worker
+        get_key_rotation_worker().start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Deliver alert e-mail still waiting in digest windows."""
+    from mvp.notifications import notification_system
+    await notification_system.email.close()
 
 # Add middleware in correct order (last added = first executed)
 app.add_middleware(SecurityHeadersMiddleware)
@@ -175,6 +191,7 @@ app.include_router(canvas_router, prefix="/api/lms", tags=["Canvas LMS"])  # pro
 app.include_router(powerschool_router, prefix="/api/sis", tags=["PowerSchool SIS"])  # provides /api/sis/*
 app.include_router(google_classroom_router, prefix="/api/google", tags=["Google Classroom"])
 app.include_router(combined_router, prefix="/api/integration", tags=["Combined Integration"])
+app.include_router(sync_jobs_router, prefix="/api/integration", tags=["Sync Jobs"])  # provides /api/integration/jobs/*
 app.include_router(notifications_router, prefix="/api", tags=["Real-time Notifications"])
 app.include_router(gpt_enhanced_router, prefix="/api/gpt", tags=["GPT-Enhanced AI Analysis"])
 app.include_router(health_router, prefix="", tags=["Health & Monitoring"])
@@ -20,19 +20,38 @@ Key Features:
 import asyncio
 import json
 import logging
-import smtplib
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set, Any, Callable
-from dataclasses import dataclass, asdict
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from typing import Dict, List, Mapping, Optional, Set, Any, Callable
+from dataclasses import dataclass, fields
 import os
+import uuid
 from enum import Enum
 
+import numpy as np
+
+try:
+    from .alert_store import AlertStore, BoundedRiskCache, risk_key
+    from .email_dispatcher import EmailDispatcher
+    from .websocket_broadcaster import WebSocketBroadcaster, topic
+except ImportError:
+    from mvp.alert_store import AlertStore, BoundedRiskCache, risk_key
+    from mvp.email_dispatcher import EmailDispatcher
+    from mvp.websocket_broadcaster import WebSocketBroadcaster, topic
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Risk score rise that triggers a risk increase alert
+RISK_INCREASE_THRESHOLD = 0.15
+# Condition alert thresholds
+LOW_ATTENDANCE_RATE = 0.75
+LOW_ENGAGEMENT_SCORE = 0.50
+# Prediction fields carried into alert details by monitor_batch
+CONTEXT_FIELDS = ('attendance_rate', 'grade_trend', 'engagement_score', 'gpa', 'institution_id', 'school_id')
+# Alerts per grouped WebSocket message
+ALERT_BATCH_MESSAGE_SIZE = 500
+
 class AlertLevel(Enum):
     LOW = "low"
     MEDIUM = "medium"
@@ -63,6 +82,20 @@ class StudentAlert:
     resolved: bool = False
     assignee: Optional[str] = None
     intervention_recommended: bool = False
+    institution_id: Optional[str] = None
+    school_id: Optional[str] = None
+    
+    @property
+    def topics(self) -> List[str]:
+        """WebSocket topics this alert is published to"""
+        topics = [topic('student', self.student_id)]
+        if self.institution_id is not None:
+            topics.append(topic('institution', self.institution_id))
+        if self.school_id is not None:
+            topics.append(topic('school', self.school_id))
+        return topics
+
+_ALERT_FIELDS = tuple(field.name for field in fields(StudentAlert))
 
 @dataclass
 class NotificationRule:
@@ -77,23 +110,48 @@ class NotificationRule:
 
 class RealTimeNotificationSystem:
     def __init__(self):
-        self.active_alerts: Dict[str, StudentAlert] = {}
         self.notification_rules: List[NotificationRule] = []
-        self.websocket_connections: Set = set()
-        self.alert_history: List[StudentAlert] = []
-        self.student_risk_cache: Dict[str, float] = {}
+        self.broadcaster = WebSocketBroadcaster(
+            max_queue=int(os.getenv('WEBSOCKET_SEND_QUEUE_SIZE', '256')),
+            send_timeout=float(os.getenv('WEBSOCKET_SEND_TIMEOUT', '10'))
+        )
+        self.alerts = AlertStore(max_history=int(os.getenv('NOTIFICATION_HISTORY_SIZE', '10000')),
+                                 max_active=int(os.getenv('NOTIFICATION_ACTIVE_LIMIT', '10000')))
+        self.student_risk_cache = BoundedRiskCache(int(os.getenv('NOTIFICATION_RISK_CACHE_SIZE', '100000')))
         
         # Email configuration
         self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
         self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
         self.email_user = os.getenv('EMAIL_USER')
         self.email_password = os.getenv('EMAIL_PASSWORD')
+        self.email = EmailDispatcher(
+            self.smtp_server, self.smtp_port,
+            username=self.email_user,
+            password=self.email_password,
+            use_tls=os.getenv('SMTP_USE_TLS', 'true').lower() == 'true',
+            digest_window=float(os.getenv('EMAIL_DIGEST_WINDOW_SECONDS', '60')),
+            max_per_minute=int(os.getenv('EMAIL_MAX_PER_MINUTE', '30')),
+            idle_timeout=float(os.getenv('EMAIL_IDLE_TIMEOUT_SECONDS', '60')),
+            max_attempts=int(os.getenv('EMAIL_MAX_ATTEMPTS', '5')),
+            retry_backoff=float(os.getenv('EMAIL_RETRY_BACKOFF_SECONDS', '30')),
+            shutdown_timeout=float(os.getenv('EMAIL_SHUTDOWN_TIMEOUT_SECONDS', '10'))
+        )
         
         # Initialize default notification rules
         self.setup_default_rules()
         
         logger.info("🔔 Real-time notification system initialized")
 
+    @property
+    def active_alerts(self) -> Mapping[str, StudentAlert]:
+        """Read-only view of active alerts by id"""
+        return self.alerts.active
+
+    @property
+    def alert_history(self) -> List[StudentAlert]:
+        """Alerts still in the bounded history, oldest first"""
+        return list(self.alerts)
+
     def setup_default_rules(self):
         """Set up default notification rules for common scenarios"""
         default_rules = [
@@ -149,10 +207,11 @@ class RealTimeNotificationSystem:
             List of generated alerts
         """
         generated_alerts = []
-        previous_risk = self.student_risk_cache.get(student_id, 0.0)
+        key = risk_key(student_id, (additional_data or {}).get('institution_id'))
+        previous_risk = self.student_risk_cache.get(key, 0.0)
         
         # Update risk cache
-        self.student_risk_cache[student_id] = current_risk
+        self.student_risk_cache[key] = current_risk
         
         # Check for risk threshold alerts
         for rule in self.notification_rules:
@@ -168,7 +227,7 @@ class RealTimeNotificationSystem:
                     
             elif AlertType.RISK_INCREASE in rule.alert_types:
                 risk_increase = current_risk - previous_risk
-                if risk_increase >= 0.15 and current_risk >= rule.risk_threshold:  # 15% increase threshold
+                if risk_increase >= RISK_INCREASE_THRESHOLD and current_risk >= rule.risk_threshold:
                     alert = await self.create_risk_increase_alert(
                         student_id, student_name, current_risk, previous_risk, additional_data
                     )
@@ -181,17 +240,112 @@ class RealTimeNotificationSystem:
             )
             generated_alerts.extend(condition_alerts)
         
+        # Scope alerts so WebSocket clients can subscribe by institution or school
+        self._scope_alerts(generated_alerts, additional_data)
+        
         # Process and broadcast alerts
         for alert in generated_alerts:
             await self.process_alert(alert)
             
         return generated_alerts
 
+    async def monitor_batch(self, predictions: List[Dict[str, Any]],
+                            previous_risk: Optional[Dict[str, float]] = None) -> List[StudentAlert]:
+        """
+        Monitor risk scores for a whole roster (an upload or a re-scoring run) in one pass
+        
+        Current and previous risk are held in NumPy arrays and every rule is
+        evaluated against all students at once; only students that trigger an
+        alert are visited individually. Alerts are broadcast grouped by
+        institution/school instead of one WebSocket message each.
+        
+        Args:
+            predictions: Dicts with student_id, risk_probability (or risk_score) and
+                optionally name plus the CONTEXT_FIELDS (attendance_rate, grade_trend,
+                engagement_score, gpa, institution_id, school_id)
+            previous_risk: Baseline risk by student id for students not in the risk cache yet
+                (the cache itself is keyed by institution and student id)
+            
+        Returns:
+            List of generated alerts
+        """
+        if not predictions:
+            return []
+        
+        baseline = previous_risk or {}
+        student_ids = [str(prediction.get('student_id')) for prediction in predictions]
+        keys = [risk_key(student_id, prediction.get('institution_id'))
+                for student_id, prediction in zip(student_ids, predictions)]
+        current = _float_column(predictions, 'risk_probability', 'risk_score', default=0.0)
+        previous = np.array([
+            self.student_risk_cache.get(key, baseline.get(student_id, 0.0)) or 0.0
+            for key, student_id in zip(keys, student_ids)
+        ], dtype=float)
+        self.student_risk_cache.update(zip(keys, current.tolist()))
+        names = [str(prediction.get('name') or student_id) for prediction, student_id in zip(predictions, student_ids)]
+        
+        def context(row: int) -> Dict[str, Any]:
+            prediction = predictions[row]
+            return {field: _plain(prediction[field]) for field in CONTEXT_FIELDS if prediction.get(field) is not None}
+        
+        # Each rule is evaluated for every student at once; alerts are built only for the hits
+        alerts_by_row: Dict[int, List[StudentAlert]] = {}
+        increase = current - previous
+        for rule in self.notification_rules:
+            if not rule.enabled:
+                continue
+            if AlertType.RISK_THRESHOLD in rule.alert_types:
+                crossed = (current >= rule.risk_threshold) & (previous < rule.risk_threshold)
+                for row in np.flatnonzero(crossed).tolist():
+                    alerts_by_row.setdefault(row, []).append(self._build_risk_threshold_alert(
+                        student_ids[row], names[row], current[row], previous[row], rule, context(row)))
+            elif AlertType.RISK_INCREASE in rule.alert_types:
+                rose = (increase >= RISK_INCREASE_THRESHOLD) & (current >= rule.risk_threshold)
+                for row in np.flatnonzero(rose).tolist():
+                    alerts_by_row.setdefault(row, []).append(self._build_risk_increase_alert(
+                        student_ids[row], names[row], current[row], previous[row], context(row)))
+        
+        # Condition alerts (missing values are NaN, which never compares below a threshold)
+        attendance = _float_column(predictions, 'attendance_rate')
+        engagement = _float_column(predictions, 'engagement_score')
+        declining = np.array([prediction.get('grade_trend') == 'declining' for prediction in predictions])
+        flagged = (attendance < LOW_ATTENDANCE_RATE) | (engagement < LOW_ENGAGEMENT_SCORE) | declining
+        for row in np.flatnonzero(flagged).tolist():
+            alerts_by_row.setdefault(row, []).extend(self._build_condition_alerts(
+                student_ids[row], names[row], current[row], context(row)))
+        
+        generated_alerts = []
+        for row in sorted(alerts_by_row):
+            self._scope_alerts(alerts_by_row[row], predictions[row])
+            generated_alerts.extend(alerts_by_row[row])
+        
+        await self.process_alerts(generated_alerts)
+        logger.info(f"🔍 Monitored {len(predictions)} students: {len(generated_alerts)} alerts for "
+                    f"{len(alerts_by_row)} students")
+        return generated_alerts
+
+    @staticmethod
+    def _scope_alerts(alerts: List[StudentAlert], data: Optional[Dict[str, Any]]):
+        """Copy institution/school ids from monitoring data onto alerts"""
+        if not data:
+            return
+        for alert in alerts:
+            if data.get('institution_id') is not None:
+                alert.institution_id = str(data['institution_id'])
+            if data.get('school_id') is not None:
+                alert.school_id = str(data['school_id'])
+
     async def create_risk_threshold_alert(self, student_id: str, student_name: str, 
                                         current_risk: float, previous_risk: float,
                                         rule: NotificationRule, additional_data: Dict) -> StudentAlert:
         """Create a risk threshold alert"""
-        
+        return self._build_risk_threshold_alert(student_id, student_name, current_risk, previous_risk,
+                                                rule, additional_data)
+
+    def _build_risk_threshold_alert(self, student_id: str, student_name: str,
+                                    current_risk: float, previous_risk: float,
+                                    rule: NotificationRule, additional_data: Dict) -> StudentAlert:
+        current_risk, previous_risk = float(current_risk), float(previous_risk)
         alert_level = AlertLevel.CRITICAL if current_risk >= 0.85 else AlertLevel.HIGH
         
         message = f"🚨 {student_name} has crossed the {rule.name.lower()} threshold"
@@ -203,7 +357,7 @@ class RealTimeNotificationSystem:
         }
         
         alert = StudentAlert(
-            alert_id=f"alert_{student_id}_{int(datetime.now().timestamp())}",
+            alert_id=new_alert_id('alert', student_id),
             student_id=student_id,
             student_name=student_name,
             alert_type=AlertType.RISK_THRESHOLD,
@@ -222,7 +376,13 @@ class RealTimeNotificationSystem:
                                        current_risk: float, previous_risk: float,
                                        additional_data: Dict) -> StudentAlert:
         """Create a risk increase alert"""
-        
+        return self._build_risk_increase_alert(student_id, student_name, current_risk, previous_risk,
+                                               additional_data)
+
+    def _build_risk_increase_alert(self, student_id: str, student_name: str,
+                                   current_risk: float, previous_risk: float,
+                                   additional_data: Dict) -> StudentAlert:
+        current_risk, previous_risk = float(current_risk), float(previous_risk)
         risk_increase = current_risk - previous_risk
         alert_level = AlertLevel.HIGH if risk_increase >= 0.20 else AlertLevel.MEDIUM
         
@@ -233,7 +393,7 @@ class RealTimeNotificationSystem:
         }
         
         alert = StudentAlert(
-            alert_id=f"alert_{student_id}_{int(datetime.now().timestamp())}",
+            alert_id=new_alert_id('alert', student_id),
             student_id=student_id,
             student_name=student_name,
             alert_type=AlertType.RISK_INCREASE,
@@ -251,13 +411,17 @@ class RealTimeNotificationSystem:
     async def check_condition_alerts(self, student_id: str, student_name: str, 
                                    current_risk: float, data: Dict) -> List[StudentAlert]:
         """Check for specific condition-based alerts (attendance, grades, engagement)"""
-        
+        return self._build_condition_alerts(student_id, student_name, current_risk, data)
+
+    def _build_condition_alerts(self, student_id: str, student_name: str,
+                                current_risk: float, data: Dict) -> List[StudentAlert]:
+        current_risk = float(current_risk)
         alerts = []
         
         # Attendance drop alert
-        if 'attendance_rate' in data and data['attendance_rate'] < 0.75:
+        if 'attendance_rate' in data and data['attendance_rate'] < LOW_ATTENDANCE_RATE:
             alert = StudentAlert(
-                alert_id=f"attendance_{student_id}_{int(datetime.now().timestamp())}",
+                alert_id=new_alert_id('attendance', student_id),
                 student_id=student_id,
                 student_name=student_name,
                 alert_type=AlertType.ATTENDANCE_DROP,
@@ -274,7 +438,7 @@ class RealTimeNotificationSystem:
         # Grade decline alert
         if 'grade_trend' in data and data['grade_trend'] == 'declining':
             alert = StudentAlert(
-                alert_id=f"grades_{student_id}_{int(datetime.now().timestamp())}",
+                alert_id=new_alert_id('grades', student_id),
                 student_id=student_id,
                 student_name=student_name,
                 alert_type=AlertType.GRADE_DECLINE,
@@ -289,9 +453,9 @@ class RealTimeNotificationSystem:
             alerts.append(alert)
         
         # Engagement drop alert
-        if 'engagement_score' in data and data['engagement_score'] < 0.50:
+        if 'engagement_score' in data and data['engagement_score'] < LOW_ENGAGEMENT_SCORE:
             alert = StudentAlert(
-                alert_id=f"engagement_{student_id}_{int(datetime.now().timestamp())}",
+                alert_id=new_alert_id('engagement', student_id),
                 student_id=student_id,
                 student_name=student_name,
                 alert_type=AlertType.ENGAGEMENT_DROP,
@@ -311,23 +475,53 @@ class RealTimeNotificationSystem:
         """Process and broadcast an alert through configured channels"""
         
         # Add to active alerts
-        self.active_alerts[alert.alert_id] = alert
-        self.alert_history.append(alert)
+        self.alerts.add(alert)
         
         logger.info(f"🔔 Processing alert: {alert.message}")
         
         # Find applicable notification rules
-        applicable_rules = [
-            rule for rule in self.notification_rules 
-            if rule.enabled and alert.alert_type in rule.alert_types
-            and alert.risk_score >= rule.risk_threshold
-        ]
+        applicable_rules = self._applicable_rules(alert, self._rules_by_type())
         
-        # Broadcast through configured channels
-        for rule in applicable_rules:
-            if 'websocket' in (rule.channels or []):
-                await self.broadcast_websocket_alert(alert)
-                
+        # Broadcast through configured channels (WebSocket once, however many rules ask for it)
+        if any('websocket' in (rule.channels or []) for rule in applicable_rules):
+            await self.broadcast_websocket_alert(alert)
+        
+        await self._send_rule_notifications(alert, applicable_rules)
+
+    async def process_alerts(self, alerts: List[StudentAlert]):
+        """Process a batch of alerts; WebSocket delivery is grouped into batched broadcasts"""
+        
+        if not alerts:
+            return
+        rules_by_type = self._rules_by_type()
+        websocket_alerts = []
+        for alert in alerts:
+            self.alerts.add(alert)
+            applicable_rules = self._applicable_rules(alert, rules_by_type)
+            if any('websocket' in (rule.channels or []) for rule in applicable_rules):
+                websocket_alerts.append(alert)
+            await self._send_rule_notifications(alert, applicable_rules)
+        
+        self.broadcast_websocket_alerts(websocket_alerts)
+        logger.info(f"🔔 Processed {len(alerts)} alerts, {len(websocket_alerts)} broadcast")
+
+    def _rules_by_type(self) -> Dict[AlertType, List[NotificationRule]]:
+        """Enabled rules indexed by the alert types they cover"""
+        rules_by_type: Dict[AlertType, List[NotificationRule]] = {}
+        for rule in self.notification_rules:
+            if rule.enabled:
+                for alert_type in rule.alert_types:
+                    rules_by_type.setdefault(alert_type, []).append(rule)
+        return rules_by_type
+
+    @staticmethod
+    def _applicable_rules(alert: StudentAlert,
+                          rules_by_type: Dict[AlertType, List[NotificationRule]]) -> List[NotificationRule]:
+        return [rule for rule in rules_by_type.get(alert.alert_type, []) if alert.risk_score >= rule.risk_threshold]
+
+    async def _send_rule_notifications(self, alert: StudentAlert, rules: List[NotificationRule]):
+        """Email/SMS channels of the rules an alert matched"""
+        for rule in rules:
             if 'email' in (rule.channels or []) and self.email_user:
                 await self.send_email_alert(alert, rule.recipients or [])
                 
@@ -335,54 +529,86 @@ class RealTimeNotificationSystem:
             if 'sms' in (rule.channels or []):
                 logger.info(f"📱 SMS alert would be sent for: {alert.message}")
 
+    @staticmethod
+    def _alert_payload(alert: StudentAlert) -> Dict[str, Any]:
+        """JSON-ready alert fields (enum values and timestamp as strings)"""
+        # Shallow copy: serialized straight away, so asdict's recursive deep copy is not needed
+        payload = {name: getattr(alert, name) for name in _ALERT_FIELDS}
+        payload['alert_type'] = alert.alert_type.value
+        payload['alert_level'] = alert.alert_level.value
+        payload['timestamp'] = alert.timestamp.isoformat()
+        return payload
+
     async def broadcast_websocket_alert(self, alert: StudentAlert):
-        """Broadcast alert to all connected WebSocket clients"""
+        """Queue an alert for WebSocket clients subscribed to its student, institution or school"""
         
         alert_data = {
             'type': 'student_alert',
-            'alert': asdict(alert),
+            'alert': self._alert_payload(alert),
             'timestamp': alert.timestamp.isoformat()
         }
         
-        # Convert enum values to strings for JSON serialization
-        alert_data['alert']['alert_type'] = alert.alert_type.value
-        alert_data['alert']['alert_level'] = alert.alert_level.value
-        alert_data['alert']['timestamp'] = alert.timestamp.isoformat()
-        
-        message = json.dumps(alert_data)
-        
-        # Broadcast to all connected clients
-        disconnected_clients = set()
-        for websocket in self.websocket_connections:
-            try:
-                await websocket.send_text(message)
-            except Exception as e:
-                logger.warning(f"Failed to send WebSocket message: {e}")
-                disconnected_clients.add(websocket)
-        
-        # Clean up disconnected clients
-        self.websocket_connections -= disconnected_clients
+        recipients = self.broadcaster.publish(json.dumps(alert_data, default=str), alert.topics,
+                                              scope=alert.institution_id)
+        logger.info(f"📡 Broadcasted alert to {recipients} WebSocket clients")
+
+    def broadcast_websocket_alerts(self, alerts: List[StudentAlert]):
+        """
+        Broadcast many alerts as grouped messages
         
-        logger.info(f"📡 Broadcasted alert to {len(self.websocket_connections)} WebSocket clients")
+        Alerts are grouped by institution/school and sent as ``student_alert_batch``
+        messages of up to ALERT_BATCH_MESSAGE_SIZE alerts to that scope's subscribers.
+        Clients following individual students get those
+        students' alerts as ``student_alert`` messages unless a batch already reached them.
+        """
+        groups: Dict[tuple, List[StudentAlert]] = {}
+        for alert in alerts:
+            groups.setdefault((alert.institution_id, alert.school_id), []).append(alert)
+        
+        messages = 0
+        for (institution_id, school_id), group in groups.items():
+            scope_topics = []
+            if institution_id is not None:
+                scope_topics.append(topic('institution', institution_id))
+            if school_id is not None:
+                scope_topics.append(topic('school', school_id))
+            timestamp = datetime.now().isoformat()
+            for start in range(0, len(group), ALERT_BATCH_MESSAGE_SIZE):
+                chunk = group[start:start + ALERT_BATCH_MESSAGE_SIZE]
+                self.broadcaster.publish({
+                    'type': 'student_alert_batch',
+                    'count': len(chunk),
+                    'alerts': [self._alert_payload(alert) for alert in chunk],
+                    'timestamp': timestamp
+                }, scope_topics, scope=institution_id)
+                messages += 1
+            
+            reached = self.broadcaster.recipients(scope_topics, institution_id)
+            for alert in group:
+                student_topic = topic('student', alert.student_id)
+                if self.broadcaster.has_subscribers(student_topic):
+                    self.broadcaster.publish({
+                        'type': 'student_alert',
+                        'alert': self._alert_payload(alert),
+                        'timestamp': alert.timestamp.isoformat()
+                    }, [student_topic], exclude=reached, scope=institution_id)
+                    messages += 1
+        
+        if alerts:
+            logger.info(f"📡 Broadcasted {len(alerts)} alerts in {messages} WebSocket messages")
 
     async def send_email_alert(self, alert: StudentAlert, recipients: List[str]):
-        """Send email notification for alert"""
+        """Queue an email notification for alert (sent in the background, digested per recipient)"""
         
         if not self.email_user or not self.email_password:
             logger.warning("📧 Email credentials not configured - skipping email alert")
             return
             
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.email_user
-            msg['To'] = ', '.join(recipients) if recipients else self.email_user
-            msg['Subject'] = f"Student Alert: {alert.student_name} - {alert.alert_level.value.upper()}"
+            subject = f"Student Alert: {alert.student_name} - {alert.alert_level.value.upper()}"
             
-            # Create HTML email body
-            html_body = f"""
-            <html>
-                <body>
-                    <h2>🚨 Student Success Alert</h2>
+            # HTML section for this alert; the dispatcher wraps one or more sections into a message
+            html_section = f"""
                     <div style="border-left: 4px solid #ff6b6b; padding-left: 16px; margin: 16px 0;">
                         <h3>{alert.message}</h3>
                         <p><strong>Student:</strong> {alert.student_name}</p>
@@ -395,32 +621,22 @@ class RealTimeNotificationSystem:
                     {f'<p><strong>🎯 Intervention Recommended:</strong> Yes</p>' if alert.intervention_recommended else ''}
                     
                     <h4>Additional Details:</h4>
-                    <pre>{json.dumps(alert.details, indent=2)}</pre>
-                    
-                    <p><em>This alert was generated by the Student Success Prediction System.</em></p>
-                </body>
-            </html>
+                    <pre>{json.dumps(alert.details, indent=2, default=str)}</pre>
             """
             
-            msg.attach(MIMEText(html_body, 'html'))
-            
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.email_user, self.email_password)
-                server.send_message(msg)
-                
-            logger.info(f"📧 Email alert sent for {alert.student_name}")
+            queued = self.email.submit(recipients or [self.email_user], subject, html_section)
+            logger.info(f"📧 Email alert queued for {alert.student_name} ({queued} recipients)")
             
         except Exception as e:
-            logger.error(f"❌ Failed to send email alert: {e}")
+            logger.error(f"❌ Failed to queue email alert: {e}")
 
     async def acknowledge_alert(self, alert_id: str, user_id: str) -> bool:
         """Acknowledge an alert"""
         
-        if alert_id in self.active_alerts:
-            self.active_alerts[alert_id].acknowledged = True
-            self.active_alerts[alert_id].assignee = user_id
+        alert = self.alerts.get_active(alert_id)
+        if alert is not None:
+            alert.acknowledged = True
+            alert.assignee = user_id
             
             # Broadcast acknowledgment
             await self.broadcast_alert_update(alert_id, 'acknowledged')
@@ -433,9 +649,8 @@ class RealTimeNotificationSystem:
     async def resolve_alert(self, alert_id: str, user_id: str, resolution_notes: str = None) -> bool:
         """Resolve an alert"""
         
-        if alert_id in self.active_alerts:
-            alert = self.active_alerts[alert_id]
-            alert.resolved = True
+        alert = self.alerts.resolve(alert_id)
+        if alert is not None:
             alert.assignee = user_id
             
             if resolution_notes:
@@ -443,17 +658,6 @@ class RealTimeNotificationSystem:
                 alert.details['resolved_by'] = user_id
                 alert.details['resolved_at'] = datetime.now().isoformat()
             
-            # Remove from active alerts
-            # Keep a resolved copy in history; replace the corresponding history entry if exists
-            resolved_copy = alert
-            del self.active_alerts[alert_id]
-            for i, hist_alert in enumerate(self.alert_history):
-                if hist_alert.alert_id == alert_id:
-                    self.alert_history[i] = resolved_copy
-                    break
-            else:
-                self.alert_history.append(resolved_copy)
-            
             # Broadcast resolution
             await self.broadcast_alert_update(alert_id, 'resolved')
             
@@ -472,65 +676,62 @@ class RealTimeNotificationSystem:
             'timestamp': datetime.now().isoformat()
         }
         
-        message = json.dumps(update_data)
-        
-        for websocket in self.websocket_connections:
-            try:
-                await websocket.send_text(message)
-            except Exception:
-                pass  # Handle in main broadcast method
+        alert = self.alerts.get(alert_id)
+        if alert is not None:
+            self.broadcaster.publish(update_data, alert.topics, scope=alert.institution_id)
 
-    def add_websocket_connection(self, websocket):
-        """Add a WebSocket connection for real-time notifications"""
-        self.websocket_connections.add(websocket)
-        logger.info(f"📡 WebSocket connected - {len(self.websocket_connections)} total connections")
+    def add_websocket_connection(self, websocket, topics: List[str] = None, institution_id: Any = None):
+        """Add a WebSocket connection receiving the given topics, limited to one institution's alerts if given"""
+        self.broadcaster.connect(websocket, topics or (), scope=institution_id)
+        logger.info(f"📡 WebSocket connected - {len(self.broadcaster)} total connections")
 
     def remove_websocket_connection(self, websocket):
         """Remove a WebSocket connection"""
-        self.websocket_connections.discard(websocket)
-        logger.info(f"📡 WebSocket disconnected - {len(self.websocket_connections)} total connections")
+        self.broadcaster.disconnect(websocket)
+        logger.info(f"📡 WebSocket disconnected - {len(self.broadcaster)} total connections")
 
-    def get_active_alerts(self, student_id: str = None) -> List[StudentAlert]:
-        """Get active alerts, optionally filtered by student"""
-        
-        alerts = list(self.active_alerts.values())
-        
-        if student_id:
-            alerts = [alert for alert in alerts if alert.student_id == student_id]
-            
-        # Sort by timestamp (newest first)
-        alerts.sort(key=lambda x: x.timestamp, reverse=True)
-        
-        return alerts
+    def get_active_alerts(self, student_id: str = None, limit: int = None) -> List[StudentAlert]:
+        """Get active alerts (newest first), optionally filtered by student"""
+        return self.alerts.active_alerts(student_id or None, limit)
+
+    def get_alert_history(self, student_id: str = None, limit: int = None) -> List[StudentAlert]:
+        """Get alerts from the bounded history (newest first), optionally filtered by student"""
+        return self.alerts.history(student_id or None, limit)
 
     def get_alert_statistics(self) -> Dict[str, Any]:
-        """Get notification system statistics"""
-        
-        total_alerts = len(self.alert_history)
-        active_alerts = len(self.active_alerts)
-        
-        # Count by alert level
-        level_counts = {}
-        for alert in self.alert_history:
-            level = alert.alert_level.value
-            level_counts[level] = level_counts.get(level, 0) + 1
-        
-        # Count by alert type
-        type_counts = {}
-        for alert in self.alert_history:
-            alert_type = alert.alert_type.value
-            type_counts[alert_type] = type_counts.get(alert_type, 0) + 1
+        """Get notification system statistics (running counters, independent of history size)"""
         
         return {
-            'total_alerts': total_alerts,
-            'active_alerts': active_alerts,
-            'resolved_alerts': total_alerts - active_alerts,
-            'alert_levels': level_counts,
-            'alert_types': type_counts,
-            'websocket_connections': len(self.websocket_connections),
+            **self.alerts.get_stats(),
+            'websocket_connections': len(self.broadcaster),
+            'websocket': self.broadcaster.get_stats(),
             'notification_rules': len(self.notification_rules),
-            'students_monitored': len(self.student_risk_cache)
+            'students_monitored': len(self.student_risk_cache),
+            'risk_cache_limit': self.student_risk_cache.max_size,
+            'email': self.email.get_stats()
         }
 
+def new_alert_id(prefix: str, student_id: str) -> str:
+    """Unique alert id (``<prefix>_<student>_<unix seconds>`` alone collided for alerts raised in the same second)"""
+    return f"{prefix}_{student_id}_{int(datetime.now().timestamp())}_{uuid.uuid4().hex[:8]}"
+
+def _plain(value: Any) -> Any:
+    """NumPy scalars (from DataFrame rows) as plain Python values"""
+    return value.item() if isinstance(value, np.generic) else value
+
+def _float_column(rows: List[Dict[str, Any]], *fields: str, default: float = np.nan) -> np.ndarray:
+    """First present field of each row as a float array; missing or non-numeric values become ``default``"""
+    values = np.full(len(rows), default, dtype=float)
+    for i, row in enumerate(rows):
+        for field in fields:
+            value = row.get(field)
+            if value is not None:
+                try:
+                    values[i] = float(value)
+                except (TypeError, ValueError):
+                    pass
+                break
+    return values
+
 # Global notification system instance
 notification_system = RealTimeNotificationSystem()
\ No newline at end of file
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Rate Limiting Engine for Inbound API Requests
+
+One limiter shared by ``AdvancedRateLimiter`` and the simple auth helpers.
+Each key (operation + client IP) holds a single float, its GCRA theoretical
+arrival time, instead of a deque of every request timestamp. A key whose
+arrival time has passed is indistinguishable from a key that was never seen,
+so idle keys are evicted and memory stays O(active keys).
+
+State lives in a pluggable backend:
+
+* ``MemoryRateLimitBackend`` - per-process, sharded dicts so concurrent
+  requests only contend on 1/N of the keys
+* ``SQLiteRateLimitBackend`` - a local file shared by every uvicorn worker on
+  the host, updated under an immediate transaction so workers enforce one
+  combined limit
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARDS = 64
+# Each shard is swept for idle keys after this many updates (amortized O(1) per request)
+SWEEP_EVERY = 1024
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """``limit`` requests per ``window`` seconds, allowing the whole limit as a burst"""
+    limit: int
+    window: float
+
+    @property
+    def interval(self) -> float:
+        """Seconds of quota one request consumes"""
+        return self.window / self.limit
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of one rate limit check"""
+    allowed: bool
+    retry_after: float = 0.0
+    used: float = 0.0  # requests counted against the current window, including this one
+
+
+def gcra(tat: Optional[float], now: float, rate: RateLimit) -> Tuple[Optional[float], RateLimitDecision]:
+    """
+    Generic cell rate algorithm step.
+
+    Args:
+        tat: Stored theoretical arrival time for the key, None if unseen
+        now: Current time in seconds
+        rate: Limit being enforced
+
+    Returns:
+        (new theoretical arrival time, or None to leave state untouched; decision)
+    """
+    interval = rate.window / rate.limit
+    base = tat if tat is not None and tat > now else now
+    new_tat = base + interval
+    backlog = new_tat - now
+    if backlog > rate.window + 1e-9:
+        return None, RateLimitDecision(False, retry_after=backlog - rate.window, used=(base - now) / interval)
+    return new_tat, RateLimitDecision(True, used=backlog / interval)
+
+
+class MemoryRateLimitBackend:
+    """In-process state split across independently locked shards"""
+
+    def __init__(self, shards: int = DEFAULT_SHARDS, sweep_every: int = SWEEP_EVERY):
+        self._shards: List[Dict[str, float]] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._updates = [0] * shards
+        self._sweep_every = sweep_every
+
+    def _shard(self, key: str) -> int:
+        return hash(key) % len(self._shards)
+
+    def hit(self, key: str, now: float, rate: RateLimit) -> RateLimitDecision:
+        index = self._shard(key)
+        shard = self._shards[index]
+        with self._locks[index]:
+            new_tat, decision = gcra(shard.get(key), now, rate)
+            if new_tat is not None:
+                shard[key] = new_tat
+            self._updates[index] += 1
+            if self._updates[index] >= self._sweep_every:
+                self._updates[index] = 0
+                self._sweep(shard, now)
+        return decision
+
+    def set_until(self, key: str, until: float) -> None:
+        index = self._shard(key)
+        with self._locks[index]:
+            self._shards[index][key] = until
+
+    def get_until(self, key: str, now: float) -> float:
+        """Stored time for ``key`` if it is still in the future, else 0"""
+        value = self._shards[self._shard(key)].get(key, 0.0)
+        return value if value > now else 0.0
+
+    @staticmethod
+    def _sweep(shard: Dict[str, float], now: float) -> int:
+        idle = [key for key, tat in shard.items() if tat <= now]
+        for key in idle:
+            del shard[key]
+        return len(idle)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop every key whose quota has fully recovered; returns the number removed"""
+        now = time.time() if now is None else now
+        removed = 0
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                removed += self._sweep(shard, now)
+        return removed
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+class SQLiteRateLimitBackend:
+    """State in a local SQLite file so every worker process on the host shares the limits"""
+
+    def __init__(self, path: str, sweep_every: int = SWEEP_EVERY):
+        self.path = path
+        self._sweep_every = sweep_every
+        self._updates = 0
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # counters, not records; losing the last writes on a crash is fine
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, now: float, rate: RateLimit) -> RateLimitDecision:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            new_tat, decision = gcra(row[0] if row else None, now, rate)
+            if new_tat is not None:
+                conn.execute("INSERT OR REPLACE INTO rate_limits (key, tat) VALUES (?, ?)", (key, new_tat))
+            self._updates += 1
+            if self._updates >= self._sweep_every:
+                self._updates = 0
+                conn.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return decision
+
+    def set_until(self, key: str, until: float) -> None:
+        self._connection().execute("INSERT OR REPLACE INTO rate_limits (key, tat) VALUES (?, ?)", (key, until))
+
+    def get_until(self, key: str, now: float) -> float:
+        row = self._connection().execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+        return row[0] if row and row[0] > now else 0.0
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return self._connection().execute("DELETE FROM rate_limits WHERE tat <= ?", (now,)).rowcount
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+class RateLimiter:
+    """Checks keyed limits against a backend and tracks temporary blocks"""
+
+    def __init__(self, backend=None, clock: Callable[[], float] = time.time):
+        self.backend = backend if backend is not None else MemoryRateLimitBackend()
+        self._clock = clock
+
+    def hit(self, key: str, rate: RateLimit) -> RateLimitDecision:
+        """Count one request for ``key``; rejected requests consume no quota"""
+        return self.backend.hit(key, self._clock(), rate)
+
+    def block(self, key: str, seconds: float) -> None:
+        self.backend.set_until(f"blocked:{key}", self._clock() + seconds)
+
+    def blocked_for(self, key: str) -> float:
+        """Seconds until ``key`` is unblocked, 0 if it is not blocked"""
+        now = self._clock()
+        until = self.backend.get_until(f"blocked:{key}", now)
+        return until - now if until else 0.0
+
+
+def create_rate_limit_backend():
+    """Backend selected by RATE_LIMIT_BACKEND (memory or file, at RATE_LIMIT_STATE_PATH)"""
+    kind = os.getenv('RATE_LIMIT_BACKEND', 'memory').lower()
+    if kind == 'file':
+        path = os.getenv('RATE_LIMIT_STATE_PATH', 'rate_limits.db')
+        logger.info(f"Rate limits shared through {path}")
+        return SQLiteRateLimitBackend(path)
+    if kind != 'memory':
+        logger.warning(f"Unknown RATE_LIMIT_BACKEND '{kind}', using in-process limits")
+    return MemoryRateLimitBackend()
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter(create_rate_limit_backend())
+    return _rate_limiter
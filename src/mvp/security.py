@@ -4,18 +4,27 @@ Production-Ready Security Module
 Implements secure authentication, session management, and security controls
 """
 
+import math
 import os
 import time
 import secrets
 import hashlib
 import hmac
+import base64
+import json
+import threading
 from datetime import datetime, timedelta
 from fastapi import HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials
 from typing import Dict, Any, Optional
-from collections import defaultdict, deque
+from collections import OrderedDict
 import logging
 
+try:
+    from .rate_limit import RateLimit, RateLimiter, get_rate_limiter
+except ImportError:
+    from mvp.rate_limit import RateLimit, RateLimiter, get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 # Security Configuration
@@ -104,30 +113,106 @@ class SecurityConfig:
 security_config = SecurityConfig()
 
 # Session Management
+class SessionRevocationStore:
+    """Database-backed revoked session nonces (revoked_sessions table)
+
+    Revocations have to survive restarts and be seen by every worker, so they
+    live in the database rather than in process memory. A row is only needed
+    until the token it covers expires; expired rows are purged on each write.
+    """
+    
+    def __init__(self, session_factory=None):
+        """
+        Initialize store.
+        
+        Args:
+            session_factory: Context manager yielding a DB session (defaults to get_db_session)
+        """
+        if session_factory is None:
+            try:
+                from .database import get_db_session
+            except ImportError:
+                from mvp.database import get_db_session
+            session_factory = get_db_session
+        self.session_factory = session_factory
+    
+    @staticmethod
+    def _model():
+        try:
+            from .models import RevokedSession
+        except ImportError:
+            from mvp.models import RevokedSession
+        return RevokedSession
+    
+    def revoke(self, nonce: str, exp: int, now: float) -> None:
+        """Record a revoked nonce until ``exp`` and drop revocations that expired before ``now``"""
+        RevokedSession = self._model()
+        with self.session_factory() as db:
+            db.query(RevokedSession).filter(RevokedSession.exp < int(now)).delete(synchronize_session=False)
+            db.merge(RevokedSession(nonce=nonce, exp=int(exp)))
+            db.commit()
+    
+    def is_revoked(self, nonce: str) -> bool:
+        RevokedSession = self._model()
+        with self.session_factory() as db:
+            return db.query(RevokedSession.nonce).filter(RevokedSession.nonce == nonce).first() is not None
+
+
 class SecureSessionManager:
-    """Secure session management with cryptographic validation"""
+    """Secure session management with cryptographic validation
+
+    Tokens are stateless: ``v1.<payload>.<signature>``, where the base64url JSON
+    payload carries the user id, creation and expiry times and a random nonce,
+    and the signature is the full HMAC-SHA256 of the payload under
+    SESSION_SECRET. Any worker sharing the secret can validate a token without
+    a session store. Verified tokens are kept in a bounded LRU cache so repeat
+    requests skip the HMAC; the cache is cleared whenever the secret changes.
+    Revoked nonces are recorded in the database (SessionRevocationStore), so
+    logouts hold across restarts and workers until the token would have
+    expired anyway.
+    """
     
-    def __init__(self):
+    TOKEN_VERSION = 'v1'
+    
+    def __init__(self, cache_size: Optional[int] = None, clock=time.time,
+                 revocations: Optional[SessionRevocationStore] = None):
+        self._verified: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
         self.secret_key = security_config.session_secret.encode('utf-8')
         self.session_timeout = timedelta(hours=8)  # 8-hour sessions
-        self._active_sessions = {}
+        self.cache_size = cache_size or int(os.getenv('SESSION_CACHE_SIZE', '4096'))
+        self._clock = clock
+        self._revocations = revocations
+    
+    @property
+    def secret_key(self) -> bytes:
+        return self._secret_key
+    
+    @secret_key.setter
+    def secret_key(self, value: bytes) -> None:
+        # Cached tokens were verified under the old secret
+        with self._lock:
+            self._secret_key = value
+            self._verified.clear()
+    
+    @property
+    def revocations(self) -> SessionRevocationStore:
+        """Store of revoked nonces (the application database unless one was injected)"""
+        if self._revocations is None:
+            self._revocations = SessionRevocationStore()
+        return self._revocations
     
     def create_session(self, user_id: str) -> str:
         """Create a cryptographically secure session token"""
-        # Create session data
+        now = self._clock()
         session_data = {
-            'user_id': user_id,
-            'created_at': datetime.utcnow(),
-            'expires_at': datetime.utcnow() + self.session_timeout,
+            'uid': user_id,
+            'iat': int(now),
+            'exp': int(now + self.session_timeout.total_seconds()),
             'nonce': secrets.token_urlsafe(16)
         }
-        
-        # Generate secure session token
         session_token = self._generate_secure_token(session_data)
         
-        # Store session (in production, use Redis or database)
-        self._active_sessions[session_token] = session_data
-        
         logger.info(f"Created secure session for user: {user_id}")
         return session_token
     
@@ -137,27 +222,35 @@ class SecureSessionManager:
             return None
         
         try:
-            # Verify token signature
-            if not self._verify_token_signature(session_token):
-                logger.warning("Invalid session token signature")
-                return None
+            now = self._clock()
+            with self._lock:
+                session_data = self._verified.get(session_token)
+                if session_data is not None:
+                    self._verified.move_to_end(session_token)
             
-            # Check if session exists and is valid
-            session_data = self._active_sessions.get(session_token)
-            if not session_data:
-                logger.warning("Session token not found")
-                return None
+            if session_data is None:
+                # Verify token signature
+                session_data = self._verify_token_signature(session_token)
+                if session_data is None:
+                    logger.warning("Invalid session token signature")
+                    return None
+                if now <= session_data['exp']:
+                    self._cache(session_token, session_data)
             
             # Check expiration
-            if datetime.utcnow() > session_data['expires_at']:
+            if now > session_data['exp']:
                 logger.warning("Session expired")
-                self.revoke_session(session_token)
+                self._forget(session_token)
+                return None
+            
+            if self.revocations.is_revoked(session_data['nonce']):
+                logger.warning("Session revoked")
                 return None
             
             return {
-                'user_id': session_data['user_id'],
-                'created_at': session_data['created_at'],
-                'expires_at': session_data['expires_at']
+                'user_id': session_data['uid'],
+                'created_at': datetime.utcfromtimestamp(session_data['iat']),
+                'expires_at': datetime.utcfromtimestamp(session_data['exp'])
             }
         
         except Exception as e:
@@ -166,52 +259,69 @@ class SecureSessionManager:
     
     def revoke_session(self, session_token: str) -> None:
         """Revoke a session token"""
-        if session_token in self._active_sessions:
-            del self._active_sessions[session_token]
-            logger.info("Session revoked")
+        session_data = self._verify_token_signature(session_token)
+        if session_data is None:
+            return
+        # Revocations only need to outlive the tokens they cover; the store purges them after exp
+        self.revocations.revoke(session_data['nonce'], session_data['exp'], self._clock())
+        self._forget(session_token)
+        logger.info("Session revoked")
+    
+    def _cache(self, session_token: str, session_data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._verified[session_token] = session_data
+            if len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+    
+    def _forget(self, session_token: str) -> None:
+        with self._lock:
+            self._verified.pop(session_token, None)
+    
+    def _sign(self, payload: str) -> str:
+        signature = hmac.new(self.secret_key, payload.encode('ascii'), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(signature).rstrip(b'=').decode('ascii')
     
     def _generate_secure_token(self, session_data: Dict) -> str:
         """Generate cryptographically secure session token"""
-        # Create token payload
-        payload = f"{session_data['user_id']}:{session_data['nonce']}:{session_data['expires_at'].isoformat()}"
-        
-        # Generate HMAC signature
-        signature = hmac.new(
-            self.secret_key,
-            payload.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        
-        # Combine payload and signature
-        token = f"{secrets.token_urlsafe(32)}.{signature[:32]}"
-        return token
+        payload = base64.urlsafe_b64encode(
+            json.dumps(session_data, separators=(',', ':')).encode('utf-8')
+        ).rstrip(b'=').decode('ascii')
+        body = f"{self.TOKEN_VERSION}.{payload}"
+        return f"{body}.{self._sign(body)}"
     
-    def _verify_token_signature(self, token: str) -> bool:
-        """Verify token signature"""
+    def _verify_token_signature(self, token: str) -> Optional[Dict[str, Any]]:
+        """Verify token signature and return its payload, or None if it was not issued with our secret"""
         try:
-            parts = token.split('.')
-            if len(parts) != 2:
-                return False
-            
-            # In production, implement full signature verification
-            # For now, basic format validation
-            return len(parts[0]) >= 32 and len(parts[1]) == 32
+            version, payload, signature = token.split('.')
+            if version != self.TOKEN_VERSION:
+                return None
+            if not hmac.compare_digest(signature, self._sign(f"{version}.{payload}")):
+                return None
+            session_data = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+            if not all(key in session_data for key in ('uid', 'iat', 'exp', 'nonce')):
+                return None
+            return session_data
         
         except Exception:
-            return False
+            return None
+
 
 # Rate Limiting with Advanced Protection
 class AdvancedRateLimiter:
     """Advanced rate limiting with different limits for different operations"""
     
-    def __init__(self):
-        self.storage = defaultdict(lambda: {
-            'requests': deque(),
-            'uploads': deque(),
-            'auth_attempts': deque(),
-            'suspicious_activity': 0,
-            'blocked_until': None
-        })
+    # operation -> (config key, window seconds, description)
+    OPERATIONS = {
+        'api_request': ('api_requests_per_minute', 60, 'API requests'),
+        'file_upload': ('file_uploads_per_hour', 3600, 'file uploads'),
+        'auth_attempt': ('auth_attempts_per_hour', 3600, 'authentication attempts'),
+    }
+    # Two near-limit auth bursts an hour are tolerated; the third blocks the IP
+    SUSPICIOUS_ACTIVITY = RateLimit(limit=2, window=3600)
+    BLOCK_SECONDS = 3600
+    
+    def __init__(self, limiter: Optional[RateLimiter] = None):
+        self.limiter = limiter or get_rate_limiter()
         self.config = security_config.rate_limits
     
     def check_rate_limit(self, request: Request, operation: str = 'api_request') -> None:
@@ -219,23 +329,34 @@ class AdvancedRateLimiter:
         if os.getenv('TESTING', 'false').lower() == 'true':
             return
         
-        client_ip = self._get_client_ip(request)
-        current_time = time.time()
-        
+        self.check_client(self._get_client_ip(request), operation)
+    
+    def check_client(self, client_ip: str, operation: str = 'api_request') -> None:
+        """Count one ``operation`` for ``client_ip``, raising 429 when over its limit"""
         # Check if IP is temporarily blocked
-        if self._is_ip_blocked(client_ip, current_time):
+        if self.limiter.blocked_for(client_ip):
             raise HTTPException(
                 status_code=429,
                 detail="IP temporarily blocked due to suspicious activity"
             )
         
-        # Check specific operation limits
-        if operation == 'api_request':
-            self._check_api_limit(client_ip, current_time)
-        elif operation == 'file_upload':
-            self._check_upload_limit(client_ip, current_time)
-        elif operation == 'auth_attempt':
-            self._check_auth_limit(client_ip, current_time)
+        if operation not in self.OPERATIONS:
+            return
+        config_key, window, description = self.OPERATIONS[operation]
+        rate = RateLimit(limit=self.config[config_key], window=window)
+        decision = self.limiter.hit(f"{operation}:{client_ip}", rate)
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded for {description}. Try again in {math.ceil(decision.retry_after)} seconds"
+            )
+        
+        # Track suspicious activity for auth attempts at 80% of the limit
+        if operation == 'auth_attempt' and decision.used >= rate.limit * 0.8:
+            suspicious = self.limiter.hit(f"suspicious:{client_ip}", self.SUSPICIOUS_ACTIVITY)
+            if not suspicious.allowed:
+                self.limiter.block(client_ip, self.BLOCK_SECONDS)
+                logger.warning(f"Blocked IP {client_ip} for suspicious authentication activity")
     
     def _get_client_ip(self, request: Request) -> str:
         """Get real client IP, handling proxies"""
@@ -249,70 +370,6 @@ class AdvancedRateLimiter:
             return real_ip.strip()
         
         return request.client.host
-    
-    def _is_ip_blocked(self, client_ip: str, current_time: float) -> bool:
-        """Check if IP is currently blocked"""
-        ip_data = self.storage[client_ip]
-        blocked_until = ip_data.get('blocked_until')
-        
-        if blocked_until and current_time < blocked_until:
-            return True
-        elif blocked_until and current_time >= blocked_until:
-            # Unblock IP
-            ip_data['blocked_until'] = None
-            ip_data['suspicious_activity'] = 0
-        
-        return False
-    
-    def _check_api_limit(self, client_ip: str, current_time: float) -> None:
-        """Check API request rate limit"""
-        limit = self.config['api_requests_per_minute']
-        window = 60
-        requests = self.storage[client_ip]['requests']
-        
-        self._enforce_limit(client_ip, requests, limit, window, current_time, 'API requests')
-    
-    def _check_upload_limit(self, client_ip: str, current_time: float) -> None:
-        """Check file upload rate limit"""
-        limit = self.config['file_uploads_per_hour']
-        window = 3600
-        uploads = self.storage[client_ip]['uploads']
-        
-        self._enforce_limit(client_ip, uploads, limit, window, current_time, 'file uploads')
-    
-    def _check_auth_limit(self, client_ip: str, current_time: float) -> None:
-        """Check authentication attempt rate limit"""
-        limit = self.config['auth_attempts_per_hour']
-        window = 3600
-        auth_attempts = self.storage[client_ip]['auth_attempts']
-        
-        self._enforce_limit(client_ip, auth_attempts, limit, window, current_time, 'authentication attempts')
-        
-        # Track suspicious activity for auth attempts
-        if len(auth_attempts) >= limit * 0.8:  # 80% of limit
-            self.storage[client_ip]['suspicious_activity'] += 1
-            if self.storage[client_ip]['suspicious_activity'] >= 3:
-                # Block IP for 1 hour
-                self.storage[client_ip]['blocked_until'] = current_time + 3600
-                logger.warning(f"Blocked IP {client_ip} for suspicious authentication activity")
-    
-    def _enforce_limit(self, client_ip: str, timestamps: deque, limit: int, 
-                      window: int, current_time: float, operation: str) -> None:
-        """Enforce rate limit for specific operation"""
-        # Remove old timestamps
-        while timestamps and current_time - timestamps[0] > window:
-            timestamps.popleft()
-        
-        # Check limit
-        if len(timestamps) >= limit:
-            time_to_wait = window - (current_time - timestamps[0])
-            raise HTTPException(
-                status_code=429,
-                detail=f"Rate limit exceeded for {operation}. Try again in {int(time_to_wait)} seconds"
-            )
-        
-        # Add current timestamp
-        timestamps.append(current_time)
 
 # Input Sanitization and Validation
 class InputSanitizer:
@@ -343,139 +400,17 @@ class InputSanitizer:
         return filename
     
     @staticmethod
-    def validate_file_content(content: bytes, filename: str) -> None:
-        """Comprehensive file content validation for security and integrity"""
-        import csv
-        import io
-        
-        # 1. SIZE LIMITS - Multiple tiers for security
-        max_size = int(os.getenv('MAX_FILE_SIZE_MB', '10')) * 1024 * 1024
-        if len(content) > max_size:
-            raise HTTPException(status_code=413, detail=f"File too large (max {max_size//1024//1024}MB)")
-        
-        if len(content) < 10:  # Minimum viable CSV content
-            raise HTTPException(status_code=400, detail="File too small to be valid CSV")
-        
-        # 2. EXTENSION VALIDATION - Strict whitelist
-        allowed_extensions = ['.csv']
-        if not any(filename.lower().endswith(ext) for ext in allowed_extensions):
-            raise HTTPException(status_code=400, detail="Only CSV files allowed")
-        
-        # 3. MIME TYPE VALIDATION - Prevent disguised files (optional)
+    def validate_file_content(content: bytes, filename: str) -> 'ValidatedUpload':
+        """Comprehensive file content validation for security and integrity
+
+        Runs as a single streaming pass (see upload_validation); parse the returned
+        upload with ``read_csv()`` instead of decoding the bytes again.
+        """
         try:
-            import magic
-            detected_type = magic.from_buffer(content, mime=True)
-            # CSV files can be detected as text/plain or text/csv
-            allowed_mime_types = ['text/plain', 'text/csv', 'application/csv', 'text/x-csv']
-            if detected_type not in allowed_mime_types:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Invalid file type. Expected CSV, got: {detected_type}"
-                )
+            from .upload_validation import validate_csv_upload
         except ImportError:
-            # python-magic not installed, skip MIME validation
-            logging.info("MIME type validation skipped (python-magic not installed)")
-        except Exception as e:
-            # If magic fails, continue with other validations
-            logging.warning(f"MIME type detection failed: {e}, relying on other validations")
-        
-        # 4. ENCODING VALIDATION - Strict UTF-8
-        try:
-            content_str = content.decode('utf-8')
-        except UnicodeDecodeError as e:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Invalid file encoding at byte {e.start}. Must be UTF-8"
-            )
-        
-        if len(content_str.strip()) == 0:
-            raise HTTPException(status_code=400, detail="File contains no readable content")
-        
-        # 5. MALICIOUS CONTENT SCANNING - Comprehensive patterns
-        dangerous_patterns = [
-            # Script injection
-            '<script', 'javascript:', 'vbscript:', 'onload=', 'onerror=', 'onclick=',
-            # Command injection
-            '$(', '${', '`', '&&', '||', ';ls', ';cat', ';rm', 'eval(', 'exec(',
-            # SQL injection attempts in CSV
-            'drop table', 'delete from', 'insert into', 'update set', 'union select',
-            # Path traversal
-            '../', '..\\', '/etc/', '/bin/', 'c:\\windows\\',
-            # Binary signatures that shouldn't be in CSV
-            '\\x00', '\\xff\\xfe', '\\xfe\\xff', 'pk\\x03\\x04',  # ZIP signature
-            # Suspicious macro indicators
-            'auto_open', 'workbook_open', 'document_open'
-        ]
-        
-        content_lower = content_str.lower()
-        for pattern in dangerous_patterns:
-            if pattern in content_lower:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"File contains potentially dangerous content: {pattern}"
-                )
-        
-        # 6. CSV STRUCTURE VALIDATION - Parse and validate
-        try:
-            # Test CSV parsing with strict validation
-            csv_reader = csv.reader(io.StringIO(content_str))
-            
-            # Validate header row exists
-            try:
-                header_row = next(csv_reader)
-                if not header_row or len(header_row) < 1:
-                    raise HTTPException(status_code=400, detail="CSV must have header row")
-            except StopIteration:
-                raise HTTPException(status_code=400, detail="CSV file appears to be empty")
-            
-            # Validate reasonable column count
-            if len(header_row) > 200:  # Prevent excessive columns
-                raise HTTPException(status_code=400, detail="Too many columns (max 200)")
-            
-            # Validate header content
-            for col_name in header_row:
-                if not col_name or len(str(col_name).strip()) == 0:
-                    raise HTTPException(status_code=400, detail="CSV headers cannot be empty")
-                if len(str(col_name)) > 255:
-                    raise HTTPException(status_code=400, detail="CSV header names too long")
-            
-            # Sample first few rows for structure validation
-            row_count = 0
-            for row in csv_reader:
-                row_count += 1
-                
-                # Check for excessive rows (prevent DoS)
-                if row_count > 50000:  # Reasonable limit for educational data
-                    raise HTTPException(status_code=400, detail="Too many rows (max 50,000)")
-                
-                # Validate row structure matches header
-                if len(row) != len(header_row):
-                    logging.warning(f"Row {row_count + 1} has {len(row)} columns, expected {len(header_row)}")
-                    # Allow some flexibility but warn
-                
-                # Sample only first 100 rows for performance
-                if row_count >= 100:
-                    break
-            
-            # Ensure minimum viable data
-            if row_count == 0:
-                raise HTTPException(status_code=400, detail="CSV must contain data rows")
-            
-        except csv.Error as e:
-            raise HTTPException(status_code=400, detail=f"Invalid CSV format: {str(e)}")
-        except HTTPException:
-            raise  # Re-raise our custom exceptions
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"CSV validation failed: {str(e)}")
-        
-        # 7. CONTENT LENGTH VALIDATION - Prevent zip bombs
-        if len(content_str) > len(content) * 10:  # Suspicious compression ratio
-            raise HTTPException(
-                status_code=400, 
-                detail="Suspicious file expansion detected"
-            )
-        
-        logging.info(f"✅ File validation passed: {filename} ({len(content)} bytes, {row_count} rows)")
+            from mvp.upload_validation import validate_csv_upload
+        return validate_csv_upload(content, filename)
 
 # Global instances
 session_manager = SecureSessionManager()
@@ -11,5 +11,6 @@ from .metrics_aggregator import MetricsAggregator
 from .gpt_enhanced_predictor import GPTEnhancedPredictor
 from .context_builder import ContextBuilder
 from .gpt_cache_service import GPTCacheService
+from .insight_warmup import InsightWarmupService
 
-__all__ = ['GPTOSSService', 'MetricsAggregator', 'GPTEnhancedPredictor', 'ContextBuilder', 'GPTCacheService']
\ No newline at end of file
+__all__ = ['GPTOSSService', 'MetricsAggregator', 'GPTEnhancedPredictor', 'ContextBuilder', 'GPTCacheService', 'InsightWarmupService']
\ No newline at end of file
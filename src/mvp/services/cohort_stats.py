@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Cohort Statistics Engine
+
+Computes cohort aggregates (demographics, risk distribution, intervention
+patterns, improvement trends) with SQL GROUP BY / FILTER queries and keeps
+per-(institution, grade) counters that are updated incrementally as
+predictions and interventions are written, so cohort reads cost O(grades)
+instead of O(students).
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from sqlalchemy import func
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.mvp.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+UNKNOWN_GRADE = "unknown"
+# Seeds raced by a concurrent write are retried this many times before being served uncached
+SEED_ATTEMPTS = 3
+
+
+@dataclass
+class _StudentState:
+    """Per-student values needed to apply write deltas to grade counters."""
+    grade_level: str
+    latest_score: Optional[float] = None
+    latest_category: Optional[str] = None
+    first_score: Optional[float] = None
+    prediction_count: int = 0
+    intervention_count: int = 0
+
+    @property
+    def improving(self) -> bool:
+        return (self.prediction_count >= 2 and bool(self.first_score) and bool(self.latest_score)
+                and self.latest_score < self.first_score)
+
+
+@dataclass
+class CohortCounters:
+    """Running aggregates for one (institution, grade) cohort."""
+    student_count: int = 0
+    ell_count: int = 0
+    iep_count: int = 0
+    section_504_count: int = 0
+    economically_disadvantaged_count: int = 0
+    with_predictions: int = 0
+    risk_score_sum: float = 0.0
+    risk_categories: Dict[str, int] = field(default_factory=dict)
+    improving_count: int = 0
+    intervention_types: Dict[str, int] = field(default_factory=dict)
+    intervention_successes: Dict[str, int] = field(default_factory=dict)
+    students_with_interventions: int = 0
+
+    def merge(self, other: "CohortCounters") -> None:
+        for name in ("student_count", "ell_count", "iep_count", "section_504_count",
+                     "economically_disadvantaged_count", "with_predictions", "risk_score_sum",
+                     "improving_count", "students_with_interventions"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name in ("risk_categories", "intervention_types", "intervention_successes"):
+            target = getattr(self, name)
+            for key, count in getattr(other, name).items():
+                target[key] = target.get(key, 0) + count
+
+    def add_prediction(self, state: _StudentState, sign: int) -> None:
+        """Add (sign=1) or remove (sign=-1) a student's latest prediction contribution."""
+        if not state.prediction_count:
+            return
+        self.with_predictions += sign
+        if state.latest_score is not None:
+            self.risk_score_sum += sign * state.latest_score
+        if state.latest_category:
+            self.risk_categories[state.latest_category] = self.risk_categories.get(state.latest_category, 0) + sign
+        if state.improving:
+            self.improving_count += sign
+
+    def add_intervention(self, intervention_type: str, successful: bool, sign: int) -> None:
+        self.intervention_types[intervention_type] = self.intervention_types.get(intervention_type, 0) + sign
+        if successful:
+            self.intervention_successes[intervention_type] = (
+                self.intervention_successes.get(intervention_type, 0) + sign)
+
+
+@dataclass
+class _InstitutionStats:
+    loaded_at: float
+    grades: Dict[str, CohortCounters]
+    students: Dict[int, _StudentState]
+
+
+class CohortStatsEngine:
+    """SQL-seeded, incrementally maintained cohort counters per institution and grade."""
+
+    def __init__(self, session_factory=None, ttl_seconds: Optional[int] = None):
+        """
+        Initialize cohort statistics engine.
+
+        Args:
+            session_factory: Context manager yielding a DB session (defaults to get_db_session)
+            ttl_seconds: Re-seed counters from SQL after this many seconds, as a
+                safety net for writes that bypass the update hooks
+        """
+        if session_factory is None:
+            from src.mvp.database import get_db_session
+            session_factory = get_db_session
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(
+            os.getenv('COHORT_STATS_TTL_SECONDS', '900'))
+        self._institutions: Dict[int, _InstitutionStats] = {}
+        # Writes that arrived while an institution had no counters (e.g. during a seed)
+        self._write_versions: Counter = Counter()
+        self._invalidations = 0
+        self._lock = threading.RLock()
+
+    def get_cohort_stats(self, institution_id: int, grade_level: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get aggregated cohort statistics for an institution, optionally one grade.
+
+        Returns:
+            Dict with total_students, demographics, risk_distribution,
+            intervention_patterns and success_factors sections
+        """
+        stats = self._get_institution(institution_id)
+        with self._lock:
+            counters = CohortCounters()
+            grade_levels = {}
+            for grade, grade_counters in stats.grades.items():
+                if grade_level and grade != grade_level:
+                    continue
+                counters.merge(grade_counters)
+                if grade_counters.student_count:
+                    grade_levels[grade] = grade_counters.student_count
+        return self._format(counters, grade_levels)
+
+    def record_prediction(self, institution_id: int, student_id: int, risk_score: Optional[float],
+                          risk_category: Optional[str], replaces_existing: bool = False) -> None:
+        """
+        Apply a committed prediction write to the counters.
+
+        Args:
+            institution_id: Institution the prediction belongs to
+            student_id: Student database id
+            risk_score: New risk score
+            risk_category: New risk category
+            replaces_existing: True when the student's latest prediction row was
+                updated in place rather than a new row inserted
+        """
+        with self._lock:
+            stats = self._institutions.get(institution_id)
+            if stats is None:
+                self._write_versions[institution_id] += 1
+                return
+            state = stats.students.get(student_id)
+            if state is None:
+                # New student: demographics unknown here, re-seed on next read
+                self._institutions.pop(institution_id, None)
+                self._write_versions[institution_id] += 1
+                return
+
+            counters = stats.grades[state.grade_level]
+            counters.add_prediction(state, -1)
+            if not replaces_existing or not state.prediction_count:
+                state.prediction_count += 1
+            if state.prediction_count == 1:
+                state.first_score = risk_score
+            state.latest_score = risk_score
+            state.latest_category = risk_category
+            counters.add_prediction(state, 1)
+
+    def record_intervention(self, institution_id: int, student_id: int, intervention_type: str,
+                            outcome: Optional[str] = None, removed: bool = False) -> None:
+        """
+        Apply a committed intervention insert (or delete, with removed=True).
+
+        Outcome changes are recorded as a removal of the old values followed by
+        an insert of the new ones.
+        """
+        with self._lock:
+            stats = self._institutions.get(institution_id)
+            if stats is None:
+                self._write_versions[institution_id] += 1
+                return
+            state = stats.students.get(student_id)
+            if state is None:
+                self._institutions.pop(institution_id, None)
+                self._write_versions[institution_id] += 1
+                return
+
+            sign = -1 if removed else 1
+            counters = stats.grades[state.grade_level]
+            counters.add_intervention(intervention_type, outcome == "successful", sign)
+            had_interventions = state.intervention_count > 0
+            state.intervention_count = max(0, state.intervention_count + sign)
+            if had_interventions != (state.intervention_count > 0):
+                counters.students_with_interventions += sign
+
+    def invalidate(self, institution_id: Optional[int] = None) -> None:
+        """Drop cached counters so the next read re-seeds from SQL."""
+        with self._lock:
+            if institution_id is None:
+                self._institutions.clear()
+                self._invalidations += 1
+            else:
+                self._institutions.pop(institution_id, None)
+                self._write_versions[institution_id] += 1
+
+    def _get_institution(self, institution_id: int) -> _InstitutionStats:
+        """
+        Cached counters, seeding them from SQL when missing or expired.
+
+        The seed queries run outside the lock. A write committed after the
+        queries read but recorded before the counters are cached would be lost,
+        so a seed is only cached if no write for the institution arrived
+        meanwhile; otherwise it is re-run, which then sees the write.
+        """
+        for _ in range(SEED_ATTEMPTS):
+            with self._lock:
+                stats = self._institutions.get(institution_id)
+                if stats and time.monotonic() - stats.loaded_at < self.ttl_seconds:
+                    return stats
+                version = (self._invalidations, self._write_versions[institution_id])
+
+            stats = self._seed(institution_id)
+            with self._lock:
+                if (self._invalidations, self._write_versions[institution_id]) == version:
+                    self._institutions[institution_id] = stats
+                    return stats
+
+        # Writes kept racing the seed: serve the latest one without caching it
+        logger.info(f"📊 Cohort stats for institution {institution_id} changed while seeding; not cached")
+        return stats
+
+    def _seed(self, institution_id: int) -> _InstitutionStats:
+        """Build all counters for an institution with four aggregate queries."""
+        from src.mvp.models import Student, Prediction, Intervention
+
+        start = time.perf_counter()
+        grades: Dict[str, CohortCounters] = {}
+        students: Dict[int, _StudentState] = {}
+        cohort_filter = (Student.institution_id == institution_id, Student.enrollment_status == 'active')
+        grade_col = func.coalesce(Student.grade_level, UNKNOWN_GRADE)
+
+        with self.session_factory() as db:
+            # Demographics per grade
+            for row in db.query(
+                grade_col.label('grade_level'),
+                func.count(Student.id),
+                func.count(Student.id).filter(Student.is_ell.is_(True)),
+                func.count(Student.id).filter(Student.has_iep.is_(True)),
+                func.count(Student.id).filter(Student.has_504.is_(True)),
+                func.count(Student.id).filter(Student.is_economically_disadvantaged.is_(True))
+            ).filter(*cohort_filter).group_by(grade_col).all():
+                grades[row[0]] = CohortCounters(
+                    student_count=row[1], ell_count=row[2], iep_count=row[3],
+                    section_504_count=row[4], economically_disadvantaged_count=row[5]
+                )
+
+            for student_id, grade in db.query(Student.id, grade_col).filter(*cohort_filter).all():
+                students[student_id] = _StudentState(grade_level=grade)
+
+            # First and latest prediction per student
+            ranked = db.query(
+                Prediction.student_id.label('student_id'),
+                Prediction.risk_score.label('risk_score'),
+                Prediction.risk_category.label('risk_category'),
+                func.row_number().over(
+                    partition_by=Prediction.student_id,
+                    order_by=(Prediction.prediction_date.desc(), Prediction.id.desc())
+                ).label('latest_rank'),
+                func.row_number().over(
+                    partition_by=Prediction.student_id,
+                    order_by=(Prediction.prediction_date.asc(), Prediction.id.asc())
+                ).label('first_rank')
+            ).join(Student, Student.id == Prediction.student_id).filter(*cohort_filter).subquery()
+
+            for row in db.query(
+                ranked.c.student_id,
+                func.max(ranked.c.risk_score).filter(ranked.c.latest_rank == 1),
+                func.max(ranked.c.risk_category).filter(ranked.c.latest_rank == 1),
+                func.max(ranked.c.risk_score).filter(ranked.c.first_rank == 1),
+                func.count()
+            ).group_by(ranked.c.student_id).all():
+                state = students.get(row[0])
+                if state is None:
+                    continue
+                state.latest_score, state.latest_category, state.first_score, state.prediction_count = row[1:]
+                grades[state.grade_level].add_prediction(state, 1)
+
+            # Interventions per student, then per (grade, type) with success counts
+            for student_id, count in db.query(
+                Intervention.student_id, func.count(Intervention.id)
+            ).join(Student, Student.id == Intervention.student_id).filter(
+                *cohort_filter
+            ).group_by(Intervention.student_id).all():
+                state = students.get(student_id)
+                if state is not None:
+                    state.intervention_count = count
+                    grades[state.grade_level].students_with_interventions += 1
+
+            for grade, intervention_type, total, successful in db.query(
+                grade_col,
+                Intervention.intervention_type,
+                func.count(Intervention.id),
+                func.count(Intervention.id).filter(Intervention.outcome == 'successful')
+            ).join(Student, Student.id == Intervention.student_id).filter(
+                *cohort_filter
+            ).group_by(grade_col, Intervention.intervention_type).all():
+                counters = grades[grade]
+                counters.intervention_types[intervention_type] = total
+                if successful:
+                    counters.intervention_successes[intervention_type] = successful
+
+        logger.info(f"📊 Seeded cohort stats for institution {institution_id}: {len(students)} students, "
+                    f"{len(grades)} grades in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return _InstitutionStats(loaded_at=time.monotonic(), grades=grades, students=students)
+
+    @staticmethod
+    def _format(counters: CohortCounters, grade_levels: Dict[str, int]) -> Dict[str, Any]:
+        """Shape counters like MetricsAggregator.get_cohort_analysis sections."""
+        risk_categories = {"High": 0, "Medium": 0, "Low": 0}
+        risk_categories.update({k: v for k, v in counters.risk_categories.items() if v})
+        total_with_predictions = counters.with_predictions
+
+        success_rates = {}
+        for intervention_type, total in counters.intervention_types.items():
+            if total <= 0:
+                continue
+            successful = counters.intervention_successes.get(intervention_type, 0)
+            success_rates[intervention_type] = {
+                "total": total,
+                "successful": successful,
+                "percentage": successful / total * 100
+            }
+
+        return {
+            "total_students": counters.student_count,
+            "demographics": {
+                "total_count": counters.student_count,
+                "grade_levels": grade_levels,
+                "special_populations": {
+                    "ell_count": counters.ell_count,
+                    "iep_count": counters.iep_count,
+                    "section_504_count": counters.section_504_count,
+                    "economically_disadvantaged_count": counters.economically_disadvantaged_count
+                }
+            },
+            "risk_distribution": {
+                "total_with_predictions": total_with_predictions,
+                "category_distribution": risk_categories,
+                "average_risk_score": (counters.risk_score_sum / total_with_predictions
+                                       if total_with_predictions else None),
+                "high_risk_percentage": (risk_categories["High"] / total_with_predictions * 100
+                                         if total_with_predictions else 0)
+            },
+            "intervention_patterns": {
+                "total_interventions": sum(t for t in counters.intervention_types.values() if t > 0),
+                "intervention_types": {k: v for k, v in counters.intervention_types.items() if v > 0},
+                "success_rates": success_rates,
+                "students_with_interventions": counters.students_with_interventions
+            },
+            "success_factors": {
+                "high_performing_students": [],
+                "common_success_patterns": [],
+                "protective_factors": [],
+                "improving_student_count": counters.improving_count,
+                "improvement_rate": (counters.improving_count / counters.student_count * 100
+                                     if counters.student_count else 0)
+            }
+        }
+
+
+_cohort_stats_engine: Optional[CohortStatsEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_cohort_stats_engine() -> CohortStatsEngine:
+    """Get or create the process-wide cohort statistics engine."""
+    global _cohort_stats_engine
+    if _cohort_stats_engine is None:
+        with _engine_lock:
+            if _cohort_stats_engine is None:
+                _cohort_stats_engine = CohortStatsEngine()
+    return _cohort_stats_engine
+
+
+def notify_predictions_written(institution_id: int, predictions: List[Dict[str, Any]]) -> None:
+    """
+    Write hook: apply committed predictions to the cohort counters.
+
+    Each item needs student_id (database id), risk_score, risk_category and
+    optionally replaces_existing. Never raises.
+    """
+    try:
+        engine = get_cohort_stats_engine()
+        for prediction in predictions:
+            engine.record_prediction(institution_id, prediction['student_id'], prediction.get('risk_score'),
+                                     prediction.get('risk_category'),
+                                     replaces_existing=prediction.get('replaces_existing', False))
+    except Exception as e:
+        logger.warning(f"⚠️ Could not update cohort stats: {str(e)}")
+
+
+def notify_intervention_written(institution_id: int, student_id: int, intervention_type: str,
+                                outcome: Optional[str] = None, removed: bool = False) -> None:
+    """Write hook: apply a committed intervention insert or delete. Never raises."""
+    try:
+        get_cohort_stats_engine().record_intervention(institution_id, student_id, intervention_type,
+                                                      outcome, removed)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not update cohort stats: {str(e)}")
+
+
+def notify_intervention_outcome_changed(institution_id: int, student_id: int, intervention_type: str,
+                                        previous_outcome: Optional[str], outcome: Optional[str]) -> None:
+    """Write hook: apply a committed intervention outcome change. Never raises."""
+    if (previous_outcome == "successful") == (outcome == "successful"):
+        return
+    notify_intervention_written(institution_id, student_id, intervention_type, previous_outcome, removed=True)
+    notify_intervention_written(institution_id, student_id, intervention_type, outcome)
+
+
+def notify_cohort_changed(institution_id: Optional[int] = None) -> None:
+    """Write hook for bulk operations: re-seed counters on next read. Never raises."""
+    try:
+        get_cohort_stats_engine().invalidate(institution_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not invalidate cohort stats: {str(e)}")
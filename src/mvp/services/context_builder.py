@@ -18,14 +18,26 @@ project_root = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from src.mvp.logging_config import get_logger
+from src.mvp.services.token_budget import (
+    ContextSection, compact_sections, get_default_tokenizer, get_input_budget
+)
 
 logger = get_logger(__name__)
 
 class ContextBuilder:
     """Service for building rich context for GPT-OSS educational analysis."""
     
-    def __init__(self):
-        """Initialize context builder with educational templates."""
+    def __init__(self, tokenizer=None, input_budgets: Optional[Dict[str, int]] = None):
+        """
+        Initialize context builder with educational templates.
+        
+        Args:
+            tokenizer: Object with ``count(text) -> int`` (defaults to GPT_TOKENIZER choice)
+            input_budgets: Per-analysis-type prompt token budgets overriding defaults
+        """
+        self.tokenizer = tokenizer or get_default_tokenizer()
+        self.input_budgets = input_budgets or {}
+        self.last_compaction: Optional[Dict[str, Any]] = None
         
         # Grade-level specific context templates
         self.grade_contexts = {
@@ -98,39 +110,44 @@ class ContextBuilder:
         Returns:
             Formatted context string for GPT analysis
         """
-        context_sections = []
-        
-        # Header with analysis type
-        context_sections.append(self._build_analysis_header(student_data, context_depth))
-        
-        # Student profile section
-        context_sections.append(self._build_student_profile(student_data))
-        
-        # Current performance metrics
-        context_sections.append(self._build_performance_metrics(student_data, ml_results))
+        sections = [
+            # Header with analysis type
+            ContextSection("header", self._build_analysis_header(student_data, context_depth)),
+            # Student profile section
+            ContextSection("profile", self._build_student_profile(student_data)),
+            # Current performance metrics
+            ContextSection("performance", self._build_performance_metrics(student_data, ml_results)),
+        ]
         
         # Grade-level and developmental context
-        context_sections.append(self._build_developmental_context(student_data))
+        developmental = self._build_developmental_context(student_data)
+        sections.append(ContextSection("developmental", developmental, priority=3,
+                                       summary=self._first_lines(developmental, 2)))
         
         # Historical trends if available
         if historical_data and context_depth in ["detailed", "comprehensive"]:
-            context_sections.append(self._build_historical_context(historical_data))
+            historical = self._build_historical_context(historical_data)
+            sections.append(ContextSection("historical", historical, priority=2,
+                                           summary=self._first_lines(historical, 3)))
         
         # Risk assessment context
-        context_sections.append(self._build_risk_context(ml_results))
+        risk = self._build_risk_context(ml_results)
+        sections.append(ContextSection("risk", risk, priority=2, summary=self._first_lines(risk, 3)))
         
         # Educational priorities and focus areas
-        context_sections.append(self._build_educational_priorities(student_data, ml_results))
+        sections.append(ContextSection("priorities", self._build_educational_priorities(student_data, ml_results),
+                                       priority=1))
         
         # Comprehensive analysis request
         if context_depth == "comprehensive":
-            context_sections.append(self._build_comprehensive_analysis_request())
+            request = self._build_comprehensive_analysis_request()
         elif context_depth == "detailed":
-            context_sections.append(self._build_detailed_analysis_request())
+            request = self._build_detailed_analysis_request()
         else:
-            context_sections.append(self._build_basic_analysis_request())
+            request = self._build_basic_analysis_request()
+        sections.append(ContextSection("request", request))
         
-        return "\n\n".join(context_sections)
+        return self._assemble(sections, "student_analysis")
     
     def build_cohort_analysis_context(self, cohort_data: Dict[str, Any],
                                     context_focus: str = "patterns") -> str:
@@ -144,31 +161,32 @@ class ContextBuilder:
         Returns:
             Formatted context string for cohort GPT analysis
         """
-        context_sections = []
-        
-        # Cohort overview
-        context_sections.append(self._build_cohort_overview(cohort_data))
-        
         # Demographics and populations
-        context_sections.append(self._build_cohort_demographics(cohort_data))
-        
-        # Performance distribution
-        context_sections.append(self._build_cohort_performance(cohort_data))
-        
-        # Intervention patterns
-        context_sections.append(self._build_cohort_interventions(cohort_data))
+        demographics = self._build_cohort_demographics(cohort_data)
+        
+        sections = [
+            # Cohort overview
+            ContextSection("overview", self._build_cohort_overview(cohort_data)),
+            ContextSection("demographics", demographics, priority=2,
+                           summary=self._first_lines(demographics, 2)),
+            # Performance distribution
+            ContextSection("performance", self._build_cohort_performance(cohort_data)),
+            # Intervention patterns
+            ContextSection("interventions", self._build_cohort_interventions(cohort_data), priority=1),
+        ]
         
         # Analysis request based on focus
         if context_focus == "patterns":
-            context_sections.append(self._build_pattern_analysis_request())
+            request = self._build_pattern_analysis_request()
         elif context_focus == "interventions":
-            context_sections.append(self._build_intervention_analysis_request())
+            request = self._build_intervention_analysis_request()
         elif context_focus == "equity":
-            context_sections.append(self._build_equity_analysis_request())
+            request = self._build_equity_analysis_request()
         else:
-            context_sections.append(self._build_general_cohort_request())
+            request = self._build_general_cohort_request()
+        sections.append(ContextSection("request", request))
         
-        return "\n\n".join(context_sections)
+        return self._assemble(sections, "cohort_analysis")
     
     def build_intervention_planning_context(self, student_data: Dict[str, Any],
                                           intervention_history: List[Dict[str, Any]],
@@ -184,26 +202,83 @@ class ContextBuilder:
         Returns:
             Formatted context for intervention planning
         """
-        context_sections = []
-        
-        # Intervention planning header
-        context_sections.append("INTERVENTION PLANNING ANALYSIS")
-        context_sections.append("Objective: Develop evidence-based, practical intervention strategy")
-        
-        # Student summary for intervention planning
-        context_sections.append(self._build_intervention_student_summary(student_data))
+        sections = [
+            # Intervention planning header
+            ContextSection("header", "INTERVENTION PLANNING ANALYSIS\n\n"
+                                     "Objective: Develop evidence-based, practical intervention strategy"),
+            # Student summary for intervention planning
+            ContextSection("student_summary", self._build_intervention_student_summary(student_data)),
+        ]
         
         # Historical intervention analysis
-        context_sections.append(self._build_intervention_history_analysis(intervention_history))
+        history = self._build_intervention_history_analysis(intervention_history)
+        sections.append(ContextSection("history", history, priority=1, summary=self._first_lines(history, 4)))
         
         # Available resources and constraints
         if available_resources:
-            context_sections.append(self._build_resource_context(available_resources))
+            sections.append(ContextSection("resources", self._build_resource_context(available_resources),
+                                           priority=2))
         
         # Intervention planning request
-        context_sections.append(self._build_intervention_planning_request(student_data))
+        sections.append(ContextSection("request", self._build_intervention_planning_request(student_data)))
         
-        return "\n\n".join(context_sections)
+        return self._assemble(sections, "intervention_planning")
+
+    def build_quick_insight_context(self, student_data: Dict[str, Any], question: str) -> str:
+        """
+        Build the focused prompt used for quick per-student insights.
+
+        Args:
+            student_data: Flat student data as sent by the dashboard
+            question: Specific question about the student
+
+        Returns:
+            Formatted prompt for quick GPT insight generation
+        """
+        prompt_parts = [
+            "STUDENT INSIGHT REQUEST",
+            f"Question: {question}",
+            "",
+            "Student Data:"
+        ]
+
+        for key, value in student_data.items():
+            if value is not None:
+                prompt_parts.append(f"• {key.replace('_', ' ').title()}: {value}")
+
+        prompt_parts.extend([
+            "",
+            "Format each recommendation as:",
+            "1) [Action title]",
+            "- What to do: [One specific action]",
+            "- Why it's needed for THIS student: [Brief explanation using their data]",
+            "- How to implement: [1 concrete step]",
+            "- Timeline: [When to start/complete]"
+        ])
+
+        return "\n".join(prompt_parts)
+
+    def _assemble(self, sections: List[ContextSection], analysis_type: str) -> str:
+        """Join sections, compacting low-priority ones to fit the analysis type's input budget."""
+        budget = get_input_budget(analysis_type, self.input_budgets)
+        prompt, report = compact_sections(sections, budget, self.tokenizer)
+        report["analysis_type"] = analysis_type
+        self.last_compaction = report
+        
+        if report["dropped_sections"] or report["summarized_sections"]:
+            logger.info(f"✂️ Compacted {analysis_type} prompt {report['original_tokens']} -> "
+                        f"{report['final_tokens']} tokens (summarized: {report['summarized_sections']}, "
+                        f"dropped: {report['dropped_sections']})")
+        return prompt
+    
+    @staticmethod
+    def _first_lines(text: str, count: int) -> str:
+        """Short form of a section: its heading plus the first bullets."""
+        return "\n".join(text.split("\n")[:count])
+    
+    def count_tokens(self, text: str) -> int:
+        """Count prompt tokens with the configured tokenizer."""
+        return self.tokenizer.count(text)
     
     def _build_analysis_header(self, student_data: Dict[str, Any], context_depth: str) -> str:
         """Build analysis header with key student information."""
@@ -104,7 +104,8 @@ class GPTEnhancedPredictor:
     
     def predict_student_success(self, student_data: Dict[str, Any], 
                               include_gpt_analysis: bool = True,
-                              analysis_depth: str = "comprehensive") -> Dict[str, Any]:
+                              analysis_depth: str = "comprehensive",
+                              data_loader=None) -> Dict[str, Any]:
         """
         Generate enhanced student success prediction with optional GPT analysis.
         
@@ -112,6 +113,7 @@ class GPTEnhancedPredictor:
             student_data: Student data dictionary (can be from CSV or database)
             include_gpt_analysis: Whether to include GPT-OSS natural language analysis
             analysis_depth: Level of analysis ("basic", "detailed", "comprehensive")
+            data_loader: Request-scoped StudentDataLoader to reuse already-loaded student data
             
         Returns:
             Enhanced prediction results with ML scores and GPT insights
@@ -148,7 +150,7 @@ class GPTEnhancedPredictor:
             if student_data.get("student_id") and isinstance(student_data["student_id"], int):
                 logger.info("📊 Aggregating comprehensive student metrics...")
                 comprehensive_data = self.metrics_aggregator.get_comprehensive_student_data(
-                    student_data["student_id"]
+                    student_data["student_id"], loader=data_loader
                 )
             
             # Step 4: Generate GPT analysis if requested and available
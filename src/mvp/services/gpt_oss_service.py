@@ -31,6 +31,8 @@ from src.mvp.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+from .token_budget import get_default_tokenizer, token_usage_metrics
+
 # Import caching service
 try:
     from .gpt_cache_service import GPTCacheService
@@ -58,6 +60,9 @@ class GPTOSSService:
         self.timeout = timeout
         self.is_initialized = False
         self.client = None
+        self.tokenizer = get_default_tokenizer(model_name)
+        # Completion headroom for reasoning models; minimal effort rarely needs more than ~1K
+        self.reasoning_token_allowance = int(os.getenv('GPT_REASONING_TOKEN_ALLOWANCE', '1024'))
         
         # Initialize cache service if enabled
         self.cache_service = None
@@ -234,9 +239,9 @@ Identify actionable insights for systemic improvements while maintaining student
             if "gpt-5" in self.model_name.lower():
                 # GPT-5-nano uses tokens for reasoning, so significantly increase allocation
                 if "gpt-5-nano" in self.model_name.lower():
-                    # GPT-5-nano needs massive token allocation due to reasoning overhead
-                    # Based on community reports: reasoning can use 1000+ tokens before output
-                    adjusted_tokens = max(max_tokens + 2000, 3000)  # Ensure at least 3000 tokens total
+                    # Reasoning tokens count against the completion limit; with
+                    # reasoning_effort="minimal" a fixed allowance is enough
+                    adjusted_tokens = max_tokens + self.reasoning_token_allowance
                 else:
                     adjusted_tokens = max_tokens
                 request_params["max_completion_tokens"] = adjusted_tokens
@@ -332,6 +337,11 @@ Identify actionable insights for systemic improvements while maintaining student
                 generated_text = f"Unexpected response format. Response: {response}"
                 success = False
             
+            total_tokens, prompt_tokens, completion_tokens = self._usage_tokens(response, generated_text)
+            estimated_prompt_tokens = self.tokenizer.count(messages[0]['content']) + self.tokenizer.count(prompt)
+            token_usage_metrics.record(analysis_type, prompt_tokens or estimated_prompt_tokens,
+                                       completion_tokens, estimated_prompt_tokens)
+            
             # Build result
             result = {
                 "success": success,
@@ -341,9 +351,10 @@ Identify actionable insights for systemic improvements while maintaining student
                     "analysis_type": analysis_type,
                     "processing_time_seconds": processing_time,
                     "timestamp": end_time.isoformat(),
-                    "tokens_used": getattr(response.usage, 'total_tokens', 0) if hasattr(response, 'usage') else len(generated_text.split()),
-                    "prompt_tokens": getattr(response.usage, 'prompt_tokens', 0) if hasattr(response, 'usage') else 0,
-                    "completion_tokens": getattr(response.usage, 'completion_tokens', 0) if hasattr(response, 'usage') else 0
+                    "tokens_used": total_tokens,
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "estimated_prompt_tokens": estimated_prompt_tokens
                 }
             }
             
@@ -373,6 +384,25 @@ Identify actionable insights for systemic improvements while maintaining student
                 "metadata": {"model": self.model_name, "timestamp": datetime.now().isoformat()}
             }
     
+    @staticmethod
+    def _usage_tokens(response, generated_text: str):
+        """Extract (total, prompt, completion) tokens from Chat Completions or Responses API usage."""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return len(generated_text.split()), 0, 0
+        
+        def count(*names):
+            for name in names:
+                value = getattr(usage, name, None)
+                if isinstance(value, int) and value:
+                    return value
+            return 0
+        
+        prompt_tokens = count('prompt_tokens', 'input_tokens')
+        completion_tokens = count('completion_tokens', 'output_tokens')
+        total_tokens = count('total_tokens') or prompt_tokens + completion_tokens
+        return total_tokens, prompt_tokens, completion_tokens
+    
     def analyze_student_comprehensive(self, student_data: Dict[str, Any], 
                                     intervention_history: List[Dict] = None,
                                     peer_context: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -479,6 +509,9 @@ Identify actionable insights for systemic improvements while maintaining student
             except Exception as e:
                 health_info["cache_status"] = {"status": "error", "error": str(e)}
         
+        health_info["token_usage"] = token_usage_metrics.summary()
+        health_info["reasoning_token_allowance"] = self.reasoning_token_allowance
+        
         # Add model info if available
         if self.is_initialized:
             try:
@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+GPT Insight Warm-up Service
+
+Precomputes quick GPT insights for the highest-risk students right after a
+gradebook upload so that teacher clicks hit the database cache instead of
+waiting on an LLM round trip. Jobs run in a background worker with
+cancellation, progress reporting and per-institution token budgets.
+"""
+
+import os
+import sys
+import html
+import json
+import math
+import threading
+import uuid
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Callable
+from datetime import datetime, date
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.mvp.logging_config import get_logger
+from src.mvp.services.context_builder import ContextBuilder
+
+logger = get_logger(__name__)
+
+# Risk categories that are worth warming (matches frontend risk_category values)
+WARMUP_RISK_CATEGORIES = ("High Risk", "Medium Risk")
+
+# Same completion budget the /api/gpt/quick-insight endpoint requests
+QUICK_INSIGHT_MAX_TOKENS = 512
+
+
+def _js_number(value: float) -> str:
+    """Format a number exactly like JavaScript's Number.prototype.toString."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    value = float(value)
+    if math.isnan(value) or math.isinf(value):
+        return "null"  # JSON.stringify turns NaN/Infinity into null
+    if value == 0:
+        return "0"
+    sign = "-" if value < 0 else ""
+    # Shortest round-trip digits (same as JS) as value = digits * 10^(n - k)
+    _, digit_tuple, exponent = Decimal(repr(abs(value))).as_tuple()
+    digits = "".join(str(d) for d in digit_tuple).rstrip("0")
+    n = exponent + len(digit_tuple)
+    k = len(digits)
+    if k <= n <= 21:
+        return sign + digits + "0" * (n - k)
+    if 0 < n <= 21:
+        return sign + digits[:n] + "." + digits[n:]
+    if -6 < n <= 0:
+        return sign + "0." + "0" * (-n) + digits
+    exp = n - 1
+    exp_str = f"e{'+' if exp >= 0 else '-'}{abs(exp)}"
+    if k == 1:
+        return sign + digits + exp_str
+    return sign + digits[0] + "." + digits[1:] + exp_str
+
+
+def _js_stringify(data: Dict[str, Any]) -> str:
+    """Serialize a flat dict the way JSON.stringify does (insertion order, no spaces)."""
+    parts = []
+    for key, value in data.items():
+        if isinstance(value, str):
+            encoded = json.dumps(value, ensure_ascii=False)
+        elif value is None:
+            encoded = "null"
+        else:
+            encoded = _js_number(value)
+        parts.append(f"{json.dumps(key)}:{encoded}")
+    return "{" + ",".join(parts) + "}"
+
+
+def _summarize_interventions(interventions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Mirror the intervention fields analysis.js derives for a student."""
+    summary = {"interventions_count": len(interventions)}
+    if interventions:
+        recent = interventions[:5]
+        summary["active_interventions_count"] = len(
+            [i for i in interventions if i.get("status") != "completed"]
+        )
+        summary["recent_intervention_types"] = ", ".join(
+            str(i.get("intervention_type") or i.get("title") or "") for i in recent
+        )
+        summary["recent_intervention_statuses"] = ", ".join(str(i.get("status") or "") for i in recent)
+    return summary
+
+
+def compute_insight_data_hash(student: Dict[str, Any],
+                              interventions: Optional[List[Dict[str, Any]]] = None) -> str:
+    """
+    Compute the data hash the frontend uses to key cached GPT insights.
+
+    This is a faithful port of ``generateDataHash`` in
+    ``static/js/components/analysis.js`` so that warmed insights are found by
+    ``/gpt-insights/check``.
+
+    Args:
+        student: Student row as returned by ``/api/mvp/analyze``
+        interventions: Student interventions, newest first
+
+    Returns:
+        Hex hash string identical to the browser-side value
+    """
+    summary = _summarize_interventions(interventions or [])
+    risk = student.get("risk_score") or student.get("success_probability") or 0.5
+    relevant_data = {
+        "interventions_count": summary.get("interventions_count") or 0,
+        "active_interventions_count": summary.get("active_interventions_count") or 0,
+        "recent_intervention_types": summary.get("recent_intervention_types") or "",
+        "recent_intervention_statuses": summary.get("recent_intervention_statuses") or "",
+        "gpa": student.get("gpa") or 0,
+        "attendance_rate": student.get("attendance_rate") or 0,
+        "behavioral_incidents": student.get("behavioral_incidents") or 0,
+        "risk_score": risk or 0,
+    }
+
+    data_string = _js_stringify(relevant_data)
+    code_units = data_string.encode("utf-16-le")
+    hash_value = 0
+    for i in range(0, len(code_units), 2):
+        char = code_units[i] | (code_units[i + 1] << 8)
+        hash_value = ((hash_value << 5) - hash_value + char) & 0xFFFFFFFF
+    if hash_value & 0x80000000:
+        hash_value -= 0x100000000
+    return format(abs(hash_value), "x")
+
+
+def build_student_insight_data(student: Dict[str, Any],
+                               interventions: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Build the student_data payload the frontend sends to /api/gpt/quick-insight."""
+    interventions = interventions or []
+    student_id = student.get("student_id")
+    risk = student.get("risk_score") or student.get("success_probability") or 0.5
+    data = {
+        "student_id": student_id,
+        "grade_level": student.get("grade_level") or 9,
+        "risk_category": student.get("risk_category"),
+        "risk_score": risk,
+        "success_probability": student.get("success_probability") or (1 - risk),
+        "needs_intervention": student.get("needs_intervention") or risk > 0.5,
+        "name": student.get("name") or f"Student {student_id}",
+        "gpa": student.get("gpa"),
+        "attendance_rate": student.get("attendance_rate"),
+        "behavioral_incidents": student.get("behavioral_incidents"),
+        "socioeconomic_status": student.get("socioeconomic_status"),
+        "special_programs": student.get("special_programs"),
+    }
+    data.update(_summarize_interventions(interventions))
+    if interventions:
+        data["recent_intervention_details"] = "; ".join(
+            f"{i.get('intervention_type') or i.get('title')}: {i.get('status')} - {i.get('description') or 'No details'}"
+            for i in interventions[:5]
+        )
+    return data
+
+
+def build_personalized_question(student_data: Dict[str, Any]) -> str:
+    """Port of analysis.js ``buildPersonalizedPrompt`` for server-side generation."""
+    gpa = student_data.get("gpa")
+    attendance = student_data.get("attendance_rate") or 0
+    question = (
+        f"Student {student_data.get('student_id')} ({student_data.get('risk_category')}): "
+        f"GPA {_js_number(gpa) if gpa else 'N/A'}, {attendance * 100:.0f}% attendance"
+    )
+    incidents = student_data.get("behavioral_incidents") or 0
+    if incidents > 0:
+        question += f", {_js_number(incidents)} behavioral incidents"
+    active = student_data.get("active_interventions_count") or 0
+    if active > 0:
+        question += f". {active} active interventions - don't duplicate, build upon them"
+    else:
+        question += ". No current interventions"
+    return question + ". Provide 3 specific recommendations."
+
+
+class WarmupStatus(Enum):
+    """Warm-up job lifecycle states"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    BUDGET_EXHAUSTED = "budget_exhausted"
+    UNAVAILABLE = "unavailable"
+    FAILED = "failed"
+
+
+@dataclass
+class WarmupJob:
+    """State and progress for a single warm-up run"""
+    job_id: str
+    institution_id: int
+    session_id: Optional[str]
+    candidates: List[Dict[str, Any]]
+    token_budget: int
+    status: WarmupStatus = WarmupStatus.QUEUED
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    generated: int = 0
+    skipped_existing: int = 0
+    failed: int = 0
+    tokens_used: int = 0
+    error: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def processed(self) -> int:
+        return self.generated + self.skipped_existing + self.failed
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = len(self.candidates)
+        return {
+            "job_id": self.job_id,
+            "institution_id": self.institution_id,
+            "session_id": self.session_id,
+            "status": self.status.value,
+            "progress": {
+                "total": total,
+                "processed": self.processed,
+                "generated": self.generated,
+                "skipped_existing": self.skipped_existing,
+                "failed": self.failed,
+                "percent": round(self.processed / total * 100, 1) if total else 100.0
+            },
+            "budget": {
+                "token_budget": self.token_budget,
+                "tokens_used": self.tokens_used
+            },
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error
+        }
+
+
+class InstitutionBudgetLedger:
+    """Tracks daily GPT token spend per institution for warm-up jobs."""
+
+    def __init__(self, daily_token_budget: int, cost_per_1k_tokens: float):
+        self.daily_token_budget = daily_token_budget
+        self.cost_per_1k_tokens = cost_per_1k_tokens
+        self._spent: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, institution_id: int) -> Dict[str, Any]:
+        today = date.today()
+        entry = self._spent.get(institution_id)
+        if entry is None or entry["day"] != today:
+            entry = {"day": today, "tokens": 0, "insights": 0}
+            self._spent[institution_id] = entry
+        return entry
+
+    def remaining(self, institution_id: int) -> int:
+        with self._lock:
+            return max(0, self.daily_token_budget - self._entry(institution_id)["tokens"])
+
+    def record(self, institution_id: int, tokens: int) -> None:
+        with self._lock:
+            entry = self._entry(institution_id)
+            entry["tokens"] += tokens
+            entry["insights"] += 1
+
+    def summary(self, institution_id: int) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._entry(institution_id)
+            return {
+                "institution_id": institution_id,
+                "day": entry["day"].isoformat(),
+                "daily_token_budget": self.daily_token_budget,
+                "tokens_used": entry["tokens"],
+                "tokens_remaining": max(0, self.daily_token_budget - entry["tokens"]),
+                "insights_generated": entry["insights"],
+                "estimated_cost_usd": round(entry["tokens"] / 1000 * self.cost_per_1k_tokens, 4)
+            }
+
+
+class InsightWarmupService:
+    """Background precomputation of quick GPT insights for uploaded gradebooks."""
+
+    def __init__(self, gpt_service_factory: Optional[Callable[[], Any]] = None,
+                 top_n: Optional[int] = None, job_token_budget: Optional[int] = None,
+                 daily_token_budget: Optional[int] = None,
+                 cost_per_1k_tokens: Optional[float] = None, max_workers: int = 1,
+                 max_retained_jobs: int = 100):
+        """
+        Initialize warm-up service.
+
+        Args:
+            gpt_service_factory: Callable returning a GPT service (defaults to GPTOSSService)
+            top_n: Maximum students warmed per upload
+            job_token_budget: Maximum tokens a single job may spend
+            daily_token_budget: Maximum tokens per institution per day
+            cost_per_1k_tokens: USD per 1K tokens for cost reporting
+            max_workers: Concurrent warm-up jobs
+            max_retained_jobs: Finished jobs kept for status queries
+        """
+        self.enabled = os.getenv('GPT_WARMUP_ENABLED', 'true').lower() == 'true'
+        self.top_n = top_n if top_n is not None else int(os.getenv('GPT_WARMUP_TOP_N', '25'))
+        self.job_token_budget = job_token_budget if job_token_budget is not None else int(
+            os.getenv('GPT_WARMUP_JOB_TOKEN_BUDGET', '60000'))
+        self.ledger = InstitutionBudgetLedger(
+            daily_token_budget if daily_token_budget is not None else int(
+                os.getenv('GPT_WARMUP_DAILY_TOKEN_BUDGET', '500000')),
+            cost_per_1k_tokens if cost_per_1k_tokens is not None else float(
+                os.getenv('GPT_WARMUP_COST_PER_1K_TOKENS', '0.0004'))
+        )
+        self.max_retained_jobs = max_retained_jobs
+        self._gpt_service_factory = gpt_service_factory or self._default_gpt_service
+        self._gpt_service = None
+        self._context_builder = ContextBuilder()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gpt-warmup")
+        self._jobs: Dict[str, WarmupJob] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _default_gpt_service():
+        from src.mvp.services.gpt_oss_service import GPTOSSService
+        return GPTOSSService()
+
+    def select_candidates(self, students: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rank high/medium-risk students by risk_score and keep the top-N."""
+        at_risk = [s for s in students if s.get("risk_category") in WARMUP_RISK_CATEGORIES]
+        at_risk.sort(key=lambda s: s.get("risk_score") or 0, reverse=True)
+        return at_risk[:self.top_n]
+
+    def submit(self, students: List[Dict[str, Any]], institution_id: int = 1,
+               session_id: Optional[str] = None,
+               interventions_by_student: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Optional[WarmupJob]:
+        """
+        Queue a warm-up job for an analyzed gradebook.
+
+        Args:
+            students: Result rows from /api/mvp/analyze
+            institution_id: Institution the insights belong to
+            session_id: Upload session the insights are tagged with
+            interventions_by_student: Optional interventions keyed by frontend student id;
+                loaded from the database when omitted
+
+        Returns:
+            The queued job, or None if warm-up is disabled or nothing qualifies
+        """
+        if not self.enabled:
+            return None
+
+        candidates = self.select_candidates(students)
+        if not candidates:
+            return None
+
+        job = WarmupJob(
+            job_id=f"warmup_{uuid.uuid4().hex[:12]}",
+            institution_id=institution_id,
+            session_id=session_id,
+            candidates=candidates,
+            token_budget=self.job_token_budget
+        )
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune_jobs()
+
+        self._executor.submit(self._run_job, job, interventions_by_student)
+        logger.info(f"🔥 Queued GPT insight warm-up {job.job_id} for {len(candidates)} students")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[WarmupJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation; the worker stops before its next student."""
+        job = self.get_job(job_id)
+        if not job or job.status not in (WarmupStatus.QUEUED, WarmupStatus.RUNNING):
+            return False
+        job.cancel_event.set()
+        return True
+
+    def budget_summary(self, institution_id: int) -> Dict[str, Any]:
+        return self.ledger.summary(institution_id)
+
+    def _prune_jobs(self) -> None:
+        """Drop the oldest finished jobs beyond the retention limit."""
+        finished = [j for j in self._jobs.values()
+                    if j.status not in (WarmupStatus.QUEUED, WarmupStatus.RUNNING)]
+        excess = len(self._jobs) - self.max_retained_jobs
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(0, excess)]:
+            del self._jobs[job.job_id]
+
+    def _get_gpt_service(self):
+        if self._gpt_service is None:
+            self._gpt_service = self._gpt_service_factory()
+        if not self._gpt_service.is_initialized and not self._gpt_service.initialize_model():
+            return None
+        return self._gpt_service
+
+    def _run_job(self, job: WarmupJob,
+                 interventions_by_student: Optional[Dict[str, List[Dict[str, Any]]]]) -> None:
+        job.status = WarmupStatus.RUNNING
+        job.started_at = datetime.now()
+        try:
+            gpt_service = self._get_gpt_service()
+            if gpt_service is None:
+                job.status = WarmupStatus.UNAVAILABLE
+                job.error = "GPT service not available"
+                return
+
+            if interventions_by_student is None:
+                interventions_by_student = _load_interventions_for(
+                    [c.get("student_id") for c in job.candidates]
+                )
+
+            for student in job.candidates:
+                if job.cancel_event.is_set():
+                    job.status = WarmupStatus.CANCELLED
+                    break
+                if self._warm_student(job, gpt_service, student,
+                                      interventions_by_student.get(str(student.get("student_id")), [])) is False:
+                    job.status = WarmupStatus.BUDGET_EXHAUSTED
+                    break
+            else:
+                job.status = WarmupStatus.COMPLETED
+        except Exception as e:
+            logger.error(f"❌ GPT insight warm-up {job.job_id} failed: {str(e)}")
+            job.status = WarmupStatus.FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            logger.info(f"🔥 Warm-up {job.job_id} {job.status.value}: {job.generated} generated, "
+                        f"{job.skipped_existing} already cached, {job.tokens_used} tokens")
+
+    def _warm_student(self, job: WarmupJob, gpt_service, student: Dict[str, Any],
+                      interventions: List[Dict[str, Any]]) -> Optional[bool]:
+        """Generate and persist one insight. Returns False when the budget is exhausted."""
+        from src.mvp.database import gpt_insight_exists, save_gpt_insight
+
+        student_id = str(student.get("student_id"))
+        data_hash = compute_insight_data_hash(student, interventions)
+        if gpt_insight_exists(student_id, data_hash, institution_id=job.institution_id):
+            job.skipped_existing += 1
+            return None
+
+        student_data = build_student_insight_data(student, interventions)
+        prompt = self._context_builder.build_quick_insight_context(
+            student_data, build_personalized_question(student_data)
+        )
+
+        # Reserve a worst-case estimate (prompt + full completion) before calling out
+        estimated_tokens = self._context_builder.count_tokens(prompt) + QUICK_INSIGHT_MAX_TOKENS
+        job_remaining = job.token_budget - job.tokens_used
+        if estimated_tokens > min(job_remaining, self.ledger.remaining(job.institution_id)):
+            return False
+
+        start = datetime.now()
+        response = gpt_service.generate_analysis(prompt, "student_analysis", max_tokens=QUICK_INSIGHT_MAX_TOKENS)
+        elapsed_ms = int((datetime.now() - start).total_seconds() * 1000)
+        tokens = (response.get("metadata") or {}).get("tokens_used") or estimated_tokens
+        job.tokens_used += tokens
+        self.ledger.record(job.institution_id, tokens)
+
+        if not response.get("success"):
+            job.failed += 1
+            return None
+
+        raw = response.get("analysis", "")
+        save_gpt_insight({
+            "student_id": student_id,
+            "risk_level": student.get("risk_category"),
+            "data_hash": data_hash,
+            "raw_response": raw,
+            "formatted_html": self._format_insight_html(raw),
+            "gpt_model": (response.get("metadata") or {}).get("model", "gpt-5-nano"),
+            "tokens_used": tokens,
+            "generation_time_ms": elapsed_ms
+        }, session_id=job.session_id, institution_id=job.institution_id)
+        job.generated += 1
+        return True
+
+    def _format_insight_html(self, raw_response: str) -> str:
+        """Wrap a generated insight in the same container the frontend renders."""
+        body = self._context_builder.format_for_display(html.escape(raw_response), "web")
+        return (
+            '<div class="gpt-quick-insights">'
+            '<div class="insights-header"><span><i class="fas fa-lightbulb"></i> '
+            'Personalized AI Recommendations</span></div>'
+            f'<div class="insights-content">{body}</div>'
+            '</div>'
+        )
+
+
+def _load_interventions_for(student_ids: List[Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Load interventions for frontend student ids in two queries.
+
+    Resolves ids the same way GET /api/interventions/student/{id} does:
+    database id first, then the external student_id string.
+    """
+    from src.mvp.database import get_db_session
+    from src.mvp.models import Student, Intervention
+
+    result: Dict[str, List[Dict[str, Any]]] = {}
+    try:
+        with get_db_session() as db:
+            numeric_ids = {}
+            for sid in student_ids:
+                try:
+                    numeric_ids[int(sid)] = str(sid)
+                except (TypeError, ValueError):
+                    pass
+
+            resolved: Dict[int, str] = {}
+            if numeric_ids:
+                for (db_id,) in db.query(Student.id).filter(Student.id.in_(list(numeric_ids))).all():
+                    resolved[db_id] = numeric_ids[db_id]
+
+            resolved_external = set(resolved.values())
+            unresolved = [str(sid) for sid in student_ids if str(sid) not in resolved_external]
+            if unresolved:
+                for db_id, external_id in db.query(Student.id, Student.student_id).filter(
+                        Student.student_id.in_(unresolved)).all():
+                    resolved.setdefault(db_id, external_id)
+
+            if resolved:
+                rows = db.query(Intervention).filter(
+                    Intervention.student_id.in_(list(resolved))
+                ).order_by(Intervention.created_at.desc()).all()
+                for row in rows:
+                    result.setdefault(resolved[row.student_id], []).append({
+                        "intervention_type": row.intervention_type,
+                        "title": row.title,
+                        "status": row.status,
+                        "description": row.description
+                    })
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load interventions for warm-up: {str(e)}")
+    return result
+
+
+_insight_warmup_service: Optional[InsightWarmupService] = None
+
+
+def get_insight_warmup_service() -> InsightWarmupService:
+    """Get or create the process-wide warm-up service."""
+    global _insight_warmup_service
+    if _insight_warmup_service is None:
+        _insight_warmup_service = InsightWarmupService()
+    return _insight_warmup_service
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Online Re-encryption After Key Rotation
+
+Rotating DATABASE_ENCRYPTION_KEY used to mean downtime: every encrypted column
+had to be rewritten before the API could read it again. With the key ring in
+EncryptionManager old versions stay readable, and this worker moves rows to
+the newest key in the background:
+
+* tables in ENCRYPTED_FIELDS are walked in primary-key order with keyset
+  pagination (``WHERE id > :last_id ORDER BY id LIMIT :batch``), one short
+  transaction per batch, so no long-held locks or OFFSET scans
+* only values not already on the current key are rewritten, each with a
+  compare-and-set UPDATE (``WHERE id = :id AND col = :old``) so a concurrent
+  write by the API is never overwritten with stale data
+* blind-index digests of rewritten values are refreshed in the same UPDATE
+* the batch position is checkpointed in key_rotation_checkpoints in the same
+  transaction, so a restart resumes where it stopped
+* batches run in a worker thread and are throttled to a rows-per-second cap
+  so request latency is unaffected
+
+The worker refuses to run unless DATABASE_BLIND_INDEX_KEY is pinned: with
+digests derived from the master key, rows not yet rewritten would keep
+digests under the old key and stop matching searches mid-rotation.
+
+Configuration (environment):
+    KEY_ROTATION_ENABLED          start re-encrypting when the API starts (default false)
+    KEY_ROTATION_BATCH_SIZE       rows per batch and transaction (default 500)
+    KEY_ROTATION_ROWS_PER_SECOND  throughput cap (default 2000)
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import String, bindparam, func, select
+
+from src.mvp.encryption import BLIND_INDEXED_FIELDS, ENCRYPTED_FIELDS, blind_index_column
+from src.mvp.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class TableRotationProgress:
+    """Re-encryption progress of one table"""
+    table: str
+    key_version: str
+    last_id: int = 0
+    rows_scanned: int = 0
+    rows_reencrypted: int = 0
+    rows_remaining: int = 0
+    completed: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'table': self.table,
+            'key_version': self.key_version,
+            'last_id': self.last_id,
+            'rows_scanned': self.rows_scanned,
+            'rows_reencrypted': self.rows_reencrypted,
+            'rows_remaining': self.rows_remaining,
+            'completed': self.completed
+        }
+
+
+def _default_session_factory():
+    from src.mvp.database import get_db_session
+    return get_db_session()
+
+
+def _default_manager():
+    from src.mvp.encryption import encryption_manager
+    return encryption_manager
+
+
+class KeyRotationWorker:
+    """Re-encrypts ENCRYPTED_FIELDS tables with the current key, throttled and resumable"""
+
+    def __init__(self,
+                 session_factory: Callable[[], Any] = None,
+                 manager=None,
+                 batch_size: int = 500,
+                 rows_per_second: float = 2000,
+                 tables: Optional[List[str]] = None,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+                 clock: Callable[[], float] = time.perf_counter):
+        """
+        Initialize worker.
+
+        Args:
+            session_factory: Context manager yielding a committing DB session (defaults to get_db_session)
+            manager: EncryptionManager holding the key ring (defaults to the global one)
+            batch_size: Rows read, re-encrypted and committed per transaction
+            rows_per_second: Throughput cap; batches are spaced to stay below it
+            tables: Tables to walk (defaults to every table in ENCRYPTED_FIELDS)
+            sleep: Awaitable sleep, injectable for tests
+            clock: Monotonic time source for throttling and throughput
+        """
+        self.session_factory = session_factory or _default_session_factory
+        self._manager = manager
+        self.batch_size = batch_size
+        self.rows_per_second = rows_per_second
+        self.tables = list(tables or ENCRYPTED_FIELDS)
+        self._sleep = sleep
+        self._clock = clock
+        self._task: Optional[asyncio.Task] = None
+        self._run_lock = asyncio.Lock()
+        self._lock = threading.Lock()
+        self._stop_requested = False
+        self.running = False
+        self.progress: Dict[str, TableRotationProgress] = {}
+        self.last_run_started_at: Optional[datetime] = None
+        self.last_run_finished_at: Optional[datetime] = None
+        self.active_seconds = 0.0
+        self.run_rows_scanned = 0
+        self.error: Optional[str] = None
+
+    @property
+    def manager(self):
+        if self._manager is None:
+            self._manager = _default_manager()
+        return self._manager
+
+    def blocked_reason(self) -> Optional[str]:
+        """Why re-encryption cannot run right now, or None"""
+        if not self.manager.enabled:
+            return "Database encryption is disabled"
+        if not self.manager.blind_index_key_pinned:
+            return "DATABASE_BLIND_INDEX_KEY must be pinned before rotating keys"
+        return None
+
+    @staticmethod
+    def _table(table_name: str):
+        from src.mvp.models import Base
+        return Base.metadata.tables[table_name]
+
+    def rotation_fields(self, table_name: str) -> List[str]:
+        """Encrypted string columns of a table (only String/Text columns hold ciphertext)"""
+        table = self._table(table_name)
+        return [field for field in ENCRYPTED_FIELDS.get(table_name, [])
+                if field in table.c and isinstance(table.c[field].type, String)]
+
+    def _checkpoint(self, db, table_name: str):
+        from src.mvp.models import KeyRotationCheckpoint
+
+        key_version = self.manager.key_version
+        checkpoint = db.query(KeyRotationCheckpoint).filter_by(table_name=table_name, key_version=key_version).first()
+        if checkpoint is None:
+            checkpoint = KeyRotationCheckpoint(table_name=table_name, key_version=key_version,
+                                               last_id=0, rows_scanned=0, rows_reencrypted=0)
+            db.add(checkpoint)
+            db.flush()
+        return checkpoint
+
+    def load_progress(self, table_name: str) -> TableRotationProgress:
+        """Checkpointed progress of a table plus the rows still ahead of it"""
+        table = self._table(table_name)
+        with self.session_factory() as db:
+            checkpoint = self._checkpoint(db, table_name)
+            remaining = 0
+            if checkpoint.completed_at is None:
+                remaining = db.execute(select(func.count()).select_from(table)
+                                       .where(table.c.id > checkpoint.last_id)).scalar() or 0
+            return TableRotationProgress(
+                table=table_name,
+                key_version=checkpoint.key_version,
+                last_id=checkpoint.last_id,
+                rows_scanned=checkpoint.rows_scanned,
+                rows_reencrypted=checkpoint.rows_reencrypted,
+                rows_remaining=remaining,
+                completed=checkpoint.completed_at is not None
+            )
+
+    def rotate_batch(self, table_name: str) -> Tuple[int, int, bool]:
+        """
+        Re-encrypt the next batch of a table and advance its checkpoint.
+
+        Runs in a worker thread (blocking database calls).
+
+        Returns:
+            (rows scanned, rows rewritten, whether the table is finished)
+        """
+        table = self._table(table_name)
+        fields = self.rotation_fields(table_name)
+        indexed = set(BLIND_INDEXED_FIELDS.get(table_name, []))
+        manager = self.manager
+
+        with self.session_factory() as db:
+            checkpoint = self._checkpoint(db, table_name)
+            if checkpoint.completed_at is not None:
+                return 0, 0, True
+            rows = db.execute(
+                select(table.c.id, *[table.c[field] for field in fields])
+                .where(table.c.id > checkpoint.last_id)
+                .order_by(table.c.id)
+                .limit(self.batch_size)
+            ).all()
+            if not rows:
+                checkpoint.completed_at = datetime.now()
+                return 0, 0, True
+
+            rewritten = set()
+            for position, field in enumerate(fields, start=1):
+                stored = [row[position] for row in rows]
+                params = []
+                for row, old, change in zip(rows, stored, manager.reencrypt_column(stored)):
+                    if change is None:
+                        continue
+                    plaintext, new_value = change
+                    params.append({'row_id': row[0], 'old_value': old, 'new_value': new_value,
+                                   'digest': manager.blind_index(field, plaintext)})
+                if not params:
+                    continue
+                values = {field: bindparam('new_value')}
+                if field in indexed:
+                    values[blind_index_column(field)] = bindparam('digest')
+                # Compare-and-set: rows the API rewrote since the read keep their newer value
+                db.execute(
+                    table.update()
+                    .where(table.c.id == bindparam('row_id'), table.c[field] == bindparam('old_value'))
+                    .values(values),
+                    params
+                )
+                rewritten.update(param['row_id'] for param in params)
+
+            checkpoint.last_id = rows[-1][0]
+            checkpoint.rows_scanned += len(rows)
+            checkpoint.rows_reencrypted += len(rewritten)
+            return len(rows), len(rewritten), False
+
+    async def run_once(self) -> Dict[str, Any]:
+        """Walk every table until all rows are on the current key (skipped while already running)"""
+        if self._run_lock.locked():
+            logger.info("⏭️ Re-encryption already in progress")
+            return self.get_status()
+        if not self.manager.enabled:
+            logger.info("🔓 Database encryption disabled; nothing to re-encrypt")
+            return self.get_status()
+        if not self.manager.blind_index_key_pinned:
+            self.error = self.blocked_reason()
+            logger.error(f"❌ Re-encryption not started: {self.error}")
+            return self.get_status()
+
+        async with self._run_lock:
+            self.running = True
+            self._stop_requested = False
+            self.error = None
+            self.active_seconds = 0.0
+            self.run_rows_scanned = 0
+            self.last_run_started_at = datetime.now()
+            try:
+                for table_name in self.tables:
+                    progress = await asyncio.to_thread(self.load_progress, table_name)
+                    with self._lock:
+                        self.progress[table_name] = progress
+                    while not progress.completed and not self._stop_requested:
+                        started = self._clock()
+                        scanned, rewritten, done = await asyncio.to_thread(self.rotate_batch, table_name)
+                        elapsed = self._clock() - started
+                        with self._lock:
+                            progress.rows_scanned += scanned
+                            progress.rows_reencrypted += rewritten
+                            progress.rows_remaining = 0 if done else max(progress.rows_remaining - scanned, 0)
+                            progress.completed = done
+                            self.active_seconds += elapsed
+                            self.run_rows_scanned += scanned
+                        # Space batches so the average stays under the rows-per-second cap
+                        delay = scanned / self.rows_per_second - elapsed
+                        if delay > 0:
+                            await self._sleep(delay)
+                    if self._stop_requested:
+                        break
+            except Exception as e:
+                logger.error(f"❌ Re-encryption failed: {e}")
+                self.error = str(e)
+            finally:
+                self.running = False
+                self.last_run_finished_at = datetime.now()
+
+            status = self.get_status()
+            logger.info(f"🔑 Re-encrypted {status['rows_reencrypted']} rows to key version "
+                        f"{self.manager.key_version}, {status['rows_remaining']} remaining")
+            return status
+
+    def start(self) -> bool:
+        """Start re-encrypting on the running event loop; False if a run is already in progress"""
+        if self.running or (self._task is not None and not self._task.done()):
+            return False
+        self._task = asyncio.get_running_loop().create_task(self.run_once())
+        return True
+
+    def stop(self) -> None:
+        """Stop after the current batch; the checkpoint keeps the position"""
+        self._stop_requested = True
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            tables = [progress.to_dict() for progress in self.progress.values()]
+            active_seconds = self.active_seconds
+            run_scanned = self.run_rows_scanned
+        remaining = sum(table['rows_remaining'] for table in tables)
+        # Batch throughput of the current/last run (time spent throttled excluded)
+        throughput = run_scanned / active_seconds if active_seconds > 0 else 0.0
+        effective_rate = min(throughput, self.rows_per_second)
+        return {
+            'enabled': self.manager.enabled,
+            'running': self.running,
+            'key_version': self.manager.key_version,
+            'batch_size': self.batch_size,
+            'rows_per_second_cap': self.rows_per_second,
+            'rows_scanned': sum(table['rows_scanned'] for table in tables),
+            'rows_reencrypted': sum(table['rows_reencrypted'] for table in tables),
+            'rows_remaining': remaining,
+            'throughput_rows_per_second': round(throughput, 1),
+            'eta_seconds': round(remaining / effective_rate, 1) if effective_rate > 0 else None,
+            'tables': tables,
+            'last_run_started_at': self.last_run_started_at.isoformat() if self.last_run_started_at else None,
+            'last_run_finished_at': self.last_run_finished_at.isoformat() if self.last_run_finished_at else None,
+            'error': self.error
+        }
+
+
+_key_rotation_worker: Optional[KeyRotationWorker] = None
+_key_rotation_worker_lock = threading.Lock()
+
+
+def get_key_rotation_worker() -> KeyRotationWorker:
+    """Process-wide re-encryption worker configured from the environment"""
+    global _key_rotation_worker
+    with _key_rotation_worker_lock:
+        if _key_rotation_worker is None:
+            _key_rotation_worker = KeyRotationWorker(
+                batch_size=int(os.getenv('KEY_ROTATION_BATCH_SIZE', '500')),
+                rows_per_second=float(os.getenv('KEY_ROTATION_ROWS_PER_SECOND', '2000'))
+            )
+        return _key_rotation_worker
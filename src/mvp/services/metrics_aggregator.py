@@ -8,10 +8,12 @@ and peer context data.
 """
 
 import sys
+import json
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
+import numpy as np
 from sqlalchemy.orm import Session
 from sqlalchemy import text, desc, and_, func
 
@@ -22,56 +24,186 @@ sys.path.insert(0, str(project_root))
 from src.mvp.models import Student, Prediction, Intervention, Institution, AuditLog
 from src.mvp.database import get_db_session
 from src.mvp.logging_config import get_logger
+from src.mvp.services.cohort_stats import get_cohort_stats_engine
+from src.mvp.services.risk_percentile_index import RiskPercentileIndex, get_risk_percentile_index
 
 logger = get_logger(__name__)
 
+class StudentDataLoader:
+    """
+    Request-scoped batched loader for comprehensive student data.
+    
+    Fetches each data facet (students, latest predictions, interventions,
+    recent predictions) with one query for all requested students, reads peer
+    risks from the shared percentile index and memoizes the assembled
+    profiles, so create one per request.
+    """
+    
+    def __init__(self, aggregator: "MetricsAggregator", session_factory=None):
+        """
+        Initialize loader.
+        
+        Args:
+            aggregator: MetricsAggregator providing the profile formatting
+            session_factory: Context manager yielding a DB session
+        """
+        self.aggregator = aggregator
+        self.session_factory = session_factory or aggregator.session_factory
+        self._profiles: Dict[int, Dict[str, Any]] = {}
+        self.query_count = 0
+        self.last_error: Optional[str] = None
+    
+    def get(self, student_id: int, institution_id: Optional[int] = None) -> Dict[str, Any]:
+        """Get one student's comprehensive profile, loading it if not memoized."""
+        if student_id not in self._profiles:
+            self.load_many([student_id], institution_id)
+        profile = self._profiles.get(student_id)
+        if profile is None:
+            if self.last_error:
+                return {"error": f"Data aggregation failed: {self.last_error}"}
+            return {"error": f"Student {student_id} not found"}
+        return profile
+    
+    def load_many(self, student_ids: List[int], 
+                  institution_id: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Load comprehensive profiles for many students with one query per facet.
+        
+        Args:
+            student_ids: Database IDs of the students
+            institution_id: Optional institution filter
+            
+        Returns:
+            Profiles keyed by student ID (students not found are omitted)
+        """
+        pending = [sid for sid in dict.fromkeys(student_ids) if sid not in self._profiles]
+        if pending:
+            try:
+                with self.session_factory() as db:
+                    self._load(db, pending, institution_id)
+            except Exception as e:
+                logger.error(f"❌ Error aggregating student data: {str(e)}")
+                self.last_error = str(e)
+        return {sid: self._profiles[sid] for sid in student_ids if sid in self._profiles}
+    
+    def _load(self, db: Session, student_ids: List[int], institution_id: Optional[int]) -> None:
+        aggregator = self.aggregator
+        
+        # Facet 1: student records
+        query = db.query(Student).filter(Student.id.in_(student_ids))
+        if institution_id:
+            query = query.filter(Student.institution_id == institution_id)
+        students = query.all()
+        self.query_count += 1
+        if not students:
+            return
+        ids = [s.id for s in students]
+        
+        # Facet 2: latest prediction per student
+        latest_rank = func.row_number().over(
+            partition_by=Prediction.student_id,
+            order_by=(desc(Prediction.prediction_date), desc(Prediction.id))
+        ).label('latest_rank')
+        ranked = db.query(Prediction.id, latest_rank).filter(Prediction.student_id.in_(ids)).subquery()
+        latest_predictions = {
+            p.student_id: p for p in db.query(Prediction).join(
+                ranked, and_(Prediction.id == ranked.c.id, ranked.c.latest_rank == 1)
+            ).all()
+        }
+        self.query_count += 1
+        
+        # Facet 3: all interventions (history, engagement and support factors)
+        interventions: Dict[int, List[Intervention]] = {sid: [] for sid in ids}
+        for intervention in db.query(Intervention).filter(
+            Intervention.student_id.in_(ids)
+        ).order_by(desc(Intervention.created_at), desc(Intervention.id)).all():
+            interventions[intervention.student_id].append(intervention)
+        self.query_count += 1
+        
+        # Facet 4: predictions over the last 6 months for trends
+        six_months_ago = datetime.now() - timedelta(days=180)
+        recent_predictions: Dict[int, List[Prediction]] = {sid: [] for sid in ids}
+        for prediction in db.query(Prediction).filter(
+            and_(
+                Prediction.student_id.in_(ids),
+                Prediction.prediction_date >= six_months_ago
+            )
+        ).order_by(Prediction.prediction_date).all():
+            recent_predictions[prediction.student_id].append(prediction)
+        self.query_count += 1
+        
+        # Peer group risks come from the in-memory percentile index
+        percentile_index = aggregator.get_percentile_index()
+        for student in students:
+            latest = latest_predictions.get(student.id)
+            history = interventions[student.id]
+            self._profiles[student.id] = {
+                "student_info": aggregator._get_student_demographics(student),
+                "academic_performance": aggregator._get_academic_metrics(latest),
+                "risk_assessment": aggregator._get_latest_risk_assessment(latest),
+                "intervention_history": aggregator._get_intervention_history(history),
+                "engagement_metrics": aggregator._get_engagement_metrics(history),
+                "peer_context": aggregator._get_peer_context(
+                    student, percentile_index.grade_scores(student.institution_id, student.grade_level),
+                    latest.risk_score if latest else None
+                ),
+                "temporal_trends": aggregator._get_temporal_trends(recent_predictions[student.id]),
+                "support_factors": aggregator._get_support_factors(history)
+            }
+
+
 class MetricsAggregator:
     """Service for aggregating comprehensive student metrics for AI analysis."""
     
-    def __init__(self):
-        """Initialize metrics aggregator."""
+    def __init__(self, percentile_index: Optional[RiskPercentileIndex] = None):
+        """
+        Initialize metrics aggregator.
+        
+        Args:
+            percentile_index: Peer risk index (defaults to the process-wide one)
+        """
         self.session_factory = get_db_session
+        self.percentile_index = percentile_index
+    
+    def get_percentile_index(self) -> RiskPercentileIndex:
+        """Peer risk percentile index used for peer context."""
+        return self.percentile_index or get_risk_percentile_index()
+    
+    def create_loader(self) -> StudentDataLoader:
+        """Create a batched, memoizing loader; use one per request."""
+        return StudentDataLoader(self)
         
     def get_comprehensive_student_data(self, student_id: int, 
-                                     institution_id: Optional[int] = None) -> Dict[str, Any]:
+                                     institution_id: Optional[int] = None,
+                                     loader: Optional[StudentDataLoader] = None) -> Dict[str, Any]:
         """
         Aggregate all available data for a student.
         
         Args:
             student_id: Database ID of the student
             institution_id: Optional institution filter
+            loader: Request-scoped loader to reuse memoized/batched results
             
         Returns:
             Comprehensive student data dictionary
         """
-        try:
-            with self.session_factory() as db:
-                # Get student record
-                query = db.query(Student).filter(Student.id == student_id)
-                if institution_id:
-                    query = query.filter(Student.institution_id == institution_id)
-                
-                student = query.first()
-                if not student:
-                    return {"error": f"Student {student_id} not found"}
-                
-                # Build comprehensive profile
-                profile = {
-                    "student_info": self._get_student_demographics(student),
-                    "academic_performance": self._get_academic_metrics(db, student_id),
-                    "risk_assessment": self._get_latest_risk_assessment(db, student_id),
-                    "intervention_history": self._get_intervention_history(db, student_id),
-                    "engagement_metrics": self._get_engagement_metrics(db, student_id),
-                    "peer_context": self._get_peer_context(db, student),
-                    "temporal_trends": self._get_temporal_trends(db, student_id),
-                    "support_factors": self._get_support_factors(db, student_id)
-                }
-                
-                return profile
-                
-        except Exception as e:
-            logger.error(f"❌ Error aggregating student data: {str(e)}")
-            return {"error": f"Data aggregation failed: {str(e)}"}
+        return (loader or self.create_loader()).get(student_id, institution_id)
+    
+    def get_comprehensive_student_data_batch(self, student_ids: List[int],
+                                             institution_id: Optional[int] = None,
+                                             loader: Optional[StudentDataLoader] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Aggregate data for many students with one query per data facet.
+        
+        Args:
+            student_ids: Database IDs of the students
+            institution_id: Optional institution filter
+            loader: Request-scoped loader to reuse memoized/batched results
+            
+        Returns:
+            Comprehensive student data keyed by student ID
+        """
+        return (loader or self.create_loader()).load_many(student_ids, institution_id)
     
     def _get_student_demographics(self, student: Student) -> Dict[str, Any]:
         """Extract student demographic information (FERPA-compliant)."""
@@ -96,21 +228,15 @@ class MetricsAggregator:
             return int(delta.days / 30)  # Approximate months
         return None
     
-    def _get_academic_metrics(self, db: Session, student_id: int) -> Dict[str, Any]:
-        """Get academic performance metrics from predictions."""
+    def _get_academic_metrics(self, latest_prediction: Optional[Prediction]) -> Dict[str, Any]:
+        """Get academic performance metrics from the latest prediction."""
         try:
-            # Get latest prediction
-            latest_prediction = db.query(Prediction).filter(
-                Prediction.student_id == student_id
-            ).order_by(desc(Prediction.prediction_date)).first()
-            
             if not latest_prediction:
                 return {"no_predictions": True}
             
             # Extract features if available
             features = {}
             if latest_prediction.features_used:
-                import json
                 try:
                     features = json.loads(latest_prediction.features_used)
                 except:
@@ -145,13 +271,9 @@ class MetricsAggregator:
         
         return academic_features
     
-    def _get_latest_risk_assessment(self, db: Session, student_id: int) -> Dict[str, Any]:
+    def _get_latest_risk_assessment(self, latest_prediction: Optional[Prediction]) -> Dict[str, Any]:
         """Get the most recent risk assessment details."""
         try:
-            latest_prediction = db.query(Prediction).filter(
-                Prediction.student_id == student_id
-            ).order_by(desc(Prediction.prediction_date)).first()
-            
             if not latest_prediction:
                 return {"no_assessment": True}
             
@@ -161,14 +283,12 @@ class MetricsAggregator:
             
             if latest_prediction.risk_factors:
                 try:
-                    import json
                     risk_factors = json.loads(latest_prediction.risk_factors)
                 except:
                     pass
             
             if latest_prediction.protective_factors:
                 try:
-                    import json
                     protective_factors = json.loads(latest_prediction.protective_factors)
                 except:
                     pass
@@ -186,104 +306,63 @@ class MetricsAggregator:
             logger.error(f"❌ Error getting risk assessment: {str(e)}")
             return {"error": "Risk assessment unavailable"}
     
-    def _get_intervention_history(self, db: Session, student_id: int) -> List[Dict[str, Any]]:
-        """Get student's intervention history with outcomes."""
-        try:
-            interventions = db.query(Intervention).filter(
-                Intervention.student_id == student_id
-            ).order_by(desc(Intervention.created_at)).limit(10).all()
-            
-            history = []
-            for intervention in interventions:
-                history.append({
-                    "type": intervention.intervention_type,
-                    "title": intervention.title,
-                    "priority": intervention.priority,
-                    "status": intervention.status,
-                    "outcome": intervention.outcome,
-                    "created_date": intervention.created_at.isoformat() if intervention.created_at else None,
-                    "completed_date": intervention.completed_date.isoformat() if intervention.completed_date else None,
-                    "time_spent_minutes": intervention.time_spent_minutes,
-                    "follow_up_needed": intervention.follow_up_needed,
-                    "assigned_to": intervention.assigned_to
-                })
-            
-            return history
-            
-        except Exception as e:
-            logger.error(f"❌ Error getting intervention history: {str(e)}")
-            return []
+    def _get_intervention_history(self, interventions: List[Intervention]) -> List[Dict[str, Any]]:
+        """Get student's 10 most recent interventions with outcomes."""
+        history = []
+        for intervention in interventions[:10]:
+            history.append({
+                "type": intervention.intervention_type,
+                "title": intervention.title,
+                "priority": intervention.priority,
+                "status": intervention.status,
+                "outcome": intervention.outcome,
+                "created_date": intervention.created_at.isoformat() if intervention.created_at else None,
+                "completed_date": intervention.completed_date.isoformat() if intervention.completed_date else None,
+                "time_spent_minutes": intervention.time_spent_minutes,
+                "follow_up_needed": intervention.follow_up_needed,
+                "assigned_to": intervention.assigned_to
+            })
+        
+        return history
     
-    def _get_engagement_metrics(self, db: Session, student_id: int) -> Dict[str, Any]:
-        """Calculate engagement metrics from intervention and prediction data."""
-        try:
-            # Count interventions by type and outcome
-            intervention_stats = db.query(
-                Intervention.intervention_type,
-                Intervention.outcome,
-                func.count(Intervention.id).label('count')
-            ).filter(
-                Intervention.student_id == student_id
-            ).group_by(Intervention.intervention_type, Intervention.outcome).all()
-            
-            engagement_summary = {
-                "total_interventions": len(intervention_stats),
-                "successful_interventions": sum(1 for stat in intervention_stats if stat.outcome == 'successful'),
-                "intervention_types": list(set(stat.intervention_type for stat in intervention_stats)),
-                "response_rate": 0.0
-            }
-            
-            # Calculate response rate
-            total = len(intervention_stats)
-            successful = engagement_summary["successful_interventions"]
-            if total > 0:
-                engagement_summary["response_rate"] = successful / total
-            
-            return engagement_summary
-            
-        except Exception as e:
-            logger.error(f"❌ Error getting engagement metrics: {str(e)}")
-            return {"error": "Engagement metrics unavailable"}
+    def _get_engagement_metrics(self, interventions: List[Intervention]) -> Dict[str, Any]:
+        """Calculate engagement metrics from intervention data."""
+        # Distinct (type, outcome) combinations
+        intervention_stats = {(i.intervention_type, i.outcome) for i in interventions}
+        
+        engagement_summary = {
+            "total_interventions": len(intervention_stats),
+            "successful_interventions": sum(1 for _, outcome in intervention_stats if outcome == 'successful'),
+            "intervention_types": list(set(int_type for int_type, _ in intervention_stats)),
+            "response_rate": 0.0
+        }
+        
+        # Calculate response rate
+        total = len(intervention_stats)
+        successful = engagement_summary["successful_interventions"]
+        if total > 0:
+            engagement_summary["response_rate"] = successful / total
+        
+        return engagement_summary
     
-    def _get_peer_context(self, db: Session, student: Student) -> Dict[str, Any]:
-        """Get peer comparison context for same grade level and institution."""
+    def _get_peer_context(self, student: Student, grade_risks: np.ndarray,
+                          student_risk: Optional[float]) -> Dict[str, Any]:
+        """
+        Get peer comparison context for same grade level and institution.
+        
+        Args:
+            student: Student record
+            grade_risks: Sorted latest risk scores of active grade-level peers
+            student_risk: Student's latest risk score
+        """
         try:
-            # Get grade-level statistics
-            grade_stats = db.query(
-                func.avg(Prediction.risk_score).label('avg_risk_score'),
-                func.count(distinct(Prediction.student_id)).label('total_students')
-            ).join(Student).filter(
-                and_(
-                    Student.institution_id == student.institution_id,
-                    Student.grade_level == student.grade_level,
-                    Student.enrollment_status == 'active'
-                )
-            ).first()
-            
-            # Calculate percentile rank for student
-            student_risk = db.query(Prediction.risk_score).filter(
-                Prediction.student_id == student.id
-            ).order_by(desc(Prediction.prediction_date)).first()
-            
-            percentile_rank = None
-            if student_risk and student_risk[0] is not None:
-                # Count students with lower risk scores
-                lower_risk_count = db.query(func.count(distinct(Prediction.student_id))).join(Student).filter(
-                    and_(
-                        Student.institution_id == student.institution_id,
-                        Student.grade_level == student.grade_level,
-                        Student.enrollment_status == 'active',
-                        Prediction.risk_score < student_risk[0]
-                    )
-                ).scalar()
-                
-                if grade_stats.total_students and grade_stats.total_students > 0:
-                    percentile_rank = (lower_risk_count / grade_stats.total_students) * 100
+            peer_count = len(grade_risks)
+            percentile_rank = RiskPercentileIndex.percentile_rank(grade_risks, student_risk)
             
             return {
                 "grade_level": student.grade_level,
-                "institution_peer_count": grade_stats.total_students or 0,
-                "grade_average_risk_score": float(grade_stats.avg_risk_score) if grade_stats.avg_risk_score else None,
+                "institution_peer_count": peer_count,
+                "grade_average_risk_score": float(grade_risks.mean()) if peer_count else None,
                 "student_percentile_rank": round(percentile_rank, 1) if percentile_rank is not None else None,
                 "comparison_context": self._generate_peer_comparison_text(percentile_rank)
             }
@@ -306,18 +385,9 @@ class MetricsAggregator:
         else:
             return f"Student requires significant support compared to grade-level peers"
     
-    def _get_temporal_trends(self, db: Session, student_id: int) -> Dict[str, Any]:
-        """Analyze trends in risk scores and interventions over time."""
+    def _get_temporal_trends(self, predictions: List[Prediction]) -> Dict[str, Any]:
+        """Analyze trends in risk scores over the last 6 months (predictions in date order)."""
         try:
-            # Get predictions over last 6 months
-            six_months_ago = datetime.now() - timedelta(days=180)
-            predictions = db.query(Prediction).filter(
-                and_(
-                    Prediction.student_id == student_id,
-                    Prediction.prediction_date >= six_months_ago
-                )
-            ).order_by(Prediction.prediction_date).all()
-            
             if len(predictions) < 2:
                 return {"insufficient_data": True}
             
@@ -351,41 +421,27 @@ class MetricsAggregator:
             logger.error(f"❌ Error getting temporal trends: {str(e)}")
             return {"error": "Temporal analysis unavailable"}
     
-    def _get_support_factors(self, db: Session, student_id: int) -> Dict[str, Any]:
-        """Identify support factors and resources available to student."""
-        try:
-            # Analyze successful interventions
-            successful_interventions = db.query(Intervention).filter(
-                and_(
-                    Intervention.student_id == student_id,
-                    Intervention.outcome == 'successful'
-                )
-            ).all()
-            
-            # Identify what works for this student
-            effective_strategies = {}
-            for intervention in successful_interventions:
-                strategy = intervention.intervention_type
-                if strategy in effective_strategies:
-                    effective_strategies[strategy] += 1
-                else:
-                    effective_strategies[strategy] = 1
-            
-            # Sort by effectiveness
-            effective_strategies = dict(sorted(effective_strategies.items(), 
-                                             key=lambda x: x[1], reverse=True))
-            
-            return {
-                "successful_intervention_count": len(successful_interventions),
-                "most_effective_strategies": list(effective_strategies.keys())[:3],
-                "strategy_success_rates": effective_strategies,
-                "has_consistent_support": len(effective_strategies) > 0,
-                "support_recommendation": self._generate_support_recommendation(effective_strategies)
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Error getting support factors: {str(e)}")
-            return {"error": "Support factor analysis unavailable"}
+    def _get_support_factors(self, interventions: List[Intervention]) -> Dict[str, Any]:
+        """Identify support factors from the student's successful interventions."""
+        successful_interventions = [i for i in interventions if i.outcome == 'successful']
+        
+        # Identify what works for this student
+        effective_strategies = {}
+        for intervention in successful_interventions:
+            strategy = intervention.intervention_type
+            effective_strategies[strategy] = effective_strategies.get(strategy, 0) + 1
+        
+        # Sort by effectiveness
+        effective_strategies = dict(sorted(effective_strategies.items(), 
+                                         key=lambda x: x[1], reverse=True))
+        
+        return {
+            "successful_intervention_count": len(successful_interventions),
+            "most_effective_strategies": list(effective_strategies.keys())[:3],
+            "strategy_success_rates": effective_strategies,
+            "has_consistent_support": len(effective_strategies) > 0,
+            "support_recommendation": self._generate_support_recommendation(effective_strategies)
+        }
     
     def _generate_support_recommendation(self, effective_strategies: Dict[str, int]) -> str:
         """Generate support strategy recommendation based on historical success."""
@@ -407,187 +463,25 @@ class MetricsAggregator:
         """
         Aggregate cohort-level data for pattern analysis.
         
+        Statistics cover the whole active cohort and are served from the
+        incrementally maintained cohort counters (see CohortStatsEngine).
+        
         Args:
             institution_id: Institution to analyze
             grade_level: Optional grade level filter
-            limit_students: Maximum students to include
+            limit_students: Ignored; kept for backwards compatibility
             
         Returns:
             Cohort analysis data
         """
         try:
-            with self.session_factory() as db:
-                # Base query for students
-                student_query = db.query(Student).filter(
-                    and_(
-                        Student.institution_id == institution_id,
-                        Student.enrollment_status == 'active'
-                    )
-                )
-                
-                if grade_level:
-                    student_query = student_query.filter(Student.grade_level == grade_level)
-                
-                students = student_query.limit(limit_students).all()
-                
-                # Aggregate cohort metrics
-                cohort_data = {
-                    "institution_id": institution_id,
-                    "grade_level_filter": grade_level,
-                    "total_students": len(students),
-                    "demographics": self._analyze_cohort_demographics(students),
-                    "risk_distribution": self._analyze_risk_distribution(db, [s.id for s in students]),
-                    "intervention_patterns": self._analyze_intervention_patterns(db, [s.id for s in students]),
-                    "success_factors": self._identify_cohort_success_factors(db, [s.id for s in students])
-                }
-                
-                return cohort_data
-                
-        except Exception as e:
-            logger.error(f"❌ Error in cohort analysis: {str(e)}")
-            return {"error": f"Cohort analysis failed: {str(e)}"}
-    
-    def _analyze_cohort_demographics(self, students: List[Student]) -> Dict[str, Any]:
-        """Analyze demographic distribution of cohort."""
-        demographics = {
-            "total_count": len(students),
-            "grade_levels": {},
-            "special_populations": {
-                "ell_count": 0,
-                "iep_count": 0,
-                "section_504_count": 0,
-                "economically_disadvantaged_count": 0
-            }
-        }
-        
-        for student in students:
-            # Grade level distribution
-            grade = student.grade_level or "unknown"
-            demographics["grade_levels"][grade] = demographics["grade_levels"].get(grade, 0) + 1
-            
-            # Special populations
-            if student.is_ell:
-                demographics["special_populations"]["ell_count"] += 1
-            if student.has_iep:
-                demographics["special_populations"]["iep_count"] += 1
-            if student.has_504:
-                demographics["special_populations"]["section_504_count"] += 1
-            if student.is_economically_disadvantaged:
-                demographics["special_populations"]["economically_disadvantaged_count"] += 1
-        
-        return demographics
-    
-    def _analyze_risk_distribution(self, db: Session, student_ids: List[int]) -> Dict[str, Any]:
-        """Analyze risk score distribution across cohort."""
-        try:
-            # Get latest predictions for each student
-            subquery = db.query(
-                Prediction.student_id,
-                func.max(Prediction.prediction_date).label('max_date')
-            ).filter(
-                Prediction.student_id.in_(student_ids)
-            ).group_by(Prediction.student_id).subquery()
-            
-            predictions = db.query(Prediction).join(
-                subquery,
-                and_(
-                    Prediction.student_id == subquery.c.student_id,
-                    Prediction.prediction_date == subquery.c.max_date
-                )
-            ).all()
-            
-            risk_categories = {"High": 0, "Medium": 0, "Low": 0}
-            risk_scores = []
-            
-            for prediction in predictions:
-                if prediction.risk_category:
-                    risk_categories[prediction.risk_category] = risk_categories.get(prediction.risk_category, 0) + 1
-                if prediction.risk_score is not None:
-                    risk_scores.append(prediction.risk_score)
-            
+            cohort_stats = get_cohort_stats_engine().get_cohort_stats(institution_id, grade_level)
             return {
-                "total_with_predictions": len(predictions),
-                "category_distribution": risk_categories,
-                "average_risk_score": sum(risk_scores) / len(risk_scores) if risk_scores else None,
-                "high_risk_percentage": (risk_categories["High"] / len(predictions) * 100) if predictions else 0
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Error analyzing risk distribution: {str(e)}")
-            return {"error": "Risk distribution analysis failed"}
-    
-    def _analyze_intervention_patterns(self, db: Session, student_ids: List[int]) -> Dict[str, Any]:
-        """Analyze intervention patterns across cohort."""
-        try:
-            interventions = db.query(Intervention).filter(
-                Intervention.student_id.in_(student_ids)
-            ).all()
-            
-            patterns = {
-                "total_interventions": len(interventions),
-                "intervention_types": {},
-                "success_rates": {},
-                "students_with_interventions": len(set(i.student_id for i in interventions))
-            }
-            
-            # Analyze by type
-            for intervention in interventions:
-                int_type = intervention.intervention_type
-                outcome = intervention.outcome
-                
-                # Count by type
-                patterns["intervention_types"][int_type] = patterns["intervention_types"].get(int_type, 0) + 1
-                
-                # Track success rates
-                if int_type not in patterns["success_rates"]:
-                    patterns["success_rates"][int_type] = {"total": 0, "successful": 0}
-                
-                patterns["success_rates"][int_type]["total"] += 1
-                if outcome == "successful":
-                    patterns["success_rates"][int_type]["successful"] += 1
-            
-            # Calculate success percentages
-            for int_type in patterns["success_rates"]:
-                total = patterns["success_rates"][int_type]["total"]
-                successful = patterns["success_rates"][int_type]["successful"]
-                patterns["success_rates"][int_type]["percentage"] = (successful / total * 100) if total > 0 else 0
-            
-            return patterns
-            
-        except Exception as e:
-            logger.error(f"❌ Error analyzing intervention patterns: {str(e)}")
-            return {"error": "Intervention pattern analysis failed"}
-    
-    def _identify_cohort_success_factors(self, db: Session, student_ids: List[int]) -> Dict[str, Any]:
-        """Identify factors associated with successful outcomes."""
-        try:
-            # This is a simplified analysis - in production, would use more sophisticated methods
-            success_factors = {
-                "high_performing_students": [],
-                "common_success_patterns": [],
-                "protective_factors": []
+                "institution_id": institution_id,
+                "grade_level_filter": grade_level,
+                **cohort_stats
             }
-            
-            # Find students with consistently low risk or improving trends
-            improving_students = []
-            
-            for student_id in student_ids[:20]:  # Sample for performance
-                predictions = db.query(Prediction).filter(
-                    Prediction.student_id == student_id
-                ).order_by(Prediction.prediction_date).limit(5).all()
                 
-                if len(predictions) >= 2:
-                    first_risk = predictions[0].risk_score
-                    last_risk = predictions[-1].risk_score
-                    
-                    if first_risk and last_risk and last_risk < first_risk:
-                        improving_students.append(student_id)
-            
-            success_factors["improving_student_count"] = len(improving_students)
-            success_factors["improvement_rate"] = len(improving_students) / min(len(student_ids), 20) * 100
-            
-            return success_factors
-            
         except Exception as e:
-            logger.error(f"❌ Error identifying success factors: {str(e)}")
-            return {"error": "Success factor analysis failed"}
\ No newline at end of file
+            logger.error(f"❌ Error in cohort analysis: {str(e)}")
+            return {"error": f"Cohort analysis failed: {str(e)}"}
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Scheduled Re-scoring of Synced Rosters
+
+Risk scores used to change only when someone uploaded a CSV or pressed sync.
+The scheduler re-scores configured Canvas courses and PowerSchool schools on
+an off-peak cadence instead: each run uses the integrations' delta sync, so
+only students whose source records changed are refetched, and of those only
+the ones whose model-input feature hash changed are scored (in one vectorized
+K12UltraPredictor batch). Only those changed predictions are persisted and
+passed to the notification system, with last run's risk as the baseline so
+threshold crossings are detected across restarts.
+
+Configuration (environment):
+    RESCORE_ENABLED               start the scheduler with the API (default false)
+    RESCORE_RUN_HOUR              local hour of the first run of a day (default 2)
+    RESCORE_INTERVAL_HOURS        hours between runs (default 24)
+    RESCORE_CANVAS_COURSES        comma-separated course IDs, with CANVAS_BASE_URL / CANVAS_API_TOKEN
+    RESCORE_POWERSCHOOL_SCHOOLS   comma-separated school IDs, with POWERSCHOOL_BASE_URL /
+                                  POWERSCHOOL_CLIENT_ID / POWERSCHOOL_CLIENT_SECRET
+    RESCORE_INSTITUTION_ID        institution the configured targets belong to
+                                  (default DEFAULT_INSTITUTION_ID, else 1)
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.mvp.logging_config import get_logger
+from src.mvp.services.sync_jobs import PERSIST_CHUNK_SIZE
+
+logger = get_logger(__name__)
+
+SUPPORTED_INTEGRATIONS = ('canvas', 'powerschool')
+
+
+@dataclass
+class RescoreTarget:
+    """A synced course or school re-scored on every run"""
+    integration: str  # 'canvas' or 'powerschool'
+    scope_id: str
+    credentials: Dict[str, str] = field(default_factory=dict, repr=False)
+    institution_id: Optional[str] = None  # scopes alerts and the notifier's risk cache
+
+    @property
+    def key(self) -> str:
+        return f"{self.integration}:{self.scope_id}"
+
+
+@dataclass
+class RescoreResult:
+    """Outcome of re-scoring one target"""
+    integration: str
+    scope_id: str
+    status: str = "success"
+    mode: Optional[str] = None
+    students_total: int = 0
+    students_rescored: int = 0
+    students_unchanged: int = 0
+    predictions_persisted: int = 0
+    alerts_generated: int = 0
+    error: Optional[str] = None
+    elapsed_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'integration': self.integration,
+            'scope_id': self.scope_id,
+            'status': self.status,
+            'mode': self.mode,
+            'students_total': self.students_total,
+            'students_rescored': self.students_rescored,
+            'students_unchanged': self.students_unchanged,
+            'predictions_persisted': self.predictions_persisted,
+            'alerts_generated': self.alerts_generated,
+            'error': self.error,
+            'elapsed_seconds': round(self.elapsed_seconds, 3)
+        }
+
+
+def targets_from_env() -> List[RescoreTarget]:
+    """Re-scoring targets configured through RESCORE_* and integration credential variables"""
+    targets = []
+    institution_id = os.getenv('RESCORE_INSTITUTION_ID') or os.getenv('DEFAULT_INSTITUTION_ID', '1')
+    canvas_credentials = {
+        'base_url': os.getenv('CANVAS_BASE_URL', ''),
+        'access_token': os.getenv('CANVAS_API_TOKEN', '')
+    }
+    powerschool_credentials = {
+        'base_url': os.getenv('POWERSCHOOL_BASE_URL', ''),
+        'client_id': os.getenv('POWERSCHOOL_CLIENT_ID', ''),
+        'client_secret': os.getenv('POWERSCHOOL_CLIENT_SECRET', '')
+    }
+    for integration, variable, credentials in (
+        ('canvas', 'RESCORE_CANVAS_COURSES', canvas_credentials),
+        ('powerschool', 'RESCORE_POWERSCHOOL_SCHOOLS', powerschool_credentials)
+    ):
+        scope_ids = [scope.strip() for scope in os.getenv(variable, '').split(',') if scope.strip()]
+        if scope_ids and not all(credentials.values()):
+            logger.warning(f"⚠️ {variable} is set but {integration} credentials are missing; skipping")
+            continue
+        targets.extend(RescoreTarget(integration, scope_id, dict(credentials), institution_id)
+                       for scope_id in scope_ids)
+    return targets
+
+
+def _default_integration_factory(target: RescoreTarget):
+    """Build the Canvas / PowerSchool integration of a target"""
+    credentials = target.credentials
+    if target.integration == 'canvas':
+        try:
+            from integrations.canvas_lms import create_canvas_integration
+        except ImportError:
+            from src.integrations.canvas_lms import create_canvas_integration
+        return create_canvas_integration(credentials['base_url'], credentials['access_token'])
+    try:
+        from integrations.powerschool_sis import create_powerschool_integration
+    except ImportError:
+        from src.integrations.powerschool_sis import create_powerschool_integration
+    return create_powerschool_integration(credentials['base_url'], credentials['client_id'],
+                                          credentials['client_secret'])
+
+
+def _default_save_predictions(predictions: List[Dict[str, Any]], session_id: str) -> None:
+    try:
+        from mvp.database import save_predictions_batch
+    except ImportError:
+        from src.mvp.database import save_predictions_batch
+    save_predictions_batch(predictions, session_id)
+
+
+def _default_notifier():
+    # mvp.notifications first: it is the instance the WebSocket endpoints broadcast from
+    try:
+        from mvp.notifications import notification_system
+    except ImportError:
+        from src.mvp.notifications import notification_system
+    return notification_system
+
+
+def _default_predictor():
+    from src.models.k12_ultra_predictor import K12UltraPredictor
+    return K12UltraPredictor()
+
+
+class RescoringScheduler:
+    """Re-scores synced courses and schools on a fixed cadence"""
+
+    def __init__(self,
+                 targets: Optional[List[RescoreTarget]] = None,
+                 run_hour: int = 2,
+                 interval_hours: float = 24,
+                 integration_factory: Callable[[RescoreTarget], Any] = None,
+                 save_predictions: Callable[[List[Dict[str, Any]], str], None] = None,
+                 notifier=None,
+                 predictor_factory: Callable[[], Any] = None,
+                 state_store=None,
+                 clock: Callable[[], datetime] = datetime.now):
+        """
+        Initialize scheduler.
+
+        Args:
+            targets: Courses and schools to re-score
+            run_hour: Local hour the cadence is anchored at (off-peak)
+            interval_hours: Hours between runs
+            integration_factory: Builds the integration of a target
+            save_predictions: Persists a chunk of predictions (defaults to save_predictions_batch)
+            notifier: RealTimeNotificationSystem fed with changed risk scores
+            predictor_factory: Builds the K12UltraPredictor shared by all targets of a run
+            state_store: SyncStateStore for the delta-sync snapshots (defaults to the database)
+            clock: Time source, injectable for tests
+        """
+        self.targets: List[RescoreTarget] = list(targets or [])
+        self.run_hour = run_hour
+        self.interval = timedelta(hours=interval_hours)
+        self.integration_factory = integration_factory or _default_integration_factory
+        self.save_predictions = save_predictions or _default_save_predictions
+        self._notifier = notifier
+        self.predictor_factory = predictor_factory or _default_predictor
+        self.state_store = state_store
+        self._clock = clock
+        self._predictor = None
+        self._task: Optional[asyncio.Task] = None
+        self._manual_task: Optional[asyncio.Task] = None
+        self._run_lock = asyncio.Lock()
+        self._lock = threading.Lock()
+        self.running = False
+        self.last_run_started_at: Optional[datetime] = None
+        self.last_run_finished_at: Optional[datetime] = None
+        self.last_results: List[RescoreResult] = []
+        self.runs_completed = 0
+
+    @property
+    def notifier(self):
+        if self._notifier is None:
+            self._notifier = _default_notifier()
+        return self._notifier
+
+    def add_target(self, target: RescoreTarget) -> None:
+        if target.integration not in SUPPORTED_INTEGRATIONS:
+            raise ValueError(f"Unsupported re-scoring integration: {target.integration}")
+        with self._lock:
+            self.targets = [t for t in self.targets if t.key != target.key] + [target]
+
+    def next_run_at(self, now: Optional[datetime] = None) -> datetime:
+        """First run time after ``now`` on the cadence anchored at ``run_hour``"""
+        now = now or self._clock()
+        run_at = now.replace(hour=self.run_hour, minute=0, second=0, microsecond=0)
+        while run_at - self.interval > now:
+            run_at -= self.interval
+        while run_at <= now:
+            run_at += self.interval
+        return run_at
+
+    def rescore_target(self, target: RescoreTarget) -> Tuple[RescoreResult, List[Dict[str, Any]], Dict[str, float]]:
+        """
+        Delta-sync and re-score one target, persisting only changed predictions.
+
+        Runs in a worker thread (blocking HTTP and database calls).
+
+        Returns:
+            (result, changed predictions, previous risk of the changed students)
+        """
+        started = time.perf_counter()
+        result = RescoreResult(target.integration, target.scope_id)
+        try:
+            integration = self.integration_factory(target)
+            if self._predictor is None:
+                self._predictor = self.predictor_factory()
+            integration.predictor = self._predictor
+
+            if target.integration == 'canvas':
+                sync_result = integration.sync_course_data(target.scope_id, incremental=True,
+                                                           state_store=self.state_store)
+            else:
+                sync_result = integration.sync_school_data(target.scope_id, incremental=True,
+                                                           state_store=self.state_store)
+            if sync_result.get('status') == 'error':
+                raise RuntimeError(sync_result.get('error') or 'sync failed')
+
+            predictions = sync_result.get('predictions') or []
+            delta = sync_result.get('delta')
+            if delta:
+                rescored = set(delta.get('rescored_student_ids') or [])
+                changed = [p for p in predictions if str(p.get('student_id')) in rescored]
+                previous_risk = delta.get('previous_risk') or {}
+                result.mode = delta.get('mode')
+                result.students_unchanged = delta.get('students_unchanged', 0)
+            else:
+                # Delta sync unavailable: everything was scored from scratch
+                changed, previous_risk = predictions, {}
+                result.mode = 'full'
+
+            result.students_total = len(predictions)
+            result.students_rescored = len(changed)
+            session_id = f"rescore_{target.integration}_{target.scope_id}_{self._clock().strftime('%Y%m%d_%H%M%S')}"
+            for start in range(0, len(changed), PERSIST_CHUNK_SIZE):
+                chunk = changed[start:start + PERSIST_CHUNK_SIZE]
+                self.save_predictions(chunk, session_id)
+                result.predictions_persisted += len(chunk)
+            return result, changed, previous_risk
+
+        except Exception as e:
+            logger.error(f"❌ Re-scoring {target.key} failed: {e}")
+            result.status = "error"
+            result.error = str(e)
+            return result, [], {}
+        finally:
+            result.elapsed_seconds = time.perf_counter() - started
+
+    async def monitor_changes(self, predictions: List[Dict[str, Any]], previous_risk: Dict[str, float],
+                              target: Optional[RescoreTarget] = None) -> int:
+        """
+        Feed changed risk scores to the notification system.
+
+        Students the notifier has not seen since startup get last run's risk as
+        their baseline, so only genuine threshold crossings raise alerts. Rows
+        carry the target's institution (and, for PowerSchool, its school), which
+        scopes the alerts' WebSocket topics and the notifier's risk cache.
+
+        Returns:
+            Number of alerts generated
+        """
+        rows = []
+        for prediction in predictions:
+            student_id = str(prediction.get('student_id'))
+            row = {
+                'student_id': student_id,
+                'name': str(prediction.get('name') or student_id),
+                'risk_probability': float(prediction.get('risk_probability', 0.0))
+            }
+            if prediction.get('attendance_rate') is not None:
+                row['attendance_rate'] = prediction['attendance_rate']
+            if target is not None and target.institution_id is not None:
+                row['institution_id'] = target.institution_id
+            if target is not None and target.integration == 'powerschool':
+                row['school_id'] = target.scope_id
+            rows.append(row)
+        # One vectorized pass over the changed students instead of a coroutine per student
+        generated = await self.notifier.monitor_batch(
+            rows, {str(student_id): float(risk) for student_id, risk in previous_risk.items() if risk is not None}
+        )
+        return len(generated)
+
+    async def run_once(self) -> List[RescoreResult]:
+        """Re-score every target now (skipped while a run is already in progress)"""
+        if self._run_lock.locked():
+            logger.info("⏭️ Re-scoring run already in progress")
+            return []
+        async with self._run_lock:
+            self.running = True
+            self.last_run_started_at = self._clock()
+            self._predictor = None  # pick up a retrained model once per run
+            results = []
+            try:
+                with self._lock:
+                    targets = list(self.targets)
+                for target in targets:
+                    result, changed, previous_risk = await asyncio.to_thread(self.rescore_target, target)
+                    if changed:
+                        try:
+                            result.alerts_generated = await self.monitor_changes(changed, previous_risk, target)
+                        except Exception as e:
+                            logger.warning(f"⚠️ Risk monitoring after re-scoring {target.key} failed: {e}")
+                    results.append(result)
+            finally:
+                self.running = False
+                self.last_run_finished_at = self._clock()
+                self.last_results = results
+                self.runs_completed += 1
+
+            rescored = sum(r.students_rescored for r in results)
+            total = sum(r.students_total for r in results)
+            logger.info(f"🌙 Re-scored {rescored} of {total} students across {len(results)} targets")
+            return results
+
+    async def _loop(self) -> None:
+        while True:
+            delay = (self.next_run_at() - self._clock()).total_seconds()
+            await asyncio.sleep(max(delay, 0))
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Scheduled re-scoring failed: {e}")
+
+    def start(self) -> None:
+        """Schedule runs on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+            logger.info(f"🌙 Re-scoring scheduled for {len(self.targets)} targets, next run {self.next_run_at().isoformat()}")
+
+    def trigger(self) -> bool:
+        """Start a run now on the running event loop; False if one is already in progress"""
+        if self.running or (self._manual_task is not None and not self._manual_task.done()):
+            return False
+        self._manual_task = asyncio.get_running_loop().create_task(self.run_once())
+        return True
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            targets = [{'integration': t.integration, 'scope_id': t.scope_id} for t in self.targets]
+        return {
+            'scheduled': self._task is not None and not self._task.done(),
+            'running': self.running,
+            'targets': targets,
+            'run_hour': self.run_hour,
+            'interval_hours': self.interval.total_seconds() / 3600,
+            'next_run_at': self.next_run_at().isoformat(),
+            'last_run_started_at': self.last_run_started_at.isoformat() if self.last_run_started_at else None,
+            'last_run_finished_at': self.last_run_finished_at.isoformat() if self.last_run_finished_at else None,
+            'runs_completed': self.runs_completed,
+            'last_results': [result.to_dict() for result in self.last_results]
+        }
+
+
+_rescoring_scheduler: Optional[RescoringScheduler] = None
+_rescoring_scheduler_lock = threading.Lock()
+
+
+def get_rescoring_scheduler() -> RescoringScheduler:
+    """Process-wide scheduler configured from the environment"""
+    global _rescoring_scheduler
+    with _rescoring_scheduler_lock:
+        if _rescoring_scheduler is None:
+            _rescoring_scheduler = RescoringScheduler(
+                targets=targets_from_env(),
+                run_hour=int(os.getenv('RESCORE_RUN_HOUR', '2')),
+                interval_hours=float(os.getenv('RESCORE_INTERVAL_HOURS', '24'))
+            )
+        return _rescoring_scheduler
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Risk Percentile Index
+
+In-memory, per-(institution, grade) sorted arrays of students' latest risk
+scores. Percentile ranks are answered with a binary search
+(numpy.searchsorted) instead of grade-wide COUNT queries, and the arrays are
+updated incrementally as prediction batches are saved. Arrays are re-seeded
+from SQL after RISK_PERCENTILE_TTL_SECONDS (default 900), which picks up
+deletes, enrollment changes and writes made by other worker processes.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple, Union
+
+import numpy as np
+from sqlalchemy import desc, func
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.mvp.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+GradeKey = Optional[str]
+# Seeds raced by a concurrent write are retried this many times before being served uncached
+SEED_ATTEMPTS = 3
+
+
+@dataclass
+class _GradeScores:
+    """Sorted latest risk scores for one grade."""
+    scores: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+
+    def replace(self, removed: List[float], added: List[float]) -> None:
+        """Remove old scores and merge in new ones: O(n + k log n) for k changes."""
+        scores = self.scores
+        if removed:
+            positions = np.searchsorted(scores, np.asarray(removed, dtype=np.float64), side='left')
+            # Equal scores: shift duplicate removals onto consecutive slots
+            positions.sort()
+            for i in range(1, len(positions)):
+                if positions[i] <= positions[i - 1]:
+                    positions[i] = positions[i - 1] + 1
+            scores = np.delete(scores, positions)
+        if added:
+            new_scores = np.sort(np.asarray(added, dtype=np.float64))
+            scores = np.insert(scores, np.searchsorted(scores, new_scores, side='left'), new_scores)
+        self.scores = scores
+
+
+@dataclass
+class _InstitutionIndex:
+    grades: Dict[GradeKey, _GradeScores]
+    students: Dict[int, Tuple[GradeKey, float]]
+    external_ids: Dict[str, int]
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+class RiskPercentileIndex:
+    """Per-institution percentile index over active students' latest risk scores."""
+
+    def __init__(self, session_factory=None, ttl_seconds: Optional[int] = None):
+        """
+        Initialize percentile index.
+
+        Args:
+            session_factory: Context manager yielding a DB session (defaults to get_db_session)
+            ttl_seconds: Rebuild arrays from SQL after this many seconds, so changes the
+                write hook never sees (deletes, other workers) are picked up
+        """
+        if session_factory is None:
+            from src.mvp.database import get_db_session
+            session_factory = get_db_session
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(
+            os.getenv('RISK_PERCENTILE_TTL_SECONDS', '900'))
+        self._institutions: Dict[int, _InstitutionIndex] = {}
+        # Writes that arrived while an institution had no arrays (e.g. during a build)
+        self._write_versions: Counter = Counter()
+        self._invalidations = 0
+        self._lock = threading.RLock()
+
+    def grade_scores(self, institution_id: int, grade_level: GradeKey) -> np.ndarray:
+        """Sorted latest risk scores of a grade's active students."""
+        index = self._get_institution(institution_id)
+        with self._lock:
+            grade = index.grades.get(grade_level)
+            return grade.scores if grade else np.empty(0, dtype=np.float64)
+
+    @staticmethod
+    def percentile_rank(scores: np.ndarray, risk_score: Optional[float]) -> Optional[float]:
+        """Percentage of peers with a strictly lower risk score."""
+        if risk_score is None or len(scores) == 0:
+            return None
+        return float(np.searchsorted(scores, risk_score, side='left')) / len(scores) * 100
+
+    def get_percentiles(self, institution_id: int,
+                        student_ids: List[Union[int, str]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Percentile ranks for many students in one pass.
+
+        Args:
+            institution_id: Institution the students belong to
+            student_ids: Database IDs or external student IDs
+
+        Returns:
+            Results keyed by the requested ID (as string); unknown students map
+            to ``{"found": False}``
+        """
+        index = self._get_institution(institution_id)
+        results = {}
+        with self._lock:
+            for requested in student_ids:
+                db_id = self._resolve(index, requested)
+                entry = index.students.get(db_id) if db_id is not None else None
+                if entry is None:
+                    results[str(requested)] = {"found": False}
+                    continue
+
+                grade_level, risk_score = entry
+                scores = index.grades[grade_level].scores
+                percentile = self.percentile_rank(scores, risk_score)
+                results[str(requested)] = {
+                    "found": True,
+                    "student_db_id": db_id,
+                    "grade_level": grade_level,
+                    "risk_score": risk_score,
+                    "percentile_rank": round(percentile, 1) if percentile is not None else None,
+                    "peer_count": len(scores)
+                }
+        return results
+
+    def record_scores(self, institution_id: int, updates: List[Dict[str, Any]]) -> None:
+        """
+        Apply committed latest-score writes.
+
+        Each update needs student_id (database id) and risk_score; new students
+        also need grade_level and may carry external_id. When a batch scores
+        the same student more than once, the last update wins.
+        """
+        latest: Dict[int, Dict[str, Any]] = {}
+        for update in updates:
+            if update.get('risk_score') is not None:
+                latest.pop(update['student_id'], None)
+                latest[update['student_id']] = update
+
+        with self._lock:
+            index = self._institutions.get(institution_id)
+            if index is None:
+                self._write_versions[institution_id] += 1
+                return
+
+            changes: Dict[GradeKey, Tuple[List[float], List[float]]] = {}
+            for db_id, update in latest.items():
+                risk_score = update['risk_score']
+                previous = index.students.get(db_id)
+                grade_level = previous[0] if previous else update.get('grade_level')
+                removed, added = changes.setdefault(grade_level, ([], []))
+                if previous:
+                    removed.append(previous[1])
+                added.append(float(risk_score))
+                index.students[db_id] = (grade_level, float(risk_score))
+                if update.get('external_id') is not None:
+                    index.external_ids[str(update['external_id'])] = db_id
+
+            for grade_level, (removed, added) in changes.items():
+                index.grades.setdefault(grade_level, _GradeScores()).replace(removed, added)
+
+    def invalidate(self, institution_id: Optional[int] = None) -> None:
+        """Drop cached arrays so the next read rebuilds them from SQL."""
+        with self._lock:
+            if institution_id is None:
+                self._institutions.clear()
+                self._invalidations += 1
+            else:
+                self._institutions.pop(institution_id, None)
+                self._write_versions[institution_id] += 1
+
+    @staticmethod
+    def _resolve(index: _InstitutionIndex, requested: Union[int, str]) -> Optional[int]:
+        if isinstance(requested, int) and requested in index.students:
+            return requested
+        if str(requested) in index.external_ids:
+            return index.external_ids[str(requested)]
+        if isinstance(requested, str) and requested.isdigit() and int(requested) in index.students:
+            return int(requested)
+        return None
+
+    def _get_institution(self, institution_id: int) -> _InstitutionIndex:
+        """
+        Cached arrays, building them from SQL when missing or expired.
+
+        A build is only cached if no write for the institution arrived while
+        its query ran; otherwise it is re-run so the write is not lost.
+        """
+        for _ in range(SEED_ATTEMPTS):
+            with self._lock:
+                index = self._institutions.get(institution_id)
+                if index and time.monotonic() - index.loaded_at < self.ttl_seconds:
+                    return index
+                version = (self._invalidations, self._write_versions[institution_id])
+
+            index = self._build(institution_id)
+            with self._lock:
+                if (self._invalidations, self._write_versions[institution_id]) == version:
+                    self._institutions[institution_id] = index
+                    return index
+
+        # Writes kept racing the build: serve the latest one without caching it
+        logger.info(f"📈 Risk scores of institution {institution_id} changed while indexing; not cached")
+        return index
+
+    def _build(self, institution_id: int) -> _InstitutionIndex:
+        """Load every active student's latest risk score in one query."""
+        from src.mvp.models import Student, Prediction
+
+        latest_rank = func.row_number().over(
+            partition_by=Prediction.student_id,
+            order_by=(desc(Prediction.prediction_date), desc(Prediction.id))
+        ).label('latest_rank')
+
+        with self.session_factory() as db:
+            ranked = db.query(
+                Student.id.label('id'),
+                Student.student_id.label('external_id'),
+                Student.grade_level.label('grade_level'),
+                Prediction.risk_score.label('risk_score'),
+                latest_rank
+            ).join(Prediction, Prediction.student_id == Student.id).filter(
+                Student.institution_id == institution_id,
+                Student.enrollment_status == 'active'
+            ).subquery()
+            rows = db.query(
+                ranked.c.id, ranked.c.external_id, ranked.c.grade_level, ranked.c.risk_score
+            ).filter(ranked.c.latest_rank == 1, ranked.c.risk_score.isnot(None)).all()
+
+        students = {}
+        external_ids = {}
+        by_grade: Dict[GradeKey, List[float]] = {}
+        for db_id, external_id, grade_level, risk_score in rows:
+            students[db_id] = (grade_level, float(risk_score))
+            if external_id is not None:
+                external_ids[str(external_id)] = db_id
+            by_grade.setdefault(grade_level, []).append(float(risk_score))
+
+        grades = {
+            grade_level: _GradeScores(np.sort(np.asarray(scores, dtype=np.float64)))
+            for grade_level, scores in by_grade.items()
+        }
+        logger.info(f"📈 Built risk percentile index for institution {institution_id}: "
+                    f"{len(students)} students across {len(grades)} grades")
+        return _InstitutionIndex(grades=grades, students=students, external_ids=external_ids)
+
+
+_risk_percentile_index: Optional[RiskPercentileIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_risk_percentile_index() -> RiskPercentileIndex:
+    """Get or create the process-wide risk percentile index."""
+    global _risk_percentile_index
+    if _risk_percentile_index is None:
+        with _index_lock:
+            if _risk_percentile_index is None:
+                _risk_percentile_index = RiskPercentileIndex()
+    return _risk_percentile_index
+
+
+def notify_scores_written(institution_id: int, updates: List[Dict[str, Any]]) -> None:
+    """Write hook: apply committed prediction scores to the index. Never raises."""
+    try:
+        get_risk_percentile_index().record_scores(institution_id, updates)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not update risk percentile index: {str(e)}")
+
+
+def notify_percentiles_changed(institution_id: Optional[int] = None) -> None:
+    """Write hook for deletes and moves: rebuild arrays on next read. Never raises."""
+    try:
+        get_risk_percentile_index().invalidate(institution_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not invalidate risk percentile index: {str(e)}")
@@ -0,0 +1,690 @@
+#!/usr/bin/env python3
+"""
+Background Integration Sync Jobs
+
+Runs Canvas, PowerSchool and combined syncs outside the HTTP request: a sync
+endpoint submits a job and returns its id, and clients poll
+/api/integration/jobs/{job_id} or subscribe over the notifications WebSocket
+for progress (students fetched, scored, persisted). Jobs run on a bounded
+worker pool with per-integration concurrency limits and a bounded queue, can
+be cancelled, and their state is stored in the sync_jobs table so status and
+results survive restarts. Results hold student predictions, so they are stored
+encrypted like other FERPA-covered columns and only shown to the user who
+requested the job. Credentials live only in the queued closure and are
+never written to the database, so jobs that were queued or running when their
+process stopped are marked interrupted and must be resubmitted.
+
+Several API workers share the sync_jobs table. Each job records the worker
+that owns it, and the owner refreshes ``heartbeat_at`` while the job is
+active; at startup only jobs whose heartbeat went stale are marked
+interrupted. Cancellation is a flag on the row, so a cancel request served by
+any worker reaches the one running the job, which polls it between steps.
+
+Configuration (environment):
+    SYNC_JOB_HEARTBEAT_SECONDS    how often active jobs are marked alive (default 30)
+    SYNC_JOB_CANCEL_POLL_SECONDS  how often a running job checks for a cancel request (default 2)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.mvp.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Concurrent jobs per integration (override with SYNC_JOB_CONCURRENCY="canvas=2,powerschool=1")
+DEFAULT_CONCURRENCY = {'canvas': 2, 'powerschool': 2, 'combined': 1}
+
+# Predictions saved per database batch while persisting
+PERSIST_CHUNK_SIZE = 500
+
+# Heartbeats an active job may miss before it counts as abandoned
+STALE_HEARTBEATS = 4
+
+# Identifies this process as the owner of the jobs it runs
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class SyncJobStatus(Enum):
+    """Sync job lifecycle states"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    INTERRUPTED = "interrupted"  # process stopped before the job finished
+
+
+ACTIVE_STATUSES = (SyncJobStatus.QUEUED, SyncJobStatus.RUNNING)
+
+
+class SyncJobError(Exception):
+    """Sync finished without a usable result (reported as the job error)"""
+
+
+class SyncJobCancelled(Exception):
+    """Raised inside a running job once cancellation was requested"""
+
+
+class SyncJobQueueFull(Exception):
+    """Too many jobs waiting; the caller should retry later"""
+
+
+def _json_safe(value: Any) -> Any:
+    """Round-trip through JSON so numpy scalars and datetimes become plain values"""
+    def default(obj):
+        if hasattr(obj, 'item'):
+            return obj.item()
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        return str(obj)
+    return json.loads(json.dumps(value, default=default))
+
+
+@dataclass
+class SyncJob:
+    """State and progress for a single sync run"""
+    job_id: str
+    integration: str
+    scope_id: str
+    requested_by: Optional[str] = None
+    status: SyncJobStatus = SyncJobStatus.QUEUED
+    stage: str = "queued"
+    students_fetched: int = 0
+    students_scored: int = 0
+    students_persisted: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    dedupe_key: Optional[str] = None
+    worker_id: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    cancel_polled_at: float = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATUSES
+
+    def progress(self) -> Dict[str, int]:
+        return {
+            "students_fetched": self.students_fetched,
+            "students_scored": self.students_scored,
+            "students_persisted": self.students_persisted
+        }
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "integration": self.integration,
+            "scope_id": self.scope_id,
+            "requested_by": self.requested_by,
+            "status": self.status.value,
+            "stage": self.stage,
+            "progress": self.progress(),
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class SyncJobStore:
+    """Database-backed job state (sync_jobs table)"""
+
+    def __init__(self, session_factory=None, encryption=None):
+        """
+        Initialize store.
+
+        Args:
+            session_factory: Context manager yielding a DB session (defaults to get_db_session)
+            encryption: EncryptionManager for the result column (defaults to the global one)
+        """
+        if session_factory is None:
+            from src.mvp.database import get_db_session
+            session_factory = get_db_session
+        if encryption is None:
+            from src.mvp.encryption import encryption_manager as encryption
+        self.session_factory = session_factory
+        self.encryption = encryption
+
+    def save(self, job: SyncJob) -> None:
+        from src.mvp.models import SyncJobRecord
+
+        with self.session_factory() as db:
+            row = db.query(SyncJobRecord).filter_by(job_id=job.job_id).first()
+            if row is None:
+                row = SyncJobRecord(job_id=job.job_id, integration=job.integration, scope_id=job.scope_id,
+                                    requested_by=job.requested_by, created_at=job.created_at)
+                db.add(row)
+            row.status = job.status.value
+            row.stage = job.stage
+            row.progress = json.dumps(job.progress())
+            row.result = self.encryption.encrypt(json.dumps(job.result)) if job.result is not None else None
+            row.error = job.error
+            row.started_at = job.started_at
+            row.finished_at = job.finished_at
+            row.worker_id = job.worker_id
+            row.heartbeat_at = datetime.now()
+            db.commit()
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        """Mark jobs as still owned by a live worker"""
+        from src.mvp.models import SyncJobRecord
+
+        if not job_ids:
+            return
+        with self.session_factory() as db:
+            db.query(SyncJobRecord).filter(SyncJobRecord.job_id.in_(job_ids)).update(
+                {SyncJobRecord.heartbeat_at: datetime.now()}, synchronize_session=False)
+            db.commit()
+
+    def request_cancel(self, job_id: str) -> bool:
+        """Flag an active job for cancellation by whichever worker runs it"""
+        from src.mvp.models import SyncJobRecord
+
+        with self.session_factory() as db:
+            flagged = db.query(SyncJobRecord).filter(
+                SyncJobRecord.job_id == job_id,
+                SyncJobRecord.status.in_([status.value for status in ACTIVE_STATUSES])
+            ).update({SyncJobRecord.cancel_requested: True}, synchronize_session=False)
+            db.commit()
+            return flagged > 0
+
+    def cancel_requested(self, job_id: str) -> bool:
+        from src.mvp.models import SyncJobRecord
+
+        with self.session_factory() as db:
+            return bool(db.query(SyncJobRecord.cancel_requested).filter_by(job_id=job_id).scalar())
+
+    def _load_result(self, row) -> Optional[Dict[str, Any]]:
+        if not row.result:
+            return None
+        try:
+            return json.loads(self.encryption.decrypt(row.result))
+        except ValueError:
+            logger.warning(f"Could not decrypt the result of sync job {row.job_id}")
+            return None
+
+    def _from_row(self, row) -> SyncJob:
+        progress = json.loads(row.progress) if row.progress else {}
+        return SyncJob(
+            job_id=row.job_id,
+            integration=row.integration,
+            scope_id=row.scope_id,
+            requested_by=row.requested_by,
+            status=SyncJobStatus(row.status),
+            stage=row.stage or row.status,
+            students_fetched=progress.get('students_fetched', 0),
+            students_scored=progress.get('students_scored', 0),
+            students_persisted=progress.get('students_persisted', 0),
+            result=self._load_result(row),
+            error=row.error,
+            created_at=row.created_at or datetime.now(),
+            started_at=row.started_at,
+            finished_at=row.finished_at,
+            worker_id=row.worker_id
+        )
+
+    def load(self, job_id: str) -> Optional[SyncJob]:
+        from src.mvp.models import SyncJobRecord
+
+        with self.session_factory() as db:
+            row = db.query(SyncJobRecord).filter_by(job_id=job_id).first()
+            return self._from_row(row) if row is not None else None
+
+    def list(self, limit: int = 50, integration: Optional[str] = None,
+             requested_by: Optional[str] = None) -> List[SyncJob]:
+        """Most recent jobs first, optionally only one user's"""
+        from src.mvp.models import SyncJobRecord
+
+        with self.session_factory() as db:
+            query = db.query(SyncJobRecord)
+            if integration:
+                query = query.filter_by(integration=integration)
+            if requested_by is not None:
+                query = query.filter_by(requested_by=requested_by)
+            rows = query.order_by(SyncJobRecord.created_at.desc(), SyncJobRecord.id.desc()).limit(limit).all()
+            return [self._from_row(row) for row in rows]
+
+    def mark_interrupted(self, stale_before: datetime) -> int:
+        """Close out queued or running jobs whose worker stopped heartbeating before ``stale_before``"""
+        from src.mvp.models import SyncJobRecord
+
+        with self.session_factory() as db:
+            rows = db.query(SyncJobRecord).filter(
+                SyncJobRecord.status.in_([status.value for status in ACTIVE_STATUSES]),
+                (SyncJobRecord.heartbeat_at.is_(None)) | (SyncJobRecord.heartbeat_at < stale_before)
+            ).all()
+            for row in rows:
+                row.status = SyncJobStatus.INTERRUPTED.value
+                row.stage = SyncJobStatus.INTERRUPTED.value
+                row.error = "Server restarted before the sync finished; please resubmit it"
+                row.finished_at = datetime.now()
+            db.commit()
+            return len(rows)
+
+
+class SyncJobContext:
+    """Handle a running sync uses to report progress and observe cancellation"""
+
+    def __init__(self, job: SyncJob, service: Optional["SyncJobService"] = None):
+        self.job = job
+        self._service = service
+
+    @property
+    def cancelled(self) -> bool:
+        if not self.job.cancel_event.is_set() and self._service is not None:
+            self._service._poll_cancel(self.job)
+        return self.job.cancel_event.is_set()
+
+    def check_cancelled(self) -> None:
+        if self.cancelled:
+            raise SyncJobCancelled(f"Sync job {self.job.job_id} cancelled")
+
+    def _changed(self) -> None:
+        if self._service is not None:
+            self._service._job_changed(self.job)
+
+    def stage(self, name: str) -> None:
+        self.check_cancelled()
+        self.job.stage = name
+        self._changed()
+
+    def progress(self, stage: str, count: int) -> None:
+        """Integration progress callback: ('fetched' | 'scored' | 'persisted', student count)"""
+        self.check_cancelled()
+        if stage == 'fetched':
+            self.job.students_fetched = count
+            self.job.stage = 'scoring'
+        elif stage == 'scored':
+            self.job.students_scored = count
+        elif stage == 'persisted':
+            self.job.students_persisted = count
+        self._changed()
+
+    def persist(self, items: List[Dict[str, Any]], save: Callable[[List[Dict[str, Any]]], None],
+                chunk_size: int = PERSIST_CHUNK_SIZE) -> int:
+        """Save items in chunks, reporting progress and stopping early when cancelled"""
+        self.stage('persisting')
+        saved = 0
+        for start in range(0, len(items), chunk_size):
+            self.check_cancelled()
+            chunk = items[start:start + chunk_size]
+            save(chunk)
+            saved += len(chunk)
+            self.progress('persisted', saved)
+        return saved
+
+
+def run_inline(integration: str, scope_id: str, run: Callable[[SyncJobContext], Dict[str, Any]]) -> Dict[str, Any]:
+    """Run a sync in the calling thread (the synchronous endpoint path)"""
+    job = SyncJob(job_id=f"inline_{uuid.uuid4().hex[:12]}", integration=integration, scope_id=scope_id)
+    return run(SyncJobContext(job))
+
+
+def _concurrency_from_env() -> Dict[str, int]:
+    limits = dict(DEFAULT_CONCURRENCY)
+    for item in os.getenv('SYNC_JOB_CONCURRENCY', '').split(','):
+        name, _, value = item.partition('=')
+        if name.strip() and value.strip().isdigit():
+            limits[name.strip()] = max(1, int(value))
+    return limits
+
+
+class SyncJobService:
+    """Bounded background runner for integration syncs"""
+
+    def __init__(self, store: Optional[SyncJobStore] = None, max_workers: Optional[int] = None,
+                 concurrency_limits: Optional[Dict[str, int]] = None, max_queued: Optional[int] = None,
+                 max_retained_jobs: int = 200, worker_id: str = WORKER_ID,
+                 heartbeat_seconds: Optional[float] = None, cancel_poll_seconds: Optional[float] = None):
+        """
+        Initialize job service.
+
+        Args:
+            store: Job state persistence (defaults to the application database)
+            max_workers: Jobs running at once across all integrations
+            concurrency_limits: Jobs running at once per integration (1 for unlisted integrations)
+            max_queued: Jobs allowed to wait before submit raises SyncJobQueueFull
+            max_retained_jobs: Finished jobs kept in memory (older ones are read from the store)
+            worker_id: Owner recorded on this service's jobs
+            heartbeat_seconds: Interval at which this service's active jobs are marked alive
+            cancel_poll_seconds: Minimum interval between a running job's checks of the cancel flag
+        """
+        self.store = store or SyncJobStore()
+        self.max_workers = max_workers or int(os.getenv('SYNC_JOB_WORKERS', '4'))
+        self.concurrency_limits = concurrency_limits or _concurrency_from_env()
+        self.max_queued = max_queued or int(os.getenv('SYNC_JOB_MAX_QUEUED', '50'))
+        self.max_retained_jobs = max_retained_jobs
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sync-job")
+        self._jobs: Dict[str, SyncJob] = {}
+        self._runners: Dict[str, Callable[[SyncJobContext], Dict[str, Any]]] = {}
+        self._pending: deque = deque()
+        self._running: Counter = Counter()
+        self._subscribers: Dict[str, Set[Any]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self.worker_id = worker_id
+        self.heartbeat_seconds = heartbeat_seconds or float(os.getenv('SYNC_JOB_HEARTBEAT_SECONDS', '30'))
+        self.cancel_poll_seconds = cancel_poll_seconds if cancel_poll_seconds is not None else float(
+            os.getenv('SYNC_JOB_CANCEL_POLL_SECONDS', '2'))
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def recover_interrupted(self) -> int:
+        """
+        Mark jobs abandoned by a stopped worker as interrupted; run once at startup.
+
+        Jobs of other live workers keep heartbeating and are left alone.
+        """
+        stale_before = datetime.now() - timedelta(seconds=self.heartbeat_seconds * STALE_HEARTBEATS)
+        try:
+            interrupted = self.store.mark_interrupted(stale_before)
+        except Exception as e:
+            logger.warning(f"Could not recover sync job state: {e}")
+            return 0
+        if interrupted:
+            logger.warning(f"⚠️ Marked {interrupted} unfinished sync jobs as interrupted")
+        return interrupted
+
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Event loop used to push WebSocket progress from worker threads"""
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+        self._loop = loop
+
+    def submit(self, integration: str, scope_id: str, run: Callable[[SyncJobContext], Dict[str, Any]],
+               requested_by: Optional[str] = None, dedupe_key: Optional[str] = None) -> SyncJob:
+        """
+        Queue a sync.
+
+        Args:
+            integration: 'canvas', 'powerschool' or 'combined' (selects the concurrency limit)
+            scope_id: Course / school being synced, shown in job status
+            run: Performs the sync and returns the response body; credentials stay in this closure
+            requested_by: User who submitted the job
+            dedupe_key: Jobs with the same key share one active run
+
+        Returns:
+            The queued job, or the already active job with the same dedupe_key
+
+        Raises:
+            SyncJobQueueFull: When max_queued jobs are already waiting
+        """
+        self.bind_loop()
+        # Keys usually embed credentials; keep only a digest
+        dedupe_key = hashlib.sha256(dedupe_key.encode()).hexdigest() if dedupe_key else None
+        with self._lock:
+            if dedupe_key:
+                for existing in self._jobs.values():
+                    if existing.dedupe_key == dedupe_key and existing.active:
+                        return existing
+            if len(self._pending) >= self.max_queued:
+                raise SyncJobQueueFull(f"{len(self._pending)} sync jobs already queued")
+
+            job = SyncJob(job_id=f"sync_{uuid.uuid4().hex[:12]}", integration=integration, scope_id=str(scope_id),
+                          requested_by=requested_by, dedupe_key=dedupe_key, worker_id=self.worker_id)
+            self._jobs[job.job_id] = job
+            self._runners[job.job_id] = run
+            self._pending.append(job.job_id)
+            self._prune_jobs()
+
+        self._save(job)
+        self._ensure_heartbeat()
+        logger.info(f"🔄 Queued {integration} sync job {job.job_id} for {scope_id}")
+        self._dispatch()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[SyncJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            return self.store.load(job_id)
+        except Exception as e:
+            logger.warning(f"Could not load sync job {job_id}: {e}")
+            return None
+
+    def list_jobs(self, limit: int = 50, integration: Optional[str] = None,
+                  requested_by: Optional[str] = None) -> List[SyncJob]:
+        """Recent jobs, newest first, optionally only one user's (live in-memory state wins over stored rows)"""
+        try:
+            stored = self.store.list(limit, integration, requested_by)
+        except Exception as e:
+            logger.warning(f"Could not list stored sync jobs: {e}")
+            stored = []
+        with self._lock:
+            live = {job_id: job for job_id, job in self._jobs.items()
+                    if (integration is None or job.integration == integration)
+                    and (requested_by is None or job.requested_by == requested_by)}
+        jobs = {job.job_id: job for job in stored}
+        jobs.update(live)
+        return sorted(jobs.values(), key=lambda job: job.created_at, reverse=True)[:limit]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued job immediately, or ask a running one to stop at its next progress step.
+
+        Jobs this worker does not hold are flagged in the store; the worker running them polls the flag.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                if not job.active:
+                    return False
+                job.cancel_event.set()
+                queued = job_id in self._pending
+                if queued:
+                    self._pending.remove(job_id)
+                    self._runners.pop(job_id, None)
+                    job.status = SyncJobStatus.CANCELLED
+                    job.stage = SyncJobStatus.CANCELLED.value
+                    job.finished_at = datetime.now()
+        if job is None:
+            try:
+                requested = self.store.request_cancel(job_id)
+            except Exception as e:
+                logger.warning(f"Could not request cancellation of sync job {job_id}: {e}")
+                return False
+            if requested:
+                logger.info(f"🛑 Cancellation requested for sync job {job_id} of another worker")
+            return requested
+        if queued:
+            self._job_changed(job)
+        logger.info(f"🛑 Cancellation requested for sync job {job_id}")
+        return True
+
+    def subscribe(self, job_id: str, websocket, requested_by: Optional[str] = None) -> Optional[SyncJob]:
+        """Send progress of a job to a notifications WebSocket (None if it is not ``requested_by``'s job)"""
+        self.bind_loop()
+        job = self.get_job(job_id)
+        if job is not None and requested_by is not None and job.requested_by != requested_by:
+            return None
+        if job is not None and job.active:
+            with self._lock:
+                self._subscribers.setdefault(job_id, set()).add(websocket)
+        return job
+
+    def unsubscribe(self, websocket) -> None:
+        with self._lock:
+            for subscribers in self._subscribers.values():
+                subscribers.discard(websocket)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses = Counter(job.status.value for job in self._jobs.values())
+            return {
+                'max_workers': self.max_workers,
+                'max_queued': self.max_queued,
+                'concurrency_limits': dict(self.concurrency_limits),
+                'queued': len(self._pending),
+                'running_by_integration': dict(self._running),
+                'jobs_by_status': dict(statuses)
+            }
+
+    def _dispatch(self) -> None:
+        """Start queued jobs in FIFO order while worker and per-integration capacity allow"""
+        to_start = []
+        with self._lock:
+            running = sum(self._running.values())
+            for job_id in list(self._pending):
+                if running >= self.max_workers:
+                    break
+                job = self._jobs[job_id]
+                if self._running[job.integration] >= self.concurrency_limits.get(job.integration, 1):
+                    continue  # a later job of another integration may still start
+                self._pending.remove(job_id)
+                self._running[job.integration] += 1
+                running += 1
+                to_start.append((job, self._runners.pop(job_id)))
+
+        for job, run in to_start:
+            self._executor.submit(self._run_job, job, run)
+
+    def _run_job(self, job: SyncJob, run: Callable[[SyncJobContext], Dict[str, Any]]) -> None:
+        job.status = SyncJobStatus.RUNNING
+        job.stage = 'fetching'
+        job.started_at = datetime.now()
+        self._job_changed(job)
+        try:
+            context = SyncJobContext(job, self)
+            context.check_cancelled()
+            result = run(context)
+            context.check_cancelled()
+            job.result = _json_safe(result)
+            job.status = SyncJobStatus.COMPLETED
+        except SyncJobCancelled:
+            job.status = SyncJobStatus.CANCELLED
+        except Exception as e:
+            if job.cancel_event.is_set():
+                # Integrations turn the cancellation raised in their progress callback into an error result
+                job.status = SyncJobStatus.CANCELLED
+            else:
+                logger.error(f"❌ Sync job {job.job_id} failed: {e}")
+                job.status = SyncJobStatus.FAILED
+                job.error = str(e)
+        finally:
+            job.stage = job.status.value
+            job.finished_at = datetime.now()
+            with self._lock:
+                self._running[job.integration] -= 1
+            self._job_changed(job)
+            with self._lock:
+                self._subscribers.pop(job.job_id, None)
+            logger.info(f"🔄 Sync job {job.job_id} {job.status.value}: {job.students_fetched} fetched, "
+                        f"{job.students_scored} scored, {job.students_persisted} persisted")
+            self._dispatch()
+
+    def _poll_cancel(self, job: SyncJob) -> None:
+        """Pick up a cancel request another worker stored for this job (rate limited per job)"""
+        now = time.monotonic()
+        if now - job.cancel_polled_at < self.cancel_poll_seconds:
+            return
+        job.cancel_polled_at = now
+        try:
+            if self.store.cancel_requested(job.job_id):
+                job.cancel_event.set()
+        except Exception as e:
+            logger.warning(f"Could not check cancellation of sync job {job.job_id}: {e}")
+
+    def _ensure_heartbeat(self) -> None:
+        with self._lock:
+            if self._heartbeat is not None and self._heartbeat.is_alive():
+                return
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="sync-job-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def _heartbeat_loop(self) -> None:
+        """Keep this worker's active jobs from being recovered as abandoned; exits once none are left"""
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                active = [job_id for job_id, job in self._jobs.items() if job.active]
+                if not active:
+                    self._heartbeat = None
+                    return
+            try:
+                self.store.heartbeat(active)
+            except Exception as e:
+                logger.warning(f"Could not record sync job heartbeat: {e}")
+
+    def _prune_jobs(self) -> None:
+        """Drop the oldest finished jobs beyond the retention limit."""
+        finished = [job for job in self._jobs.values() if not job.active]
+        excess = len(self._jobs) - self.max_retained_jobs
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(0, excess)]:
+            del self._jobs[job.job_id]
+
+    def _save(self, job: SyncJob) -> None:
+        try:
+            self.store.save(job)
+        except Exception as e:
+            logger.warning(f"Could not save sync job {job.job_id}: {e}")
+
+    def _job_changed(self, job: SyncJob) -> None:
+        self._save(job)
+        self._publish(job)
+
+    def _publish(self, job: SyncJob) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(job.job_id, ()))
+        loop = self._loop
+        if not subscribers or loop is None or loop.is_closed():
+            return
+        message = json.dumps({
+            'type': 'sync_job_progress',
+            'job': job.to_dict(include_result=False),
+            'timestamp': datetime.now().isoformat()
+        })
+        try:
+            asyncio.run_coroutine_threadsafe(self._send(job.job_id, subscribers, message), loop)
+        except RuntimeError:
+            pass  # loop shut down
+
+    async def _send(self, job_id: str, subscribers: List[Any], message: str) -> None:
+        for websocket in subscribers:
+            try:
+                await websocket.send_text(message)
+            except Exception as e:
+                logger.warning(f"Failed to send sync job progress: {e}")
+                with self._lock:
+                    self._subscribers.get(job_id, set()).discard(websocket)
+
+
+_sync_job_service: Optional[SyncJobService] = None
+_sync_job_service_lock = threading.Lock()
+
+
+def get_sync_job_service() -> SyncJobService:
+    """Get or create the process-wide sync job service."""
+    global _sync_job_service
+    with _sync_job_service_lock:
+        if _sync_job_service is None:
+            _sync_job_service = SyncJobService()
+        return _sync_job_service
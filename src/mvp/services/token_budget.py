@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Token Budget Service
+
+Token accounting for GPT prompts: pluggable tokenizers, per-analysis-type input
+budgets with priority-based section compaction, and tokens-in/tokens-out metrics.
+"""
+
+import os
+import re
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.mvp.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Optional exact tokenizer
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Sections with this priority are never dropped or summarized
+PRIORITY_REQUIRED = 0
+
+# Default prompt (input) token budgets per analysis type
+DEFAULT_INPUT_BUDGETS = {
+    "student_analysis": 600,
+    "cohort_analysis": 400,
+    "intervention_planning": 450,
+}
+
+_WORD_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+class ApproximateTokenizer:
+    """
+    Offline BPE-style token estimate.
+
+    Counts letter runs, digit runs and individual symbols, charging long words
+    one token per four characters. Tracks cl100k/o200k counts within ~15% on
+    English prose and never needs network or model files, so it is also the
+    deterministic tokenizer used by tests.
+    """
+
+    name = "approximate"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        tokens = 0
+        for piece in _WORD_PATTERN.findall(text):
+            if piece.isdigit():
+                tokens += (len(piece) + 2) // 3
+            elif len(piece) > 4:
+                tokens += (len(piece) + 3) // 4
+            else:
+                tokens += 1
+        return tokens
+
+
+class TiktokenTokenizer:
+    """Exact token counts via tiktoken for the configured model."""
+
+    def __init__(self, model_name: str = "gpt-5-nano"):
+        try:
+            self._encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            self._encoding = tiktoken.get_encoding("o200k_base")
+        self.name = f"tiktoken:{self._encoding.name}"
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text)) if text else 0
+
+
+def get_default_tokenizer(model_name: str = "gpt-5-nano"):
+    """
+    Pick the tokenizer named by GPT_TOKENIZER ("tiktoken" or "approximate").
+
+    Falls back to the approximation when tiktoken or its encoding files are
+    unavailable (e.g. offline test runs).
+    """
+    if os.getenv('GPT_TOKENIZER', 'approximate').lower() == 'tiktoken' and TIKTOKEN_AVAILABLE:
+        try:
+            return TiktokenTokenizer(model_name)
+        except Exception as e:
+            logger.warning(f"⚠️ tiktoken unavailable, using approximate token counts: {str(e)}")
+    return ApproximateTokenizer()
+
+
+def get_input_budget(analysis_type: str, overrides: Optional[Dict[str, int]] = None) -> Optional[int]:
+    """
+    Resolve the prompt token budget for an analysis type.
+
+    Precedence: explicit overrides, GPT_INPUT_BUDGET_<TYPE> env var, defaults.
+    A value of 0 disables compaction for that type.
+    """
+    if overrides and analysis_type in overrides:
+        budget = overrides[analysis_type]
+    else:
+        env_value = os.getenv(f"GPT_INPUT_BUDGET_{analysis_type.upper()}")
+        budget = int(env_value) if env_value else DEFAULT_INPUT_BUDGETS.get(analysis_type)
+    return budget or None
+
+
+@dataclass
+class ContextSection:
+    """One prompt section with its compaction priority (higher drops first)."""
+    name: str
+    text: str
+    priority: int = PRIORITY_REQUIRED
+    summary: Optional[str] = None
+
+
+def compact_sections(sections: List[ContextSection], budget: Optional[int], tokenizer,
+                     separator: str = "\n\n") -> Tuple[str, Dict[str, Any]]:
+    """
+    Fit sections into a token budget.
+
+    Lowest-priority sections are first replaced by their summary, then dropped,
+    until the prompt fits. Required sections are always kept, so the result can
+    exceed the budget when the required content alone does.
+
+    Args:
+        sections: Ordered prompt sections
+        budget: Maximum prompt tokens, or None for no limit
+        tokenizer: Object with a ``count(text) -> int`` method
+
+    Returns:
+        Tuple of (prompt text, compaction report)
+    """
+    sections = [s for s in sections if s.text]
+    separator_tokens = tokenizer.count(separator)
+    counts = {s.name: tokenizer.count(s.text) for s in sections}
+    original_tokens = sum(counts.values()) + separator_tokens * max(0, len(sections) - 1)
+
+    kept = {s.name: s.text for s in sections}
+    summarized, dropped = [], []
+    total = original_tokens
+
+    if budget and total > budget:
+        optional = sorted((s for s in sections if s.priority > PRIORITY_REQUIRED),
+                          key=lambda s: s.priority, reverse=True)
+        for section in optional:
+            if total <= budget:
+                break
+            if section.summary:
+                summary_tokens = tokenizer.count(section.summary)
+                if summary_tokens < counts[section.name]:
+                    total -= counts[section.name] - summary_tokens
+                    counts[section.name] = summary_tokens
+                    kept[section.name] = section.summary
+                    summarized.append(section.name)
+                    if total <= budget:
+                        break
+            total -= counts.pop(section.name) + separator_tokens
+            del kept[section.name]
+            if section.name in summarized:
+                summarized.remove(section.name)
+            dropped.append(section.name)
+
+    text = separator.join(kept[s.name] for s in sections if s.name in kept)
+    report = {
+        "tokenizer": getattr(tokenizer, "name", type(tokenizer).__name__),
+        "budget": budget,
+        "original_tokens": original_tokens,
+        "final_tokens": total,
+        "section_tokens": counts,
+        "summarized_sections": summarized,
+        "dropped_sections": dropped,
+        "over_budget": bool(budget and total > budget),
+    }
+    return text, report
+
+
+class TokenUsageMetrics:
+    """Thread-safe per-analysis-type counters of prompt and completion tokens."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def record(self, analysis_type: str, prompt_tokens: int, completion_tokens: int,
+               estimated_prompt_tokens: Optional[int] = None) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(analysis_type, {
+                "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "estimated_prompt_tokens": 0
+            })
+            stats["calls"] += 1
+            stats["prompt_tokens"] += prompt_tokens or 0
+            stats["completion_tokens"] += completion_tokens or 0
+            stats["estimated_prompt_tokens"] += estimated_prompt_tokens or 0
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            by_type = {}
+            for analysis_type, stats in self._stats.items():
+                calls = stats["calls"] or 1
+                by_type[analysis_type] = {
+                    **stats,
+                    "avg_prompt_tokens": round(stats["prompt_tokens"] / calls, 1),
+                    "avg_completion_tokens": round(stats["completion_tokens"] / calls, 1),
+                }
+            return {
+                "total_calls": sum(s["calls"] for s in self._stats.values()),
+                "total_prompt_tokens": sum(s["prompt_tokens"] for s in self._stats.values()),
+                "total_completion_tokens": sum(s["completion_tokens"] for s in self._stats.values()),
+                "by_analysis_type": by_type,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+# Process-wide token usage metrics
+token_usage_metrics = TokenUsageMetrics()
@@ -4,19 +4,21 @@ Simple authentication for MVP
 Replaces complex security layer with basic API key check
 """
 
+import math
 import os
 import time
 from fastapi import HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials
 from typing import Dict, Any
-from collections import defaultdict, deque
 from fastapi import Depends
 from sqlalchemy.orm import Session
-import time
 
-# Rate limiting with time-based sliding windows
-_rate_limit_storage = defaultdict(lambda: deque())
-_blocked_ips = {}
+try:
+    from .rate_limit import RateLimit, get_rate_limiter
+except ImportError:
+    from mvp.rate_limit import RateLimit, get_rate_limiter
+
+# Rate limiting through the shared limiter engine (see rate_limit.py)
 RATE_LIMIT_WINDOW = 60  # 1 minute window
 MAX_REQUESTS_PER_MINUTE = 60  # Default limit
 
@@ -154,48 +156,20 @@ def get_current_user_secure(
 
 def simple_rate_limit(request: Request, limit: int = MAX_REQUESTS_PER_MINUTE) -> None:
     """
-    Time-based sliding window rate limiting for MVP
-    Allows 'limit' requests per minute per IP address
+    GCRA rate limiting for MVP (see rate_limit.py)
+    Allows 'limit' requests per minute per IP address, spaced evenly with a burst of up to 'limit'
     """
     if os.getenv('TESTING', 'false').lower() == 'true':
         # Skip rate limiting during tests
         return
     
     client_ip = request.client.host
-    current_time = time.time()
-    
-    # Get the request timestamps for this IP
-    timestamps = _rate_limit_storage[client_ip]
-    
-    # Remove timestamps older than the window
-    while timestamps and current_time - timestamps[0] > RATE_LIMIT_WINDOW:
-        timestamps.popleft()
-    
-    # Check if we're over the limit
-    if len(timestamps) >= limit:
-        # Calculate time until oldest request expires
-        time_to_wait = RATE_LIMIT_WINDOW - (current_time - timestamps[0])
+    decision = get_rate_limiter().hit(f"simple_auth:{client_ip}", RateLimit(limit=limit, window=RATE_LIMIT_WINDOW))
+    if not decision.allowed:
         raise HTTPException(
             status_code=429, 
-            detail=f"Rate limit exceeded. Try again in {int(time_to_wait)} seconds"
+            detail=f"Rate limit exceeded. Try again in {math.ceil(decision.retry_after)} seconds"
         )
-    
-    # Add current request timestamp
-    timestamps.append(current_time)
-    
-    # Optional: Clean up storage for IPs with no recent requests
-    if len(_rate_limit_storage) > 1000:  # Prevent memory bloat
-        _cleanup_old_entries(current_time)
-
-def _cleanup_old_entries(current_time: float) -> None:
-    """Clean up rate limiting storage for IPs with no recent requests"""
-    to_remove = []
-    for ip, timestamps in _rate_limit_storage.items():
-        if not timestamps or current_time - timestamps[-1] > RATE_LIMIT_WINDOW * 2:
-            to_remove.append(ip)
-    
-    for ip in to_remove:
-        del _rate_limit_storage[ip]
 
 def simple_file_validation(contents: bytes, filename: str) -> None:
     """Simple file validation for MVP"""
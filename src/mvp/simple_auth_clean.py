@@ -5,14 +5,16 @@ Single API key check with development mode bypass
 """
 
 import os
-import time
 from fastapi import HTTPException, Request, Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from typing import Dict, Any
-from collections import defaultdict, deque
 
-# Simple rate limiting (optional)
-_rate_limit_storage = defaultdict(lambda: deque())
+try:
+    from .rate_limit import RateLimit, get_rate_limiter
+except ImportError:
+    from mvp.rate_limit import RateLimit, get_rate_limiter
+
+# Simple rate limiting (optional), through the shared limiter engine
 RATE_LIMIT_WINDOW = 60  # 1 minute window
 MAX_REQUESTS_PER_MINUTE = 100  # More permissive for simplicity
 
@@ -76,32 +78,6 @@ def simple_auth_check(
 def apply_rate_limit(request: Request, limit: int = MAX_REQUESTS_PER_MINUTE):
     """Simple rate limiting - optional, can be disabled"""
     client_ip = request.client.host if request.client else "unknown"
-    current_time = time.time()
-    
-    # Get request history for this IP
-    timestamps = _rate_limit_storage[client_ip]
-    
-    # Remove old requests outside the window
-    while timestamps and current_time - timestamps[0] > RATE_LIMIT_WINDOW:
-        timestamps.popleft()
-    
-    # Check if over limit
-    if len(timestamps) >= limit:
+    decision = get_rate_limiter().hit(f"simple_auth_clean:{client_ip}", RateLimit(limit=limit, window=RATE_LIMIT_WINDOW))
+    if not decision.allowed:
         raise HTTPException(status_code=429, detail="Rate limit exceeded")
-    
-    # Add current request
-    timestamps.append(current_time)
-    
-    # Cleanup storage periodically
-    if len(_rate_limit_storage) > 1000:
-        cleanup_old_ips(current_time)
-
-def cleanup_old_ips(current_time: float):
-    """Remove IPs with no recent requests"""
-    to_remove = []
-    for ip, timestamps in _rate_limit_storage.items():
-        if not timestamps or current_time - timestamps[-1] > RATE_LIMIT_WINDOW * 2:
-            to_remove.append(ip)
-    
-    for ip in to_remove:
-        del _rate_limit_storage[ip]
\ No newline at end of file
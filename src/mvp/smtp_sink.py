@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Local SMTP Sink
+
+A minimal SMTP server that accepts every message and keeps it in memory,
+for tests and local development of alert e-mail without a real mail server.
+It speaks enough of the protocol for smtplib: EHLO/HELO, AUTH PLAIN/LOGIN
+(any credentials), MAIL, RCPT, DATA, RSET, NOOP and QUIT. There is no TLS, so
+point the notification system at it with SMTP_USE_TLS=false.
+
+Usage:
+    python -m src.mvp.smtp_sink [--port 1025]
+
+    with LocalSMTPSink() as sink:
+        ...send to 127.0.0.1:sink.port...
+        sink.messages  # [(mail_from, [rcpt_to, ...], email.message.Message), ...]
+"""
+
+import argparse
+import socket
+import socketserver
+import threading
+import time
+from contextlib import suppress
+from email import message_from_bytes
+from email.message import Message
+from typing import List, Set, Tuple
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(line.encode('ascii') + b"\r\n")
+
+    def read_line(self) -> str:
+        return self.rfile.readline().decode('utf-8', 'replace').rstrip("\r\n")
+
+    def handle(self) -> None:
+        sink = self.server.sink
+        sink._record_connection(self.connection)
+        self.reply("220 localhost SMTP sink ready")
+        mail_from, rcpt_to = None, []
+        while True:
+            line = self.read_line()
+            if not line:
+                return  # connection closed
+            command, _, argument = line.partition(' ')
+            command = command.upper()
+            if command == 'EHLO':
+                self.reply("250-localhost")
+                self.reply("250-AUTH PLAIN LOGIN")
+                self.reply("250 8BITMIME")
+            elif command == 'HELO':
+                self.reply("250 localhost")
+            elif command == 'AUTH':
+                mechanism = argument.split(' ')[0].upper()
+                if mechanism == 'LOGIN':
+                    if ' ' not in argument:  # no initial response carrying the username
+                        self.reply("334 VXNlcm5hbWU6")
+                        self.read_line()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    self.read_line()
+                elif mechanism == 'PLAIN' and ' ' not in argument:
+                    self.reply("334 ")
+                    self.read_line()
+                sink._record_login()
+                self.reply("235 Authentication successful")
+            elif command == 'MAIL':
+                mail_from, rcpt_to = argument.partition(':')[2].split(' ')[0].strip('<>'), []
+                self.reply("250 OK")
+            elif command == 'RCPT':
+                rcpt_to.append(argument.partition(':')[2].split(' ')[0].strip('<>'))
+                self.reply("250 OK")
+            elif command == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    raw = self.rfile.readline()
+                    if not raw or raw in (b".\r\n", b".\n"):
+                        break
+                    lines.append(raw[1:] if raw.startswith(b"..") else raw)
+                sink._record_message(mail_from, rcpt_to, message_from_bytes(b"".join(lines)))
+                mail_from, rcpt_to = None, []
+                self.reply("250 OK queued")
+            elif command in ('RSET', 'NOOP'):
+                if command == 'RSET':
+                    mail_from, rcpt_to = None, []
+                self.reply("250 OK")
+            elif command == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def finish(self) -> None:
+        self.server.sink._forget_connection(self.connection)
+        super().finish()
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LocalSMTPSink:
+    """In-memory SMTP server on 127.0.0.1 that records connections, logins and messages"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, delay: float = 0.0):
+        """
+        Initialize sink.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free one, see ``port``)
+            delay: Seconds to stall before accepting each message, to simulate a slow server
+        """
+        self.host = host
+        self.delay = delay
+        self.messages: List[Tuple[str, List[str], Message]] = []
+        self.connections = 0
+        self.logins = 0
+        self._lock = threading.Lock()
+        self._open: Set[socket.socket] = set()
+        self._server = _Server((host, port), _SMTPHandler)
+        self._server.sink = self
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def _record_connection(self, connection: socket.socket) -> None:
+        with self._lock:
+            self.connections += 1
+            self._open.add(connection)
+
+    def _forget_connection(self, connection: socket.socket) -> None:
+        with self._lock:
+            self._open.discard(connection)
+
+    def drop_connections(self) -> int:
+        """Close every open client connection from the server side, like a server timing out idle clients"""
+        with self._lock:
+            connections, self._open = list(self._open), set()
+        for connection in connections:
+            with suppress(OSError):
+                connection.shutdown(socket.SHUT_RDWR)
+        return len(connections)
+
+    def _record_login(self) -> None:
+        with self._lock:
+            self.logins += 1
+
+    def _record_message(self, mail_from: str, rcpt_to: List[str], message: Message) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.messages.append((mail_from, list(rcpt_to), message))
+
+    def start(self) -> 'LocalSMTPSink':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='smtp-sink', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'LocalSMTPSink':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--port', type=int, default=1025)
+    args = parser.parse_args()
+
+    sink = LocalSMTPSink(port=args.port).start()
+    print(f"📧 SMTP sink listening on 127.0.0.1:{sink.port} (SMTP_SERVER=127.0.0.1 SMTP_PORT={sink.port} "
+          f"SMTP_USE_TLS=false)")
+    seen = 0
+    try:
+        while True:
+            time.sleep(0.5)
+            for mail_from, rcpt_to, message in sink.messages[seen:]:
+                print(f"📨 {mail_from} -> {', '.join(rcpt_to)}: {message['Subject']}")
+            seen = len(sink.messages)
+    except KeyboardInterrupt:
+        sink.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+WebSocket Fan-out Broadcaster
+
+Alerts used to be delivered by awaiting ``send_text`` on every connected socket
+in turn, so one slow client delayed delivery to everyone, and every connection
+received every alert. The broadcaster decouples publishing from delivery:
+
+* each connection has a bounded send queue drained by its own sender task;
+  when a client falls behind, the oldest queued message is dropped, so memory
+  per client is bounded and a stalled socket never blocks the publisher
+* clients subscribe to topics (``institution:<id>``, ``school:<id>``,
+  ``student:<id>``) and receive nothing else; a client without subscriptions
+  only gets direct replies
+* a client may be bound to a scope (its institution): it then only receives
+  messages published for that scope, whatever topics it subscribed to, so a
+  school or student id shared by two institutions never leaks across them
+* a message is serialized to JSON once, however many clients receive it
+* a send that does not complete within the send timeout disconnects the client
+
+Configuration (environment):
+    WEBSOCKET_SEND_QUEUE_SIZE   messages buffered per client (default 256)
+    WEBSOCKET_SEND_TIMEOUT      seconds before a stuck send drops the client (default 10)
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from contextlib import suppress
+from typing import Any, Dict, Iterable, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+TOPIC_KINDS = ('institution', 'school', 'student')
+
+
+def topic(kind: str, value: Any) -> str:
+    """Topic name for an institution, school or student, e.g. ``institution:12``"""
+    if kind not in TOPIC_KINDS:
+        raise ValueError(f"Unknown topic kind '{kind}' (expected one of {', '.join(TOPIC_KINDS)})")
+    return f"{kind}:{value}"
+
+
+def validate_topic(name: str) -> str:
+    """Check a client-supplied topic name and return it normalized"""
+    kind, sep, value = str(name).strip().partition(':')
+    if not sep or not value.strip():
+        raise ValueError(f"Invalid topic '{name}' (expected kind:id)")
+    return topic(kind, value.strip())
+
+
+class ClientConnection:
+    """A connected WebSocket with its bounded send queue and topic subscriptions"""
+
+    __slots__ = ('websocket', 'scope', 'topics', 'queue', 'ready', 'task', 'sent', 'dropped')
+
+    def __init__(self, websocket, max_queue: int, scope: Optional[str] = None):
+        self.websocket = websocket
+        self.scope = scope
+        self.topics: Set[str] = set()
+        self.queue: deque = deque(maxlen=max_queue)
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+
+    def enqueue(self, message: str) -> bool:
+        """Queue a message, dropping the oldest one when full; True if one was dropped"""
+        dropped = len(self.queue) == self.queue.maxlen
+        if dropped:
+            self.dropped += 1
+        self.queue.append(message)
+        self.ready.set()
+        return dropped
+
+
+class WebSocketBroadcaster:
+    """Topic-based fan-out to WebSocket clients with per-client bounded queues"""
+
+    def __init__(self, max_queue: int = 256, send_timeout: float = 10.0):
+        """
+        Initialize broadcaster.
+
+        Args:
+            max_queue: Messages buffered per client before the oldest is dropped
+            send_timeout: Seconds a single send may take before the client is disconnected
+        """
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self._clients: Dict[Any, ClientConnection] = {}
+        self._topics: Dict[str, Set[ClientConnection]] = {}
+        self.messages_published = 0
+        self.messages_delivered = 0
+        self.messages_dropped = 0
+        self.clients_disconnected = 0
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __contains__(self, websocket) -> bool:
+        return websocket in self._clients
+
+    def connect(self, websocket, topics: Iterable[str] = (), scope: Any = None) -> ClientConnection:
+        """
+        Register a connection and start its sender task on the running event loop.
+
+        Args:
+            websocket: Accepted WebSocket
+            topics: Initial subscriptions
+            scope: Institution the client is limited to (None: unrestricted, for internal consumers)
+        """
+        client = self._clients.get(websocket)
+        if client is None:
+            client = ClientConnection(websocket, self.max_queue, None if scope is None else str(scope))
+            self._clients[websocket] = client
+            client.task = asyncio.get_running_loop().create_task(self._sender(client))
+        if topics:
+            self.subscribe(websocket, topics)
+        return client
+
+    def disconnect(self, websocket) -> None:
+        """Unregister a connection; messages still queued for it are discarded"""
+        client = self._clients.pop(websocket, None)
+        if client is None:
+            return
+        for name in client.topics:
+            subscribers = self._topics.get(name)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._topics[name]
+        if client.task is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def subscribe(self, websocket, topics: Iterable[str]) -> Set[str]:
+        """
+        Add topics a connection receives messages for (in addition to earlier ones).
+
+        Raises:
+            ValueError: For malformed topic names
+        """
+        client = self._clients[websocket]
+        names = {validate_topic(name) for name in topics}
+        for name in names:
+            self._topics.setdefault(name, set()).add(client)
+        client.topics |= names
+        return set(client.topics)
+
+    def unsubscribe(self, websocket, topics: Optional[Iterable[str]] = None) -> Set[str]:
+        """Drop some (or, with ``topics=None``, all) subscriptions"""
+        client = self._clients[websocket]
+        names = set(client.topics) if topics is None else {validate_topic(name) for name in topics}
+        for name in names & client.topics:
+            subscribers = self._topics.get(name)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._topics[name]
+        client.topics -= names
+        return set(client.topics)
+
+    @staticmethod
+    def _serialize(message: Union[str, Dict[str, Any]]) -> str:
+        return message if isinstance(message, str) else json.dumps(message, default=str)
+
+    def has_subscribers(self, name: str) -> bool:
+        return name in self._topics
+
+    def recipients(self, topics: Iterable[str] = (), scope: Any = None) -> Set[ClientConnection]:
+        """Clients a message for ``topics`` in ``scope`` reaches: subscribers that are unscoped or in that scope"""
+        scope = None if scope is None else str(scope)
+        recipients = set()
+        for name in topics:
+            subscribers = self._topics.get(name)
+            if subscribers:
+                recipients |= subscribers
+        return {client for client in recipients if client.scope is None or client.scope == scope}
+
+    def publish(self, message: Union[str, Dict[str, Any]], topics: Iterable[str] = (),
+                exclude: Optional[Set[ClientConnection]] = None, scope: Any = None) -> int:
+        """
+        Queue a message for every client subscribed to one of ``topics``.
+
+        Never waits on a socket; must be called from the event loop thread.
+
+        Args:
+            message: JSON text, or a dict serialized once for all recipients
+            topics: Topics the message belongs to
+            exclude: Clients to skip, e.g. those an earlier message already covered
+            scope: Institution the message belongs to; scoped clients of other institutions never get it
+
+        Returns:
+            Number of clients the message was queued for
+        """
+        recipients = self.recipients(topics, scope)
+        if exclude:
+            recipients -= exclude
+        if recipients:
+            text = self._serialize(message)  # skipped entirely when nobody is listening
+            for client in recipients:
+                if client.enqueue(text):
+                    self.messages_dropped += 1
+        self.messages_published += 1
+        return len(recipients)
+
+    def send_to(self, websocket, message: Union[str, Dict[str, Any]]) -> bool:
+        """Queue a message for one connection (replies share its ordered queue); False if not connected"""
+        client = self._clients.get(websocket)
+        if client is None:
+            return False
+        if client.enqueue(self._serialize(message)):
+            self.messages_dropped += 1
+        return True
+
+    async def _sender(self, client: ClientConnection) -> None:
+        websocket = client.websocket
+        try:
+            while True:
+                await client.ready.wait()
+                while client.queue:
+                    message = client.queue.popleft()
+                    # asyncio.timeout rather than wait_for: no extra task per message, and a
+                    # cancellation racing a completed send is not swallowed
+                    async with asyncio.timeout(self.send_timeout):
+                        await websocket.send_text(message)
+                    client.sent += 1
+                    self.messages_delivered += 1
+                client.ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"📡 Disconnecting WebSocket client after failed send: {e!r}")
+            self.clients_disconnected += 1
+            self.disconnect(websocket)
+            with suppress(Exception):
+                await asyncio.wait_for(websocket.close(code=1013), 1.0)
+
+    async def close(self) -> None:
+        """Disconnect every client and wait for the sender tasks to finish"""
+        tasks = [client.task for client in self._clients.values() if client.task is not None]
+        for websocket in list(self._clients):
+            self.disconnect(websocket)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        queued = [len(client.queue) for client in self._clients.values()]
+        return {
+            'clients': len(self._clients),
+            'unsubscribed_clients': sum(1 for client in self._clients.values() if not client.topics),
+            'topics': len(self._topics),
+            'messages_published': self.messages_published,
+            'messages_delivered': self.messages_delivered,
+            'messages_dropped': self.messages_dropped,
+            'messages_queued': sum(queued),
+            'max_queue_depth': max(queued, default=0),
+            'clients_disconnected': self.clients_disconnected,
+            'queue_size': self.max_queue,
+            'send_timeout': self.send_timeout
+        }
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Alert Store Tests
+Tests the bounded alert history, id/student indexes, timestamp ordering, running counters and the risk cache
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from src.mvp.alert_store import AlertStore, BoundedRiskCache
+from src.mvp.notifications import AlertLevel, AlertType, RealTimeNotificationSystem, StudentAlert
+
+START = datetime(2026, 10, 1, 8, 0)
+
+
+def make_alert(n, student_id=None, minutes=None, level=AlertLevel.HIGH, alert_type=AlertType.RISK_THRESHOLD):
+    return StudentAlert(
+        alert_id=f"alert_{n}", student_id=student_id or f"S{n}", student_name=f"Student {n}",
+        alert_type=alert_type, alert_level=level, risk_score=0.8, previous_risk_score=0.5,
+        message='', details={}, timestamp=START + timedelta(minutes=n if minutes is None else minutes)
+    )
+
+
+class TestAlertStore:
+
+    def test_history_is_bounded_and_indexes_follow_eviction(self):
+        store = AlertStore(max_history=3)
+        for n in range(5):
+            store.add(make_alert(n, student_id='S1' if n % 2 else 'S2'))
+
+        assert [a.alert_id for a in store] == ['alert_2', 'alert_3', 'alert_4']
+        assert [a.alert_id for a in store.history('S1')] == ['alert_3']
+        assert store.get('alert_0').alert_id == 'alert_0'  # evicted from history, still active
+        assert store.get_stats()['total_alerts'] == 5 and store.get_stats()['evicted_alerts'] == 2
+
+    def test_newest_first_with_out_of_order_timestamps(self):
+        store = AlertStore()
+        for n, minutes in enumerate([5, 1, 9, 3]):
+            store.add(make_alert(n, student_id='S1', minutes=minutes))
+
+        assert [a.alert_id for a in store.active_alerts(limit=2)] == ['alert_2', 'alert_0']
+        assert [a.alert_id for a in store.history('S1')] == ['alert_2', 'alert_0', 'alert_3', 'alert_1']
+
+    def test_resolve_moves_alert_out_of_active_and_counters_stay_consistent(self):
+        store = AlertStore()
+        store.add(make_alert(1, level=AlertLevel.CRITICAL))
+        store.add(make_alert(2, alert_type=AlertType.ATTENDANCE_DROP))
+
+        assert store.resolve('alert_1').resolved and store.resolve('alert_1') is None
+        assert 'alert_1' not in store.active and store.get('alert_1').resolved
+        stats = store.get_stats()
+        assert (stats['total_alerts'], stats['active_alerts'], stats['resolved_alerts']) == (2, 1, 1)
+        assert stats['alert_levels'] == {'critical': 1, 'high': 1}
+        assert stats['alert_types'] == {'risk_threshold': 1, 'attendance_drop': 1}
+
+        store.add(make_alert(2, level=AlertLevel.LOW))  # replaced under the same id
+        assert store.get_stats()['alert_levels'] == {'critical': 1, 'low': 1}
+
+    def test_active_alerts_are_capped_by_expiring_the_oldest(self):
+        store = AlertStore(max_history=2, max_active=3)
+        for n in range(6):
+            store.add(make_alert(n, student_id='S1' if n < 3 else 'S2'))
+
+        assert [a.alert_id for a in store.active_alerts()] == ['alert_5', 'alert_4', 'alert_3']
+        assert store.active_alerts('S1') == [] and store.get('alert_0') is None
+        assert not store.get('alert_4').resolved
+        stats = store.get_stats()
+        assert (stats['active_alerts'], stats['expired_alerts'], stats['resolved_alerts']) == (3, 3, 0)
+
+    def test_risk_cache_evicts_least_recently_updated(self):
+        cache = BoundedRiskCache(max_size=3)
+        cache.update({'a': 0.1, 'b': 0.2, 'c': 0.3})
+        cache['a'] = 0.4
+        cache.update(zip(['d'], [0.5]))
+
+        assert list(cache) == ['c', 'a', 'd'] and cache['a'] == 0.4
+
+
+class TestNotifierAlertStore:
+
+    def test_alerts_raised_in_the_same_second_keep_distinct_ids(self):
+        async def scenario():
+            notifier = RealTimeNotificationSystem()
+            alerts = await notifier.monitor_student_risk('S1', 'Sam', 0.9, {'attendance_rate': 0.5})
+            await notifier.resolve_alert(alerts[0].alert_id, 'teacher', 'Called home')
+            return notifier, alerts
+
+        notifier, alerts = asyncio.run(scenario())
+        assert len(alerts) == 4 and len({a.alert_id for a in alerts}) == 4
+        assert len(notifier.get_alert_history('S1')) == 4 and len(notifier.get_active_alerts('S1')) == 3
+
+        stats = notifier.get_alert_statistics()
+        assert stats['total_alerts'] == 4 and stats['resolved_alerts'] == 1
+        assert stats['students_monitored'] == 1
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Batch Risk Monitoring Tests
+Tests vectorized rule evaluation in monitor_batch against the per-student path and grouped alert broadcasts
+"""
+
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from src.mvp.alert_store import risk_key
+from src.mvp.notifications import ALERT_BATCH_MESSAGE_SIZE, RealTimeNotificationSystem
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text):
+        self.messages.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+
+async def drain():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+def roster(n=400, seed=7):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        row = {'student_id': f"S{i}", 'name': f"Student {i}", 'risk_probability': float(rng.random())}
+        if i % 3 == 0:
+            row['attendance_rate'] = float(rng.uniform(0.5, 1.0))
+        if i % 7 == 0:
+            row['grade_trend'] = 'declining'
+        if i % 11 == 0:
+            row['engagement_score'] = float(rng.random())
+        rows.append(row)
+    return rows
+
+
+def signature(alerts):
+    return sorted((a.student_id, a.alert_type.value, a.alert_level.value, round(a.risk_score, 6),
+                   round(a.previous_risk_score, 6)) for a in alerts)
+
+
+class TestMonitorBatch:
+
+    def test_matches_per_student_monitoring(self):
+        rows = roster()
+        baseline = {f"S{i}": 0.6 for i in range(0, 400, 2)}
+
+        async def per_student():
+            notifier = RealTimeNotificationSystem()
+            notifier.student_risk_cache.update({risk_key(sid): risk for sid, risk in baseline.items()})
+            alerts = []
+            for row in rows:
+                data = {k: v for k, v in row.items() if k not in ('student_id', 'name', 'risk_probability')}
+                alerts += await notifier.monitor_student_risk(row['student_id'], row['name'],
+                                                              row['risk_probability'], data or None)
+            return alerts
+
+        async def batched():
+            notifier = RealTimeNotificationSystem()
+            return await notifier.monitor_batch(rows, previous_risk=baseline), notifier
+
+        expected = asyncio.run(per_student())
+        alerts, notifier = asyncio.run(batched())
+        assert expected and signature(alerts) == signature(expected)
+        assert notifier.student_risk_cache[risk_key('S5')] == rows[5]['risk_probability']
+
+    def test_cached_risk_wins_over_baseline_and_no_repeat_alerts(self):
+        async def scenario():
+            notifier = RealTimeNotificationSystem()
+            notifier.student_risk_cache[risk_key('A')] = 0.9
+            rows = [{'student_id': 'A', 'risk_probability': 0.95}, {'student_id': 'B', 'risk_score': 0.9}]
+            first = await notifier.monitor_batch(rows, previous_risk={'A': 0.1, 'B': 0.8})
+            second = await notifier.monitor_batch(rows)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        # A was already above both thresholds; B only crossed the critical one
+        assert [(a.student_id, a.details['threshold']) for a in first] == [('B', 0.85)]
+        assert second == []
+
+    def test_risk_cache_is_per_institution(self):
+        async def scenario():
+            notifier = RealTimeNotificationSystem()
+            await notifier.monitor_batch([{'student_id': 'S1', 'risk_probability': 0.9, 'institution_id': 1}])
+            # Another institution's S1 is a different student: its first high score still alerts
+            return await notifier.monitor_batch([{'student_id': 'S1', 'risk_probability': 0.9, 'institution_id': 2}])
+
+        alerts = asyncio.run(scenario())
+        assert alerts and {alert.institution_id for alert in alerts} == {'2'}
+
+
+class TestGroupedBroadcast:
+
+    def test_alerts_broadcast_in_batches_per_institution(self):
+        async def scenario():
+            notifier = RealTimeNotificationSystem()
+            district, other, namesake, parent, both = (FakeWebSocket() for _ in range(5))
+            notifier.add_websocket_connection(district, ['institution:1'], institution_id=1)
+            notifier.add_websocket_connection(other, ['institution:2'], institution_id=2)
+            notifier.add_websocket_connection(namesake, ['student:S3'], institution_id=2)
+            notifier.add_websocket_connection(parent, ['student:S3'], institution_id=1)
+            notifier.add_websocket_connection(both, ['institution:1', 'student:S3'], institution_id=1)
+
+            rows = [{'student_id': f"S{i}", 'risk_probability': 0.75, 'institution_id': 1} for i in range(1200)]
+            alerts = await notifier.monitor_batch(rows)
+            await drain()
+            await notifier.broadcaster.close()
+            return alerts, district, other, namesake, parent, both
+
+        alerts, district, other, namesake, parent, both = asyncio.run(scenario())
+        assert len(alerts) == 2400  # high threshold + risk increase for every student
+
+        expected_messages = -(-len(alerts) // ALERT_BATCH_MESSAGE_SIZE)
+        for client in (district, both):
+            assert len(client.messages) == expected_messages
+            assert {m['type'] for m in client.messages} == {'student_alert_batch'}
+            assert sum(m['count'] for m in client.messages) == len(alerts)
+        assert other.messages == [] and namesake.messages == []
+        # The single-student follower gets just that student's alerts, the batch subscriber no duplicates
+        assert [m['type'] for m in parent.messages] == ['student_alert', 'student_alert']
+        assert {m['alert']['student_id'] for m in parent.messages} == {'S3'}
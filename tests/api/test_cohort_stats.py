@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Cohort Statistics Engine Tests
+Tests SQL-seeded cohort aggregates and their incremental updates on writes
+"""
+
+import pytest
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.mvp.database import Base
+from src.mvp.models import Institution, Student, Prediction, Intervention
+from src.mvp.services.cohort_stats import CohortStatsEngine
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    @contextmanager
+    def factory():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    with factory() as db:
+        db.add(Institution(id=1, name="Cohort School", code="COHORT_001", type="K12"))
+        base_date = datetime(2025, 1, 1)
+        for i in range(12):
+            grade = "9" if i < 8 else "10"
+            db.add(Student(id=i + 1, institution_id=1, student_id=f"S{i:03d}", grade_level=grade,
+                           enrollment_status="active", is_ell=i % 3 == 0, has_iep=i % 4 == 0))
+            scores = [0.8, 0.6] if i % 2 == 0 else [0.4, 0.5]
+            for offset, score in enumerate(scores):
+                db.add(Prediction(institution_id=1, student_id=i + 1, risk_score=score,
+                                  risk_category="High" if score >= 0.7 else "Medium" if score >= 0.5 else "Low",
+                                  prediction_date=base_date + timedelta(days=offset)))
+        db.add(Student(id=99, institution_id=1, student_id="GONE", grade_level="9", enrollment_status="withdrawn"))
+        for student_id, outcome in [(1, "successful"), (1, None), (2, "unsuccessful"), (9, "successful")]:
+            db.add(Intervention(institution_id=1, student_id=student_id, intervention_type="tutoring",
+                                title="Tutoring", outcome=outcome))
+        db.add(Intervention(institution_id=1, student_id=3, intervention_type="meeting", title="Meeting"))
+        db.commit()
+
+    return factory
+
+
+class TestCohortStatsEngine:
+
+    def test_seeded_aggregates_cover_whole_cohort(self, session_factory):
+        stats = CohortStatsEngine(session_factory=session_factory).get_cohort_stats(1)
+
+        assert stats["total_students"] == 12
+        assert stats["demographics"]["grade_levels"] == {"9": 8, "10": 4}
+        assert stats["demographics"]["special_populations"]["ell_count"] == 4
+        assert stats["demographics"]["special_populations"]["iep_count"] == 3
+
+        risk = stats["risk_distribution"]
+        assert risk["total_with_predictions"] == 12
+        assert risk["category_distribution"] == {"High": 0, "Medium": 12, "Low": 0}
+        assert risk["average_risk_score"] == pytest.approx(0.55)
+
+        patterns = stats["intervention_patterns"]
+        assert patterns["total_interventions"] == 5
+        assert patterns["intervention_types"] == {"tutoring": 4, "meeting": 1}
+        assert patterns["success_rates"]["tutoring"]["successful"] == 2
+        assert patterns["students_with_interventions"] == 4
+
+        assert stats["success_factors"]["improving_student_count"] == 6
+        assert stats["success_factors"]["improvement_rate"] == pytest.approx(50.0)
+
+    def test_grade_filter(self, session_factory):
+        stats = CohortStatsEngine(session_factory=session_factory).get_cohort_stats(1, grade_level="10")
+        assert stats["total_students"] == 4
+        assert stats["intervention_patterns"]["intervention_types"] == {"tutoring": 1}
+
+    def test_incremental_updates_match_reseed(self, session_factory):
+        engine = CohortStatsEngine(session_factory=session_factory)
+        engine.get_cohort_stats(1)
+
+        with session_factory() as db:
+            db.add(Prediction(institution_id=1, student_id=2, risk_score=0.9, risk_category="High",
+                              prediction_date=datetime(2025, 2, 1)))
+            db.add(Intervention(institution_id=1, student_id=5, intervention_type="meeting",
+                                title="Meeting", outcome="successful"))
+            db.query(Intervention).filter(Intervention.student_id == 2).update({"outcome": "successful"})
+            db.commit()
+
+        engine.record_prediction(1, 2, 0.9, "High")
+        engine.record_intervention(1, 5, "meeting", "successful")
+        engine.record_intervention(1, 2, "tutoring", "unsuccessful", removed=True)
+        engine.record_intervention(1, 2, "tutoring", "successful")
+
+        incremental = engine.get_cohort_stats(1)
+        reseeded = CohortStatsEngine(session_factory=session_factory).get_cohort_stats(1)
+        assert incremental == reseeded
+        assert incremental["risk_distribution"]["category_distribution"]["High"] == 1
+
+    def test_unknown_student_forces_reseed(self, session_factory):
+        engine = CohortStatsEngine(session_factory=session_factory)
+        engine.get_cohort_stats(1)
+
+        with session_factory() as db:
+            db.add(Student(id=50, institution_id=1, student_id="NEW", grade_level="11", enrollment_status="active"))
+            db.add(Prediction(institution_id=1, student_id=50, risk_score=0.75, risk_category="High"))
+            db.commit()
+        engine.record_prediction(1, 50, 0.75, "High")
+
+        stats = engine.get_cohort_stats(1)
+        assert stats["total_students"] == 13
+        assert stats["demographics"]["grade_levels"]["11"] == 1
+
+    def test_reads_do_not_query_once_seeded(self, session_factory):
+        calls = []
+
+        @contextmanager
+        def counting_factory():
+            calls.append(1)
+            with session_factory() as db:
+                yield db
+
+        engine = CohortStatsEngine(session_factory=counting_factory)
+        engine.get_cohort_stats(1)
+        engine.record_prediction(1, 3, 0.2, "Low", replaces_existing=True)
+        engine.get_cohort_stats(1, grade_level="9")
+        assert len(calls) == 1
+
+    def test_write_recorded_while_seeding_is_not_lost(self, session_factory):
+        seeds = []
+
+        @contextmanager
+        def racing_factory():
+            with session_factory() as db:
+                yield db
+            seeds.append(1)
+            if len(seeds) == 1:
+                # Committed after the first seed read, recorded before its counters are cached
+                with session_factory() as db:
+                    db.add(Intervention(institution_id=1, student_id=7, intervention_type="meeting",
+                                        title="Meeting", outcome="successful"))
+                    db.commit()
+                engine.record_intervention(1, 7, "meeting", "successful")
+
+        engine = CohortStatsEngine(session_factory=racing_factory)
+        stats = engine.get_cohort_stats(1)
+
+        assert len(seeds) == 2
+        assert stats["intervention_patterns"]["intervention_types"] == {"tutoring": 4, "meeting": 2}
+        assert stats == CohortStatsEngine(session_factory=session_factory).get_cohort_stats(1)
@@ -149,6 +149,22 @@ class TestDatabaseConstraints:
             with pytest.raises(IntegrityError):
                 session.commit()
     
+    def test_user_email_uniqueness_is_on_blind_index(self):
+        """Encrypted e-mails are randomized, so the unique index sits on their digest"""
+        columns = User.__table__.c
+        assert not columns.email.unique
+        assert columns.email_bidx.unique
+        
+        with self.SQLiteSession() as session:
+            session.add_all([
+                User(username=f"bidx_user{i}", email=email, password_hash="hash",
+                     first_name="Test", last_name="User", role="teacher",
+                     institution_id=self.institution_id)
+                for i, email in enumerate(["Same.Person@example.com", "same.person@example.com "])
+            ])
+            with pytest.raises(IntegrityError):
+                session.commit()
+    
     def test_unique_constraint_institutions_code(self):
         """Test unique constraint on institutions.code"""
         with self.SQLiteSession() as session:
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Email Dispatcher Tests
+Tests per-recipient digests, SMTP connection reuse, rate limiting and non-blocking alert e-mail against a local SMTP sink
+"""
+
+import asyncio
+import os
+import smtplib
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from src.mvp.email_dispatcher import EmailDispatcher
+from src.mvp.notifications import RealTimeNotificationSystem
+from src.mvp.smtp_sink import LocalSMTPSink
+
+
+@pytest.fixture
+def sink():
+    with LocalSMTPSink() as server:
+        yield server
+
+
+def make_dispatcher(sink, **kwargs):
+    return EmailDispatcher('127.0.0.1', sink.port, username='alerts@school.edu', password='secret',
+                           use_tls=False, **kwargs)
+
+
+class TestEmailDispatcher:
+
+    def test_alerts_per_recipient_are_digested_over_one_connection(self, sink):
+        async def scenario():
+            dispatcher = make_dispatcher(sink, digest_window=0.05)
+            for n in range(5):
+                dispatcher.submit(['counselor@school.edu'], f"Alert {n}", f"<p>alert {n}</p>")
+            dispatcher.submit(['counselor@school.edu', 'principal@school.edu'], "Alert 5", "<p>alert 5</p>")
+            await asyncio.sleep(0.3)
+            stats = dispatcher.get_stats()
+            await dispatcher.close()
+            return stats
+
+        stats = asyncio.run(scenario())
+        by_recipient = {rcpt[0]: message for _, rcpt, message in sink.messages}
+        assert by_recipient['counselor@school.edu']['Subject'] == 'Student Alert Digest: 6 alerts'
+        assert by_recipient['principal@school.edu']['Subject'] == 'Alert 5'
+        assert b'alert 3' in by_recipient['counselor@school.edu'].get_payload()[0].get_payload(decode=True)
+        assert sink.connections == 1 and sink.logins == 1
+        assert stats['messages_sent'] == 2 and stats['digests_sent'] == 1 and stats['alerts_sent'] == 7
+        assert stats['delivery_latency_seconds']['samples'] == 7
+        assert stats['delivery_latency_seconds']['p50'] >= 0.05
+
+    def test_reconnects_when_the_server_drops_the_connection(self, sink):
+        async def scenario():
+            dispatcher = make_dispatcher(sink, digest_window=0)
+            dispatcher.submit(['a@school.edu'], "First", "<p>1</p>")
+            await dispatcher.flush()
+            sink.drop_connections()  # server closes the idle connection
+            dispatcher.submit(['a@school.edu'], "Second", "<p>2</p>")
+            await dispatcher.flush()
+            await dispatcher.close()
+            return dispatcher.get_stats()
+
+        stats = asyncio.run(scenario())
+        assert [message['Subject'] for _, _, message in sink.messages] == ['First', 'Second']
+        assert stats['connections_opened'] == 2 and stats['alerts_failed'] == 0
+
+    def test_sends_are_rate_limited(self, sink):
+        now = [0.0]
+        waits = []
+
+        async def fake_sleep(seconds):
+            waits.append(seconds)
+            now[0] += seconds
+
+        async def scenario():
+            dispatcher = make_dispatcher(sink, digest_window=0, max_per_minute=2,
+                                         sleep=fake_sleep, clock=lambda: now[0])
+            dispatcher.submit([f"teacher{n}@school.edu" for n in range(3)], "Alert", "<p>x</p>")
+            await dispatcher.flush()
+            await dispatcher.close()
+            return dispatcher.get_stats()
+
+        stats = asyncio.run(scenario())
+        # Two messages per minute: the third waits for half a minute of quota
+        assert len(sink.messages) == 3
+        assert waits == [pytest.approx(30.0)] and stats['rate_limited_seconds'] == pytest.approx(30.0)
+
+    def test_failed_digest_is_requeued_with_backoff(self, sink):
+        now = [0.0]
+        connects = [0]
+
+        def flaky_smtp(*args, **kwargs):
+            connects[0] += 1
+            if connects[0] == 1:
+                raise ConnectionRefusedError('server down')
+            return smtplib.SMTP(*args, **kwargs)
+
+        async def scenario():
+            dispatcher = make_dispatcher(sink, digest_window=0, retry_backoff=30, smtp_factory=flaky_smtp,
+                                         clock=lambda: now[0])
+            dispatcher.submit(['a@school.edu'], "First", "<p>1</p>")
+            await asyncio.sleep(0.1)  # the worker's attempt fails
+            failed = dispatcher.get_stats()
+            dispatcher.submit(['a@school.edu'], "Second", "<p>2</p>")
+            now[0] = 10.0
+            early = await dispatcher.send_due()
+            now[0] = 30.0
+            retried = await dispatcher.send_due()
+            await dispatcher.close()
+            return failed, early, retried, dispatcher.get_stats()
+
+        failed, early, retried, stats = asyncio.run(scenario())
+        assert failed['send_retries'] == 1 and failed['alerts_pending'] == 1 and failed['alerts_failed'] == 0
+        assert early == 0 and retried == 1
+        # The failed alert goes out first, together with the one queued while backing off
+        message = sink.messages[0][2]
+        body = message.get_payload()[0].get_payload(decode=True)
+        assert len(sink.messages) == 1 and message['Subject'] == 'Student Alert Digest: 2 alerts'
+        assert body.index(b'<p>1</p>') < body.index(b'<p>2</p>')
+        assert stats['alerts_sent'] == 2 and stats['recipients_retrying'] == 0
+
+    def test_digest_is_dropped_after_the_last_attempt(self, sink):
+        def down(*args, **kwargs):
+            raise ConnectionRefusedError('server down')
+
+        async def scenario():
+            dispatcher = make_dispatcher(sink, digest_window=60, max_attempts=2, smtp_factory=down)
+            dispatcher.submit(['a@school.edu'], "Alert", "<p>x</p>")
+            await dispatcher.flush()
+            retrying = dispatcher.get_stats()
+            await dispatcher.flush()
+            await dispatcher.close()
+            return retrying, dispatcher.get_stats()
+
+        retrying, stats = asyncio.run(scenario())
+        assert retrying['alerts_pending'] == 1 and retrying['alerts_failed'] == 0
+        assert stats['alerts_pending'] == 0 and stats['alerts_failed'] == 1 and stats['alerts_dropped'] == 0
+
+    def test_close_does_not_wait_out_the_rate_limit(self, sink):
+        now = [0.0]
+        waits = []
+
+        async def fake_sleep(seconds):
+            waits.append(seconds)
+            now[0] += seconds
+
+        async def scenario():
+            dispatcher = make_dispatcher(sink, digest_window=60, max_per_minute=2, shutdown_timeout=10,
+                                         sleep=fake_sleep, clock=lambda: now[0])
+            dispatcher.submit([f"teacher{n}@school.edu" for n in range(3)], "Alert", "<p>x</p>")
+            await dispatcher.close()
+            return dispatcher.get_stats()
+
+        stats = asyncio.run(scenario())
+        # The third message would need 30s of quota, past the 10s shutdown budget
+        assert len(sink.messages) == 2 and waits == []
+        assert stats['alerts_sent'] == 2 and stats['alerts_dropped'] == 1 and stats['alerts_pending'] == 0
+
+
+    def test_recipient_sent_by_flush_while_worker_waits_for_quota(self, sink):
+        now = [0.0]
+        release = asyncio.Event()
+
+        async def gated_sleep(seconds):
+            await release.wait()
+            now[0] += seconds
+
+        async def scenario():
+            dispatcher = make_dispatcher(sink, digest_window=0, max_per_minute=1,
+                                         sleep=gated_sleep, clock=lambda: now[0])
+            dispatcher.submit(['a@school.edu', 'b@school.edu'], "Alert", "<p>x</p>")
+            await asyncio.sleep(0.2)  # the worker sends a@ and waits for quota for b@
+            flush = asyncio.create_task(dispatcher.flush())
+            await asyncio.sleep(0.05)  # the flush waits for quota for b@ too
+            release.set()
+            await flush
+            await dispatcher.close()
+            return dispatcher.get_stats()
+
+        stats = asyncio.run(scenario())
+        # Whichever wakes second finds b@ already sent and skips it
+        assert sorted(rcpt[0] for _, rcpt, _ in sink.messages) == ['a@school.edu', 'b@school.edu']
+        assert stats['alerts_sent'] == 2 and stats['alerts_pending'] == 0
+
+
+class TestAlertEmail:
+
+    def test_alert_batch_does_not_block_on_smtp(self):
+        with LocalSMTPSink(delay=0.2) as sink, patch.dict(os.environ, {
+            'SMTP_SERVER': '127.0.0.1', 'SMTP_PORT': str(sink.port), 'SMTP_USE_TLS': 'false',
+            'EMAIL_USER': 'alerts@school.edu', 'EMAIL_PASSWORD': 'secret',
+            'EMAIL_DIGEST_WINDOW_SECONDS': '0.05'
+        }):
+            async def scenario():
+                notifier = RealTimeNotificationSystem()
+                started = time.perf_counter()
+                alerts = await notifier.monitor_batch(
+                    [{'student_id': f"S{i}", 'risk_probability': 0.9} for i in range(200)])
+                elapsed = time.perf_counter() - started
+                await notifier.email.close()
+                return alerts, elapsed, notifier.get_alert_statistics()['email']
+
+            alerts, elapsed, stats = asyncio.run(scenario())
+
+        assert len(alerts) == 600 and elapsed < 0.2  # the slow server is never awaited inline
+        # Both threshold alerts match both e-mailing threshold rules: 800 sections, one digest
+        assert [message['Subject'] for _, _, message in sink.messages] == ['Student Alert Digest: 800 alerts']
+        assert stats['alerts_sent'] == 800 and stats['connections_opened'] == 1
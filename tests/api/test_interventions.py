@@ -99,6 +99,7 @@ class TestInterventionSystem:
                     institution_id=institution.id,
                     student_id="TEST_STU_002", 
                     grade_level="10",
+                    email="stu002@school.edu",
                     enrollment_status="active"
                 ),
                 Student(
@@ -466,6 +467,31 @@ class TestInterventionSystem:
         for intervention in in_progress_interventions:
             assert intervention["status"] == "in_progress"
     
+    def test_all_interventions_student_search(self):
+        """Test student search matches ID prefixes case-insensitively and exact e-mails via the blind index"""
+        response = client.post(
+            "/api/interventions/",
+            json={
+                "student_id": self.test_students["TEST_STU_002"],
+                "intervention_type": "family_engagement",
+                "title": "Parent Conference"
+            },
+            headers={"Authorization": "Bearer test-key"}
+        )
+        assert response.status_code == 200
+        
+        by_prefix = client.get("/api/interventions/all?student_search=TEST_STU_00").json()
+        by_email = client.get("/api/interventions/all?student_search=%20STU002@School.edu").json()
+        no_match = client.get("/api/interventions/all?student_search=stu002@school").json()
+        lower_prefix = client.get("/api/interventions/all?student_search=test_stu_00").json()
+        mid_id = client.get("/api/interventions/all?student_search=STU_00").json()
+        
+        assert by_prefix["pagination"]["total_items"] >= 2
+        assert lower_prefix["pagination"]["total_items"] == by_prefix["pagination"]["total_items"]
+        assert mid_id["pagination"]["total_items"] == 0  # IDs match from the start only
+        assert {i["student_id"] for i in by_email["interventions"]} == {self.test_students["TEST_STU_002"]}
+        assert no_match["pagination"]["total_items"] == 0
+    
     def test_intervention_data_validation(self):
         """Test intervention data validation"""
         student_id = self.test_students["TEST_STU_001"]
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Key Rotation Tests
+Tests reading with the key ring, selective re-encryption and the resumable, throttled re-encryption worker
+"""
+
+import asyncio
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.mvp.database import Base
+from src.mvp.encryption import EncryptionManager
+from src.mvp.models import Institution, KeyRotationCheckpoint, Student, User
+from src.mvp.services.key_rotation import KeyRotationWorker
+
+OLD_KEY = 'old-master-key-' + 'a' * 32
+NEW_KEY = 'new-master-key-' + 'b' * 32
+
+
+PINNED_BLIND_INDEX_KEY = 'pinned-blind-index-key-' + 'c' * 32
+
+
+def make_manager(key, version, previous='', blind_index_key=PINNED_BLIND_INDEX_KEY):
+    with patch.dict(os.environ, {'ENABLE_DATABASE_ENCRYPTION': 'true', 'DATABASE_ENCRYPTION_KEY': key,
+                                 'ENCRYPTION_KEY_VERSION': version,
+                                 'DATABASE_ENCRYPTION_PREVIOUS_KEYS': previous,
+                                 'DATABASE_BLIND_INDEX_KEY': blind_index_key or ''}):
+        return EncryptionManager()
+
+
+@pytest.fixture(scope="module")
+def old_manager():
+    return make_manager(OLD_KEY, '1')
+
+
+@pytest.fixture(scope="module")
+def new_manager():
+    return make_manager(NEW_KEY, '2', previous=f"1:{OLD_KEY}")
+
+
+@pytest.fixture
+def database(old_manager):
+    """Students and users written under key version 1, with blind indexes left empty"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    @contextmanager
+    def factory():
+        session = Session()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    with factory() as db:
+        institution = Institution(name="Test", code="TEST", type="K12")
+        db.add(institution)
+        db.flush()
+        emails = old_manager.encrypt_column([f"s{i}@school.edu" for i in range(23)])
+        db.execute(Student.__table__.insert(), [
+            {'institution_id': institution.id, 'student_id': f"S{i}", 'email': email,
+             'phone': '555-0100' if i == 0 else None}  # one plaintext value written before encryption
+            for i, email in enumerate(emails)
+        ])
+        db.execute(User.__table__.insert(), [{
+            'institution_id': institution.id, 'username': 'teacher', 'password_hash': 'x', 'role': 'teacher',
+            'email': old_manager.encrypt('teacher@school.edu'),
+            'first_name': old_manager.encrypt('Jane'), 'last_name': 'v9:unreadable'
+        }])
+    return factory
+
+
+class TestKeyRing:
+
+    def test_previous_versions_stay_readable(self, old_manager, new_manager):
+        old_value = old_manager.encrypt('parent@mail.com')
+        new_value = new_manager.encrypt('parent@mail.com')
+
+        assert new_value.startswith('v2:')
+        assert new_manager.decrypt_column([old_value, new_value]) == ['parent@mail.com'] * 2
+        assert old_manager.decrypt(new_value) == new_value  # version 2 is unknown to the old ring
+        assert new_manager.get_encryption_status()['readable_key_versions'] == ['2', '1']
+
+    def test_mislabelled_version_falls_back_to_other_keys(self, old_manager, new_manager):
+        relabelled = 'v7:' + old_manager.encrypt('x@y.org').split(':', 1)[1]
+        assert new_manager.decrypt(relabelled) == 'x@y.org'
+
+    def test_blind_indexes_survive_rotation_only_when_pinned(self, old_manager, new_manager):
+        # The key is derived when the manager is built, so later environment changes do not leak in
+        assert old_manager.blind_index_key_pinned
+        assert old_manager.blind_index('email', 'a@b.org') == new_manager.blind_index('email', 'a@b.org')
+
+        unpinned_old = make_manager(OLD_KEY, '1', blind_index_key=None)
+        unpinned_new = make_manager(NEW_KEY, '2', previous=f"1:{OLD_KEY}", blind_index_key=None)
+        assert not unpinned_new.blind_index_key_pinned
+        assert unpinned_old.blind_index('email', 'a@b.org') != unpinned_new.blind_index('email', 'a@b.org')
+
+    def test_reencrypt_column_only_touches_stale_values(self, old_manager, new_manager):
+        current = new_manager.encrypt('current@school.edu')
+        stale = old_manager.encrypt('stale@school.edu')
+        changes = new_manager.reencrypt_column([current, stale, 'plain@school.edu', None, '', 'v1:garbage'])
+
+        assert changes[0] is None and changes[3:] == [None, None, None]
+        assert changes[1][0] == 'stale@school.edu' and new_manager.is_current(changes[1][1])
+        assert changes[2][0] == 'plain@school.edu' and new_manager.decrypt(changes[2][1]) == 'plain@school.edu'
+
+
+class TestKeyRotationWorker:
+
+    def run(self, worker):
+        return asyncio.run(worker.run_once())
+
+    def test_rotates_every_table_and_refreshes_blind_indexes(self, database, new_manager):
+        worker = KeyRotationWorker(session_factory=database, manager=new_manager, batch_size=5,
+                                   rows_per_second=1e6)
+        status = self.run(worker)
+
+        assert status['rows_remaining'] == 0 and status['error'] is None
+        assert status['throughput_rows_per_second'] > 0
+        students = {t['table']: t for t in status['tables']}['students']
+        assert students['completed'] and students['rows_scanned'] == 23 and students['rows_reencrypted'] == 23
+
+        with database() as db:
+            rows = db.execute(select(Student.__table__)).all()
+            assert all(new_manager.is_current(row.email) for row in rows)
+            assert new_manager.decrypt(rows[0].phone) == '555-0100'
+            assert rows[5].email_bidx == new_manager.blind_index('email', 's5@school.edu')
+            user = db.execute(select(User.__table__)).one()
+            assert new_manager.decrypt(user.first_name) == 'Jane'
+            assert user.last_name == 'v9:unreadable'  # undecryptable values are left alone
+            assert db.query(KeyRotationCheckpoint).filter_by(key_version='2').count() == 5  # + sync_jobs, integration_sync_states
+
+        # A finished rotation is a no-op
+        assert self.run(worker)['rows_remaining'] == 0
+
+    def test_resumes_from_checkpoint(self, database, new_manager):
+        worker = KeyRotationWorker(session_factory=database, manager=new_manager, batch_size=10,
+                                   tables=['students'])
+        assert worker.rotate_batch('students') == (10, 10, False)
+
+        resumed = KeyRotationWorker(session_factory=database, manager=new_manager, batch_size=10,
+                                    rows_per_second=1e6, tables=['students'])
+        progress = resumed.load_progress('students')
+        assert progress.rows_scanned == 10 and progress.rows_remaining == 13
+
+        status = self.run(resumed)
+        assert status['tables'][0]['rows_reencrypted'] == 23
+        with database() as db:
+            assert db.query(KeyRotationCheckpoint).one().last_id == 23
+
+    def test_refuses_to_run_without_pinned_blind_index_key(self, database):
+        manager = make_manager(NEW_KEY, '2', previous=f"1:{OLD_KEY}", blind_index_key=None)
+        worker = KeyRotationWorker(session_factory=database, manager=manager, rows_per_second=1e6)
+
+        assert worker.blocked_reason() == "DATABASE_BLIND_INDEX_KEY must be pinned before rotating keys"
+        status = self.run(worker)
+        assert status['error'] == worker.blocked_reason() and status['rows_reencrypted'] == 0
+        with database() as db:
+            assert db.query(KeyRotationCheckpoint).count() == 0
+
+    def test_throttles_to_rows_per_second(self, database, new_manager):
+        delays = []
+
+        async def sleep(delay):
+            delays.append(delay)
+
+        worker = KeyRotationWorker(session_factory=database, manager=new_manager, batch_size=10,
+                                   rows_per_second=100, tables=['students'], sleep=sleep)
+        self.run(worker)
+
+        # Three batches of 10, 10 and 3 rows at 100 rows/s: about 0.1s, 0.1s and 0.03s apart
+        assert len(delays) == 3
+        assert delays[0] == pytest.approx(0.1, abs=0.05) and delays[2] == pytest.approx(0.03, abs=0.03)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter Tests
+Tests GCRA limits, idle-key eviction, suspicious-activity blocking and the shared file backend
+"""
+
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from src.mvp.rate_limit import MemoryRateLimitBackend, RateLimit, RateLimiter, SQLiteRateLimitBackend
+from src.mvp import simple_auth, simple_auth_clean
+from src.mvp.security import AdvancedRateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter:
+
+    @pytest.mark.parametrize("make_backend", [
+        lambda tmp_path: MemoryRateLimitBackend(shards=4),
+        lambda tmp_path: SQLiteRateLimitBackend(str(tmp_path / "limits.db")),
+    ], ids=["memory", "file"])
+    def test_window_limit_and_recovery(self, tmp_path, make_backend):
+        clock = FakeClock()
+        limiter = RateLimiter(make_backend(tmp_path), clock=clock)
+        rate = RateLimit(limit=3, window=60)
+
+        assert [limiter.hit("ip", rate).allowed for _ in range(4)] == [True, True, True, False]
+        rejected = limiter.hit("ip", rate)
+        assert rejected.retry_after == pytest.approx(20)
+        assert limiter.hit("other", rate).allowed  # keys are independent
+
+        clock.now += 20  # one request's worth of quota recovers
+        assert limiter.hit("ip", rate).allowed
+        assert not limiter.hit("ip", rate).allowed
+
+    def test_file_backend_shares_limits_between_workers(self, tmp_path):
+        path = str(tmp_path / "limits.db")
+        clock = FakeClock()
+        worker_a = RateLimiter(SQLiteRateLimitBackend(path), clock=clock)
+        worker_b = RateLimiter(SQLiteRateLimitBackend(path), clock=clock)
+        rate = RateLimit(limit=4, window=60)
+
+        results = [(worker_a if i % 2 else worker_b).hit("ip", rate).allowed for i in range(6)]
+        assert results == [True, True, True, True, False, False]
+
+        worker_a.block("ip", 30)
+        assert worker_b.blocked_for("ip") == pytest.approx(30)
+
+    def test_memory_is_bounded_by_active_keys(self):
+        clock = FakeClock()
+        backend = MemoryRateLimitBackend(shards=8, sweep_every=256)
+        limiter = RateLimiter(backend, clock=clock)
+        rate = RateLimit(limit=30, window=60)
+
+        for i in range(100_000):
+            clock.now += 0.01  # a key recovers 2s after its single request
+            limiter.hit(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", rate)
+
+        # Only IPs seen in the last 2 seconds (plus unswept leftovers) are still held
+        assert len(backend) < 200 + 8 * 256
+        clock.now += 60
+        backend.evict_idle(clock.now)
+        assert len(backend) == 0
+
+    def test_simple_auth_modules_keep_separate_budgets(self, monkeypatch):
+        limiter = RateLimiter(MemoryRateLimitBackend(), clock=FakeClock())
+        monkeypatch.setenv('TESTING', 'false')
+        monkeypatch.setattr(simple_auth, 'get_rate_limiter', lambda: limiter)
+        monkeypatch.setattr(simple_auth_clean, 'get_rate_limiter', lambda: limiter)
+        request = SimpleNamespace(client=SimpleNamespace(host='5.5.5.5'))
+
+        for _ in range(2):
+            simple_auth.simple_rate_limit(request, limit=2)
+        # The other module's limit for the same IP is unaffected
+        simple_auth_clean.apply_rate_limit(request, limit=2)
+        with pytest.raises(HTTPException):
+            simple_auth.simple_rate_limit(request, limit=2)
+
+
+    def test_retry_after_is_rounded_up(self, monkeypatch):
+        clock = FakeClock()
+        limiter = RateLimiter(MemoryRateLimitBackend(), clock=clock)
+        monkeypatch.setenv('TESTING', 'false')
+        monkeypatch.setattr(simple_auth, 'get_rate_limiter', lambda: limiter)
+        request = SimpleNamespace(client=SimpleNamespace(host='7.7.7.7'))
+
+        for _ in range(2):
+            simple_auth.simple_rate_limit(request, limit=2)
+        clock.now += 29.6  # 0.4s until the next request is allowed
+        with pytest.raises(HTTPException) as exc:
+            simple_auth.simple_rate_limit(request, limit=2)
+        assert exc.value.detail == "Rate limit exceeded. Try again in 1 seconds"
+
+
+class TestAdvancedRateLimiter:
+
+    def test_operation_limits_and_message(self):
+        limiter = AdvancedRateLimiter(RateLimiter(MemoryRateLimitBackend(), clock=FakeClock()))
+        limiter.config = {'api_requests_per_minute': 2, 'file_uploads_per_hour': 1, 'auth_attempts_per_hour': 5}
+
+        limiter.check_client('1.2.3.4', 'api_request')
+        limiter.check_client('1.2.3.4', 'api_request')
+        limiter.check_client('1.2.3.4', 'file_upload')
+        with pytest.raises(HTTPException) as exc:
+            limiter.check_client('1.2.3.4', 'api_request')
+        assert exc.value.status_code == 429
+        assert exc.value.detail == "Rate limit exceeded for API requests. Try again in 30 seconds"
+
+    def test_repeated_auth_attempts_near_limit_block_ip(self):
+        clock = FakeClock()
+        limiter = AdvancedRateLimiter(RateLimiter(MemoryRateLimitBackend(), clock=clock))
+        limiter.config = {'api_requests_per_minute': 30, 'file_uploads_per_hour': 10, 'auth_attempts_per_hour': 5}
+
+        # Attempts 4 and 5 reach 80% of the limit; the third such attempt after recovery blocks
+        for _ in range(5):
+            limiter.check_client('6.6.6.6', 'auth_attempt')
+        clock.now += 720  # one attempt recovers
+        limiter.check_client('6.6.6.6', 'auth_attempt')
+
+        with pytest.raises(HTTPException) as exc:
+            limiter.check_client('6.6.6.6', 'api_request')
+        assert exc.value.detail == "IP temporarily blocked due to suspicious activity"
+        clock.now += 3600
+        limiter.check_client('6.6.6.6', 'api_request')
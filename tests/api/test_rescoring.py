@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Scheduled Re-scoring Tests
+Tests change detection, persistence of changed predictions only, batch risk monitoring and scheduling
+"""
+
+import asyncio
+import copy
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.mvp.database import Base
+import src.mvp.models  # noqa: F401  registers IntegrationSyncState
+from src.integrations.sync_state import DeltaChanges, IncrementalSync, SyncStateStore
+from src.models.k12_ultra_predictor import K12UltraPredictor, gradebook_feature_hashes
+from src.mvp.alert_store import risk_key
+from src.mvp.notifications import RealTimeNotificationSystem
+from src.mvp.services.rescoring import RescoreTarget, RescoringScheduler
+
+
+@pytest.fixture
+def state_store():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    @contextmanager
+    def factory():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    return SyncStateStore(session_factory=factory)
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    return K12UltraPredictor()
+
+
+class FakeCourse:
+    """Canvas course whose delta sync reports the students in ``changed``"""
+
+    def __init__(self):
+        self.students = {
+            'a': {'student_id': 'a', 'name': 'Ana', 'email': 'ana@school.org',
+                  'current_gpa': 3.8, 'attendance_rate': 0.98, 'assignment_completion': 0.95},
+            'b': {'student_id': 'b', 'name': 'Ben', 'email': 'ben@school.org',
+                  'current_gpa': 0.8, 'attendance_rate': 0.55, 'assignment_completion': 0.2},
+            'c': {'student_id': 'c', 'name': 'Cam', 'email': 'cam@school.org',
+                  'current_gpa': 2.5, 'attendance_rate': 0.9, 'assignment_completion': 0.7}
+        }
+        self.changed = set()
+        self.fail = False
+
+
+class FakeCanvas:
+    """Runs the shared delta sync with the integration's feature hashing, like CanvasLMSIntegration"""
+
+    def __init__(self, course):
+        self.course = course
+        self.predictor = None
+
+    def sync_course_data(self, course_id, incremental=True, state_store=None):
+        if self.course.fail:
+            return {'status': 'error', 'error': 'Canvas unavailable'}
+
+        def rows(student_ids):
+            return pd.DataFrame([self.course.students[sid] for sid in sorted(student_ids)])
+
+        sync = IncrementalSync('canvas', course_id, store=state_store)
+        model_version = self.predictor.model_version
+        result = sync.run(lambda: rows(self.course.students), lambda state: DeltaChanges(set(self.course.changed)),
+                          rows, self.predictor.predict_batch,
+                          feature_hash=lambda frame: gradebook_feature_hashes(frame, model_version=model_version),
+                          model_version=model_version)
+        return {'status': 'success', 'predictions': result.predictions, 'delta': result.summary()}
+
+
+def make_scheduler(course, state_store, predictor, notifier, saved, **kwargs):
+    return RescoringScheduler(
+        targets=[RescoreTarget('canvas', '42', institution_id='7')],
+        integration_factory=lambda target: FakeCanvas(course),
+        save_predictions=lambda chunk, session_id: saved.append([p['student_id'] for p in chunk]),
+        notifier=notifier,
+        predictor_factory=lambda: predictor,
+        state_store=state_store,
+        **kwargs
+    )
+
+
+class TestRescoringScheduler:
+
+    def test_first_run_scores_and_persists_everyone(self, state_store, predictor):
+        saved, notifier = [], RealTimeNotificationSystem()
+        scheduler = make_scheduler(FakeCourse(), state_store, predictor, notifier, saved)
+
+        [result] = asyncio.run(scheduler.run_once())
+
+        assert result.status == 'success' and result.mode == 'full'
+        assert result.students_rescored == 3 and result.predictions_persisted == 3
+        assert sorted(saved[0]) == ['a', 'b', 'c']
+        assert result.alerts_generated > 0
+        assert {alert.student_id for alert in notifier.alert_history} == {'b'}
+        assert {alert.institution_id for alert in notifier.alert_history} == {'7'}
+        assert notifier.student_risk_cache.get(risk_key('b', '7')) is not None
+
+    def test_only_changed_features_are_rescored_persisted_and_monitored(self, state_store, predictor):
+        course = FakeCourse()
+        asyncio.run(make_scheduler(course, state_store, predictor, RealTimeNotificationSystem(), []).run_once())
+
+        # After a restart: Ana's email changed (not a model input), Cam's grades collapsed
+        course.changed = {'a', 'c'}
+        course.students['a']['email'] = 'ana.new@school.org'
+        course.students['c'].update(current_gpa=0.8, attendance_rate=0.55, assignment_completion=0.2)
+        saved, notifier = [], RealTimeNotificationSystem()
+        [result] = asyncio.run(make_scheduler(course, state_store, predictor, notifier, saved).run_once())
+
+        assert result.mode == 'incremental'
+        assert result.students_total == 3
+        assert result.students_rescored == 1 and result.students_unchanged == 1
+        assert saved == [['c']]
+        alerts = notifier.alert_history
+        assert alerts and {alert.student_id for alert in alerts} == {'c'}
+        threshold_alert = next(alert for alert in alerts if alert.alert_type.value == 'risk_threshold')
+        assert 0.3 < threshold_alert.previous_risk_score < 0.7  # last run's risk, not 0
+
+    def test_retrained_model_rescores_unchanged_students(self, state_store, predictor):
+        course = FakeCourse()
+        asyncio.run(make_scheduler(course, state_store, predictor, RealTimeNotificationSystem(), []).run_once())
+
+        retrained = copy.copy(predictor)
+        retrained.model_version = 'retrained'
+        course.changed = {'a'}  # refetched with identical inputs
+        saved = []
+        [result] = asyncio.run(make_scheduler(course, state_store, retrained, RealTimeNotificationSystem(),
+                                              saved).run_once())
+
+        assert result.mode == 'incremental'
+        assert result.students_rescored == 3 and result.students_unchanged == 0
+        assert sorted(saved[0]) == ['a', 'b', 'c']
+
+        # Scored by the current model now: nothing to redo
+        course.changed = set()
+        [result] = asyncio.run(make_scheduler(course, state_store, retrained, RealTimeNotificationSystem(),
+                                              []).run_once())
+        assert result.students_rescored == 0
+
+    def test_failed_target_is_reported_and_others_continue(self, state_store, predictor):
+        broken, healthy = FakeCourse(), FakeCourse()
+        broken.fail = True
+        saved = []
+        scheduler = RescoringScheduler(
+            targets=[RescoreTarget('canvas', 'broken'), RescoreTarget('canvas', 'healthy')],
+            integration_factory=lambda target: FakeCanvas(broken if target.scope_id == 'broken' else healthy),
+            save_predictions=lambda chunk, session_id: saved.append(session_id),
+            notifier=RealTimeNotificationSystem(),
+            predictor_factory=lambda: predictor,
+            state_store=state_store
+        )
+
+        failed, succeeded = asyncio.run(scheduler.run_once())
+
+        assert failed.status == 'error' and failed.error == 'Canvas unavailable'
+        assert succeeded.status == 'success' and len(saved) == 1
+        status = scheduler.get_status()
+        assert status['runs_completed'] == 1
+        assert [r['status'] for r in status['last_results']] == ['error', 'success']
+
+    def test_next_run_follows_off_peak_cadence(self):
+        scheduler = RescoringScheduler(run_hour=2, interval_hours=24)
+        assert scheduler.next_run_at(datetime(2024, 3, 5, 1, 30)) == datetime(2024, 3, 5, 2, 0)
+        assert scheduler.next_run_at(datetime(2024, 3, 5, 2, 0)) == datetime(2024, 3, 6, 2, 0)
+
+        every_six = RescoringScheduler(run_hour=2, interval_hours=6)
+        assert every_six.next_run_at(datetime(2024, 3, 5, 9, 15)) == datetime(2024, 3, 5, 14, 0)
+        assert every_six.next_run_at(datetime(2024, 3, 5, 0, 15)) == datetime(2024, 3, 5, 2, 0)
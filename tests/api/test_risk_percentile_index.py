@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Risk Percentile Index Tests
+Tests per-grade sorted score arrays, incremental updates and the batch percentile endpoint
+"""
+
+import pytest
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.mvp.database import Base
+from src.mvp.models import Institution, Student, Prediction
+from src.mvp.services.risk_percentile_index import RiskPercentileIndex
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    @contextmanager
+    def factory():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    with factory() as db:
+        db.add(Institution(id=1, name="Percentile School", code="PCT_001", type="K12"))
+        now = datetime.now()
+        for i in range(10):
+            db.add(Student(id=i + 1, institution_id=1, student_id=f"S{i:03d}",
+                           grade_level="9" if i < 6 else "10", enrollment_status="active"))
+            db.add(Prediction(institution_id=1, student_id=i + 1, risk_score=0.99, risk_category="High",
+                              prediction_date=now - timedelta(days=10)))
+            db.add(Prediction(institution_id=1, student_id=i + 1, risk_score=i / 10, risk_category="Low",
+                              prediction_date=now))
+        db.add(Student(id=99, institution_id=1, student_id="GONE", grade_level="9", enrollment_status="withdrawn"))
+        db.add(Prediction(institution_id=1, student_id=99, risk_score=0.0, risk_category="Low"))
+        db.commit()
+
+    return factory
+
+
+def naive_percentile(scores, score):
+    return round(sum(1 for s in scores if s < score) / len(scores) * 100, 1)
+
+
+class TestRiskPercentileIndex:
+
+    def test_percentiles_from_latest_scores(self, session_factory):
+        index = RiskPercentileIndex(session_factory=session_factory)
+        results = index.get_percentiles(1, [1, "S004", "7", "missing"])
+
+        assert list(index.grade_scores(1, "9")) == pytest.approx([0.0, 0.1, 0.2, 0.3, 0.4, 0.5])
+        assert results["1"]["percentile_rank"] == 0.0
+        assert results["S004"]["percentile_rank"] == pytest.approx(66.7)
+        assert results["S004"]["peer_count"] == 6
+        assert results["7"]["grade_level"] == "10"
+        assert results["7"]["percentile_rank"] == 0.0
+        assert results["missing"] == {"found": False}
+
+    def test_incremental_updates_match_rebuild(self, session_factory):
+        index = RiskPercentileIndex(session_factory=session_factory)
+        index.get_percentiles(1, [1])
+
+        updates = [
+            {"student_id": 2, "risk_score": 0.45},
+            {"student_id": 3, "risk_score": 0.45},
+            {"student_id": 11, "risk_score": 0.25, "grade_level": "9", "external_id": "NEW"},
+        ]
+        with session_factory() as db:
+            db.add(Student(id=11, institution_id=1, student_id="NEW", grade_level="9", enrollment_status="active"))
+            for update in updates:
+                db.add(Prediction(institution_id=1, student_id=update["student_id"],
+                                  risk_score=update["risk_score"], risk_category="Medium",
+                                  prediction_date=datetime.now() + timedelta(minutes=1)))
+            db.commit()
+        index.record_scores(1, updates)
+
+        rebuilt = RiskPercentileIndex(session_factory=session_factory)
+        assert list(index.grade_scores(1, "9")) == pytest.approx(list(rebuilt.grade_scores(1, "9")))
+        assert index.get_percentiles(1, ["NEW"]) == rebuilt.get_percentiles(1, ["NEW"])
+
+    def test_matches_naive_count_with_ties(self, session_factory):
+        index = RiskPercentileIndex(session_factory=session_factory)
+        index.get_percentiles(1, [1])
+        index.record_scores(1, [{"student_id": sid, "risk_score": 0.3} for sid in (1, 2, 3)])
+
+        scores = [0.3, 0.3, 0.3, 0.3, 0.4, 0.5]
+        assert list(index.grade_scores(1, "9")) == pytest.approx(scores)
+        results = index.get_percentiles(1, [1, 5, 6])
+        for sid, score in [(1, 0.3), (5, 0.4), (6, 0.5)]:
+            assert results[str(sid)]["percentile_rank"] == naive_percentile(scores, score)
+
+    def test_repeated_student_in_batch_keeps_last_score(self, session_factory):
+        index = RiskPercentileIndex(session_factory=session_factory)
+        index.get_percentiles(1, [1])
+        index.record_scores(1, [
+            {"student_id": 2, "risk_score": 0.45},
+            {"student_id": 11, "risk_score": 0.35, "grade_level": "9", "external_id": "NEW"},
+            {"student_id": 2, "risk_score": 0.05},
+            {"student_id": 11, "risk_score": 0.15, "grade_level": "9", "external_id": "NEW"},
+        ])
+
+        assert list(index.grade_scores(1, "9")) == pytest.approx([0.0, 0.05, 0.15, 0.2, 0.3, 0.4, 0.5])
+        assert index.get_percentiles(1, [2])["2"]["risk_score"] == 0.05
+
+    def test_writes_before_first_read_are_ignored(self, session_factory):
+        calls = []
+
+        @contextmanager
+        def counting_factory():
+            calls.append(1)
+            with session_factory() as db:
+                yield db
+
+        index = RiskPercentileIndex(session_factory=counting_factory)
+        index.record_scores(1, [{"student_id": 1, "risk_score": 0.9}])
+        index.get_percentiles(1, [1, 2, 3])
+        index.get_percentiles(1, [4])
+        assert len(calls) == 1
+
+    def test_expired_arrays_are_rebuilt(self, session_factory):
+        index = RiskPercentileIndex(session_factory=session_factory, ttl_seconds=900)
+        assert index.get_percentiles(1, ["S005"])["S005"]["found"]
+        with session_factory() as db:
+            db.query(Student).filter_by(student_id="S005").update({Student.enrollment_status: "withdrawn"})
+            db.commit()
+
+        assert index.get_percentiles(1, ["S005"])["S005"]["found"]  # not seen through the write hook
+        with patch('src.mvp.services.risk_percentile_index.time.monotonic', return_value=time.monotonic() + 901):
+            assert index.get_percentiles(1, ["S005"]) == {"S005": {"found": False}}
+
+    def test_write_during_build_is_not_lost(self, session_factory):
+        index = RiskPercentileIndex(session_factory=session_factory)
+        build = index._build
+
+        def racing_build(institution_id):
+            built = build(institution_id)
+            if not racing_build.raced:
+                racing_build.raced = True
+                with session_factory() as db:
+                    db.add(Prediction(institution_id=1, student_id=1, risk_score=0.95, risk_category="High",
+                                      prediction_date=datetime.now() + timedelta(minutes=1)))
+                    db.commit()
+                index.record_scores(1, [{"student_id": 1, "risk_score": 0.95}])
+            return built
+        racing_build.raced = False
+
+        with patch.object(index, '_build', side_effect=racing_build):
+            assert index.get_percentiles(1, [1])["1"]["risk_score"] == 0.95
+
+
+class TestPercentileEndpoint:
+
+    def test_batch_endpoint(self, session_factory):
+        from fastapi.testclient import TestClient
+        from src.mvp.api import core
+
+        index = RiskPercentileIndex(session_factory=session_factory)
+        client = TestClient(_app_with(core.router))
+        with patch.object(core, 'get_risk_percentile_index', return_value=index), \
+                patch.object(core, 'simple_auth_check', return_value={"user": "test", "institution_id": 1}):
+            response = client.post("/api/mvp/students/percentiles",
+                                   json={"student_ids": ["S000", "S005", 9]})
+            bad_request = client.post("/api/mvp/students/percentiles", json={"student_ids": []})
+
+        assert response.status_code == 200
+        percentiles = response.json()["percentiles"]
+        assert percentiles["S005"]["percentile_rank"] == pytest.approx(83.3)
+        assert percentiles["9"]["grade_level"] == "10"
+        assert bad_request.status_code == 400
+
+    def test_institution_comes_from_the_caller(self, session_factory):
+        from fastapi.testclient import TestClient
+        from src.mvp.api import core
+
+        index = RiskPercentileIndex(session_factory=session_factory)
+        client = TestClient(_app_with(core.router))
+        with patch.object(core, 'get_risk_percentile_index', return_value=index), \
+                patch.object(core, 'simple_auth_check', return_value={"user": "test", "institution_id": 2}):
+            response = client.post("/api/mvp/students/percentiles",
+                                   json={"student_ids": ["S005"], "institution_id": 1})
+
+        assert response.json()["institution_id"] == 2
+        assert response.json()["percentiles"] == {"S005": {"found": False}}
+
+
+def _app_with(router):
+    from fastapi import FastAPI
+    app = FastAPI()
+    app.include_router(router, prefix="/api/mvp")
+    return app
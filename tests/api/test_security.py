@@ -20,7 +20,7 @@ os.environ['ENVIRONMENT'] = 'test'
 os.environ['MVP_API_KEY'] = 'test-api-key-secure-32-chars-min'
 
 from src.mvp.mvp_api import app
-from src.mvp.security import security_config, rate_limiter
+from src.mvp.security import security_config, rate_limiter, SecureSessionManager, SessionRevocationStore
 
 @pytest.fixture
 def client():
@@ -265,6 +265,116 @@ class TestSessionSecurity:
             # Should validate session properly
             assert response.status_code in [200, 401]
 
+@pytest.fixture
+def revocation_db(tmp_path):
+    """Session factory over a file database, as shared by every worker"""
+    from contextlib import contextmanager
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.mvp.database import Base
+    import src.mvp.models  # noqa: F401  registers RevokedSession
+    
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    
+    @contextmanager
+    def factory():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+    
+    return factory
+
+class TestSignedSessionTokens:
+    """Test stateless signed session tokens"""
+    
+    class Clock:
+        def __init__(self):
+            self.now = 1_700_000_000.0
+        
+        def __call__(self):
+            return self.now
+    
+    def test_token_validates_in_another_worker(self, revocation_db):
+        """Tokens carry their own state, so a fresh manager with the same secret accepts them"""
+        token = SecureSessionManager().create_session("teacher_42")
+        session = SecureSessionManager(revocations=SessionRevocationStore(revocation_db)).validate_session(token)
+        assert session['user_id'] == "teacher_42"
+        assert (session['expires_at'] - session['created_at']).total_seconds() == 8 * 3600
+    
+    def test_tampered_and_foreign_tokens_rejected(self):
+        manager = SecureSessionManager()
+        token = manager.create_session("teacher_42")
+        version, payload, signature = token.split('.')
+        forged = SecureSessionManager()._generate_secure_token(
+            {'uid': 'admin', 'iat': 0, 'exp': 2**40, 'nonce': 'x'})
+        
+        assert manager.validate_session(f"{version}.{payload}.{signature[:-2]}AA") is None
+        assert manager.validate_session(f"{version}.{forged.split('.')[1]}.{signature}") is None
+        assert manager.validate_session("a" * 40 + "." + "b" * 32) is None  # old opaque format
+        
+        manager.secret_key = b"another-secret-with-enough-entropy-123"
+        assert manager.validate_session(token) is None
+    
+    def test_expiry_and_revocation(self, revocation_db):
+        clock = self.Clock()
+        manager = SecureSessionManager(clock=clock, revocations=SessionRevocationStore(revocation_db))
+        token, other = manager.create_session("a"), manager.create_session("b")
+        assert manager.validate_session(token) and manager.validate_session(other)
+        
+        manager.revoke_session(token)
+        assert manager.validate_session(token) is None
+        assert manager.validate_session(other) is not None
+        
+        clock.now += 8 * 3600 + 1
+        assert manager.validate_session(other) is None
+    
+    def test_revocation_is_shared_between_workers(self, revocation_db):
+        clock = self.Clock()
+        worker_a = SecureSessionManager(clock=clock, revocations=SessionRevocationStore(revocation_db))
+        worker_b = SecureSessionManager(clock=clock, revocations=SessionRevocationStore(revocation_db))
+        token = worker_a.create_session("teacher_42")
+        assert worker_b.validate_session(token) is not None  # now cached in worker b
+        
+        worker_a.revoke_session(token)
+        assert worker_b.validate_session(token) is None
+        
+        # A restarted worker still refuses the logged-out token
+        restarted = SecureSessionManager(clock=clock, revocations=SessionRevocationStore(revocation_db))
+        assert restarted.validate_session(token) is None
+    
+    def test_expired_revocations_are_purged(self, revocation_db):
+        from src.mvp.models import RevokedSession
+        clock = self.Clock()
+        manager = SecureSessionManager(clock=clock, revocations=SessionRevocationStore(revocation_db))
+        manager.revoke_session(manager.create_session("a"))
+        
+        clock.now += 8 * 3600 + 1
+        manager.revoke_session(manager.create_session("b"))
+        with revocation_db() as db:
+            assert db.query(RevokedSession).count() == 1
+    
+    def test_rotating_secret_invalidates_cached_tokens(self, revocation_db):
+        manager = SecureSessionManager(revocations=SessionRevocationStore(revocation_db))
+        token = manager.create_session("teacher_42")
+        assert manager.validate_session(token) is not None
+        
+        manager.secret_key = b"another-secret-with-enough-entropy-123"
+        assert manager.validate_session(token) is None
+    
+    def test_verification_cache_is_bounded(self, revocation_db):
+        manager = SecureSessionManager(cache_size=3, revocations=SessionRevocationStore(revocation_db))
+        tokens = [manager.create_session(f"user_{i}") for i in range(10)]
+        for token in tokens:
+            assert manager.validate_session(token) is not None
+        assert list(manager._verified) == tokens[-3:]
+        
+        with patch.object(manager, '_verify_token_signature', side_effect=AssertionError("HMAC recomputed")):
+            assert manager.validate_session(tokens[-1])['user_id'] == "user_9"
+
 class TestAsyncSecurity:
     """Test async endpoint security"""
     
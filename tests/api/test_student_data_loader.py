@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Batched Student Data Loader Tests
+Tests one-query-per-facet loading, peer percentiles and request-scoped memoization
+"""
+
+import pytest
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.mvp.database import Base
+from src.mvp.models import Institution, Student, Prediction, Intervention
+from src.mvp.services.metrics_aggregator import MetricsAggregator, StudentDataLoader
+from src.mvp.services.risk_percentile_index import RiskPercentileIndex
+
+
+@pytest.fixture
+def db_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        db.add(Institution(id=1, name="Loader School", code="LOADER_001", type="K12"))
+        now = datetime.now()
+        for i in range(20):
+            db.add(Student(id=i + 1, institution_id=1, student_id=f"S{i:03d}",
+                           grade_level="9" if i < 15 else "10", enrollment_status="active"))
+            # Older prediction followed by the latest one
+            db.add(Prediction(institution_id=1, student_id=i + 1, risk_score=0.9, risk_category="High",
+                              prediction_date=now - timedelta(days=30)))
+            db.add(Prediction(institution_id=1, student_id=i + 1, risk_score=i / 20, risk_category="Low",
+                              prediction_date=now - timedelta(days=1)))
+        for outcome in ["successful", "successful", "unsuccessful"]:
+            db.add(Intervention(institution_id=1, student_id=1, intervention_type="tutoring",
+                                title="Tutoring", outcome=outcome))
+        db.commit()
+    return engine
+
+
+@pytest.fixture
+def aggregator(db_engine):
+    Session = sessionmaker(bind=db_engine)
+
+    @contextmanager
+    def factory():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    aggregator = MetricsAggregator(percentile_index=RiskPercentileIndex(session_factory=factory))
+    aggregator.session_factory = factory
+    return aggregator
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+class TestStudentDataLoader:
+
+    def test_query_count_independent_of_batch_size(self, aggregator, db_engine):
+        statements = count_statements(db_engine)
+        profiles = aggregator.get_comprehensive_student_data_batch(list(range(1, 21)))
+
+        assert len(profiles) == 20
+        # Four facet queries plus the one-time percentile index build
+        assert len(statements) == 5
+
+        aggregator.get_comprehensive_student_data_batch(list(range(1, 21)))
+        assert len(statements) == 9
+
+    def test_profile_contents(self, aggregator):
+        profile = aggregator.get_comprehensive_student_data(1)
+
+        assert profile["risk_assessment"]["risk_score"] == 0.0
+        assert profile["temporal_trends"]["trend_direction"] == "improving"
+        assert profile["support_factors"]["successful_intervention_count"] == 2
+        assert profile["support_factors"]["most_effective_strategies"] == ["tutoring"]
+        assert profile["engagement_metrics"]["total_interventions"] == 2
+        assert len(profile["intervention_history"]) == 3
+
+    def test_peer_percentile_uses_latest_scores(self, aggregator):
+        profiles = aggregator.get_comprehensive_student_data_batch([1, 8, 16])
+
+        # Grade 9 peers have latest scores 0.00 .. 0.70; student 8 scores 0.35
+        assert profiles[8]["peer_context"]["institution_peer_count"] == 15
+        assert profiles[8]["peer_context"]["student_percentile_rank"] == pytest.approx(46.7)
+        assert profiles[1]["peer_context"]["student_percentile_rank"] == 0.0
+        assert profiles[16]["peer_context"]["institution_peer_count"] == 5
+        assert profiles[16]["peer_context"]["grade_average_risk_score"] == pytest.approx(0.85)
+
+    def test_memoized_for_loader_lifetime(self, aggregator, db_engine):
+        loader = aggregator.create_loader()
+        loader.load_many([1, 2, 3])
+        statements = count_statements(db_engine)
+
+        assert loader.get(2) is loader.get(2)
+        aggregator.get_comprehensive_student_data(3, loader=loader)
+        assert statements == []
+
+        # A different request gets a fresh loader
+        assert isinstance(aggregator.create_loader(), StudentDataLoader)
+        assert aggregator.create_loader().get(2) is not loader.get(2)
+
+    def test_missing_student(self, aggregator):
+        assert aggregator.get_comprehensive_student_data(999) == {"error": "Student 999 not found"}
+        assert aggregator.get_comprehensive_student_data(1, institution_id=2) == {"error": "Student 1 not found"}
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Background Sync Job Tests
+Tests queueing limits, progress, cancellation, WebSocket progress and restart recovery of integration sync jobs
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.mvp.database import Base
+from src.mvp.encryption import EncryptionManager
+import src.mvp.models  # noqa: F401  registers SyncJobRecord
+from src.mvp.services.sync_jobs import (
+    SyncJob, SyncJobError, SyncJobQueueFull, SyncJobService, SyncJobStatus, SyncJobStore, run_inline
+)
+
+
+@pytest.fixture
+def store():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    lock = threading.Lock()  # one shared in-memory connection
+
+    @contextmanager
+    def factory():
+        with lock:
+            session = Session()
+            try:
+                yield session
+            finally:
+                session.close()
+
+    return SyncJobStore(session_factory=factory)
+
+
+def make_service(store, **kwargs):
+    options = {'max_workers': 2, 'concurrency_limits': {'canvas': 1, 'powerschool': 1}, 'max_queued': 10}
+    options.update(kwargs)
+    return SyncJobService(store=store, **options)
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+class BlockingRun:
+    """Sync runner that waits for release() and reports progress while waiting"""
+
+    def __init__(self, students=10):
+        self.students = students
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.saved = []
+
+    def __call__(self, job):
+        self.started.set()
+        while not self.release.wait(0.01):
+            job.check_cancelled()
+        job.progress('fetched', self.students)
+        job.progress('scored', self.students)
+        job.persist([{'student_id': i} for i in range(self.students)], self.saved.append, chunk_size=4)
+        return {'status': 'success', 'students': self.students}
+
+
+class TestSyncJobService:
+
+    def test_job_runs_and_reports_progress(self, store):
+        service = make_service(store)
+        run = BlockingRun(students=10)
+        job = service.submit('canvas', 'course-1', run, requested_by='teacher')
+        run.release.set()
+        wait_for(lambda: not job.active)
+
+        assert job.status == SyncJobStatus.COMPLETED
+        assert job.progress() == {'students_fetched': 10, 'students_scored': 10, 'students_persisted': 10}
+        assert [len(chunk) for chunk in run.saved] == [4, 4, 2]
+        assert job.result == {'status': 'success', 'students': 10}
+
+    def test_per_integration_limit_lets_other_integrations_run(self, store):
+        service = make_service(store)
+        first, second, other = BlockingRun(), BlockingRun(), BlockingRun()
+        service.submit('canvas', 'course-1', first)
+        queued = service.submit('canvas', 'course-2', second)
+        service.submit('powerschool', 'school-1', other)
+
+        assert first.started.wait(2) and other.started.wait(2)
+        assert queued.status == SyncJobStatus.QUEUED
+        assert service.get_stats()['running_by_integration'] == {'canvas': 1, 'powerschool': 1}
+
+        first.release.set()
+        assert second.started.wait(2)
+        second.release.set()
+        other.release.set()
+
+    def test_queue_is_bounded_and_duplicates_share_a_job(self, store):
+        service = make_service(store, max_workers=1, max_queued=1)
+        running = BlockingRun()
+        job = service.submit('canvas', 'course-1', running, dedupe_key='canvas:token:course-1')
+        assert running.started.wait(2)
+
+        assert service.submit('canvas', 'course-1', BlockingRun(), dedupe_key='canvas:token:course-1') is job
+        waiting = BlockingRun()
+        service.submit('canvas', 'course-2', waiting)
+        with pytest.raises(SyncJobQueueFull):
+            service.submit('canvas', 'course-3', BlockingRun())
+        running.release.set()
+        waiting.release.set()
+
+    def test_cancel_queued_and_running_jobs(self, store):
+        service = make_service(store, max_workers=1)
+        running, waiting = BlockingRun(), BlockingRun()
+        active = service.submit('canvas', 'course-1', running)
+        queued = service.submit('canvas', 'course-2', waiting)
+        assert running.started.wait(2)
+
+        assert service.cancel(queued.job_id)
+        assert queued.status == SyncJobStatus.CANCELLED
+        assert service.cancel(active.job_id)
+        wait_for(lambda: not active.active)
+
+        assert active.status == SyncJobStatus.CANCELLED
+        assert not waiting.started.is_set()
+        assert not service.cancel(active.job_id)
+
+    def test_failure_is_recorded(self, store):
+        service = make_service(store)
+
+        def run(job):
+            raise SyncJobError("Canvas sync failed: 401")
+
+        job = service.submit('canvas', 'course-1', run)
+        wait_for(lambda: not job.active)
+        assert job.status == SyncJobStatus.FAILED
+        assert job.error == "Canvas sync failed: 401"
+
+    def test_state_survives_restart(self, store):
+        service = make_service(store)
+        run = BlockingRun(students=3)
+        finished = service.submit('canvas', 'course-1', run)
+        run.release.set()
+        wait_for(lambda: not finished.active)
+        store.save(SyncJob(job_id='sync_abandoned', integration='powerschool', scope_id='school-1',
+                           status=SyncJobStatus.RUNNING, students_fetched=120, worker_id='stopped-worker'))
+
+        restarted = make_service(store)
+        with patch('src.mvp.services.sync_jobs.datetime') as clock:
+            clock.now.return_value = datetime.now() + timedelta(minutes=5)  # its heartbeat went stale
+            assert restarted.recover_interrupted() == 1
+        abandoned = restarted.get_job('sync_abandoned')
+        assert abandoned.status == SyncJobStatus.INTERRUPTED
+        assert abandoned.students_fetched == 120
+
+        reloaded = restarted.get_job(finished.job_id)
+        assert reloaded.status == SyncJobStatus.COMPLETED
+        assert reloaded.result == {'status': 'success', 'students': 3}
+        assert {job.job_id for job in restarted.list_jobs()} == {'sync_abandoned', finished.job_id}
+
+    def test_startup_recovery_leaves_other_live_workers_jobs_alone(self, store):
+        worker_a = make_service(store, worker_id='worker-a', heartbeat_seconds=30)
+        run = BlockingRun()
+        job = worker_a.submit('canvas', 'course-1', run)
+        assert run.started.wait(2)
+
+        worker_b = make_service(store, worker_id='worker-b', heartbeat_seconds=30)
+        assert worker_b.recover_interrupted() == 0
+        assert worker_b.get_job(job.job_id).status == SyncJobStatus.RUNNING
+        run.release.set()
+        wait_for(lambda: not job.active)
+        assert job.status == SyncJobStatus.COMPLETED
+
+    def test_cancel_reaches_the_worker_running_the_job(self, store):
+        worker_a = make_service(store, worker_id='worker-a', cancel_poll_seconds=0)
+        worker_b = make_service(store, worker_id='worker-b')
+        run = BlockingRun()
+        job = worker_a.submit('canvas', 'course-1', run)
+        assert run.started.wait(2)
+
+        assert worker_b.cancel(job.job_id)
+        wait_for(lambda: not job.active)
+        assert job.status == SyncJobStatus.CANCELLED
+        assert worker_b.get_job(job.job_id).status == SyncJobStatus.CANCELLED
+        assert not worker_b.cancel(job.job_id)
+
+    def test_progress_pushed_to_subscribed_websockets(self, store):
+        service = make_service(store)
+
+        class FakeWebSocket:
+            def __init__(self):
+                self.messages = []
+
+            async def send_text(self, text):
+                self.messages.append(json.loads(text))
+
+        async def scenario():
+            websocket, snooper = FakeWebSocket(), FakeWebSocket()
+            run = BlockingRun(students=5)
+            job = service.submit('canvas', 'course-1', run, requested_by='teacher_a')
+            assert service.subscribe(job.job_id, snooper, requested_by='teacher_b') is None
+            service.subscribe(job.job_id, websocket, requested_by='teacher_a')
+            run.release.set()
+            while job.active:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            assert snooper.messages == []
+            return websocket.messages
+
+        messages = asyncio.run(scenario())
+        assert all(message['type'] == 'sync_job_progress' for message in messages)
+        assert messages[-1]['job']['status'] == 'completed'
+        assert messages[-1]['job']['progress']['students_persisted'] == 5
+        assert 'result' not in messages[-1]['job']
+
+    def test_inline_run_uses_same_runner(self):
+        run = BlockingRun(students=2)
+        run.release.set()
+        assert run_inline('canvas', 'course-1', run) == {'status': 'success', 'students': 2}
+
+    def test_result_is_stored_encrypted(self, store):
+        with patch.dict(os.environ, {'ENABLE_DATABASE_ENCRYPTION': 'true',
+                                     'DATABASE_ENCRYPTION_KEY': 'sync-job-test-key-' + 'a' * 32}):
+            encrypted_store = SyncJobStore(session_factory=store.session_factory, encryption=EncryptionManager())
+        encrypted_store.save(SyncJob(job_id='sync_pii', integration='canvas', scope_id='course-1',
+                                     status=SyncJobStatus.COMPLETED,
+                                     result={'predictions': [{'student_name': 'Ada Lovelace', 'risk': 0.8}]}))
+
+        from src.mvp.models import SyncJobRecord
+        with store.session_factory() as db:
+            stored = db.query(SyncJobRecord).filter_by(job_id='sync_pii').one().result
+        assert 'Ada' not in stored and stored.startswith('v1:')
+        assert encrypted_store.load('sync_pii').result['predictions'][0]['student_name'] == 'Ada Lovelace'
+
+
+class TestSyncJobEndpoints:
+
+    def test_jobs_are_only_visible_to_their_requester(self, store):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from src.mvp.api import sync_jobs_endpoints as endpoints
+
+        service = make_service(store)
+        run = BlockingRun(students=2)
+        job = service.submit('canvas', 'course-1', run, requested_by='teacher_a')
+        run.release.set()
+        wait_for(lambda: not job.active)
+
+        user = {'user': 'teacher_b'}
+        app = FastAPI()
+        app.include_router(endpoints.router)
+        app.dependency_overrides[endpoints.get_current_user] = lambda: user
+        client = TestClient(app)
+        with patch.object(endpoints, 'get_sync_job_service', return_value=service):
+            assert client.get(f"/jobs/{job.job_id}").status_code == 404
+            assert client.post(f"/jobs/{job.job_id}/cancel").status_code == 404
+            assert client.get("/jobs").json()['jobs'] == []
+
+            user['user'] = 'teacher_a'
+            assert client.get(f"/jobs/{job.job_id}").json()['result'] == {'status': 'success', 'students': 2}
+            assert [j['job_id'] for j in client.get("/jobs").json()['jobs']] == [job.job_id]
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Upload Validation Tests
+Tests the single-pass CSV validator: chunk-boundary pattern matching, encoding errors, row limits and parsing hand-off
+"""
+
+import io
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from src.mvp import upload_validation
+from src.mvp.security import InputSanitizer
+from src.mvp.upload_validation import DANGEROUS_PATTERNS, validate_csv_upload
+
+
+def gradebook(rows=20):
+    lines = ["student_id,name,grade_level,current_gpa"]
+    lines += [f"{1000 + i},Student {i},{9 + i % 4},{2.0 + (i % 20) / 10}" for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def rejection(content, filename="grades.csv", **kwargs):
+    with pytest.raises(HTTPException) as exc:
+        validate_csv_upload(content, filename, **kwargs)
+    return exc.value
+
+
+class TestSinglePassValidation:
+
+    def test_valid_upload_counts_every_row(self):
+        upload = InputSanitizer.validate_file_content(gradebook(250), "grades.csv")
+        assert upload.rows == 250  # the old validator stopped counting at 100
+        assert upload.header == ["student_id", "name", "grade_level", "current_gpa"]
+        assert upload.columns == 4 and upload.mismatched_rows == 0
+
+    def test_read_csv_matches_decoded_parse(self):
+        content = "\ufeffstudent_id,name\n1,Zoë\n2,\"Ng, Li\"\n".encode('utf-8')
+        upload = validate_csv_upload(content, "grades.csv")
+        expected = pd.read_csv(io.StringIO(content.decode('utf-8')))
+        pd.testing.assert_frame_equal(upload.read_csv(), expected)
+
+    @pytest.mark.parametrize("pattern", ["<script", "union select", "c:\\windows\\", "workbook_open"])
+    def test_patterns_found_across_chunk_boundaries(self, pattern):
+        prefix = gradebook(5)
+        for offset in range(1, len(pattern)):
+            # Split the pattern between two 64-byte chunks, in mixed case
+            padding = b"x" * (64 - len(prefix) % 64 - offset)
+            content = prefix + padding + pattern.upper().encode() + b"\n"
+            error = rejection(content, chunk_size=64)
+            assert error.detail == f"File contains potentially dangerous content: {pattern}"
+
+    def test_every_pattern_is_detected(self):
+        for pattern in DANGEROUS_PATTERNS:
+            content = gradebook(3) + f"9,{pattern},10,3.0\n".encode()
+            assert rejection(content).detail.endswith(pattern)
+
+    def test_encoding_error_reports_absolute_offset(self):
+        content = gradebook(40)
+        bad_at = len(content) - 5
+        content = content[:bad_at] + b"\xc3(" + content[bad_at + 2:]
+        for chunk_size in (7, 64, upload_validation.CHUNK_SIZE):
+            error = rejection(content, chunk_size=chunk_size)
+            assert error.detail == f"Invalid file encoding at byte {bad_at}. Must be UTF-8"
+
+    def test_multibyte_characters_split_across_chunks(self):
+        content = "student_id,name\n" + "".join(f"{i},Zoë Ørsted\n" for i in range(50))
+        upload = validate_csv_upload(content.encode('utf-8'), "grades.csv", chunk_size=5)
+        assert upload.rows == 50
+
+    def test_row_limit_is_enforced_past_the_first_sample(self, monkeypatch):
+        monkeypatch.setattr(upload_validation, "MAX_ROWS", 150)
+        assert rejection(gradebook(151)).detail == "Too many rows (max 150)"
+        assert validate_csv_upload(gradebook(150), "grades.csv").rows == 150
+
+    def test_structure_errors(self):
+        assert rejection(b"   \n\n   \n \n").detail == "File contains no readable content"
+        assert rejection(b"student_id,name\n").detail == "CSV must contain data rows"
+        assert rejection(b"student_id,,name\n1,2,3\n").detail == "CSV headers cannot be empty"
+        assert rejection(gradebook(), "grades.txt").detail == "Only CSV files allowed"
+
+    def test_mismatched_rows_are_counted_not_rejected(self):
+        upload = validate_csv_upload(b"student_id,name\n1,Ana\n2\n3,Cam,extra\n", "grades.csv")
+        assert upload.rows == 3 and upload.mismatched_rows == 2
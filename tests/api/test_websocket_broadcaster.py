@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+WebSocket Broadcaster Tests
+Tests topic routing, drop-oldest send queues, slow-client isolation and alert publishing
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from src.mvp.notifications import RealTimeNotificationSystem
+from src.mvp.websocket_broadcaster import WebSocketBroadcaster
+
+
+class FakeWebSocket:
+    """Records sent messages; ``delay`` simulates a slow client, ``stalled`` one that never drains"""
+
+    def __init__(self, delay=0.0, stalled=False):
+        self.delay = delay
+        self.stalled = stalled
+        self.messages = []
+        self.closed_with = None
+
+    async def send_text(self, text):
+        if self.stalled:
+            await asyncio.Event().wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.messages.append(text)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+async def drain():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+class TestWebSocketBroadcaster:
+
+    def test_topic_routing_and_single_serialization(self):
+        async def scenario():
+            broadcaster = WebSocketBroadcaster()
+            idle, district, student = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+            broadcaster.connect(idle)
+            broadcaster.connect(district, ['institution:1'])
+            broadcaster.connect(student, ['student:S9'])
+
+            assert broadcaster.publish({'n': 1}, ['institution:1', 'student:S9']) == 2
+            assert broadcaster.publish({'n': 2}, ['institution:2', 'student:S9']) == 1
+            await drain()
+
+            assert idle.messages == []  # no subscriptions, no messages
+            assert [json.loads(m)['n'] for m in district.messages] == [1]
+            assert [json.loads(m)['n'] for m in student.messages] == [1, 2]
+            assert student.messages[0] is district.messages[0]  # serialized once, shared by all queues
+
+            broadcaster.unsubscribe(district)
+            assert broadcaster.publish({'n': 3}, ['institution:1']) == 0
+
+            with pytest.raises(ValueError):
+                broadcaster.subscribe(student, ['classroom:1'])
+            await broadcaster.close()
+
+        asyncio.run(scenario())
+
+    def test_scoped_clients_only_receive_their_institution(self):
+        async def scenario():
+            broadcaster = WebSocketBroadcaster()
+            own, other, internal = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+            broadcaster.connect(own, ['student:S1'], scope=1)
+            broadcaster.connect(other, ['student:S1'], scope='2')
+            broadcaster.connect(internal, ['student:S1'])
+
+            # Student ids can repeat across institutions; the scope keeps them apart
+            assert broadcaster.publish({'n': 1}, ['student:S1'], scope='1') == 2
+            assert broadcaster.publish({'n': 2}, ['student:S1']) == 1  # unscoped: internal consumers only
+            await drain()
+
+            assert [json.loads(m)['n'] for m in own.messages] == [1]
+            assert other.messages == []
+            assert [json.loads(m)['n'] for m in internal.messages] == [1, 2]
+            await broadcaster.close()
+
+        asyncio.run(scenario())
+
+    def test_slow_client_drops_oldest_without_delaying_others(self):
+        async def scenario():
+            broadcaster = WebSocketBroadcaster(max_queue=3, send_timeout=60)
+            fast, stalled = FakeWebSocket(), FakeWebSocket(stalled=True)
+            broadcaster.connect(fast, ['institution:1'])
+            broadcaster.connect(stalled, ['institution:1'])
+
+            for n in range(10):
+                broadcaster.publish({'n': n}, ['institution:1'])
+                await drain()
+
+            assert [json.loads(m)['n'] for m in fast.messages] == list(range(10))
+            stats = broadcaster.get_stats()
+            # The stalled client holds message 0 in flight and only the newest three in its queue
+            assert stats['max_queue_depth'] == 3 and stats['messages_dropped'] == 6
+            queued = broadcaster._clients[stalled].queue
+            assert [json.loads(m)['n'] for m in queued] == [7, 8, 9]
+            await broadcaster.close()
+
+        asyncio.run(scenario())
+
+    def test_stuck_send_disconnects_client(self):
+        async def scenario():
+            broadcaster = WebSocketBroadcaster(send_timeout=0.05)
+            stalled = FakeWebSocket(stalled=True)
+            broadcaster.connect(stalled, ['institution:1'])
+            broadcaster.publish('hello', ['institution:1'])
+            await asyncio.sleep(0.2)
+
+            assert stalled not in broadcaster
+            assert stalled.closed_with == 1013
+            assert broadcaster.get_stats()['topics'] == 0
+
+        asyncio.run(scenario())
+
+    def test_fan_out_to_thousands_of_clients(self):
+        """Load test: 3000 clients, 5% slow; every fast client gets every message promptly"""
+        async def scenario():
+            broadcaster = WebSocketBroadcaster(max_queue=32)
+            clients = [FakeWebSocket(delay=0.05 if i % 20 == 0 else 0.0) for i in range(3000)]
+            for i, websocket in enumerate(clients):
+                broadcaster.connect(websocket, [f"institution:{i % 10}"])
+
+            started = time.perf_counter()
+            for n in range(50):
+                broadcaster.publish({'type': 'student_alert', 'n': n}, [f"institution:{n % 10}"])
+            publish_seconds = time.perf_counter() - started
+            await asyncio.sleep(0.1)
+
+            fast = [ws for i, ws in enumerate(clients) if i % 20]
+            assert all(len(ws.messages) == 5 for ws in fast)  # each institution got 5 of the 50
+            assert publish_seconds < 1.0
+            await broadcaster.close()
+
+        asyncio.run(scenario())
+
+
+class TestAlertPublishing:
+
+    def test_alerts_reach_institution_subscribers_once(self):
+        async def scenario():
+            notifier = RealTimeNotificationSystem()
+            district, other, namesake = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+            notifier.add_websocket_connection(district, ['institution:1'], institution_id=1)
+            notifier.add_websocket_connection(other, ['institution:2'], institution_id=2)
+            notifier.add_websocket_connection(namesake, ['student:S1'], institution_id=2)  # another S1
+
+            # 0.9 crosses both the high (0.70) and critical (0.85) websocket rules
+            alerts = await notifier.monitor_student_risk('S1', 'Sam', 0.9, {'institution_id': 1})
+            await drain()
+
+            assert alerts and all(alert.institution_id == '1' for alert in alerts)
+            assert len(district.messages) == len(alerts)
+            assert other.messages == [] and namesake.messages == []
+            assert notifier.get_alert_statistics()['websocket_connections'] == 3
+            await notifier.broadcaster.close()
+
+        asyncio.run(scenario())
+
+
+class TestNotificationsWebSocket:
+
+    API_KEY = 'websocket-test-key-0123456789'
+
+    @pytest.fixture
+    def security(self, monkeypatch):
+        from src.mvp.api import notifications_endpoints as endpoints
+
+        security = sys.modules[endpoints.get_current_user_secure.__module__]
+        monkeypatch.setattr(security.security_config, 'api_key', self.API_KEY)
+        monkeypatch.setattr(security.security_config, 'development_mode', False)
+        monkeypatch.setenv('DEFAULT_INSTITUTION_ID', '1')
+        return security
+
+    @pytest.fixture
+    def client(self, security):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from src.mvp.api import notifications_endpoints as endpoints
+
+        app = FastAPI()
+        app.include_router(endpoints.router, prefix="/api")
+        return TestClient(app)
+
+    @pytest.fixture
+    def users_db(self, monkeypatch, security):
+        """Users table holding teacher_42 of institution 7, and session revocations"""
+        from contextlib import contextmanager
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from sqlalchemy.pool import StaticPool
+        import src.mvp.database as database
+        from src.mvp.models import Base, User
+
+        engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        @contextmanager
+        def factory():
+            session = Session()
+            try:
+                yield session
+                session.commit()
+            finally:
+                session.close()
+
+        with factory() as db:
+            db.add(User(institution_id=7, username='teacher_42', email='teacher42@school.edu',
+                        password_hash='x', first_name='Ada', last_name='Byron', role='teacher'))
+        monkeypatch.setattr(database, 'get_db_session', factory)
+        monkeypatch.setattr(security.session_manager, '_revocations', security.SessionRevocationStore(factory))
+        return factory
+
+    @staticmethod
+    def reply(websocket):
+        """Next message that is not one of the institution's active alerts sent on connect"""
+        while True:
+            message = websocket.receive_json()
+            if message['type'] != 'student_alert':
+                return message
+
+    def test_connection_requires_credentials(self, client):
+        from starlette.websockets import WebSocketDisconnect
+
+        # The key is never accepted from the query string, where it would be logged
+        for url in ("/api/notifications/ws", "/api/notifications/ws?token=wrong-key",
+                    f"/api/notifications/ws?token={self.API_KEY}"):
+            with pytest.raises(WebSocketDisconnect) as exc:
+                with client.websocket_connect(url):
+                    pass
+            assert exc.value.code == 1008
+
+    def test_topics_are_limited_to_the_users_institution(self, client):
+        from starlette.websockets import WebSocketDisconnect
+
+        headers = {'Authorization': f"Bearer {self.API_KEY}"}
+        with client.websocket_connect("/api/notifications/ws", headers=headers) as websocket:
+            welcome = websocket.receive_json()
+            assert welcome['type'] == 'connection_established' and welcome['topics'] == ['institution:1']
+
+            websocket.send_json({'type': 'subscribe', 'topics': ['institution:2']})
+            assert self.reply(websocket) == {'type': 'error', 'error': "Not authorized for topic 'institution:2'"}
+            websocket.send_json({'type': 'subscribe', 'topics': ['student:S1']})
+            assert self.reply(websocket)['topics'] == ['institution:1', 'student:S1']
+
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect("/api/notifications/ws?institution_id=2", headers=headers):
+                pass
+
+    def test_session_cookie_binds_the_users_own_institution(self, client, security, users_db, monkeypatch):
+        from starlette.websockets import WebSocketDisconnect
+        from src.mvp.api import notifications_endpoints as endpoints
+
+        subscribed = []
+
+        class Jobs:
+            def subscribe(self, job_id, websocket, requested_by):
+                subscribed.append(requested_by)
+
+            def unsubscribe(self, websocket):
+                pass
+
+        monkeypatch.setattr(endpoints, 'get_sync_job_service', lambda: Jobs())
+
+        client.cookies.set('session_token', security.session_manager.create_session('teacher_42'))
+        with client.websocket_connect("/api/notifications/ws") as websocket:
+            assert websocket.receive_json()['topics'] == ['institution:7']
+            websocket.send_json({'type': 'subscribe_sync_job', 'job_id': 'job-1'})
+            assert self.reply(websocket)['type'] == 'sync_job_progress'
+        # Same requested_by as a job submitted by this session user
+        assert subscribed == ['teacher_42']
+
+        client.cookies.set('session_token', security.session_manager.create_session('no_such_user'))
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect("/api/notifications/ws"):
+                pass
+        assert exc.value.code == 1008
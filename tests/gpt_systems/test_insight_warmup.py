@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+GPT Insight Warm-up Test Suite
+
+Tests background precomputation of quick insights after gradebook upload:
+frontend hash parity, candidate selection, token budgets and cancellation.
+"""
+
+import os
+import threading
+import pytest
+from unittest.mock import patch
+
+os.environ['TESTING'] = 'true'
+
+from src.mvp.services.insight_warmup import (
+    InsightWarmupService, WarmupStatus, compute_insight_data_hash, _js_number
+)
+
+
+class FakeGPTService:
+    """Stand-in for GPTOSSService that counts calls and reports fixed usage."""
+
+    def __init__(self, tokens_per_call=300, gate=None):
+        self.is_initialized = True
+        self.tokens_per_call = tokens_per_call
+        self.gate = gate
+        self.calls = 0
+
+    def initialize_model(self):
+        return True
+
+    def generate_analysis(self, prompt, analysis_type, max_tokens=512):
+        if self.gate:
+            self.gate.wait(timeout=5)
+        self.calls += 1
+        return {
+            'success': True,
+            'analysis': '1. **Tutoring**: Schedule twice weekly',
+            'metadata': {'tokens_used': self.tokens_per_call, 'model': 'gpt-5-nano'}
+        }
+
+
+def make_students(count, category='High Risk'):
+    return [{
+        'student_id': str(1000 + i),
+        'risk_score': 0.5 + i / (count * 4),
+        'risk_category': category,
+        'grade_level': 9,
+        'current_gpa': 2.0,
+        'attendance_rate': 0.8,
+        'discipline_incidents': 1
+    } for i in range(count)]
+
+
+@pytest.fixture
+def saved_insights():
+    saved = []
+    with patch('src.mvp.database.gpt_insight_exists', return_value=False), \
+         patch('src.mvp.database.save_gpt_insight',
+               side_effect=lambda data, **kwargs: saved.append((data, kwargs)) or True):
+        yield saved
+
+
+def run_job(service, students, **kwargs):
+    job = service.submit(students, interventions_by_student={}, **kwargs)
+    service._executor.shutdown(wait=True)
+    return job
+
+
+class TestHashParity:
+    """Hashes must match analysis.js generateDataHash or the cache never hits"""
+
+    def test_matches_frontend_hash(self):
+        student = {'gpa': 2.5, 'attendance_rate': 0.85, 'risk_score': 0.7312}
+        assert compute_insight_data_hash(student, []) == '1951760a'
+
+    def test_matches_frontend_hash_with_interventions(self):
+        student = {'gpa': 3, 'attendance_rate': 1e-7,
+                   'behavioral_incidents': 3, 'risk_score': 0.5}
+        interventions = [
+            {'intervention_type': 'tutoring', 'status': 'completed'},
+            {'intervention_type': 'Call home é😀', 'status': 'planned'}
+        ]
+        assert compute_insight_data_hash(student, interventions) == '5f39acd9'
+
+    @pytest.mark.parametrize('value,expected', [
+        (0, '0'), (3.0, '3'), (0.85, '0.85'), (1e-7, '1e-7'),
+        (1e21, '1e+21'), (123456.5, '123456.5'), (-2.5, '-2.5')
+    ])
+    def test_js_number_formatting(self, value, expected):
+        assert _js_number(value) == expected
+
+
+class TestWarmupJobs:
+
+    def test_selects_top_n_by_risk(self):
+        service = InsightWarmupService(gpt_service_factory=FakeGPTService, top_n=3)
+        students = make_students(5) + make_students(2, category='Low Risk')
+        candidates = service.select_candidates(students)
+        assert [c['student_id'] for c in candidates] == ['1004', '1003', '1002']
+
+    def test_no_job_without_at_risk_students(self):
+        service = InsightWarmupService(gpt_service_factory=FakeGPTService)
+        assert service.submit(make_students(3, category='Low Risk')) is None
+
+    def test_generates_and_saves_insights(self, saved_insights):
+        gpt = FakeGPTService()
+        service = InsightWarmupService(gpt_service_factory=lambda: gpt, top_n=4)
+        job = run_job(service, make_students(4), session_id='upload_1')
+
+        assert job.status == WarmupStatus.COMPLETED
+        assert job.generated == 4
+        assert job.tokens_used == 1200
+        assert len(saved_insights) == 4
+        data, kwargs = saved_insights[0]
+        assert kwargs == {'session_id': 'upload_1', 'institution_id': 1}
+        assert 'gpt-quick-insights' in data['formatted_html']
+        assert service.budget_summary(1)['tokens_used'] == 1200
+
+    def test_skips_students_with_cached_insight(self):
+        gpt = FakeGPTService()
+        service = InsightWarmupService(gpt_service_factory=lambda: gpt)
+        with patch('src.mvp.database.gpt_insight_exists', return_value=True), \
+             patch('src.mvp.database.save_gpt_insight') as save:
+            job = run_job(service, make_students(3))
+        assert job.skipped_existing == 3
+        assert gpt.calls == 0
+        save.assert_not_called()
+
+    def test_stops_when_job_budget_exhausted(self, saved_insights):
+        gpt = FakeGPTService(tokens_per_call=800)
+        service = InsightWarmupService(gpt_service_factory=lambda: gpt, job_token_budget=2000)
+        job = run_job(service, make_students(5))
+
+        assert job.status == WarmupStatus.BUDGET_EXHAUSTED
+        assert job.generated == 2
+        assert job.tokens_used <= 2000
+
+    def test_daily_institution_budget_shared_across_jobs(self, saved_insights):
+        gpt = FakeGPTService(tokens_per_call=800)
+        service = InsightWarmupService(gpt_service_factory=lambda: gpt, daily_token_budget=2000,
+                                       max_workers=1)
+        first = service.submit(make_students(2), interventions_by_student={})
+        second = service.submit(make_students(2), interventions_by_student={})
+        service._executor.shutdown(wait=True)
+
+        assert first.generated == 2
+        assert second.status == WarmupStatus.BUDGET_EXHAUSTED
+        assert service.budget_summary(1)['tokens_remaining'] == 400
+
+    def test_cancel_stops_running_job(self, saved_insights):
+        gate = threading.Event()
+        gpt = FakeGPTService(gate=gate)
+        service = InsightWarmupService(gpt_service_factory=lambda: gpt)
+        job = service.submit(make_students(5), interventions_by_student={})
+
+        assert service.cancel(job.job_id) is True
+        gate.set()
+        service._executor.shutdown(wait=True)
+
+        assert job.status == WarmupStatus.CANCELLED
+        assert job.processed < 5
+        assert service.cancel(job.job_id) is False
+
+    def test_unavailable_gpt_service(self):
+        gpt = FakeGPTService()
+        gpt.is_initialized = False
+        gpt.initialize_model = lambda: False
+        service = InsightWarmupService(gpt_service_factory=lambda: gpt)
+        job = run_job(service, make_students(2))
+        assert job.status == WarmupStatus.UNAVAILABLE
+
+    def test_disabled_by_environment(self):
+        with patch.dict(os.environ, {'GPT_WARMUP_ENABLED': 'false'}):
+            service = InsightWarmupService(gpt_service_factory=FakeGPTService)
+        assert service.submit(make_students(2)) is None
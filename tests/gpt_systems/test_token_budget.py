@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Token Budget Test Suite
+
+Tests prompt token accounting and budget-driven compaction in ContextBuilder,
+plus tokens-in/tokens-out metrics recorded by the GPT service.
+"""
+
+import os
+import pytest
+from unittest.mock import Mock, patch
+
+os.environ['TESTING'] = 'true'
+
+from src.mvp.services.context_builder import ContextBuilder
+from src.mvp.services.token_budget import (
+    ApproximateTokenizer, ContextSection, TokenUsageMetrics, compact_sections, get_input_budget
+)
+
+
+class WordTokenizer:
+    """One token per whitespace-separated word, for exact arithmetic in tests"""
+    name = "words"
+
+    def count(self, text):
+        return len(text.split())
+
+
+@pytest.fixture
+def student_inputs():
+    student_data = {
+        'grade_level': '9',
+        'current_gpa': 1.8,
+        'attendance_rate': 0.78,
+        'discipline_incidents': 4,
+        'assignment_completion': 0.6,
+        'is_ell': True
+    }
+    ml_results = {
+        'risk_score': 0.82,
+        'risk_category': 'High',
+        'success_probability': 0.18,
+        'confidence_score': 0.9
+    }
+    historical = {
+        'intervention_history': [{'type': 'tutoring', 'outcome': 'successful'}] * 3,
+        'temporal_trends': {'trend_direction': 'worsening'}
+    }
+    return student_data, ml_results, historical
+
+
+class TestTokenizer:
+
+    def test_approximate_counts_are_deterministic(self):
+        tokenizer = ApproximateTokenizer()
+        assert tokenizer.count("") == 0
+        assert tokenizer.count("GPA: 2.5") == 5
+        assert tokenizer.count("attendance") == 3
+
+    def test_budget_resolution_precedence(self):
+        assert get_input_budget('student_analysis') == 600
+        with patch.dict(os.environ, {'GPT_INPUT_BUDGET_STUDENT_ANALYSIS': '250'}):
+            assert get_input_budget('student_analysis') == 250
+            assert get_input_budget('student_analysis', {'student_analysis': 0}) is None
+        assert get_input_budget('unknown_type') is None
+
+
+class TestCompaction:
+
+    def make_sections(self):
+        return [
+            ContextSection("header", "a b c"),
+            ContextSection("optional_low", "d e f g h i", priority=3, summary="d e"),
+            ContextSection("optional_mid", "j k l m", priority=1),
+            ContextSection("request", "n o"),
+        ]
+
+    def test_no_budget_keeps_everything(self):
+        text, report = compact_sections(self.make_sections(), None, WordTokenizer())
+        assert text == "a b c\n\nd e f g h i\n\nj k l m\n\nn o"
+        assert report['original_tokens'] == report['final_tokens'] == 15
+
+    def test_summarizes_lowest_priority_first(self):
+        text, report = compact_sections(self.make_sections(), 11, WordTokenizer())
+        assert report['summarized_sections'] == ['optional_low']
+        assert report['dropped_sections'] == []
+        assert "d e\n\nj k l m" in text
+        assert report['final_tokens'] == 11
+
+    def test_drops_sections_but_never_required_ones(self):
+        text, report = compact_sections(self.make_sections(), 1, WordTokenizer())
+        assert report['dropped_sections'] == ['optional_low', 'optional_mid']
+        assert text == "a b c\n\nn o"
+        assert report['over_budget'] is True
+
+
+class TestContextBuilderBudgets:
+
+    def test_key_fields_survive_tight_budget(self, student_inputs):
+        builder = ContextBuilder(tokenizer=ApproximateTokenizer(),
+                                 input_budgets={'student_analysis': 200})
+        prompt = builder.build_student_analysis_context(*student_inputs, context_depth="comprehensive")
+
+        assert builder.last_compaction['final_tokens'] < builder.last_compaction['original_tokens']
+        assert 'developmental' in builder.last_compaction['dropped_sections']
+        assert "Current GPA: 1.80" in prompt
+        assert "Attendance Rate: 78.0%" in prompt
+        assert "ML Risk Assessment: High" in prompt
+        assert "English Language Learner" in prompt
+        assert "ANALYSIS REQUEST" in prompt
+
+    def test_default_budget_leaves_basic_prompt_untouched(self, student_inputs):
+        builder = ContextBuilder(tokenizer=ApproximateTokenizer())
+        student_data, ml_results, _ = student_inputs
+        prompt = builder.build_student_analysis_context(student_data, ml_results, context_depth="basic")
+        assert builder.last_compaction['dropped_sections'] == []
+        assert builder.last_compaction['summarized_sections'] == []
+        assert "DEVELOPMENTAL & EDUCATIONAL CONTEXT" in prompt
+
+    def test_cohort_compaction_keeps_distribution(self):
+        builder = ContextBuilder(tokenizer=ApproximateTokenizer(), input_budgets={'cohort_analysis': 150})
+        prompt = builder.build_cohort_analysis_context({
+            'total_students': 300,
+            'demographics': {
+                'grade_levels': {'9': 100, '10': 100, '11': 100},
+                'special_populations': {'ell_count': 12},
+                'total_count': 300
+            },
+            'risk_distribution': {
+                'category_distribution': {'High': 50, 'Medium': 100, 'Low': 150},
+                'total_with_predictions': 300,
+                'average_risk_score': 0.41
+            }
+        })
+        assert "High Risk: 50 students" in prompt
+        assert "English Language Learners" not in prompt
+
+
+class TestTokenUsageMetrics:
+
+    def test_records_tokens_in_and_out(self):
+        metrics = TokenUsageMetrics()
+        metrics.record('student_analysis', 400, 300, estimated_prompt_tokens=380)
+        metrics.record('student_analysis', 200, 100)
+        summary = metrics.summary()
+        assert summary['total_calls'] == 2
+        assert summary['by_analysis_type']['student_analysis']['avg_prompt_tokens'] == 300
+        assert summary['total_completion_tokens'] == 400
+
+    def test_gpt_service_records_usage_and_caps_completion(self):
+        from src.mvp.services import gpt_oss_service
+        from src.mvp.services.gpt_oss_service import GPTOSSService
+
+        service = GPTOSSService(api_key='test', enable_caching=False)
+        service.is_initialized = True
+        response = Mock(spec=['output', 'usage'])
+        response.output = "1) Tutoring"
+        response.usage = Mock(input_tokens=120, output_tokens=80, total_tokens=200,
+                              spec=['input_tokens', 'output_tokens', 'total_tokens'])
+        service.client = Mock()
+        service.client.responses.create.return_value = response
+
+        metrics = TokenUsageMetrics()
+        with patch.object(gpt_oss_service, 'token_usage_metrics', metrics):
+            result = service.generate_analysis("prompt", "student_analysis", max_tokens=512)
+
+        assert result['metadata']['prompt_tokens'] == 120
+        assert result['metadata']['completion_tokens'] == 80
+        assert service.client.responses.create.call_args.kwargs['max_output_tokens'] == 512 + 1024
+        assert metrics.summary()['by_analysis_type']['student_analysis']['prompt_tokens'] == 120
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Shared fixtures for integration tests
+Runs aiohttp mock servers (PowerSchool, Canvas) on a background event loop
+"""
+
+import asyncio
+import socket
+import threading
+
+import pytest
+from aiohttp import web
+
+
+@pytest.fixture
+def serve_app():
+    """
+    Start aiohttp applications on free local ports for the duration of a test.
+
+    Returns a function taking a ``web.Application`` and returning its base URL;
+    every server started through it is shut down when the test ends.
+    """
+    servers = []
+
+    def serve(app: web.Application) -> str:
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', port).start())
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        servers.append((loop, runner, thread))
+        return f"http://127.0.0.1:{port}"
+
+    yield serve
+
+    for loop, runner, thread in servers:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Canvas Course Sync Tests
+Tests Link-header pagination and the course-wide vectorized gradebook against a local mock Canvas server
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from src.integrations.canvas_lms import CanvasConfig, CanvasLMSIntegration, compute_grade_metrics
+
+COURSE_ID = '42'
+
+
+def submission(student_id, assignment_id):
+    """Deterministic submission that varies with student and assignment"""
+    i, k = int(student_id), int(assignment_id)
+    submitted = (i + k) % 4 != 0
+    return {
+        'user_id': i, 'assignment_id': k,
+        'workflow_state': 'submitted' if submitted else 'unsubmitted',
+        'score': (i * k) % 10 if submitted else None,
+        'late': submitted and (i + k) % 5 == 0,
+        'missing': not submitted and k % 2 == 0,
+    }
+
+
+class MockCanvas:
+    """Canvas REST API with per_page paging and Link rel="next" headers"""
+
+    def __init__(self, student_count=30, assignment_count=12):
+        self.student_ids = [str(i) for i in range(1, student_count + 1)]
+        # One assignment without points to exercise the zero-points path
+        self.assignment_records = [{'id': k, 'name': f"A{k}", 'points_possible': 0 if k == 1 else 10}
+                            for k in range(1, assignment_count + 1)]
+        self.requests = 0
+        self.paths = []
+
+    def _page(self, request, records):
+        self.requests += 1
+        self.paths.append(request.path)
+        page = int(request.query.get('page', 1))
+        per_page = int(request.query.get('per_page', 10))
+        headers = {}
+        if page * per_page < len(records):
+            query = [(k, v) for k, v in request.query.items() if k != 'page'] + [('page', str(page + 1))]
+            next_url = request.url.with_query(query)
+            headers['Link'] = f'<{next_url}>; rel="next", <{request.url}>; rel="current"'
+        return web.json_response(records[(page - 1) * per_page:page * per_page], headers=headers)
+
+    async def users(self, request):
+        return self._page(request, [{'id': int(sid), 'name': f"Student {sid}", 'email': f"s{sid}@example.org"}
+                                    for sid in self.student_ids])
+
+    async def assignments(self, request):
+        return self._page(request, self.assignment_records)
+
+    async def submissions(self, request):
+        requested = request.query.getall('student_ids[]')
+        student_ids = self.student_ids if requested == ['all'] else [s for s in requested if s in self.student_ids]
+        return self._page(request, [submission(sid, a['id']) for sid in student_ids for a in self.assignment_records])
+
+    async def course(self, request):
+        self.requests += 1
+        return web.json_response({'id': COURSE_ID, 'name': '9th Grade Biology', 'course_code': 'BIO9'})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/api/v1/courses/{cid}/users', self.users)
+        app.router.add_get('/api/v1/courses/{cid}/assignments', self.assignments)
+        app.router.add_get('/api/v1/courses/{cid}/students/submissions', self.submissions)
+        app.router.add_get('/api/v1/courses/{cid}', self.course)
+        return app
+
+
+@pytest.fixture
+def canvas_server(serve_app):
+    server = MockCanvas()
+    yield server, serve_app(server.app())
+
+
+def make_canvas(base_url, per_page=100):
+    return CanvasLMSIntegration(CanvasConfig(base_url=base_url, access_token='token', per_page=per_page))
+
+
+class TestCanvasPagination:
+
+    def test_follows_link_headers(self, canvas_server):
+        server, base_url = canvas_server
+        students = make_canvas(base_url, per_page=7).get_course_students(COURSE_ID)
+
+        assert [s.id for s in students] == server.student_ids
+        # 30 students at 7 per page
+        assert server.requests == 5
+
+    def test_single_page_has_no_next_link(self, canvas_server):
+        server, base_url = canvas_server
+        assert len(make_canvas(base_url).get_course_assignments(COURSE_ID)) == 12
+        assert server.requests == 1
+
+
+class TestCanvasCourseGradebook:
+
+    def test_matches_per_student_grades(self, canvas_server):
+        server, base_url = canvas_server
+        canvas = make_canvas(base_url, per_page=25)
+        gradebook = canvas.get_course_gradebook(COURSE_ID).set_index('student_id')
+
+        assert list(gradebook.index) == server.student_ids
+        assert (gradebook['grade_level'] == 9).all()
+        for student_id in ['1', '4', '17', '30']:
+            expected = canvas.get_student_grades(COURSE_ID, student_id)
+            row = gradebook.loc[student_id]
+            assert row['current_grade'] == pytest.approx(expected['overall_grade'] / 25.0)
+            assert row['assignment_completion'] == pytest.approx(expected['assignment_completion_rate'])
+            assert row['late_submission_rate'] == pytest.approx(expected['late_submission_rate'])
+            assert row['missing_assignments'] == expected['missing_assignments']
+            assert row['points_earned'] == pytest.approx(expected['points_earned'])
+            assert row['points_possible'] == pytest.approx(expected['points_possible'])
+
+    def test_course_wide_requests(self, canvas_server):
+        server, base_url = canvas_server
+        make_canvas(base_url, per_page=100).get_course_gradebook(COURSE_ID)
+
+        # Roster, assignments, 360 submissions in 4 pages and one course lookup
+        assert server.requests == 1 + 1 + 4 + 1
+        assert server.paths.count(f'/api/v1/courses/{COURSE_ID}/assignments') == 1
+
+    def test_student_subset(self, canvas_server):
+        server, base_url = canvas_server
+        gradebook = make_canvas(base_url).get_course_gradebook(COURSE_ID, student_ids=['3', '5'])
+        assert sorted(gradebook['student_id']) == ['3', '5']
+
+    def test_compute_grade_metrics(self):
+        metrics = compute_grade_metrics(
+            [{'id': 1, 'points_possible': 10}, {'id': 2, 'points_possible': 10}],
+            [{'user_id': 7, 'assignment_id': 1, 'score': 5, 'workflow_state': 'submitted', 'late': True},
+             {'user_id': 7, 'assignment_id': 2, 'workflow_state': 'unsubmitted', 'missing': True},
+             {'user_id': 8, 'assignment_id': 99, 'score': 10, 'workflow_state': 'submitted'}]
+        )
+        assert list(metrics.index) == ['7']
+        assert metrics.loc['7', 'overall_grade'] == pytest.approx(25.0)
+        assert metrics.loc['7', 'assignment_completion_rate'] == pytest.approx(0.5)
+        assert metrics.loc['7', 'late_submission_rate'] == pytest.approx(1.0)
+        assert metrics.loc['7', 'missing_assignments'] == 1
+
+        assert compute_grade_metrics([], []).empty
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Integration Client Registry Tests
+Tests OAuth token caching, pooled session sharing and PowerSchool re-authentication against a local mock server
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from src.integrations.client_registry import IntegrationClientRegistry, PoolConfig
+from src.integrations.powerschool_sis import PowerSchoolConfig, PowerSchoolSISIntegration
+
+
+class TokenServer:
+    """Token endpoint stand-in issuing numbered tokens"""
+
+    def __init__(self, expires_in=3600, fail=False):
+        self.expires_in = expires_in
+        self.fail = fail
+        self.fetches = 0
+
+    def __call__(self):
+        self.fetches += 1
+        if self.fail:
+            return None
+        return {'access_token': f"token-{self.fetches}", 'expires_in': self.expires_in}
+
+
+@pytest.fixture
+def clock():
+    return [1000.0]
+
+
+@pytest.fixture
+def registry(clock):
+    return IntegrationClientRegistry(pool=PoolConfig(pool_maxsize=4), max_clients=2,
+                                     token_refresh_margin_seconds=300, clock=lambda: clock[0])
+
+
+class TestIntegrationClientRegistry:
+
+    def test_token_cached_until_refresh_margin(self, registry, clock):
+        client = registry.get_client('powerschool', 'fp')
+        server = TokenServer(expires_in=3600)
+
+        assert registry.get_token(client, server).access_token == 'token-1'
+        clock[0] += 3299
+        assert registry.get_token(client, server).access_token == 'token-1'
+        clock[0] += 1
+        assert registry.get_token(client, server).access_token == 'token-2'
+        assert (client.token_fetches, client.token_hits) == (2, 1)
+
+    def test_short_lived_tokens_refresh_at_half_life(self, registry, clock):
+        client = registry.get_client('powerschool', 'fp')
+        server = TokenServer(expires_in=60)
+
+        registry.get_token(client, server)
+        clock[0] += 29
+        registry.get_token(client, server)
+        assert server.fetches == 1
+        clock[0] += 1
+        registry.get_token(client, server)
+        assert server.fetches == 2
+
+    def test_refused_token_is_not_cached(self, registry):
+        client = registry.get_client('powerschool', 'fp')
+        server = TokenServer(fail=True)
+        assert registry.get_token(client, server) is None
+        assert registry.get_token(client, server) is None
+        assert server.fetches == 2
+
+    def test_invalidate_keeps_newer_token(self, registry):
+        client = registry.get_client('powerschool', 'fp')
+        server = TokenServer()
+        registry.get_token(client, server)
+
+        client.invalidate_token('some-older-token')
+        assert client.token.access_token == 'token-1'
+        client.invalidate_token('token-1')
+        assert registry.get_token(client, server).access_token == 'token-2'
+
+    def test_clients_shared_per_fingerprint_and_evicted_lru(self, registry):
+        first = registry.get_client('canvas', 'a')
+        assert registry.get_client('canvas', 'a') is first
+        registry.get_client('canvas', 'b')
+        registry.get_client('canvas', 'c')
+
+        stats = registry.get_stats()
+        assert stats['clients'] == 2
+        assert stats['evictions'] == 1
+        assert len(stats['by_client']) == 2
+        assert 'by_client' not in registry.get_stats(include_clients=False)
+        assert registry.get_client('canvas', 'a') is not first
+
+    def test_pool_sized_for_caller_concurrency(self, registry):
+        client = registry.get_client('powerschool', 'fp', pool_maxsize=12)
+        assert client.adapter._pool_maxsize == 12
+        assert registry.get_client('canvas', 'other').adapter._pool_maxsize == 4
+
+
+@pytest.fixture
+def powerschool_server(serve_app):
+    state = {'token_requests': 0, 'api_requests': 0, 'revoked': set()}
+
+    async def token(request):
+        state['token_requests'] += 1
+        return web.json_response({'access_token': f"token-{state['token_requests']}", 'expires_in': 3600})
+
+    async def schools(request):
+        state['api_requests'] += 1
+        if request.headers.get('Authorization', '').split(' ')[-1] in state['revoked']:
+            return web.Response(status=401)
+        return web.json_response({'schools': [{'id': 1, 'name': 'Lincoln High'}]})
+
+    app = web.Application()
+    app.router.add_post('/oauth/access_token', token)
+    app.router.add_get('/ws/v1/schools', schools)
+    yield state, serve_app(app)
+
+
+def make_powerschool(base_url):
+    return PowerSchoolSISIntegration(PowerSchoolConfig(
+        base_url=base_url, client_id='client', client_secret='secret', use_response_cache=False
+    ))
+
+
+class TestPowerSchoolSharedClient:
+
+    def test_instances_share_token_and_connections(self, powerschool_server):
+        state, base_url = powerschool_server
+
+        # Endpoints build a new integration per request
+        for _ in range(5):
+            assert make_powerschool(base_url).get_schools()[0]['name'] == 'Lincoln High'
+
+        client = make_powerschool(base_url).client
+        stats = client.get_stats()
+        assert state['token_requests'] == 1
+        assert stats['token_hits'] == 4
+        assert stats['requests'] == 6  # one token request and five API calls
+        assert stats['connections_opened'] == 1
+
+    def test_rejected_token_is_refreshed_for_every_instance(self, powerschool_server):
+        state, base_url = powerschool_server
+        first, second = make_powerschool(base_url), make_powerschool(base_url)
+        first.get_schools()
+
+        state['revoked'].add('token-1')
+        assert first.get_schools()[0]['name'] == 'Lincoln High'
+        assert second.get_schools()[0]['name'] == 'Lincoln High'
+        assert second.access_token == 'token-2'
+        assert state['token_requests'] == 2
+
+    def test_instances_share_the_hourly_quota(self, powerschool_server):
+        _, base_url = powerschool_server
+        first, second = make_powerschool(base_url), make_powerschool(base_url)
+        assert first.rate_limiter is second.rate_limiter
+
+        burst = first.rate_limiter.capacity
+        for _ in range(int(burst)):
+            first.rate_limiter.reserve()
+        # The quota spent by one instance is visible to the next one
+        assert second.rate_limiter.reserve() > 0
+
+        other = PowerSchoolSISIntegration(PowerSchoolConfig(
+            base_url=base_url, client_id='other-client', client_secret='secret', use_response_cache=False
+        ))
+        assert other.rate_limiter is not first.rate_limiter
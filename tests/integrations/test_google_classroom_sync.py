@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Google Classroom Sync Tests
+Tests nextPageToken paging, course-wide vectorized metrics and batched multi-course sync on the offline fake transport
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from src.integrations.google_classroom import GoogleClassroomIntegration, compute_engagement_metrics
+from src.integrations.google_classroom_fake import FakeClassroomService
+
+
+def make_classroom(service):
+    integration = GoogleClassroomIntegration()
+    integration.service = service
+    return integration
+
+
+@pytest.fixture
+def state_store():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from src.mvp.database import Base
+    import src.mvp.models  # noqa: F401  registers IntegrationSyncState
+    from src.integrations.sync_state import SyncStateStore
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    @contextmanager
+    def factory():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    return SyncStateStore(session_factory=factory)
+
+
+class TestClassroomPaging:
+
+    def test_follows_next_page_token(self):
+        service = FakeClassroomService.demo(course_count=1, students_per_course=25, page_size=10)
+        students = make_classroom(service).get_course_students('course-1')
+
+        assert len(students) == 25
+        assert service.http_requests == 3
+
+    def test_vectorized_metrics_match_per_student(self):
+        service = FakeClassroomService.demo(course_count=1, students_per_course=12)
+        classroom = make_classroom(service)
+        metrics = compute_engagement_metrics(classroom.get_course_submissions('course-1'))
+
+        for i in [1, 5, 12]:
+            student_id = f"course-1-student-{i}"
+            expected = classroom.calculate_student_engagement_metrics(student_id, 'course-1')
+            for key, value in expected.items():
+                assert metrics.loc[student_id, key] == pytest.approx(value)
+
+    def test_empty_submissions(self):
+        assert compute_engagement_metrics([]).empty
+
+
+class TestClassroomSync:
+
+    def test_course_sync_uses_one_submission_stream(self):
+        service = FakeClassroomService.demo(course_count=1, students_per_course=25, coursework_per_course=8,
+                                            page_size=100)
+        result = make_classroom(service).sync_course_data('course-1', incremental=False)
+
+        assert result['total_students'] == 25 and result['total_assignments'] == 8
+        # Course, coursework, submissions (200 in 2 pages), roster; not one submissions call per student
+        assert service.http_requests == 5
+
+    def test_batched_sync_matches_per_course_sync(self):
+        service = FakeClassroomService.demo(course_count=4, students_per_course=25, page_size=50)
+        classroom = make_classroom(service)
+
+        batched = classroom.sync_courses(['course-1', 'course-2', 'course-3', 'course-4'])
+        batch_requests = service.http_requests
+
+        service.http_requests = 0
+        sequential = {cid: classroom.sync_course_data(cid, incremental=False) for cid in batched}
+
+        for course_id, result in batched.items():
+            expected = {s.student_id: s for s in sequential[course_id]['students']}
+            assert result['total_students'] == 25
+            for student in result['students']:
+                assert student == expected[student.student_id]
+        # Course lookups in one batch, then page rounds of submissions (200 per course at 50 a page)
+        assert batch_requests == 1 + 4
+        assert service.http_requests == 4 * (1 + 1 + 4 + 1)
+
+    def test_batched_sync_isolates_failed_courses(self):
+        service = FakeClassroomService.demo(course_count=2)
+        results = make_classroom(service).sync_courses(['course-1', 'missing', 'course-2'])
+
+        assert results['missing'] == {}
+        assert results['course-1']['total_students'] == 25
+        assert results['course-2']['total_students'] == 25
+
+    def test_incremental_sync_recomputes_changed_students(self, state_store):
+        service = FakeClassroomService.demo(course_count=1, students_per_course=10)
+        classroom = make_classroom(service)
+        first = classroom.sync_course_data('course-1', state_store=state_store)
+        assert first['delta']['mode'] == 'full'
+
+        for submission in service.data['course-1']['studentSubmissions']:
+            if submission['userId'] == 'course-1-student-3':
+                submission.update(state='TURNED_IN', updateTime='2099-01-01T00:00:00Z')
+        second = classroom.sync_course_data('course-1', state_store=state_store)
+
+        assert second['delta']['mode'] == 'incremental'
+        assert second['delta']['rescored_student_ids'] == ['course-1-student-3']
+        student = next(s for s in second['students'] if s.student_id == 'course-1-student-3')
+        assert student.classroom_participation_rate == pytest.approx(1.0)
+        assert second['total_students'] == 10
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+PowerSchool Concurrent Sync Tests
+Tests the token-bucket limiter and the async sync engine against a local mock PowerSchool server
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from aiohttp import web
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from src.integrations.powerschool_sis import PowerSchoolConfig, PowerSchoolSISIntegration
+from src.integrations.powerschool_sync import PowerSchoolSyncEngine
+from src.integrations.rate_limiter import TokenBucket
+
+LATENCY_SECONDS = 0.01
+BASELINE_MODIFIED = '2024-01-01T00:00:00Z'
+
+
+def student_dataset(student_id):
+    """Deterministic per-student records that vary with the numeric ID"""
+    i = int(student_id)
+    return {
+        'student': {'id': student_id, 'first_name': 'Test', 'last_name': student_id, 'grade_level': 9 + i % 4,
+                    'schoolid': '100', 'gender': 'F' if i % 2 else 'M', 'student_number': f"L{i}"},
+        'demographics': {'ethnicity': f"E{i % 3}", 'economically_disadvantaged': i % 2 == 1},
+        'attendance': [{'studentid': student_id, 'attendance_code': 'A' if day < i % 4 else 'P',
+                        'tardy': day == 0 and i % 2 == 0} for day in range(5)],
+        'grades': [{'studentid': student_id, 'credit_attempted': 1.0, 'grade_points': 0 if k < i % 3 else 3}
+                   for k in range(4)],
+        'gpa': {'gpa_current': 2.0 + (i % 3) * 0.5, 'gpa_cumulative': 2.5},
+        'discipline': [{'studentid': student_id, 'type': kind} for kind in ['referral', 'oss', 'note'][:i % 4]],
+        'programs': [{'program_code': ['IEP', '504', 'ELL', 'TAG', 'NONE'][i % 5]}],
+    }
+
+
+class MockPowerSchool:
+    """PowerSchool API over a deterministic dataset with fixed latency, injectable failures and 429s"""
+
+    def __init__(self, student_count=20):
+        self.student_ids = [str(i) for i in range(1, student_count + 1)]
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.throttle_once = set()   # paths answered with 429 the first time
+        self.missing = set()         # student IDs whose base record 404s
+        self.bulk_enabled = True     # school-wide collections available
+        self.new_incidents = {}      # student ID -> extra discipline incidents recorded "now"
+        self.max_page_size = None    # instance-side cap on the requested pagesize
+        self.lock = threading.Lock()
+
+    async def _respond(self, payload, status=200, headers=None):
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(LATENCY_SECONDS)
+            return web.json_response(payload, status=status, headers=headers)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    async def _page(self, request, key, records):
+        page = int(request.query.get('page', 1))
+        size = int(request.query.get('pagesize', 500))
+        if self.max_page_size:
+            size = min(size, self.max_page_size)
+        return await self._respond({key: records[(page - 1) * size:page * size]})
+
+    async def token(self, request):
+        return web.json_response({'access_token': 'token', 'expires_in': 3600})
+
+    async def students(self, request):
+        expand = request.query.get('expansions', '')
+        records = []
+        for student_id in self.student_ids:
+            data = student_dataset(student_id)
+            record = dict(data['student'])
+            if 'demographics' in expand:
+                record['demographics'] = data['demographics']
+            if 'special_programs' in expand:
+                record['special_programs'] = {'programs': data['programs']}
+            records.append(record)
+        return await self._page(request, 'students', records)
+
+    async def student(self, request):
+        student_id = request.match_info['sid']
+        if student_id in self.missing:
+            return await self._respond({'message': 'not found'}, status=404)
+        return await self._respond(student_dataset(student_id)['student'])
+
+    async def facet(self, request):
+        if request.path in self.throttle_once:
+            self.throttle_once.discard(request.path)
+            return await self._respond({}, status=429, headers={'Retry-After': '0.05'})
+        data = student_dataset(request.match_info['sid'])
+        payloads = {
+            'demographics': data['demographics'],
+            'grades': {**data['gpa'], 'grades': data['grades']},
+            'special_programs': {'programs': data['programs']},
+        }
+        return await self._respond(payloads[request.match_info['facet']])
+
+    def _records(self, key, student_id):
+        data = student_dataset(student_id)
+        records = [{**record, 'whenmodified': BASELINE_MODIFIED} for record in data[key]]
+        if key == 'discipline':
+            now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+            records += [{'studentid': student_id, 'type': 'oss', 'whenmodified': now}
+                        for _ in range(self.new_incidents.get(student_id, 0))]
+        return records
+
+    async def collection(self, request):
+        key = request.path.rsplit('/', 1)[-1]
+        if 'studentid' in request.query:
+            return await self._respond({key: self._records(key, request.query['studentid'])})
+        if not self.bulk_enabled:
+            return await self._respond({'message': 'not found'}, status=404)
+
+        # Supports the two filters the client sends: studentid=in=(...) and whenmodified=ge=<timestamp>
+        query = request.query.get('q', '')
+        student_ids = self.student_ids
+        if query.startswith('studentid=in='):
+            student_ids = [sid for sid in query[len('studentid=in=('):-1].split(',') if sid in self.student_ids]
+        records = []
+        for student_id in student_ids:
+            extra = student_dataset(student_id)['gpa'] if key == 'grades' else {}
+            records.extend({**record, **extra} for record in self._records(key, student_id))
+        if query.startswith('whenmodified=ge='):
+            since = query[len('whenmodified=ge='):]
+            records = [record for record in records if record['whenmodified'] >= since]
+        return await self._page(request, key, records)
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post('/oauth/access_token', self.token)
+        app.router.add_get('/ws/v1/students', self.students)
+        app.router.add_get('/ws/v1/students/{sid}', self.student)
+        app.router.add_get('/ws/v1/students/{sid}/{facet}', self.facet)
+        for collection in ['attendance', 'grades', 'discipline']:
+            app.router.add_get(f'/ws/v1/{collection}', self.collection)
+        return app
+
+
+@pytest.fixture
+def mock_server(serve_app):
+    server = MockPowerSchool()
+    yield server, serve_app(server.app())
+
+
+def make_integration(base_url, rate_limit_per_hour=3_600_000, workers=8, page_size=500):
+    return PowerSchoolSISIntegration(PowerSchoolConfig(
+        base_url=base_url, client_id='id', client_secret='secret',
+        rate_limit_per_hour=rate_limit_per_hour, max_concurrent_students=workers, page_size=page_size
+    ))
+
+
+class TestTokenBucket:
+
+    def test_paces_after_burst(self):
+        now = [0.0]
+        bucket = TokenBucket(rate_per_second=2, capacity=2, clock=lambda: now[0])
+
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(0.5)
+        assert bucket.reserve() == pytest.approx(1.0)
+
+        # One second repays the two-token debt
+        now[0] = 1.0
+        assert bucket.reserve() == pytest.approx(0.5)
+
+    def test_penalize_holds_back_callers(self):
+        now = [0.0]
+        bucket = TokenBucket(rate_per_second=10, capacity=10, clock=lambda: now[0])
+        bucket.penalize(1.0)
+        assert bucket.reserve() == pytest.approx(1.1)
+
+    def test_hourly_quota(self):
+        bucket = TokenBucket.per_hour(3600)
+        assert bucket.rate == pytest.approx(1.0)
+        assert bucket.capacity == 60
+
+
+class TestPowerSchoolSyncEngine:
+
+    def test_fetches_and_parses_all_facets(self, mock_server):
+        server, base_url = mock_server
+        students, report = PowerSchoolSyncEngine(make_integration(base_url)).run(['1', '2', '3'])
+
+        assert report.succeeded == 3 and report.failed == {}
+        assert report.requests_made == 18
+        student = students['2']
+        assert student.last_name == '2'
+        assert student.economic_disadvantaged is False
+        assert student.attendance_rate == pytest.approx(0.6)
+        assert student.credits_earned == 2.0
+        assert (student.office_referrals, student.suspensions) == (1, 1)
+        assert student.ell_status is True
+
+    def test_partial_failures_are_reported(self, mock_server):
+        server, base_url = mock_server
+        server.missing.add('2')
+
+        students, report = PowerSchoolSyncEngine(make_integration(base_url)).run(['1', '2', '3'])
+
+        assert set(students) == {'1', '3'}
+        assert report.succeeded == 2
+        assert '404' in report.failed['2']
+
+    def test_429_is_paced_and_retried(self, mock_server):
+        server, base_url = mock_server
+        server.throttle_once.add('/ws/v1/students/1/grades')
+
+        students, report = PowerSchoolSyncEngine(make_integration(base_url)).run(['1'])
+
+        assert report.failed == {} and report.partial == {}
+        assert report.retries == 1
+        assert report.rate_limit_wait_seconds >= 0.05
+        assert students['1'].credits_earned == 3.0
+
+    def test_worker_pool_is_bounded(self, mock_server):
+        server, base_url = mock_server
+        PowerSchoolSyncEngine(make_integration(base_url, workers=2)).run([str(i) for i in range(10)])
+        assert server.max_in_flight <= 2 * 6
+
+    def test_rate_limit_paces_instead_of_failing(self, mock_server):
+        server, base_url = mock_server
+        integration = make_integration(base_url)
+        integration.rate_limiter = TokenBucket(rate_per_second=100, capacity=6)
+
+        started = time.perf_counter()
+        students, report = PowerSchoolSyncEngine(integration).run(['1', '2', '3'])
+
+        assert len(students) == 3
+        # 18 requests, 6 free, 12 paced at 100/s
+        assert time.perf_counter() - started >= 0.11
+        assert report.rate_limit_wait_seconds > 0
+
+    def test_faster_than_sequential_client(self, mock_server):
+        server, base_url = mock_server
+        student_ids = [str(i) for i in range(1, 21)]
+        integration = make_integration(base_url)
+
+        started = time.perf_counter()
+        for student_id in student_ids:
+            integration.get_student_comprehensive_data(student_id)
+        sequential = time.perf_counter() - started
+
+        started = time.perf_counter()
+        students, report = PowerSchoolSyncEngine(integration).run(student_ids)
+        concurrent = time.perf_counter() - started
+
+        assert len(students) == 20
+        print(f"\nPowerSchool sync, 20 students x 6 requests: sequential {sequential:.2f}s, "
+              f"concurrent {concurrent:.2f}s, speed-up {sequential / concurrent:.1f}x")
+        assert sequential / concurrent > 3
+
+    def test_gradebook_uses_engine_inside_event_loop(self, mock_server):
+        server, base_url = mock_server
+        integration = make_integration(base_url)
+
+        async def from_async_endpoint():
+            return integration.create_enhanced_gradebook('100', bulk=False)
+
+        gradebook = asyncio.run(from_async_endpoint())
+        assert len(gradebook) == 20
+        assert integration.last_sync_report.mode == 'per_student'
+        assert integration.last_sync_report.succeeded == 20
+
+
+class TestPowerSchoolBulkSync:
+
+    def test_students_are_paginated(self, mock_server):
+        server, base_url = mock_server
+        students = make_integration(base_url, page_size=6).get_students_by_school('100')
+
+        assert [s.id for s in students] == server.student_ids
+        # 20 students at 6 per page: three full pages plus a short one
+        assert server.requests == 4
+
+    def test_server_capped_page_size_still_reads_every_page(self, mock_server):
+        server, base_url = mock_server
+        server.max_page_size = 6
+        students = make_integration(base_url, page_size=500).get_students_by_school('100')
+
+        assert [s.id for s in students] == server.student_ids
+        # Pages of 6, 6, 6, 2: the short last page is recognised against the served size
+        assert server.requests == 4
+
+    def test_bulk_gradebook_matches_per_student_sync(self, mock_server):
+        server, base_url = mock_server
+        integration = make_integration(base_url, page_size=7)
+
+        per_student = integration.create_enhanced_gradebook('100', bulk=False)
+        per_student_requests = integration.last_sync_report.requests_made
+        bulk = integration.create_enhanced_gradebook('100')
+        report = integration.last_sync_report
+
+        assert report.mode == 'bulk' and report.succeeded == 20
+        pd.testing.assert_frame_equal(bulk.drop(columns='last_sync'), per_student.drop(columns='last_sync'),
+                                      check_dtype=False)
+
+        # Students: 3 pages; attendance 100 records: 15; grades 80: 12; discipline 29: 5
+        assert report.requests_made == 3 + 15 + 12 + 5
+        assert per_student_requests == 20 * 6
+
+    def test_vectorized_aggregates(self):
+        from src.integrations.powerschool_bulk import aggregate_attendance, aggregate_discipline
+        attendance = aggregate_attendance([
+            {'studentid': 1, 'attendance_code': 'A', 'tardy': True},
+            {'studentid': 1, 'attendance_code': 'P'},
+            {'studentid': 2, 'attendance_code': 'U'},
+        ])
+        assert attendance.loc['1', 'attendance_rate'] == pytest.approx(0.5)
+        assert attendance.loc['1', 'tardies'] == 1
+        assert attendance.loc['2', 'absences_unexcused'] == 1
+
+        discipline = aggregate_discipline([])
+        assert discipline.empty
+
+    def test_falls_back_when_bulk_collections_unavailable(self, mock_server):
+        server, base_url = mock_server
+        server.bulk_enabled = False
+        integration = make_integration(base_url)
+
+        gradebook = integration.create_enhanced_gradebook('100')
+
+        assert len(gradebook) == 20
+        assert integration.last_sync_report.mode == 'per_student'
+
+
+@pytest.fixture
+def state_store():
+    from contextlib import contextmanager
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from src.mvp.database import Base
+    import src.mvp.models  # noqa: F401  registers IntegrationSyncState
+    from src.integrations.sync_state import SyncStateStore
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    @contextmanager
+    def factory():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    return SyncStateStore(session_factory=factory)
+
+
+class TestPowerSchoolIncrementalSync:
+
+    @staticmethod
+    def scoring_integration(base_url, scored):
+        integration = make_integration(base_url, page_size=7)
+
+        def score(gradebook):
+            scored.append(sorted(gradebook['student_id']))
+            return [{'student_id': row.student_id, 'risk_score': row.suspensions / 10}
+                    for row in gradebook.itertuples()]
+
+        integration._score_gradebook = score
+        integration.predictor = SimpleNamespace(model_version='test-model')
+        return integration
+
+    def test_second_sync_rescores_only_changed_students(self, mock_server, state_store):
+        server, base_url = mock_server
+        scored = []
+        integration = self.scoring_integration(base_url, scored)
+
+        first = integration.sync_school_data('100', state_store=state_store)
+        assert first['delta']['mode'] == 'full'
+        assert first['students_processed'] == 20 and len(scored[0]) == 20
+
+        server.new_incidents['7'] = 2
+        second = integration.sync_school_data('100', state_store=state_store)
+
+        assert second['delta']['mode'] == 'incremental'
+        assert second['delta']['rescored_student_ids'] == ['7']
+        assert scored[1] == ['7']
+        assert second['students_processed'] == 20
+        risk = {p['student_id']: p['risk_score'] for p in second['predictions']}
+        assert risk['7'] == pytest.approx(0.3) and len(risk) == 20
+        # Three roster pages, three delta queries and three filtered collections vs 3 + 32 collection pages;
+        # four of the delta/filtered answers fit in one short page, which takes an empty page to confirm
+        assert second['delta']['requests_made'] == 13
+        assert first['delta']['requests_made'] == 35
+
+    def test_unchanged_school_rescores_nobody(self, mock_server, state_store):
+        server, base_url = mock_server
+        scored = []
+        integration = self.scoring_integration(base_url, scored)
+
+        integration.sync_school_data('100', state_store=state_store)
+        result = integration.sync_school_data('100', state_store=state_store)
+
+        assert result['delta']['students_rescored'] == 0
+        assert len(scored) == 1 and len(result['predictions']) == 20
+
+    def test_roster_changes_are_merged(self, mock_server, state_store):
+        server, base_url = mock_server
+        scored = []
+        integration = self.scoring_integration(base_url, scored)
+        integration.sync_school_data('100', state_store=state_store)
+
+        server.student_ids = server.student_ids[1:] + ['21']
+        result = integration.sync_school_data('100', state_store=state_store)
+
+        assert result['delta']['students_removed'] == 1
+        assert result['delta']['rescored_student_ids'] == ['21']
+        assert set(p['student_id'] for p in result['predictions']) == set(server.student_ids)
+
+    def test_force_full_ignores_snapshot(self, mock_server, state_store):
+        server, base_url = mock_server
+        scored = []
+        integration = self.scoring_integration(base_url, scored)
+        integration.sync_school_data('100', state_store=state_store)
+
+        result = integration.sync_school_data('100', state_store=state_store, force_full=True)
+        assert result['delta']['mode'] == 'full' and len(scored[1]) == 20
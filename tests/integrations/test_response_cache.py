@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Integration Response Cache Tests
+Tests TTLs, stale-while-revalidate and ETag revalidation, including Canvas course lists against a local mock server
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from src.integrations.canvas_lms import CanvasConfig, CanvasLMSIntegration
+from src.integrations.google_classroom import GoogleClassroomIntegration
+from src.integrations.response_cache import (
+    CacheTTL, IntegrationResponseCache, UpstreamResponse, credential_fingerprint
+)
+
+
+class Upstream:
+    """Versioned upstream resource honouring If-None-Match"""
+
+    def __init__(self):
+        self.version = 1
+        self.calls = []
+        self.fail = False
+
+    def fetch(self, validators):
+        self.calls.append(validators)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        etag = f'"v{self.version}"'
+        if validators.get('If-None-Match') == etag:
+            return UpstreamResponse(not_modified=True)
+        return UpstreamResponse([f"course-{self.version}"], etag=etag)
+
+
+@pytest.fixture
+def clock():
+    return [0.0]
+
+
+@pytest.fixture
+def cache(clock):
+    return IntegrationResponseCache(ttls={'courses': CacheTTL(fresh_seconds=10, stale_seconds=100)},
+                                    clock=lambda: clock[0])
+
+
+class TestIntegrationResponseCache:
+
+    def test_fresh_entries_skip_upstream(self, cache):
+        upstream = Upstream()
+        for _ in range(3):
+            assert cache.get_or_fetch('fp', 'courses', 'courses', {'a': 1}, upstream.fetch) == ['course-1']
+        assert len(upstream.calls) == 1
+        assert cache.get_stats()['hits'] == 2
+
+    def test_key_includes_credentials_and_params(self, cache):
+        upstream = Upstream()
+        cache.get_or_fetch('fp1', 'courses', 'courses', {'a': 1}, upstream.fetch)
+        cache.get_or_fetch('fp2', 'courses', 'courses', {'a': 1}, upstream.fetch)
+        cache.get_or_fetch('fp1', 'courses', 'courses', {'a': 2}, upstream.fetch)
+        assert len(upstream.calls) == 3
+
+    def test_stale_is_served_while_revalidating(self, cache, clock):
+        upstream = Upstream()
+        cache.get_or_fetch('fp', 'courses', 'courses', None, upstream.fetch)
+
+        clock[0] = 50
+        upstream.version = 2
+        assert cache.get_or_fetch('fp', 'courses', 'courses', None, upstream.fetch) == ['course-1']
+        cache.wait_for_refreshes(timeout=5)
+
+        assert upstream.calls[-1] == {'If-None-Match': '"v1"'}
+        assert cache.get_or_fetch('fp', 'courses', 'courses', None, upstream.fetch) == ['course-2']
+        assert cache.get_stats()['stale_hits'] == 1
+
+    def test_not_modified_extends_entry(self, cache, clock):
+        upstream = Upstream()
+        cache.get_or_fetch('fp', 'courses', 'courses', None, upstream.fetch)
+
+        clock[0] = 500  # past the stale window: revalidated inline
+        assert cache.get_or_fetch('fp', 'courses', 'courses', None, upstream.fetch) == ['course-1']
+        assert cache.get_stats()['not_modified'] == 1
+
+        clock[0] = 505
+        cache.get_or_fetch('fp', 'courses', 'courses', None, upstream.fetch)
+        assert len(upstream.calls) == 2
+
+    def test_failed_refresh_keeps_stale_value(self, cache, clock):
+        upstream = Upstream()
+        cache.get_or_fetch('fp', 'courses', 'courses', None, upstream.fetch)
+
+        clock[0] = 50
+        upstream.fail = True
+        assert cache.get_or_fetch('fp', 'courses', 'courses', None, upstream.fetch) == ['course-1']
+        cache.wait_for_refreshes(timeout=5)
+        assert cache.get_stats()['refresh_errors'] == 1
+        assert cache.get_or_fetch('fp', 'courses', 'courses', None, upstream.fetch) == ['course-1']
+
+    def test_lru_eviction_and_invalidate(self, clock):
+        cache = IntegrationResponseCache(max_entries=2, clock=lambda: clock[0])
+        upstream = Upstream()
+        for endpoint in ['a', 'b', 'c']:
+            cache.get_or_fetch('fp', 'schools', endpoint, None, upstream.fetch)
+        assert cache.get_stats()['evictions'] == 1
+
+        assert cache.invalidate(fingerprint='fp') == 2
+        assert cache.get_stats()['entries'] == 0
+
+    def test_callers_get_copies(self, cache):
+        upstream = Upstream()
+        cache.get_or_fetch('fp', 'courses', 'courses', None, upstream.fetch).append('mutated')
+        cache.get_or_fetch('fp', 'courses', 'courses', None, upstream.fetch).clear()
+        assert cache.get_or_fetch('fp', 'courses', 'courses', None, upstream.fetch) == ['course-1']
+
+    def test_google_fingerprint_uses_credential_contents(self, tmp_path):
+        def tenant(name, client_id, refresh_token):
+            directory = tmp_path / name
+            directory.mkdir()
+            (directory / 'credentials.json').write_text(json.dumps({'installed': {'client_id': client_id}}))
+            (directory / 'token.json').write_text(json.dumps({'refresh_token': refresh_token}))
+            return str(directory / 'credentials.json'), str(directory / 'token.json')
+
+        first = GoogleClassroomIntegration(*tenant('a', 'client-1', 'refresh-a'))
+        same_account = GoogleClassroomIntegration(*tenant('b', 'client-1', 'refresh-a'))
+        other_account = GoogleClassroomIntegration(*tenant('c', 'client-1', 'refresh-c'))
+        assert first.credential_fingerprint == same_account.credential_fingerprint
+        assert first.credential_fingerprint != other_account.credential_fingerprint
+
+    def test_fingerprint_hides_secrets(self):
+        fingerprint = credential_fingerprint('canvas', 'https://canvas.example.org', 'secret-token')
+        assert 'secret' not in fingerprint
+        assert fingerprint != credential_fingerprint('canvas', 'https://canvas.example.org', 'other-token')
+
+
+@pytest.fixture
+def canvas_server(serve_app):
+    state = {'version': 1, 'requests': 0, 'not_modified': 0}
+
+    async def courses(request):
+        state['requests'] += 1
+        etag = f'"courses-v{state["version"]}"'
+        if request.headers.get('If-None-Match') == etag:
+            state['not_modified'] += 1
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.json_response([{'id': 1, 'name': f"Algebra v{state['version']}", 'enrollment_term_id': 1}],
+                                 headers={'ETag': etag})
+
+    app = web.Application()
+    app.router.add_get('/api/v1/courses', courses)
+    yield state, serve_app(app)
+
+
+class TestCanvasCourseCache:
+
+    def test_dashboard_loads_share_cache_and_revalidate(self, canvas_server, clock, cache):
+        state, base_url = canvas_server
+
+        def dashboard_load():
+            # Endpoints build a new integration per request
+            canvas = CanvasLMSIntegration(CanvasConfig(base_url=base_url, access_token='token'))
+            canvas.response_cache = cache
+            return canvas.get_courses()
+
+        assert dashboard_load()[0]['name'] == 'Algebra v1'
+        dashboard_load()
+        assert state['requests'] == 1
+
+        clock[0] = 500
+        assert dashboard_load()[0]['name'] == 'Algebra v1'
+        assert state['not_modified'] == 1
+
+        clock[0] = 1000
+        state['version'] = 2
+        assert dashboard_load()[0]['name'] == 'Algebra v2'
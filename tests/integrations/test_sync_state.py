@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Incremental Sync State Tests
+Tests the persisted high-water marks and snapshot merging shared by the LMS/SIS integrations
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.mvp.database import Base
+import src.mvp.models  # noqa: F401  registers IntegrationSyncState
+from src.integrations.sync_state import DeltaChanges, IncrementalSync, SyncStateStore
+from src.mvp.encryption import EncryptionManager
+
+
+@pytest.fixture
+def store():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    @contextmanager
+    def factory():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    return SyncStateStore(session_factory=factory)
+
+
+class FakeSource:
+    """Course with scores per student; records which students each call touched"""
+
+    def __init__(self, scores):
+        self.scores = dict(scores)
+        self.changed = set()
+        self.full_resync = False
+        self.fetched = []
+        self.scored = []
+
+    def rows(self, student_ids):
+        self.fetched.append(sorted(student_ids))
+        return pd.DataFrame([{'student_id': sid, 'score': self.scores[sid]} for sid in sorted(student_ids)])
+
+    def run(self, sync, **kwargs):
+        def changes(state):
+            return DeltaChanges(changed_ids=set(self.changed), removed_ids=set(state.snapshot) - set(self.scores),
+                                full_resync=self.full_resync)
+
+        def score(rows):
+            self.scored.append(sorted(rows['student_id']))
+            return [{'student_id': r.student_id, 'risk': 1 - r.score} for r in rows.itertuples()]
+
+        return sync.run(lambda: self.rows(self.scores), changes, self.rows, score, **kwargs)
+
+
+class TestIncrementalSync:
+
+    def test_first_run_is_full_and_persists_state(self, store):
+        source = FakeSource({'a': 0.5, 'b': 0.9})
+        result = source.run(IncrementalSync('canvas', '42', store=store))
+
+        assert result.mode == 'full'
+        assert result.rescored_ids == ['a', 'b']
+        state = store.load('canvas', '42')
+        assert state.high_water_mark == result.high_water_mark
+        assert set(state.snapshot) == {'a', 'b'}
+        assert state.last_full_sync_at is not None
+
+    def test_delta_run_merges_changed_rows(self, store):
+        source = FakeSource({'a': 0.5, 'b': 0.9, 'c': 0.1})
+        source.run(IncrementalSync('canvas', '42', store=store))
+
+        source.scores['b'] = 0.2
+        source.changed = {'b'}
+        del source.scores['c']
+        result = source.run(IncrementalSync('canvas', '42', store=store))
+
+        assert result.mode == 'incremental'
+        assert source.scored[-1] == ['b']
+        assert result.removed_ids == ['c']
+        risk = {p['student_id']: p['risk'] for p in result.predictions}
+        assert risk == {'a': pytest.approx(0.5), 'b': pytest.approx(0.8)}
+        assert dict(zip(result.gradebook['student_id'], result.gradebook['score'])) == {'a': 0.5, 'b': 0.2}
+
+    def test_full_resync_requested_by_source(self, store):
+        source = FakeSource({'a': 0.5, 'b': 0.9})
+        source.run(IncrementalSync('canvas', '42', store=store))
+
+        source.full_resync = True
+        result = source.run(IncrementalSync('canvas', '42', store=store))
+        assert result.mode == 'full' and source.scored[-1] == ['a', 'b']
+
+    def test_scopes_are_independent(self, store):
+        FakeSource({'a': 0.5}).run(IncrementalSync('canvas', '1', store=store))
+        result = FakeSource({'x': 0.5}).run(IncrementalSync('canvas', '2', store=store))
+        assert result.mode == 'full'
+        assert store.load('google_classroom', '1') is None
+
+    def test_tenants_with_the_same_course_id_are_independent(self, store):
+        FakeSource({'a': 0.5}).run(IncrementalSync('canvas', '42', store=store, tenant='district-a'))
+        result = FakeSource({'x': 0.5}).run(IncrementalSync('canvas', '42', store=store, tenant='district-b'))
+
+        assert result.mode == 'full' and [row['student_id'] for row in result.rows] == ['x']
+        assert set(store.load('canvas', 'district-a:42').snapshot) == {'a'}
+        assert store.load('canvas', '42') is None
+
+    def test_delta_failure_falls_back_to_full(self, store):
+        source = FakeSource({'a': 0.5})
+        sync = IncrementalSync('powerschool', '100', store=store)
+        source.run(sync)
+
+        def broken(state):
+            raise RuntimeError("delta endpoint unavailable")
+
+        result = sync.run(lambda: source.rows(source.scores), broken, source.rows, lambda rows: [])
+        assert result.mode == 'full'
+
+    def test_etag_is_stored_for_next_comparison(self, store):
+        source = FakeSource({'a': 0.5})
+        source.run(IncrementalSync('google_classroom', '7', store=store), etag='v1')
+        assert store.load('google_classroom', '7').etag == 'v1'
+
+    def test_unchanged_feature_hash_keeps_prediction(self, store):
+        source = FakeSource({'a': 0.5, 'b': 0.9})
+
+        def feature_hash(rows):
+            return rows['score'].map(lambda score: f"{score:.3f}")
+
+        source.run(IncrementalSync('canvas', '42', store=store), feature_hash=feature_hash)
+        source.changed = {'a', 'b'}  # both refetched, only b's model input moved
+        source.scores['b'] = 0.4
+        result = source.run(IncrementalSync('canvas', '42', store=store, risk_key='risk'), feature_hash=feature_hash)
+
+        assert source.scored[-1] == ['b']
+        assert result.rescored_ids == ['b'] and result.unchanged_ids == ['a']
+        assert result.previous_risk == {'b': pytest.approx(0.1)}
+        risk = {p['student_id']: p['risk'] for p in result.predictions}
+        assert risk == {'a': pytest.approx(0.5), 'b': pytest.approx(0.6)}
+
+    def test_snapshot_is_stored_encrypted(self, store):
+        with patch.dict(os.environ, {'ENABLE_DATABASE_ENCRYPTION': 'true',
+                                     'DATABASE_ENCRYPTION_KEY': 'sync-state-test-key-' + 'a' * 32}):
+            encrypted_store = SyncStateStore(session_factory=store.session_factory, encryption=EncryptionManager())
+        source = FakeSource({'ada.lovelace': 0.5})
+        source.run(IncrementalSync('powerschool', '100', store=encrypted_store))
+
+        from src.mvp.models import IntegrationSyncState
+        with store.session_factory() as db:
+            stored = db.query(IntegrationSyncState).filter_by(scope_id='100').one().snapshot
+        assert 'ada' not in stored and stored.startswith('v1:')
+        assert set(encrypted_store.load('powerschool', '100').snapshot) == {'ada.lovelace'}
+        # A snapshot no key can read means a full sync, not a crash
+        assert store.load('powerschool', '100').snapshot == {}
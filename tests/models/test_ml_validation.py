@@ -181,7 +181,50 @@ class TestK12UltraPredictorValidation:
                 
         except Exception as e:
             pytest.skip(f"Consistency test failed due to model error: {e}")
-    
+
+    def test_predict_batch_matches_row_by_row(self, k12_predictor):
+        """Vectorized batch scoring gives the same predictions as predict_from_gradebook"""
+        rng = np.random.default_rng(7)
+        n = 50
+        gradebook = pd.DataFrame({
+            'student_id': [f'S{i:03d}' for i in range(n)],
+            'name': [f'Student {i}' for i in range(n)],
+            'grade_level': rng.integers(6, 13, n),
+            'current_gpa': rng.uniform(0, 4, n),
+            'attendance_rate': rng.uniform(0.5, 1, n),
+            'disciplinary_incidents': rng.integers(0, 6, n),
+            'assignment_completion': rng.uniform(0, 1, n),
+            'parent_contact': rng.integers(0, 6, n),
+            'clubs': rng.integers(0, 3, n)
+        })
+        expected = k12_predictor.predict_from_gradebook(gradebook)
+        actual = k12_predictor.predict_batch(gradebook)
+
+        assert [p['student_id'] for p in actual] == [p['student_id'] for p in expected]
+        for batch, row in zip(actual, expected):
+            assert batch['risk_probability'] == pytest.approx(row['risk_probability'], abs=1e-9)
+            assert batch['risk_category'] == row['risk_category']
+            assert batch['grade_level'] == row['grade_level']
+        assert k12_predictor.predict_batch(gradebook.iloc[:0]) == []
+
+    def test_feature_hashes_track_model_inputs(self):
+        """Feature hashes change with model inputs but not with columns the model ignores"""
+        from src.models.k12_ultra_predictor import gradebook_feature_hashes
+
+        gradebook = pd.DataFrame({
+            'student_id': ['S1', 'S2'],
+            'name': ['Alice', 'Bob'],
+            'current_gpa': [3.2, 2.1],
+            'attendance_rate': [0.97, 0.88]
+        })
+        before = gradebook_feature_hashes(gradebook).tolist()
+
+        assert gradebook_feature_hashes(gradebook.assign(email=['a@x.org', 'b@x.org'])).tolist() == before
+        changed = gradebook.copy()
+        changed.loc[1, 'attendance_rate'] = 0.6
+        after = gradebook_feature_hashes(changed).tolist()
+        assert after[0] == before[0] and after[1] != before[1]
+
     def test_model_info_retrieval(self, k12_predictor):
         """Test model info retrieval"""
         try:
@@ -152,7 +152,7 @@ class TestModelDataEncryption:
             'student_id': 'STU001',
             'sis_id': 'SIS12345',
             'grade_level': '10',
-            'birth_date': '2008-03-15',  # Should be encrypted
+            'birth_date': '2008-03-15',  # DateTime column, NOT encrypted
             'email': 'student@school.edu',  # Should be encrypted  
             'phone': '555-0123',  # Should be encrypted
             'parent_email': 'parent@example.com',  # Should be encrypted
@@ -180,14 +180,14 @@ class TestModelDataEncryption:
         encrypted_data = encrypt_student_data(sample_student_data)
         
         # Check that sensitive fields are encrypted
-        sensitive_fields = ['birth_date', 'email', 'phone', 'parent_email', 'parent_phone']
+        sensitive_fields = ['email', 'phone', 'parent_email', 'parent_phone']
         for field in sensitive_fields:
             if field in sample_student_data:
                 assert encrypted_data[field] != sample_student_data[field]
                 assert encrypted_data[field].startswith('v1:')
         
         # Check that non-sensitive fields are unchanged
-        non_sensitive_fields = ['student_id', 'grade_level', 'enrollment_status', 'is_ell']
+        non_sensitive_fields = ['student_id', 'grade_level', 'birth_date', 'enrollment_status', 'is_ell']
         for field in non_sensitive_fields:
             if field in sample_student_data:
                 assert encrypted_data[field] == sample_student_data[field]
@@ -248,7 +248,7 @@ class TestEncryptionConfiguration:
         
         # Check student fields
         student_fields = ENCRYPTED_FIELDS['students']
-        assert 'birth_date' in student_fields
+        assert 'birth_date' not in student_fields
         assert 'email' in student_fields
         assert 'phone' in student_fields
         assert 'parent_email' in student_fields
@@ -327,6 +327,160 @@ class TestEncryptionSecurity:
         result = manager.decrypt(tampered)
         assert result == tampered  # Graceful degradation
 
+class TestColumnEncryption:
+    """Test batched column encryption and deferred ORM decryption"""
+    
+    @pytest.fixture
+    def manager(self):
+        with patch.dict(os.environ, {'ENABLE_DATABASE_ENCRYPTION': 'true'}):
+            from src.mvp.encryption import EncryptionManager
+            return EncryptionManager()
+    
+    def test_column_round_trip_keeps_empty_and_legacy_values(self, manager):
+        """Test encrypt_column/decrypt_column pass None, empty and plaintext values through"""
+        values = ['a@school.edu', None, '', '   ', 'héllo wörld' * 5]
+        encrypted = manager.encrypt_column(values)
+        
+        assert encrypted[1:4] == [None, '', '   ']
+        assert encrypted[0].startswith('v1:gAAAAA')
+        assert manager.decrypt_column(encrypted + ['plain-legacy']) == values + ['plain-legacy']
+    
+    def test_tokens_are_standard_fernet(self, manager):
+        """Test column tokens interoperate with Fernet in both directions"""
+        values = [f"student{i}@district.k12.us" * (i % 4 + 1) for i in range(50)]
+        encrypted = manager.encrypt_column(values)
+        
+        assert [manager._cipher.decrypt(v.split(':', 1)[1].encode()).decode() for v in encrypted] == values
+        fernet_tokens = [f"v1:{manager._cipher.encrypt(v.encode()).decode()}" for v in values]
+        assert manager.decrypt_column(fernet_tokens) == values
+    
+    def test_legacy_double_encoded_values_still_decrypt(self, manager):
+        """Test values written with the previous base64-wrapped format"""
+        import base64
+        legacy = 'v1:' + base64.urlsafe_b64encode(manager._cipher.encrypt(b'old@school.edu')).decode()
+        
+        assert manager.decrypt(legacy) == 'old@school.edu'
+    
+    def test_tampered_value_in_column_is_returned_as_is(self, manager):
+        """Test one bad token does not fail the rest of the column"""
+        good, bad = manager.encrypt_column(['one@school.edu', 'two@school.edu'])
+        bad = bad[:-6] + ('AAAAAA' if not bad.endswith('AAAAAA') else 'BBBBBB')
+        
+        assert manager.decrypt_column([good, bad]) == ['one@school.edu', bad]
+    
+    def test_encrypt_model_rows_only_touches_encrypted_fields(self, manager):
+        """Test bulk rows are encrypted column by column"""
+        with patch('src.mvp.encryption.encryption_manager', manager):
+            from src.mvp.encryption import encrypt_model_rows, decrypt_model_rows
+            rows = [{'student_id': str(i), 'email': f"s{i}@school.edu", 'phone': None} for i in range(3)]
+            encrypted = encrypt_model_rows('students', rows)
+            
+            assert [r['student_id'] for r in encrypted] == ['0', '1', '2']
+            assert all(r['email'].startswith('v1:') and r['phone'] is None for r in encrypted)
+            assert all(r['email_bidx'] == manager.blind_index('email', r['email'])
+                       for r in decrypt_model_rows('students', encrypted))
+            assert [{k: r[k] for k in rows[0]} for r in decrypt_model_rows('students', encrypted)] == rows
+    
+    def test_orm_attributes_decrypt_on_first_access(self, manager):
+        """Test EncryptedAttribute stores ciphertext and decrypts lazily once"""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from sqlalchemy.pool import StaticPool
+        from src.mvp.database import Base
+        from src.mvp.models import Institution, Student
+        
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        
+        with patch('src.mvp.encryption.encryption_manager', manager):
+            institution = Institution(name="Test", code="TEST", type="K12")
+            session.add(institution)
+            session.flush()
+            session.add(Student(institution_id=institution.id, student_id="S1", email="kid@school.edu"))
+            session.commit()
+            session.expunge_all()
+            
+            stored = session.execute(Student.__table__.select()).first()
+            assert stored.email.startswith('v1:gAAAAA')
+            
+            student = session.query(Student).filter(Student.student_id == "S1").one()
+            with patch.object(manager, 'decrypt_column', wraps=manager.decrypt_column) as spy:
+                assert spy.call_count == 0
+                assert student.email == "kid@school.edu"
+                assert student.email == "kid@school.edu"
+                assert spy.call_count == 1
+            
+            student.email = "new@school.edu"
+            session.commit()
+            session.expunge_all()
+            assert session.query(Student).one().email == "new@school.edu"
+
+class TestBlindIndex:
+    """Test deterministic blind indexes for searching encrypted fields"""
+    
+    def test_digest_is_normalized_deterministic_and_field_scoped(self):
+        """Test equal values match after normalization but not across fields"""
+        with patch.dict(os.environ, {'ENABLE_DATABASE_ENCRYPTION': 'true'}):
+            from src.mvp.encryption import EncryptionManager
+            manager = EncryptionManager()
+        
+        digest = manager.blind_index('email', 'Parent@Mail.com ')
+        assert digest == manager.blind_index('email', 'parent@mail.com')
+        assert len(digest) == 32
+        assert digest != manager.blind_index('parent_email', 'parent@mail.com')
+        assert manager.blind_index('phone', '(555) 012-3456') == manager.blind_index('phone', '555.012.3456')
+        assert manager.blind_index('email', '  ') is None
+        assert manager.blind_index('email', None) is None
+    
+    def test_digest_does_not_depend_on_encryption_being_enabled(self):
+        """Test rows indexed with encryption off stay searchable once it is enabled"""
+        from src.mvp.encryption import EncryptionManager
+        with patch.dict(os.environ, {'ENABLE_DATABASE_ENCRYPTION': 'false'}):
+            disabled = EncryptionManager()
+        with patch.dict(os.environ, {'ENABLE_DATABASE_ENCRYPTION': 'true'}):
+            enabled = EncryptionManager()
+        
+        assert disabled.blind_index('email', 'a@b.org') == enabled.blind_index('email', 'a@b.org')
+    
+    def test_search_encrypted_field_uses_blind_index(self):
+        """Test exact lookups on encrypted fields without decrypting rows"""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from sqlalchemy.pool import StaticPool
+        from src.mvp.database import Base
+        from src.mvp.models import Institution, Student
+        from src.mvp.encryption import EncryptionManager, encrypt_model_rows
+        from src.mvp.encryption_middleware import search_encrypted_field
+        
+        with patch.dict(os.environ, {'ENABLE_DATABASE_ENCRYPTION': 'true'}):
+            manager = EncryptionManager()
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        
+        with patch('src.mvp.encryption.encryption_manager', manager), \
+             patch('src.mvp.encryption_middleware.encryption_manager', manager):
+            institution = Institution(name="Test", code="TEST", type="K12")
+            session.add(institution)
+            session.flush()
+            session.add(Student(institution_id=institution.id, student_id="ORM1", parent_phone="555-0100"))
+            session.execute(Student.__table__.insert(), encrypt_model_rows('students', [
+                {'institution_id': institution.id, 'student_id': f"BULK{i}", 'email': f"s{i}@school.edu"}
+                for i in range(5)
+            ]))
+            session.commit()
+            
+            with patch.object(manager, 'decrypt_column') as decrypt:
+                assert search_encrypted_field(session, Student, 'email', 'S3@school.edu').one().student_id == "BULK3"
+                assert search_encrypted_field(session, Student, 'parent_phone', '(555) 0100').one().student_id == "ORM1"
+                assert search_encrypted_field(session, Student, 'email', '').count() == 0
+                assert search_encrypted_field(session, Student, 'student_id', 'BULK', prefix=True).count() == 5
+                decrypt.assert_not_called()
+            
+            with pytest.raises(ValueError):
+                search_encrypted_field(session, Student, 'email', 's3@', prefix=True)
+
 class TestPerformance:
     """Test encryption performance"""
     